@@ -0,0 +1,65 @@
+"""Add composition scores
+
+Revision ID: 3c5e7a9b1d2f
+Revises: 123456789abc
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# Identifiants de révision
+revision = '3c5e7a9b1d2f'
+down_revision = '123456789abc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Scores des compositions enregistrées, par version de l'optimiseur
+    op.create_table(
+        'composition_scores',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column(
+            'composition_id',
+            sa.Integer(),
+            sa.ForeignKey('compositions.id', ondelete='CASCADE'),
+            nullable=False,
+        ),
+        sa.Column('version', sa.String(length=100), nullable=False),
+        sa.Column('game_type', sa.String(length=50), nullable=False),
+        sa.Column('game_mode', sa.String(length=50), nullable=False),
+        # Sans score : composition sans membres ou dont un build n'a pas de modèle
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('raw_score', sa.Float(), nullable=True),
+        sa.Column('metrics', sa.JSON(), nullable=True),
+        sa.Column(
+            'scored_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column(
+            'created_at', sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint('composition_id', 'version', name='uq_composition_score'),
+    )
+    op.create_index('ix_composition_scores_id', 'composition_scores', ['id'])
+    op.create_index(
+        'ix_composition_scores_composition_id', 'composition_scores', ['composition_id']
+    )
+
+    # Classement GET /compositions?order_by=score : parcours de l'index par version
+    op.create_index(
+        'ix_composition_scores_version_score',
+        'composition_scores',
+        ['version', 'score', 'raw_score'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_composition_scores_version_score', table_name='composition_scores')
+    op.drop_index('ix_composition_scores_composition_id', table_name='composition_scores')
+    op.drop_index('ix_composition_scores_id', table_name='composition_scores')
+    op.drop_table('composition_scores')
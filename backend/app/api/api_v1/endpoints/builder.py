@@ -5,23 +5,109 @@ This module provides endpoints for optimizing squad compositions
 based on game mode, squad size, and optimization goals.
 """
 
+import asyncio
+import json
 import logging
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from typing import AsyncIterator, Optional, Dict, Any, List, Tuple
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    status,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.core.config import settings
 from app.core.optimizer import optimize_composition
+from app.core.optimizer.alliance import optimize_alliance
+from app.core.optimizer.assignment import assign_roster
+from app.core.optimizer.jobs import enqueue_optimization, get_job_status
+from app.core.optimizer.memo import get_optimizer_memo, memo_key
+from app.core.optimizer.metrics import observe_result
+from app.core.optimizer.pool import (
+    OptimizerPool,
+    OptimizerQueueFull,
+    get_optimizer_pool,
+)
+from app.core.optimizer.portfolio import optimize_portfolio
+from app.core.optimizer.repair import repair_composition
+from app.core.optimizer.sensitivity import composition_sensitivity
+from app.core.optimizer.stream import stream_incumbents
+from app.core.optimizer.strategies import STOP_CANCELLED
 from app.core.cache import cache_response
+from app.worker import get_arq_pool
 from app.schemas.composition import (
+    AllianceOptimizationRequest,
+    AllianceOptimizationResult,
+    CompositionOptimizationBatchItem,
+    CompositionOptimizationIncumbent,
+    CompositionOptimizationJob,
+    CompositionOptimizationJobRequest,
     CompositionOptimizationRequest,
     CompositionOptimizationResult,
+    CompositionRepairRequest,
+    CompositionRepairResult,
+    CompositionSensitivityRequest,
+    CompositionSensitivityResult,
+    PlayableBuild,
+    RosterAssignmentRequest,
+    RosterAssignmentResult,
+    RosterMember,
 )
+from app.models.build import Build
+from app.models.composition import Composition
+from app.models.association_tables import build_profession, composition_members
 from app.models.user import User
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+BUSY_DETAIL = "Optimizer is busy. Please retry later."
+
+
+def _validate_request(request: CompositionOptimizationRequest) -> None:
+    """Reject requests the optimizer cannot satisfy with a 400."""
+    # Validate squad size
+    if request.squad_size < 1 or request.squad_size > 50:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Squad size must be between 1 and 50",
+        )
+
+    # Validate fixed roles don't exceed squad size
+    if request.fixed_roles:
+        total_fixed = sum(role.count for role in request.fixed_roles)
+        if total_fixed > request.squad_size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Fixed roles count ({total_fixed}) exceeds squad size ({request.squad_size})",
+            )
+
+
+def _pool_jobs(request: CompositionOptimizationRequest, pool: OptimizerPool) -> int:
+    """Upper bound of the pool jobs an optimization submits."""
+    if request.restarts and request.restarts > 1:
+        return min(request.restarts, pool.max_workers)
+    return 1
+
+
+async def _optimize(
+    request: CompositionOptimizationRequest, key: str, pool: OptimizerPool
+) -> CompositionOptimizationResult:
+    """Run an optimization in the optimizer process pool and memoize it."""
+    if request.restarts and request.restarts > 1:
+        result = await optimize_portfolio(request, pool)
+    else:
+        result = await pool.run(optimize_composition, request)
+    await get_optimizer_memo().set(key, result)
+    return observe_result(request, result)
+
 
 @router.post(
     "/optimize",
@@ -40,6 +126,16 @@ logger = logging.getLogger(__name__)
     - WvW-specific capabilities (boon rip, cleanses, etc.)
     
     The optimization is time-boxed to ensure fast response times (typically < 5s).
+    It runs in a dedicated process pool; when the pool queue is full the
+    endpoint answers 503 with a `Retry-After` header.
+
+    Runs are deterministic: the search is seeded from the request, and
+    results are memoized (in process and in Redis) per request, optimizer
+    config and engine version, so repeated requests are answered from cache.
+
+    With `restarts` > 1 the request runs in portfolio mode: independent
+    restarts run in parallel workers within the same time budget and the
+    best composition is returned, with per-restart statistics.
     
     **Game Modes:**
     - `zerg`: Large-scale fights (30-50 players) - emphasis on boon coverage and sustain
@@ -114,6 +210,7 @@ logger = logging.getLogger(__name__)
         },
         400: {"description": "Invalid request parameters"},
         500: {"description": "Optimization failed"},
+        503: {"description": "Optimizer queue is full, retry later"},
     },
 )
 async def optimize_composition_endpoint(
@@ -136,24 +233,17 @@ async def optimize_composition_endpoint(
             f"mode={request.game_mode}, size={request.squad_size}"
         )
 
-        # Validate squad size
-        if request.squad_size < 1 or request.squad_size > 50:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Squad size must be between 1 and 50",
-            )
+        _validate_request(request)
 
-        # Validate fixed roles don't exceed squad size
-        if request.fixed_roles:
-            total_fixed = sum(role.count for role in request.fixed_roles)
-            if total_fixed > request.squad_size:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Fixed roles count ({total_fixed}) exceeds squad size ({request.squad_size})",
-                )
+        # Identical requests give identical results: serve them from cache
+        key = await memo_key(request)
+        result = await get_optimizer_memo().get(key)
+        if result is not None:
+            logger.info(f"Optimization served from cache: {key}")
+            return result
 
-        # Run optimization
-        result = optimize_composition(request)
+        # Run optimization in the optimizer process pool
+        result = await _optimize(request, key, get_optimizer_pool())
 
         logger.info(
             f"Optimization completed: score={result.score:.3f}, "
@@ -162,6 +252,15 @@ async def optimize_composition_endpoint(
 
         return result
 
+    except HTTPException:
+        raise
+    except OptimizerQueueFull as e:
+        logger.warning(f"Optimizer queue full, rejecting request: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=BUSY_DETAIL,
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except ValueError as e:
         logger.error(f"Validation error in optimization: {e}")
         raise HTTPException(
@@ -176,6 +275,625 @@ async def optimize_composition_endpoint(
         )
 
 
+@router.post(
+    "/optimize/batch",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Optimize several compositions",
+    description="""
+    Optimize a list of compositions in one call, e.g. a zerg, two havoc
+    groups and a roaming party.
+
+    Identical requests are optimized once, results already in cache are sent
+    first and the other optimizations run in parallel in the optimizer
+    process pool, so the call takes about as long as its slowest request.
+
+    The response is streamed as newline-delimited JSON (`application/x-ndjson`):
+    one `CompositionOptimizationBatchItem` per distinct request, written as
+    soon as its optimization finishes. `indices` gives the positions of the
+    requests it answers; a failed optimization has a `status_code` and an
+    `error` instead of a `result`.
+
+    The whole batch is rejected with 400 if a request is invalid, and with
+    503 + `Retry-After` if the pool cannot take all of its optimizations.
+    """,
+    responses={
+        200: {
+            "description": "Stream of batch items, one JSON object per line",
+            "content": {"application/x-ndjson": {}},
+        },
+        400: {"description": "Invalid request parameters"},
+        503: {"description": "Optimizer queue is full, retry later"},
+    },
+)
+async def optimize_batch_endpoint(
+    requests: List[CompositionOptimizationRequest] = Body(..., min_length=1),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> StreamingResponse:
+    """Optimize several compositions and stream the results as they finish."""
+    if len(requests) > settings.OPTIMIZER_BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch accepts at most {settings.OPTIMIZER_BATCH_MAX_REQUESTS} requests",
+        )
+    for index, request in enumerate(requests):
+        try:
+            _validate_request(request)
+        except HTTPException as e:
+            e.detail = f"Request {index}: {e.detail}"
+            raise
+
+    logger.info(
+        f"User {current_user.id} requested batch optimization of "
+        f"{len(requests)} compositions"
+    )
+
+    # Deduplicate identical requests
+    groups: Dict[str, List[int]] = {}
+    for index, request in enumerate(requests):
+        groups.setdefault(await memo_key(request), []).append(index)
+
+    memo = get_optimizer_memo()
+    cached = {key: await memo.get(key) for key in groups}
+    pending = [key for key, result in cached.items() if result is None]
+
+    # Admit the whole batch or nothing
+    pool = get_optimizer_pool()
+    jobs = sum(_pool_jobs(requests[groups[key][0]], pool) for key in pending)
+    if pool.in_flight + jobs > pool.capacity:
+        logger.warning(f"Optimizer queue full, rejecting batch of {jobs} jobs")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=BUSY_DETAIL,
+            headers={"Retry-After": str(pool.retry_after)},
+        )
+
+    async def run(key: str) -> Tuple[str, CompositionOptimizationBatchItem]:
+        item = CompositionOptimizationBatchItem(indices=groups[key])
+        try:
+            item.result = await _optimize(requests[groups[key][0]], key, pool)
+        except OptimizerQueueFull:
+            item.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            item.error = BUSY_DETAIL
+        except ValueError as e:
+            item.status_code = status.HTTP_400_BAD_REQUEST
+            item.error = str(e)
+        except Exception as e:
+            logger.error(f"Batch optimization failed: {e}", exc_info=True)
+            item.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+            item.error = "Optimization failed. Please try again or contact support."
+        return key, item
+
+    async def stream() -> AsyncIterator[str]:
+        for key, result in cached.items():
+            if result is not None:
+                item = CompositionOptimizationBatchItem(
+                    indices=groups[key], cached=True, result=result
+                )
+                yield item.model_dump_json() + "\n"
+
+        tasks = [asyncio.ensure_future(run(key)) for key in pending]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                _, item = await next_done
+                yield item.model_dump_json() + "\n"
+        finally:
+            # Client gone: don't keep optimizations nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def _sse(event: str, data: str) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@router.post(
+    "/optimize/stream",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Optimize a composition, streaming intermediate results",
+    description="""
+    Anytime variant of `/optimize`: the response is a stream of server-sent
+    events (`text/event-stream`) sent while the search runs.
+
+    - `incumbent`: a new best composition, starting with the greedy seed a
+      few milliseconds after the request. Its data is a
+      `CompositionOptimizationIncumbent` with the raw score, the local search
+      iteration and the elapsed time.
+    - `result`: the final composition (`final` is true and
+      `result.stop_reason` is set), then the stream ends. Memoized results
+      are sent right away as a single `result` event.
+    - `error`: the optimization failed, then the stream ends.
+
+    Closing the connection, e.g. once the client accepts an incumbent,
+    stops the search and frees its optimizer worker. Streamed runs don't use
+    portfolio mode: `restarts` is ignored.
+
+    Invalid requests are rejected with 400, and with 503 + `Retry-After`
+    when the optimizer pool is full.
+    """,
+    responses={
+        200: {
+            "description": "Stream of incumbent events",
+            "content": {"text/event-stream": {}},
+        },
+        400: {"description": "Invalid request parameters"},
+        503: {"description": "Optimizer queue is full, retry later"},
+    },
+)
+async def optimize_stream_endpoint(
+    request: CompositionOptimizationRequest,
+    http_request: Request,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> StreamingResponse:
+    """Optimize a composition and stream every new best one as an SSE."""
+    _validate_request(request)
+    logger.info(
+        f"User {current_user.id} requested streamed optimization: "
+        f"mode={request.game_mode}, size={request.squad_size}"
+    )
+
+    key = await memo_key(request)
+    cached = await get_optimizer_memo().get(key)
+    pool = get_optimizer_pool()
+    if cached is None and pool.in_flight >= pool.capacity:
+        logger.warning("Optimizer queue full, rejecting streamed optimization")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=BUSY_DETAIL,
+            headers={"Retry-After": str(pool.retry_after)},
+        )
+
+    async def events() -> AsyncIterator[str]:
+        if cached is not None:
+            incumbent = CompositionOptimizationIncumbent(
+                iteration=0,
+                elapsed=0.0,
+                result=cached,
+                final=True,
+            )
+            yield _sse("result", incumbent.model_dump_json())
+            return
+
+        incumbents = stream_incumbents(request, pool)
+        try:
+            async for incumbent in incumbents:
+                if await http_request.is_disconnected():
+                    break
+                if incumbent.final:
+                    if incumbent.result.stop_reason != STOP_CANCELLED:
+                        await get_optimizer_memo().set(key, incumbent.result)
+                    incumbent.result = observe_result(request, incumbent.result)
+                    yield _sse("result", incumbent.model_dump_json())
+                else:
+                    yield _sse("incumbent", incumbent.model_dump_json())
+        except OptimizerQueueFull:
+            yield _sse("error", json.dumps({"detail": BUSY_DETAIL}))
+        except Exception as e:
+            logger.error(f"Streamed optimization failed: {e}", exc_info=True)
+            yield _sse("error", json.dumps({"detail": "Optimization failed"}))
+        finally:
+            # Stops the search if the client went away before the end
+            await incumbents.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/jobs",
+    response_model=CompositionOptimizationJob,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Start a background optimization",
+    description="""
+    Enqueue an optimization on the arq worker and return its job id at once.
+
+    Use it for deep searches whose `time_budget` (up to
+    `OPTIMIZER_JOB_MAX_BUDGET` seconds) doesn't fit in an HTTP request, e.g.
+    30-60 s for a 50-player zerg. Poll `GET /builder/jobs/{job_id}` for the
+    status, progress and result; results are kept for
+    `OPTIMIZER_JOB_RESULT_TTL` seconds.
+    """,
+    responses={
+        400: {"description": "Invalid request parameters"},
+        503: {"description": "Job queue unavailable"},
+    },
+)
+async def create_optimization_job(
+    request: CompositionOptimizationJobRequest,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> CompositionOptimizationJob:
+    """Enqueue an optimization job on the arq worker."""
+    _validate_request(request)
+    if request.time_budget > settings.OPTIMIZER_JOB_MAX_BUDGET:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Time budget cannot exceed {settings.OPTIMIZER_JOB_MAX_BUDGET:g}s",
+        )
+
+    optimization = CompositionOptimizationRequest.model_validate(
+        request.model_dump(exclude={"time_budget"})
+    )
+    try:
+        job = await enqueue_optimization(
+            await get_arq_pool(), optimization, request.time_budget
+        )
+    except Exception as e:
+        logger.error(f"Failed to enqueue optimization job: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Job queue is unavailable. Please retry later.",
+        )
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Optimization job already exists",
+        )
+
+    logger.info(
+        f"User {current_user.id} enqueued optimization job {job.job_id}: "
+        f"mode={request.game_mode}, size={request.squad_size}, "
+        f"budget={request.time_budget:g}s"
+    )
+    return CompositionOptimizationJob(job_id=job.job_id, status="queued")
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=CompositionOptimizationJob,
+    summary="Get a background optimization",
+    description="""
+    Status of an optimization job: `deferred`, `queued`, `in_progress` or
+    `complete`. Running jobs report the score of their best composition so
+    far in `progress`; complete jobs have a `result` or an `error`.
+    """,
+    responses={
+        404: {"description": "Unknown or expired job"},
+        503: {"description": "Job queue unavailable"},
+    },
+)
+async def get_optimization_job(
+    job_id: str,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> CompositionOptimizationJob:
+    """Return the status, progress and result of an optimization job."""
+    try:
+        job = await get_job_status(await get_arq_pool(), job_id)
+    except Exception as e:
+        logger.error(f"Failed to read optimization job {job_id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Job queue is unavailable. Please retry later.",
+        )
+    if job.status == "not_found":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Optimization job {job_id} not found",
+        )
+    return job
+
+
+@router.post(
+    "/alliance",
+    response_model=AllianceOptimizationResult,
+    status_code=status.HTTP_200_OK,
+    summary="Optimize the squads of an alliance",
+    description="""
+    Optimize several squads (up to 10 of up to 50 players each) drawn from
+    a shared pool of players, e.g. the 2-3 squads of an alliance night.
+
+    Each squad is a regular optimization request with its own game mode.
+    `available_professions` gives the players available per profession for
+    the whole alliance; squads only use listed professions and never more
+    players of one than available.
+
+    The squads are optimized in parallel workers of the optimizer pool, then
+    rebalanced against the profession pool by build changes and exchanges
+    between squads, all within `time_budget` seconds.
+    """,
+    responses={
+        400: {"description": "Invalid request or not enough players"},
+        500: {"description": "Optimization failed"},
+        503: {"description": "Optimizer queue is full, retry later"},
+    },
+)
+async def optimize_alliance_endpoint(
+    request: AllianceOptimizationRequest,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> AllianceOptimizationResult:
+    """Optimize the squads of an alliance sharing a player pool."""
+    try:
+        for i, squad in enumerate(request.squads):
+            try:
+                _validate_request(squad)
+            except HTTPException as e:
+                raise HTTPException(
+                    status_code=e.status_code, detail=f"Squad {i}: {e.detail}"
+                )
+
+        logger.info(
+            f"User {current_user.id} requested alliance optimization: "
+            f"{len(request.squads)} squads, "
+            f"{sum(squad.squad_size for squad in request.squads)} players"
+        )
+        return await optimize_alliance(request, get_optimizer_pool())
+
+    except HTTPException:
+        raise
+    except OptimizerQueueFull as e:
+        logger.warning(f"Optimizer queue full, rejecting alliance: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=BUSY_DETAIL,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Alliance optimization failed: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Optimization failed. Please try again or contact support.",
+        )
+
+
+async def _stored_members(
+    db: AsyncSession, composition_id: int, user: User
+) -> List[RosterMember]:
+    """Members of a stored composition readable by the user, 404 otherwise."""
+    composition = await db.get(Composition, composition_id)
+    if composition is None or (
+        not composition.is_public and composition.created_by != user.id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Composition {composition_id} not found",
+        )
+    rows = await db.execute(
+        select(
+            composition_members.c.profession_id,
+            composition_members.c.elite_specialization_id,
+        )
+        .where(
+            composition_members.c.composition_id == composition_id,
+            composition_members.c.profession_id.is_not(None),
+        )
+        .order_by(composition_members.c.user_id)
+    )
+    return [
+        RosterMember(profession_id=profession_id, elite_specialization_id=elite_id)
+        for profession_id, elite_id in rows.all()
+    ]
+
+
+@router.post(
+    "/repair",
+    response_model=CompositionRepairResult,
+    status_code=status.HTTP_200_OK,
+    summary="Repair a composition after a roster change",
+    description="""
+    Adapt an existing composition to a roster change with as few build
+    changes as possible, instead of optimizing the new squad from scratch.
+
+    The composition is either stored (`composition_id`, members in the
+    order of their user ids) or given inline (`members`). `removed` lists
+    the indices of the members who left, `added` the players who joined.
+    Locked members keep their build, members of a `locked_professions`
+    profession only change elite specialization or role.
+
+    The repair changes one build at a time, the one with the best score
+    gain, within `time_budget` seconds (typically a few milliseconds) and
+    at most `max_swaps` members. The response lists the changes to ask
+    for, by member index in the new roster.
+    """,
+    responses={
+        400: {"description": "Invalid roster"},
+        404: {"description": "Unknown composition"},
+        500: {"description": "Repair failed"},
+        503: {"description": "Optimizer queue is full, retry later"},
+    },
+)
+async def repair_composition_endpoint(
+    request: CompositionRepairRequest,
+    current_user: User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> CompositionRepairResult:
+    """Repair a composition after players left or joined."""
+    try:
+        if request.composition_id is not None:
+            members = await _stored_members(db, request.composition_id, current_user)
+            request = request.model_copy(update={"members": members})
+
+        result = await get_optimizer_pool().run(repair_composition, request)
+
+        logger.info(
+            f"User {current_user.id} repaired a composition: "
+            f"{len(result.swaps)} swaps, raw score "
+            f"{result.raw_score_before:.3f} -> {result.raw_score:.3f}"
+        )
+        return result
+
+    except HTTPException:
+        raise
+    except OptimizerQueueFull as e:
+        logger.warning(f"Optimizer queue full, rejecting repair: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=BUSY_DETAIL,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Composition repair failed: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Composition repair failed. Please try again.",
+        )
+
+
+@router.post(
+    "/sensitivity",
+    response_model=CompositionSensitivityResult,
+    status_code=status.HTTP_200_OK,
+    summary="Score change of every build change of a composition",
+    description="""
+    Answer "what if this player switched build?" for the whole squad in
+    one round trip.
+
+    The composition is either stored (`composition_id`, members in the
+    order of their user ids) or given inline (`members`). `deltas[i][j]`
+    is the raw score change when member `i` plays `templates[j]` instead
+    of their build, 0 for their own build: a members x templates matrix
+    ready to render as a heatmap. `best` is the most improving change, if
+    any. The whole matrix is scored in one vectorized pass, in a few
+    milliseconds.
+    """,
+    responses={
+        400: {"description": "Invalid composition"},
+        404: {"description": "Unknown composition"},
+        500: {"description": "Analysis failed"},
+        503: {"description": "Optimizer queue is full, retry later"},
+    },
+)
+async def composition_sensitivity_endpoint(
+    request: CompositionSensitivityRequest,
+    current_user: User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> CompositionSensitivityResult:
+    """Score every single build change of a composition."""
+    try:
+        if request.composition_id is not None:
+            members = await _stored_members(db, request.composition_id, current_user)
+            request = request.model_copy(update={"members": members})
+
+        return await get_optimizer_pool().run(composition_sensitivity, request)
+
+    except HTTPException:
+        raise
+    except OptimizerQueueFull as e:
+        logger.warning(f"Optimizer queue full, rejecting sensitivity: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=BUSY_DETAIL,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Composition sensitivity failed: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Composition analysis failed. Please try again.",
+        )
+
+
+async def _saved_builds(
+    db: AsyncSession, user_ids: List[int]
+) -> Dict[int, List[PlayableBuild]]:
+    """Professions of the saved builds of users, oldest build first."""
+    rows = await db.execute(
+        select(Build.created_by_id, build_profession.c.profession_id)
+        .join(build_profession, build_profession.c.build_id == Build.id)
+        .where(Build.created_by_id.in_(user_ids))
+        .order_by(Build.id, build_profession.c.id)
+    )
+    builds: Dict[int, List[PlayableBuild]] = {}
+    for user_id, profession_id in rows.all():
+        playable = builds.setdefault(user_id, [])
+        if all(build.profession_id != profession_id for build in playable):
+            playable.append(PlayableBuild(profession_id=profession_id))
+    return builds
+
+
+@router.post(
+    "/assign",
+    response_model=RosterAssignmentResult,
+    status_code=status.HTTP_200_OK,
+    summary="Assign the players of a roster to composition slots",
+    description="""
+    Give each slot of a target composition to a real player who can play
+    it, as a minimum cost matching of players to slots.
+
+    Each player lists their playable builds by order of preference; players
+    given by `user_id` only default to the professions of their saved
+    builds. A player's exact build costs nothing, another role or elite
+    specialization of the same profession costs more, and players never
+    take a profession they don't play. Unmatched slots are returned in
+    `unfilled_slots`, players without a slot in `benched_players`.
+
+    Without `slots`, a composition is first optimized for the roster size
+    and professions within `time_budget` seconds.
+    """,
+    responses={
+        400: {"description": "Invalid roster"},
+        500: {"description": "Assignment failed"},
+        503: {"description": "Optimizer queue is full, retry later"},
+    },
+)
+async def assign_roster_endpoint(
+    request: RosterAssignmentRequest,
+    current_user: User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> RosterAssignmentResult:
+    """Assign roster players to the slots of a composition."""
+    try:
+        user_ids = [
+            player.user_id
+            for player in request.players
+            if player.builds is None and player.user_id is not None
+        ]
+        if user_ids:
+            saved = await _saved_builds(db, user_ids)
+            request = request.model_copy(
+                update={
+                    "players": [
+                        (
+                            player.model_copy(
+                                update={"builds": saved.get(player.user_id, [])}
+                            )
+                            if player.builds is None
+                            else player
+                        )
+                        for player in request.players
+                    ]
+                }
+            )
+
+        result = await get_optimizer_pool().run(assign_roster, request)
+
+        logger.info(
+            f"User {current_user.id} assigned a roster: "
+            f"{len(result.assignments)} players seated, "
+            f"{len(result.unfilled_slots)} slots unfilled"
+        )
+        return result
+
+    except HTTPException:
+        raise
+    except OptimizerQueueFull as e:
+        logger.warning(f"Optimizer queue full, rejecting assignment: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=BUSY_DETAIL,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Roster assignment failed: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Roster assignment failed. Please try again.",
+        )
+
+
 @router.get(
     "/modes",
     response_model=Dict[str, Any],
@@ -1,4 +1,4 @@
-from typing import Any, List, Optional, Dict
+from typing import Any, List, Literal, Optional, Dict
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select, insert, delete, or_
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
 from app import models, schemas
+from app.core.optimizer.leaderboard import ranking_version
 
 router = APIRouter()
 
@@ -15,12 +16,12 @@ async def _composition_to_schema(
 ) -> schemas.Composition:
     # Build members from association table
     members_stmt = select(
-        models.models.composition_members.c.user_id,
-        models.models.composition_members.c.role_id,
-        models.models.composition_members.c.profession_id,
-        models.models.composition_members.c.elite_specialization_id,
-        models.models.composition_members.c.notes,
-    ).where(models.models.composition_members.c.composition_id == comp.id)
+        models.composition_members.c.user_id,
+        models.composition_members.c.role_id,
+        models.composition_members.c.profession_id,
+        models.composition_members.c.elite_specialization_id,
+        models.composition_members.c.notes,
+    ).where(models.composition_members.c.composition_id == comp.id)
 
     members_rows = await db.execute(members_stmt)
     members: List[Dict[str, Any]] = []
@@ -130,10 +131,17 @@ async def _upsert_members(
     composition_id: int,
     members: Optional[List[schemas.CompositionMemberBase | dict]],
 ) -> None:
+    # Scores of the old members are stale, the worker scores the new ones
+    await db.execute(
+        delete(models.CompositionScore).where(
+            models.CompositionScore.composition_id == composition_id
+        )
+    )
+
     # Clear existing members then insert new if provided
     await db.execute(
-        delete(models.models.composition_members).where(
-            models.models.composition_members.c.composition_id == composition_id
+        delete(models.composition_members).where(
+            models.composition_members.c.composition_id == composition_id
         )
     )
 
@@ -145,9 +153,7 @@ async def _upsert_members(
     for m in members:
         member_data = m.dict() if hasattr(m, "dict") else m
         member_data["composition_id"] = composition_id
-        await db.execute(
-            insert(models.models.composition_members).values(**member_data)
-        )
+        await db.execute(insert(models.composition_members).values(**member_data))
 
 
 @router.post("/", response_model=schemas.Composition, status_code=201)
@@ -186,10 +192,19 @@ async def read_compositions(
     skip: int = 0,
     limit: int = 100,
     is_public: Optional[bool] = Query(None),
+    order_by: Optional[Literal["score"]] = Query(None),
+    score_mode: str = Query(
+        "wvw_zerg", description="Optimizer mode of the scores, with order_by=score"
+    ),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Retrieve compositions with optional filtering by visibility.
+
+    With ``order_by=score``, compositions are ranked by the score stored by the
+    worker for ``score_mode`` (an index scan of ``composition_scores``, nothing
+    is evaluated); compositions not scored yet, or that can't be scored, are
+    left out.
     """
     query = select(models.Composition)
 
@@ -206,6 +221,30 @@ async def read_compositions(
             )
         )
 
+    if order_by == "score":
+        try:
+            version = await ranking_version(score_mode)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        scores = models.CompositionScore
+        query = (
+            query.add_columns(scores.score)
+            .join(
+                scores,
+                (scores.composition_id == models.Composition.id)
+                & (scores.version == version)
+                & scores.score.is_not(None),
+            )
+            .order_by(scores.score.desc(), scores.raw_score.desc())
+        )
+        result = await db.execute(query.offset(skip).limit(limit))
+        ranked = []
+        for composition, score in result.all():
+            body = await _composition_to_schema(db, composition)
+            body.score = score
+            ranked.append(body)
+        return ranked
+
     result = await db.execute(query.offset(skip).limit(limit))
     compositions = result.scalars().all()
     return [await _composition_to_schema(db, c) for c in compositions]
@@ -291,8 +330,14 @@ async def delete_composition(
 
     # Delete members first
     await db.execute(
-        delete(models.models.composition_members).where(
-            models.models.composition_members.c.composition_id == composition_id
+        delete(models.composition_members).where(
+            models.composition_members.c.composition_id == composition_id
+        )
+    )
+
+    await db.execute(
+        delete(models.CompositionScore).where(
+            models.CompositionScore.composition_id == composition_id
         )
     )
 
@@ -11,6 +11,8 @@ from app.core.config import settings
 from app.core.security import get_current_active_user
 from app.models.user import User
 from app.core import db_monitor
+from app.core.optimizer.memo import get_optimizer_memo
+from app.core.optimizer.pool import get_optimizer_pool
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
@@ -96,3 +98,30 @@ async def get_db_status(
         "metrics": latest_metrics.to_dict() if latest_metrics else {},
         "issues": issues,
     }
+
+
+@router.get("/optimizer", response_model=Dict[str, Any])
+async def get_optimizer_metrics(
+    current_user: User = Depends(get_current_active_user),
+) -> Dict[str, Any]:
+    """
+    Récupère les compteurs du pool de l'optimiseur, du registre des moteurs
+    et du cache des résultats.
+
+    Args:
+        current_user: Utilisateur authentifié
+
+    Returns:
+        Compteurs du pool (jobs en cours, terminés, rejetés) et du registre
+        des moteurs (hits, misses, rebuilds), plus ceux du cache des résultats
+        sous la clé "memo"
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=403,
+            detail="Vous n'avez pas les autorisations nécessaires pour accéder à ces métriques",
+        )
+
+    stats = get_optimizer_pool().stats()
+    stats["memo"] = get_optimizer_memo().stats()
+    return stats
@@ -98,6 +98,52 @@ class Settings(BaseSettings):
         CACHE_ENABLED = False
         REDIS_URL = ""  # Désactive la connexion Redis
 
+    # Optimizer process pool
+    OPTIMIZER_POOL_WORKERS: int = int(
+        os.getenv("OPTIMIZER_POOL_WORKERS", str(os.cpu_count() or 2))
+    )
+    OPTIMIZER_POOL_MAX_QUEUE: int = int(os.getenv("OPTIMIZER_POOL_MAX_QUEUE", "16"))
+    OPTIMIZER_POOL_RETRY_AFTER: int = int(
+        os.getenv("OPTIMIZER_POOL_RETRY_AFTER", "5")
+    )  # secondes
+    OPTIMIZER_POOL_START_METHOD: str = os.getenv(
+        "OPTIMIZER_POOL_START_METHOD", "forkserver"
+    )
+    # Cache des résultats de l'optimiseur (LRU en mémoire + Redis)
+    OPTIMIZER_MEMO_SIZE: int = int(os.getenv("OPTIMIZER_MEMO_SIZE", "256"))
+    OPTIMIZER_MEMO_TTL: int = int(os.getenv("OPTIMIZER_MEMO_TTL", "86400"))  # 24h
+    # Nombre maximal de requêtes par appel à /builder/optimize/batch
+    OPTIMIZER_BATCH_MAX_REQUESTS: int = int(
+        os.getenv("OPTIMIZER_BATCH_MAX_REQUESTS", "20")
+    )
+    # Jobs d'optimisation exécutés par le worker arq (/builder/jobs)
+    OPTIMIZER_JOB_MAX_BUDGET: float = float(
+        os.getenv("OPTIMIZER_JOB_MAX_BUDGET", "120")
+    )  # secondes
+    OPTIMIZER_JOB_RESULT_TTL: int = int(
+        os.getenv("OPTIMIZER_JOB_RESULT_TTL", "3600")
+    )  # secondes de conservation des résultats dans Redis
+    OPTIMIZER_CATALOGUE_CHECK_INTERVAL: float = float(
+        os.getenv("OPTIMIZER_CATALOGUE_CHECK_INTERVAL", "60")
+    )  # secondes entre deux vérifications des tables du catalogue de builds
+    # Compositions optimales précalculées (fichier SQLite, vide pour désactiver)
+    OPTIMIZER_TABLES_PATH: str = os.getenv(
+        "OPTIMIZER_TABLES_PATH", "optimizer_tables.sqlite"
+    )
+    OPTIMIZER_TABLES_BUDGET: float = float(
+        os.getenv("OPTIMIZER_TABLES_BUDGET", "10")
+    )  # secondes de recherche par composition précalculée
+    OPTIMIZER_TABLES_CRON_HOUR: int = int(
+        os.getenv("OPTIMIZER_TABLES_CRON_HOUR", "4")
+    )  # heure (UTC) du précalcul nocturne par le worker arq
+    # Scores des compositions enregistrées (classement GET /compositions?order_by=score)
+    OPTIMIZER_SCORES_CHUNK_SIZE: int = int(
+        os.getenv("OPTIMIZER_SCORES_CHUNK_SIZE", "1024")
+    )  # compositions évaluées par lot dans un worker du pool
+    OPTIMIZER_SCORES_INTERVAL: int = int(
+        os.getenv("OPTIMIZER_SCORES_INTERVAL", "10")
+    )  # minutes entre deux recherches de scores périmés par le worker arq
+
     # Database URLs for testing
     DATABASE_URL: Optional[str] = None
     TEST_DATABASE_URL: str = "sqlite+aiosqlite:///./test.db"
@@ -118,7 +164,9 @@ class Settings(BaseSettings):
                     pass
 
             return MockRedis()
-        return cast(Any, redis.from_url(self.REDIS_URL, encoding="utf-8", decode_responses=True))
+        return cast(
+            Any, redis.from_url(self.REDIS_URL, encoding="utf-8", decode_responses=True)
+        )
 
     class Config:
         case_sensitive = True
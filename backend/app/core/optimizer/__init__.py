@@ -1,5 +1,22 @@
 """Composition optimization engine for WvW."""
 
 from .engine import optimize_composition, OptimizerEngine
+from .memo import OptimizerMemo, get_optimizer_memo
+from .pool import OptimizerPool, OptimizerQueueFull, get_optimizer_pool
+from .portfolio import optimize_portfolio
+from .registry import EngineRegistry, get_engine
+from .stream import stream_incumbents
 
-__all__ = ["optimize_composition", "OptimizerEngine"]
+__all__ = [
+    "optimize_composition",
+    "OptimizerEngine",
+    "EngineRegistry",
+    "get_engine",
+    "OptimizerMemo",
+    "get_optimizer_memo",
+    "OptimizerPool",
+    "OptimizerQueueFull",
+    "get_optimizer_pool",
+    "optimize_portfolio",
+    "stream_incumbents",
+]
@@ -0,0 +1,328 @@
+"""
+Optimization of an alliance: several squads sharing a pool of players.
+
+Alliance nights field 2-3 squads of up to 50 players, each with its own
+game mode, drawn from the same players. Searching all of them as one flat
+composition would not scale, so the problem is decomposed:
+
+1. Each squad is optimized on its own, in parallel workers of the optimizer
+   pool, restricted to the professions available to the alliance.
+2. One worker rebalances the squads against the profession pool. It first
+   moves players of over-subscribed professions to professions with spare
+   players, at the lowest score loss. It then improves the total score
+   with build changes within a squad and with exchanges between two
+   squads: squad A turns a player of profession P into Q while squad B
+   turns one of Q into P, which keeps the profession counts.
+
+Each rebalancing step scores every single build change of every squad in
+one batch per squad, so it costs O(squads) batches plus an
+O(squads^2 x professions^2) combination of their best gains: the whole
+optimization grows linearly with the number of squads.
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.optimizer.pool import OptimizerPool, get_optimizer_pool
+from app.core.optimizer.registry import get_engine
+from app.core.optimizer.strategies import (
+    STOP_NO_IMPROVEMENT,
+    STOP_TIME_BUDGET,
+    SearchStats,
+)
+from app.schemas.composition import (
+    AllianceOptimizationRequest,
+    AllianceOptimizationResult,
+    CompositionOptimizationRequest,
+)
+
+logger = logging.getLogger(__name__)
+
+# Share of the time budget spent optimizing the squads, the rest rebalances
+SQUAD_BUDGET_SHARE = 0.7
+# Minimum total raw score gain of a rebalancing move
+REBALANCE_MIN_GAIN = 1e-6
+
+
+@dataclass
+class SquadOutcome:
+    """Composition of one squad, as catalogue template indices."""
+
+    indices: List[int]
+    stats: SearchStats
+
+
+def squad_requests(
+    request: AllianceOptimizationRequest,
+) -> List[CompositionOptimizationRequest]:
+    """
+    Requests of the squads, restricted to the available professions.
+
+    Raises:
+        ValueError: If the alliance has fewer players than its squads, or a
+            squad none of its professions
+    """
+    if request.available_professions is None:
+        return list(request.squads)
+
+    players = sum(entry.count for entry in request.available_professions)
+    slots = sum(squad.squad_size for squad in request.squads)
+    if players < slots:
+        raise ValueError(
+            f"Squads need {slots} players but only {players} are available"
+        )
+    available = {
+        entry.profession_id for entry in request.available_professions if entry.count
+    }
+    requests = []
+    for i, squad in enumerate(request.squads):
+        professions = available
+        if squad.fixed_professions:
+            professions = available & set(squad.fixed_professions)
+        if not professions:
+            raise ValueError(f"Squad {i} has no available profession")
+        requests.append(
+            squad.model_copy(update={"fixed_professions": sorted(professions)})
+        )
+    return requests
+
+
+def run_squad(
+    request: CompositionOptimizationRequest, time_budget: float
+) -> SquadOutcome:
+    """Optimize one squad in a worker process."""
+    engine = get_engine(request.game_type, request.game_mode)
+    shortcut = engine.precomputed(request)
+    if shortcut is None:
+        shortcut = engine.exact_shortcut(request, time_budget * 0.2)
+    if shortcut is not None:
+        solution, stats = shortcut
+    else:
+        solution, stats = engine.restarts(request, time_budget=time_budget)
+    return SquadOutcome(indices=engine.compiled.indices(solution).tolist(), stats=stats)
+
+
+class SquadState:
+    """Composition of a squad under rebalancing, with its score terms."""
+
+    def __init__(
+        self,
+        request: CompositionOptimizationRequest,
+        indices: List[int],
+        columns: Dict[int, int],
+    ):
+        self.request = request
+        self.engine = get_engine(request.game_type, request.game_mode)
+        self.scorer = self.engine.batch_scorer
+        self.compiled = self.engine.compiled
+        self.indices = np.array(indices, dtype=np.intp)
+        self.size = self.indices.size
+        self.totals, self.role_counts = self.compiled.totals(self.indices)
+        self.pairs = self.scorer.pair_counts(self.indices)
+        self.score = float(self.scorer.raw_solutions(self.indices)[0])
+
+        catalogue = self.engine.build_catalogue
+        self.professions = np.array(
+            [columns[build.profession_id] for build in catalogue], dtype=np.intp
+        )
+        # Moves stay within the candidates and minimums of the squad
+        self.constraints = self.engine.constraints(request)
+        allowed = self.constraints.candidates
+        free = np.flatnonzero(~self.engine.fixed_slots(request, self.indices))
+        self.slots = np.repeat(free, allowed.size)
+        self.new = np.tile(allowed, free.size)
+
+    def usage(self, n_professions: int) -> np.ndarray:
+        """Players of each profession column."""
+        return np.bincount(
+            self.professions[self.indices], minlength=n_professions
+        ).astype(np.int64)
+
+    def best_moves(self, n_professions: int):
+        """
+        Best gain and move of each profession change.
+
+        Returns a (P, P) matrix of the best score gain of turning a player of
+        profession P into one of profession Q, -inf when there is none, and
+        the index of that move in ``slots`` / ``new``.
+        """
+        gains = np.full(n_professions * n_professions, -np.inf)
+        moves = np.full(n_professions * n_professions, -1, dtype=np.intp)
+        if self.slots.size:
+            old = self.indices[self.slots]
+            scores = self.scorer.raw_swaps(
+                self.totals, self.role_counts, self.size, old, self.new, self.pairs
+            )
+            scores[old == self.new] = -np.inf
+            if self.constraints.restricted:
+                scores[~self.constraints.accepts(self.totals, old, self.new)] = -np.inf
+            keys = self.professions[old] * n_professions + self.professions[self.new]
+            # Assigning in increasing gain order leaves the best move of each key
+            order = np.argsort(scores)
+            moves[keys[order]] = order
+            gains[keys[order]] = scores[order] - self.score
+        shape = (n_professions, n_professions)
+        return gains.reshape(shape), moves.reshape(shape)
+
+    def apply(self, move: int) -> float:
+        """Apply a move of ``slots`` / ``new`` and return its score gain."""
+        slot, template = int(self.slots[move]), int(self.new[move])
+        old = int(self.indices[slot])
+        compiled = self.compiled
+        self.totals += compiled.capabilities[template] - compiled.capabilities[old]
+        self.role_counts += compiled.role_onehot[template] - compiled.role_onehot[old]
+        if self.pairs is not None:
+            self.pairs.apply(old, template)
+        self.indices[slot] = template
+        before = self.score
+        self.score = float(self.scorer.raw_solutions(self.indices)[0])
+        return self.score - before
+
+
+def rebalance_alliance(
+    request: AllianceOptimizationRequest,
+    outcomes: List[SquadOutcome],
+    deadline: float,
+) -> AllianceOptimizationResult:
+    """
+    Rebalance squad compositions against the profession pool of an alliance.
+
+    Over-subscribed professions are always repaired; improvements stop at
+    ``deadline``.
+
+    Raises:
+        ValueError: If the squads cannot fit in the profession pool
+    """
+    start_time = time.time()
+    requests = squad_requests(request)
+    profession_ids = set()
+    for squad in requests:
+        engine = get_engine(squad.game_type, squad.game_mode)
+        profession_ids.update(build.profession_id for build in engine.build_catalogue)
+    capacity_of = {
+        entry.profession_id: entry.count
+        for entry in request.available_professions or []
+    }
+    profession_ids = sorted(profession_ids | set(capacity_of))
+    columns = {profession: i for i, profession in enumerate(profession_ids)}
+    n = len(profession_ids)
+    if request.available_professions is None:
+        capacity = np.full(n, np.iinfo(np.int64).max // 2)
+    else:
+        capacity = np.array([capacity_of.get(p, 0) for p in profession_ids])
+
+    squads = [
+        SquadState(squad, outcome.indices, columns)
+        for squad, outcome in zip(requests, outcomes)
+    ]
+    k = len(squads)
+    usage = sum(squad.usage(n) for squad in squads)
+    moves = 0
+    stop_reason = STOP_TIME_BUDGET
+    while True:
+        spare = usage < capacity
+        excess = usage > capacity
+        # The pool is always enforced, the budget only limits improvements
+        if not excess.any() and time.time() >= deadline:
+            break
+        best = [squad.best_moves(n) for squad in squads]
+        gains = np.stack([gain for gain, _ in best])
+
+        if excess.any():
+            # Repair first: over-subscribed professions to spare ones, at any cost
+            feasible = excess[:, np.newaxis] & spare[np.newaxis, :]
+            candidates = np.where(feasible, gains, -np.inf)
+            if not np.isfinite(candidates).any():
+                raise ValueError("Squads cannot be filled with the available players")
+            a, p, q = np.unravel_index(int(candidates.argmax()), candidates.shape)
+            exchange = None
+        else:
+            # Single changes keep or fill a spare profession
+            feasible = np.eye(n, dtype=bool) | spare[np.newaxis, :]
+            singles = np.where(feasible, gains, -np.inf)
+            # Exchanges: A turns P into Q, B turns Q into P
+            exchanges = gains[:, np.newaxis] + gains.transpose(0, 2, 1)[np.newaxis]
+            exchanges[np.arange(k), np.arange(k)] = -np.inf
+            exchanges[:, :, np.arange(n), np.arange(n)] = -np.inf
+
+            single = np.unravel_index(int(singles.argmax()), singles.shape)
+            exchange = np.unravel_index(int(exchanges.argmax()), exchanges.shape)
+            if max(singles[single], exchanges[exchange]) < REBALANCE_MIN_GAIN:
+                stop_reason = STOP_NO_IMPROVEMENT
+                break
+            if singles[single] >= exchanges[exchange]:
+                (a, p, q), exchange = single, None
+            else:
+                a, b, p, q = exchange
+
+        squads[a].apply(int(best[a][1][p, q]))
+        usage[p] -= 1
+        usage[q] += 1
+        moves += 1
+        if exchange is not None:
+            squads[b].apply(int(best[b][1][q, p]))
+            usage[q] -= 1
+            usage[p] += 1
+            moves += 1
+
+    results = [
+        squad.engine.build_result(
+            squad.compiled.builds(squad.indices),
+            squad.request,
+            stop_reason=outcome.stats.stop_reason,
+        )
+        for squad, outcome in zip(squads, outcomes)
+    ]
+    raw_score = sum(squad.score for squad in squads)
+    logger.info(
+        f"Alliance of {k} squads rebalanced with {moves} moves in "
+        f"{time.time() - start_time:.2f}s, raw score {raw_score:.3f}"
+    )
+    return AllianceOptimizationResult(
+        squads=results,
+        raw_score=raw_score,
+        profession_counts={
+            profession: int(count)
+            for profession, count in zip(profession_ids, usage)
+            if count
+        },
+        rebalance_moves=moves,
+        stop_reason=stop_reason,
+        elapsed=0.0,
+    )
+
+
+async def optimize_alliance(
+    request: AllianceOptimizationRequest,
+    pool: Optional[OptimizerPool] = None,
+) -> AllianceOptimizationResult:
+    """
+    Optimize the squads of an alliance in parallel, then rebalance them.
+
+    Squads beyond the number of workers run in successive waves, each with
+    an equal share of the squad budget.
+
+    Raises:
+        ValueError: If the alliance has fewer players than its squads
+        OptimizerQueueFull: If the pool cannot take the squads
+    """
+    start_time = time.time()
+    pool = pool or get_optimizer_pool()
+    requests = squad_requests(request)
+
+    waves = math.ceil(len(requests) / pool.max_workers)
+    squad_budget = request.time_budget * SQUAD_BUDGET_SHARE / waves
+    outcomes = await pool.run_many(
+        run_squad, [(squad, squad_budget) for squad in requests]
+    )
+
+    result = await pool.run(
+        rebalance_alliance, request, outcomes, start_time + request.time_budget
+    )
+    result.elapsed = time.time() - start_time
+    return result
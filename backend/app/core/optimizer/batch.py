@@ -0,0 +1,278 @@
+"""
+Vectorized scoring of many candidate compositions at once.
+
+The build catalogue is compiled into a dense capability matrix (templates x
+``SCORED_KEYS``) and a role one-hot matrix when the engine is built. A
+composition is then an array of template indices, and the totals of a whole
+batch of candidates are computed with a few NumPy operations, so search
+strategies can score hundreds of neighbours per Python-level step.
+
+The compiled catalogue also indexes templates by role and by the boons they
+provide, so that searches can draw relevant replacements for a slot in
+constant time, whatever the size of the catalogue.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from app.core.optimizer.scoring import SCORED_KEYS, ScoreFunction, capability_vector
+from app.core.optimizer.synergy import PairCounts
+
+if TYPE_CHECKING:
+    from app.core.optimizer.engine import BuildTemplate
+
+# Capability from which a template is indexed as a provider of a boon
+PROVIDER_THRESHOLD = 0.5
+
+
+class CompiledCatalogue:
+    """Build catalogue as dense NumPy arrays."""
+
+    def __init__(self, catalogue: Sequence["BuildTemplate"]):
+        self.catalogue = list(catalogue)
+        self.capabilities = np.array(
+            [capability_vector(build) for build in self.catalogue], dtype=np.float64
+        )
+
+        self.roles: List[str] = []
+        for build in self.catalogue:
+            if build.role_type.value not in self.roles:
+                self.roles.append(build.role_type.value)
+        self.role_index = {role: i for i, role in enumerate(self.roles)}
+        self.role_ids = np.array(
+            [self.role_index[build.role_type.value] for build in self.catalogue],
+            dtype=np.intp,
+        )
+        self.role_onehot = np.zeros((len(self.catalogue), len(self.roles)))
+        self.role_onehot[np.arange(len(self.catalogue)), self.role_ids] = 1.0
+
+        self.profession_ids = np.array(
+            [build.profession_id for build in self.catalogue], dtype=np.int64
+        )
+        self.elite_spec_ids = np.array(
+            [
+                -1 if build.elite_spec_id is None else build.elite_spec_id
+                for build in self.catalogue
+            ],
+            dtype=np.int64,
+        )
+
+        # Role buckets: the templates of role r are
+        # role_order[role_starts[r]:role_starts[r] + role_sizes[r]]
+        self.role_order = np.argsort(self.role_ids, kind="stable")
+        self.role_sizes = np.bincount(self.role_ids, minlength=len(self.roles))
+        self.role_starts = np.cumsum(self.role_sizes) - self.role_sizes
+
+        # Providers of each scored capability, best first
+        self.providers = [
+            np.flatnonzero(column >= PROVIDER_THRESHOLD)[
+                np.argsort(-column[column >= PROVIDER_THRESHOLD], kind="stable")
+            ]
+            for column in self.capabilities.reshape(-1, len(SCORED_KEYS)).T
+        ]
+
+        self._index = {id(build): i for i, build in enumerate(self.catalogue)}
+
+    def __len__(self) -> int:
+        return len(self.catalogue)
+
+    def indices(self, solution: Sequence["BuildTemplate"]) -> np.ndarray:
+        """Return the catalogue index of each build of a solution."""
+        return np.array([self._index[id(build)] for build in solution], dtype=np.intp)
+
+    def builds(self, indices: Sequence[int]) -> List["BuildTemplate"]:
+        """Return the builds of an array of catalogue indices."""
+        return [self.catalogue[i] for i in indices]
+
+    def same_role(self, templates: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """A random template of the same role as each of ``templates``."""
+        roles = self.role_ids[templates]
+        offsets = (rng.random(templates.size) * self.role_sizes[roles]).astype(np.intp)
+        return self.role_order[self.role_starts[roles] + offsets]
+
+    def totals(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Capability totals and role counts of one or many solutions.
+
+        ``indices`` has shape (size,) or (n_solutions, size).
+        """
+        return (
+            self.capabilities[indices].sum(axis=-2),
+            self.role_onehot[indices].sum(axis=-2),
+        )
+
+    def template_counts(self, indices: np.ndarray) -> np.ndarray:
+        """
+        Number of copies of each template in one or many solutions.
+
+        ``indices`` has shape (size,) or (n_solutions, size).
+        """
+        indices = np.atleast_2d(indices)
+        counts = np.zeros((indices.shape[0], len(self.catalogue)))
+        np.add.at(counts, (np.arange(indices.shape[0])[:, np.newaxis], indices), 1.0)
+        return counts
+
+    def role_counts(self, role_totals: np.ndarray) -> Dict[str, int]:
+        """Convert a role count vector into a role -> count dict."""
+        return {
+            role: int(round(count))
+            for role, count in zip(self.roles, role_totals)
+            if count
+        }
+
+
+class BatchScorer:
+    """
+    ``ScoreFunction`` evaluated on arrays of totals.
+
+    Produces the same scores as ``ScoreFunction`` for each row of a batch of
+    capability totals and role counts, and template counts when the score
+    function has pair terms.
+    """
+
+    def __init__(self, score_fn: ScoreFunction, compiled: CompiledCatalogue):
+        self.score_fn = score_fn
+        self.compiled = compiled
+        self.pairs = score_fn.pairs
+        n_keys = compiled.capabilities.shape[1]
+
+        self.metric_weights = np.zeros(n_keys)
+        for index, weight in score_fn.metric_weights:
+            self.metric_weights[index] += weight
+
+        self.n_critical = len(score_fn.critical_boons)
+        critical = [
+            (index, required)
+            for index, required in score_fn.critical_boons
+            if index is not None
+        ]
+        self.critical_index = np.array([index for index, _ in critical], dtype=np.intp)
+        self.critical_required = np.array([required for _, required in critical])
+
+        # Critical boons outside the coverage keys always miss their target
+        self.constant = -sum(
+            score_fn.missing_penalty * required
+            for index, required in score_fn.critical_boons
+            if index is None and required > 0
+        )
+
+        # Roles absent from the catalogue always have a count of 0
+        bounded = []
+        for role, minimum, maximum in score_fn.role_bounds:
+            if role in compiled.role_index:
+                bounded.append((compiled.role_index[role], minimum, maximum))
+            elif minimum > 0 or maximum < 0:
+                self.constant -= score_fn.imbalance_penalty
+        self.role_columns = np.array(
+            [column for column, _, _ in bounded], dtype=np.intp
+        )
+        self.role_min = np.array([minimum for _, minimum, _ in bounded])
+        self.role_max = np.array([maximum for _, _, maximum in bounded])
+
+    def lacking_boon(self, totals: np.ndarray, size: int) -> Optional[int]:
+        """
+        Capability column of the critical boon furthest below its required
+        coverage, None when every critical boon is covered.
+        """
+        if not self.critical_index.size:
+            return None
+        coverage = np.minimum(1.0, totals[self.critical_index] / max(1, size * 0.5))
+        deficits = self.critical_required - coverage
+        worst = int(deficits.argmax())
+        if deficits[worst] <= 0:
+            return None
+        return int(self.critical_index[worst])
+
+    def raw(
+        self,
+        totals: np.ndarray,
+        role_counts: np.ndarray,
+        size: int,
+        counts: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Weighted objective minus penalties for each row, before clipping.
+
+        ``counts`` holds the template counts of each row, for the pair terms.
+        """
+        totals = np.atleast_2d(totals)
+        role_counts = np.atleast_2d(role_counts)
+        score_fn = self.score_fn
+
+        if size:
+            score = totals @ self.metric_weights / size
+        else:
+            score = np.zeros(totals.shape[0])
+        score += self.constant
+
+        if self.n_critical:
+            boon_divisor = max(1, size * 0.5)
+            coverage = np.minimum(1.0, totals[:, self.critical_index] / boon_divisor)
+            score += (
+                coverage.sum(axis=1) / self.n_critical * score_fn.boon_uptime_weight
+            )
+            score -= score_fn.missing_penalty * np.maximum(
+                0.0, self.critical_required - coverage
+            ).sum(axis=1)
+        else:
+            score += 0.5 * score_fn.boon_uptime_weight
+
+        if self.role_columns.size:
+            actual = role_counts[:, self.role_columns]
+            violations = (actual < self.role_min) | (actual > self.role_max)
+            score -= score_fn.imbalance_penalty * violations.sum(axis=1)
+
+        if self.pairs is not None and counts is not None:
+            score += self.pairs.raw(counts, size)
+
+        return score
+
+    def score(
+        self,
+        totals: np.ndarray,
+        role_counts: np.ndarray,
+        size: int,
+        counts: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Score each row of capability totals and role counts, in [0, 1]."""
+        return np.clip(self.raw(totals, role_counts, size, counts), 0.0, 1.0)
+
+    def raw_solutions(self, indices: np.ndarray) -> np.ndarray:
+        """Unclipped score of solutions given as (n_solutions, size) indices."""
+        indices = np.atleast_2d(indices)
+        totals, role_counts = self.compiled.totals(indices)
+        counts = (
+            self.compiled.template_counts(indices) if self.pairs is not None else None
+        )
+        return self.raw(totals, role_counts, indices.shape[1], counts)
+
+    def pair_counts(self, indices: np.ndarray) -> Optional[PairCounts]:
+        """Incremental pair terms of a solution, None without pair terms."""
+        return PairCounts(self.pairs, indices) if self.pairs is not None else None
+
+    def raw_swaps(
+        self,
+        totals: np.ndarray,
+        role_counts: np.ndarray,
+        size: int,
+        old: np.ndarray,
+        new: np.ndarray,
+        pairs: Optional[PairCounts] = None,
+    ) -> np.ndarray:
+        """
+        Unclipped score of replacing template ``old[k]`` with ``new[k]``, for every k.
+
+        ``totals``, ``role_counts`` and ``pairs`` (see :meth:`pair_counts`)
+        describe the current solution.
+        """
+        capabilities = self.compiled.capabilities
+        role_onehot = self.compiled.role_onehot
+        scores = self.raw(
+            totals + capabilities[new] - capabilities[old],
+            role_counts + role_onehot[new] - role_onehot[old],
+            size,
+        )
+        if pairs is not None:
+            scores += pairs.swap_values(old, new)
+        return scores
@@ -0,0 +1,193 @@
+"""
+Performance benchmark of the optimizer search.
+
+Runs the greedy + local search of :meth:`OptimizerEngine.restart` for every
+optimizer config and squad size, and records for each run:
+
+- ``iterations_per_sec``: local search steps per second, best of
+  ``repeat`` identical runs to smooth out scheduling noise.
+- ``evaluations_per_sec``: candidate compositions scored per second (each
+  step scores a batch of ``LOCAL_SEARCH_BATCH_SIZE`` swaps).
+- ``time_to_best``: seconds until the final best composition was found.
+- ``raw_score`` and ``score``: unclipped and clipped final score.
+- ``peak_memory``: peak Python allocations of the run, in bytes, measured in
+  a second, identical run so that tracing doesn't slow the timed one.
+
+Runs are seeded from their request, so scores are reproducible and any drop
+against a baseline is a real quality regression. A single run only lasts a
+few milliseconds, so throughput is compared per config, on the median over
+all squad sizes: a drop beyond a tolerance is a performance regression.
+Throughput depends on the machine, so baselines must come from the machine
+that runs the comparison. Used by
+``scripts/benchmark_optimizer.py`` and ``tests/benchmarks``.
+"""
+
+import logging
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from statistics import median
+from typing import Dict, Iterable, List, Tuple
+
+from app.core.optimizer.engine import CONFIG_DIR, OptimizerEngine
+from app.core.optimizer.strategies import LOCAL_SEARCH_BATCH_SIZE
+from app.schemas.composition import CompositionOptimizationRequest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = range(1, 51)
+DEFAULT_REPEAT = 3
+# Relative throughput drop reported as a regression
+DEFAULT_TOLERANCE = 0.25
+# Raw score drop reported as a regression (runs are deterministic)
+SCORE_TOLERANCE = 1e-6
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements of one optimizer run."""
+
+    config: str
+    squad_size: int
+    strategy: str
+    stop_reason: str
+    steps: int
+    elapsed: float
+    iterations_per_sec: float
+    evaluations_per_sec: float
+    time_to_best: float
+    raw_score: float
+    score: float
+    peak_memory: int = 0
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return self.config, self.squad_size
+
+
+def config_engines(
+    config_dir: Path = CONFIG_DIR,
+) -> Iterable[Tuple[str, OptimizerEngine]]:
+    """One engine per optimizer config file of a directory."""
+    for path in sorted(config_dir.glob("*.yml")):
+        game_type, _, name = path.stem.partition("_")
+        yield path.name, OptimizerEngine(game_type, name, config_path=path)
+
+
+def benchmark_run(
+    engine: OptimizerEngine,
+    config: str,
+    squad_size: int,
+    time_budget: float = 2.0,
+    memory: bool = True,
+    repeat: int = DEFAULT_REPEAT,
+) -> BenchmarkResult:
+    """Benchmark one greedy + local search run of an engine."""
+    request = CompositionOptimizationRequest(
+        squad_size=squad_size,
+        game_type=engine.game_type,
+        game_mode=engine.config.config.get("mode", engine.game_mode),
+    )
+
+    # Runs are deterministic: keep the fastest one
+    runs = []
+    for _ in range(max(1, repeat)):
+        start_time = time.perf_counter()
+        solution, stats = engine.restart(request, time_budget=time_budget)
+        runs.append((time.perf_counter() - start_time, solution, stats))
+    elapsed, solution, stats = min(runs, key=lambda run: run[2].elapsed)
+    score = engine.evaluate_solution(solution, request)[0]
+
+    peak_memory = 0
+    if memory:
+        tracemalloc.start()
+        try:
+            engine.restart(request, time_budget=time_budget)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    search_time = stats.elapsed or elapsed
+    return BenchmarkResult(
+        config=config,
+        squad_size=squad_size,
+        strategy=stats.strategy,
+        stop_reason=stats.stop_reason,
+        steps=stats.steps,
+        elapsed=elapsed,
+        iterations_per_sec=stats.steps / search_time,
+        evaluations_per_sec=stats.steps * LOCAL_SEARCH_BATCH_SIZE / search_time,
+        time_to_best=stats.trace[-1][0],
+        raw_score=stats.raw_score,
+        score=score,
+        peak_memory=peak_memory,
+    )
+
+
+def run_suite(
+    config_dir: Path = CONFIG_DIR,
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    time_budget: float = 2.0,
+    memory: bool = True,
+    repeat: int = DEFAULT_REPEAT,
+) -> List[BenchmarkResult]:
+    """Benchmark every config of a directory at every squad size."""
+    sizes = list(sizes)
+    results = []
+    for config, engine in config_engines(config_dir):
+        for squad_size in sizes:
+            results.append(
+                benchmark_run(engine, config, squad_size, time_budget, memory, repeat)
+            )
+    return results
+
+
+def to_json(results: List[BenchmarkResult]) -> List[Dict]:
+    return [asdict(result) for result in results]
+
+
+def from_json(data: List[Dict]) -> List[BenchmarkResult]:
+    return [BenchmarkResult(**row) for row in data]
+
+
+def compare(
+    results: List[BenchmarkResult],
+    baseline: List[BenchmarkResult],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """
+    Regressions of ``results`` against a baseline, as readable messages.
+
+    A run regresses when its raw score is lower than in the baseline. A
+    config regresses when its median evaluations per second, over the squad
+    sizes benchmarked on both sides, drops by more than ``tolerance``. Runs
+    missing from either side are ignored.
+    """
+    reference = {result.key: result for result in baseline}
+    regressions = []
+    throughput: Dict[str, Tuple[List[float], List[float]]] = defaultdict(
+        lambda: ([], [])
+    )
+    for result in results:
+        base = reference.get(result.key)
+        if base is None:
+            continue
+        if result.raw_score < base.raw_score - SCORE_TOLERANCE:
+            regressions.append(
+                f"{result.config} n={result.squad_size}: raw score "
+                f"{result.raw_score:.4f} < baseline {base.raw_score:.4f}"
+            )
+        current, previous = throughput[result.config]
+        current.append(result.evaluations_per_sec)
+        previous.append(base.evaluations_per_sec)
+
+    for config, (current, previous) in throughput.items():
+        now, before = median(current), median(previous)
+        if now < before * (1 - tolerance):
+            regressions.append(
+                f"{config}: median {now:,.0f} evaluations/s "
+                f"< baseline {before:,.0f} (-{1 - now / before:.0%})"
+            )
+    return regressions
@@ -0,0 +1,351 @@
+"""
+Build catalogue of the optimizer, loaded from the database and a data file.
+
+The professions and elite specializations available in the game come from
+the ``professions`` and ``elite_specializations`` tables. Their capabilities
+in each role they can play, which the database doesn't hold, come from
+``config/optimizer/catalogue/builds.yml``. Every active elite specialization
+of the database with capability data gives one :class:`BuildTemplate` per
+role variant. Without elite specializations in the database (fresh install,
+tests), the catalogue falls back to the ids of the data file.
+
+Catalogues are cached per game type. The cache is identified by a version,
+the hash of the data file and of the catalogue rows of the database: it is
+recomputed at most every ``OPTIMIZER_CATALOGUE_CHECK_INTERVAL`` seconds, or
+on the next lookup after :meth:`CatalogueCache.invalidate`. Version lookups
+never wait for the sources: they return the last known version and leave
+the check to a background thread. Commits touching the
+catalogue tables invalidate it (see :func:`watch_catalogue_tables`), and the
+optimizer pool shares the invalidations with its workers.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from app.core.config import settings
+from app.core.optimizer.mode_effects import apply_mode_adjustments
+from app.schemas.composition import CompositionMemberRole
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_PATH = (
+    Path(__file__).parent.parent.parent.parent
+    / "config"
+    / "optimizer"
+    / "catalogue"
+    / "builds.yml"
+)
+
+# (profession name, elite specialization name), lower case
+SpecKey = Tuple[str, str]
+# (profession id, profession name, elite specialization id, name)
+SpecRow = Tuple[int, str, int, str]
+
+
+class BuildTemplate:
+    """Represents a build template with its capabilities."""
+
+    __slots__ = (
+        "profession_id",
+        "elite_spec_id",
+        "role_type",
+        "capabilities",
+        "profession_name",
+        "elite_spec_name",
+    )
+
+    def __init__(
+        self,
+        profession_id: int,
+        elite_spec_id: Optional[int],
+        role_type: CompositionMemberRole,
+        capabilities: Dict[str, float],
+        profession_name: Optional[str] = None,
+        elite_spec_name: Optional[str] = None,
+    ):
+        self.profession_id = profession_id
+        self.elite_spec_id = elite_spec_id
+        self.role_type = role_type
+        self.capabilities = capabilities
+        self.profession_name = profession_name
+        self.elite_spec_name = elite_spec_name
+
+    def get_capability(self, key: str, default: float = 0.0) -> float:
+        """Get a capability value with a default fallback."""
+        return self.capabilities.get(key, default)
+
+    def __repr__(self) -> str:
+        return (
+            f"<BuildTemplate({self.elite_spec_name or self.profession_id}, "
+            f"{self.role_type.value})>"
+        )
+
+
+def _spec_key(profession: str, elite_specialization: str) -> SpecKey:
+    return profession.strip().lower(), elite_specialization.strip().lower()
+
+
+def read_catalogue_file(path: Path = CATALOGUE_PATH) -> Tuple[List[Dict], str]:
+    """Specialization entries of a catalogue data file, and its SHA-256."""
+    with open(path, "rb") as f:
+        content = f.read()
+    data = yaml.safe_load(content) or {}
+    return data.get("specializations", []), hashlib.sha256(content).hexdigest()
+
+
+def database_specializations() -> Optional[Dict[SpecKey, SpecRow]]:
+    """
+    Active elite specializations of the database, by profession and name.
+
+    Returns None when the database can't be read or holds no elite
+    specialization, in which case the data file ids are used.
+    """
+    # Imported lazily: optimizer workers only need the database here
+    from sqlalchemy import select
+    from sqlalchemy.exc import SQLAlchemyError
+
+    from app.db.session import SessionLocal
+    from app.models.elite_specialization import EliteSpecialization
+    from app.models.profession import Profession
+
+    query = (
+        select(
+            Profession.id,
+            Profession.name,
+            EliteSpecialization.id,
+            EliteSpecialization.name,
+        )
+        .join(EliteSpecialization, EliteSpecialization.profession_id == Profession.id)
+        .where(Profession.is_active.is_(True), EliteSpecialization.is_active.is_(True))
+        .order_by(EliteSpecialization.id)
+    )
+    try:
+        with SessionLocal() as db:
+            rows = db.execute(query).all()
+    except SQLAlchemyError as e:
+        logger.debug(f"Build catalogue tables unavailable: {e}")
+        return None
+    if not rows:
+        return None
+    return {_spec_key(row[1], row[3]): tuple(row) for row in rows}
+
+
+def build_templates(
+    entries: List[Dict],
+    game_type: str,
+    specializations: Optional[Dict[SpecKey, SpecRow]] = None,
+) -> List[BuildTemplate]:
+    """
+    Build templates of the catalogue entries for a game type.
+
+    With database ``specializations``, entries without an active elite
+    specialization are skipped and ids come from the database.
+    """
+    catalogue = []
+    for entry in entries:
+        profession_id = entry["profession_id"]
+        elite_spec_id = entry.get("elite_specialization_id")
+        profession_name = entry["profession"]
+        elite_spec_name = entry.get("elite_specialization")
+        if specializations is not None:
+            row = specializations.get(_spec_key(profession_name, elite_spec_name))
+            if row is None:
+                continue
+            profession_id, profession_name, elite_spec_id, elite_spec_name = row
+
+        for role, capabilities in entry.get("roles", {}).items():
+            capabilities = {**capabilities, **entry.get(game_type, {})}
+            if entry.get("mode_effects"):
+                # Mode effects are keyed by the data file profession ids
+                capabilities = apply_mode_adjustments(
+                    capabilities, entry["profession_id"], game_type
+                )
+            catalogue.append(
+                BuildTemplate(
+                    profession_id=profession_id,
+                    elite_spec_id=elite_spec_id,
+                    role_type=CompositionMemberRole(role),
+                    capabilities=capabilities,
+                    profession_name=profession_name,
+                    elite_spec_name=elite_spec_name,
+                )
+            )
+    return catalogue
+
+
+class CatalogueCache:
+    """
+    Build catalogues per game type, rebuilt when their sources change.
+
+    Thread safe. The version is a hash of the data file and of the database
+    rows; catalogues of an outdated version are rebuilt on their next
+    lookup. Only the first version lookup of a process reads the sources,
+    later ones are answered from memory while a thread checks them.
+    """
+
+    def __init__(
+        self,
+        path: Path = CATALOGUE_PATH,
+        check_interval: Optional[float] = None,
+    ):
+        self.path = path
+        self.check_interval = (
+            settings.OPTIMIZER_CATALOGUE_CHECK_INTERVAL
+            if check_interval is None
+            else check_interval
+        )
+        self._lock = threading.RLock()
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+        self._entries: List[Dict] = []
+        self._specializations: Optional[Dict[SpecKey, SpecRow]] = None
+        self._catalogues: Dict[str, List[BuildTemplate]] = {}
+        self._generation: Any = [0]
+        self._seen_generation = 0
+        # Background check started by version(), None when none is running
+        self._checker: Optional[threading.Thread] = None
+
+    def use_shared_generation(self, generation: Any) -> None:
+        """
+        Count invalidations in ``generation`` instead of a local integer.
+
+        Used with a ``multiprocessing.Value`` so that invalidations reach
+        the optimizer pool workers.
+        """
+        self._generation = generation
+        self._seen_generation = self._read_generation()
+
+    def _read_generation(self) -> int:
+        if isinstance(self._generation, list):
+            return self._generation[0]
+        return self._generation.value
+
+    def invalidate(self) -> None:
+        """Check the sources again on the next lookup."""
+        with self._lock:
+            if isinstance(self._generation, list):
+                self._generation[0] += 1
+            else:
+                with self._generation.get_lock():
+                    self._generation.value += 1
+
+    def _due(self) -> bool:
+        """Whether the sources must be checked again."""
+        return (
+            self._version is None
+            or self._read_generation() != self._seen_generation
+            or time.monotonic() - self._checked_at >= self.check_interval
+        )
+
+    def refresh(self) -> str:
+        """Check the sources now and return the catalogue version."""
+        with self._lock:
+            self._seen_generation = self._read_generation()
+            self._checked_at = time.monotonic()
+
+        # Read without the lock: version lookups never wait for the database
+        entries, file_digest = read_catalogue_file(self.path)
+        specializations = database_specializations()
+        digest = hashlib.sha256(file_digest.encode())
+        for key, row in sorted((specializations or {}).items()):
+            digest.update(repr((key, row)).encode())
+        version = digest.hexdigest()[:16]
+
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    logger.info(f"Build catalogue changed (version {version})")
+                self._version = version
+                self._entries = entries
+                self._specializations = specializations
+                self._catalogues.clear()
+            return self._version
+
+    def _check(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Build catalogue check failed: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._checker = None
+
+    def version(self) -> str:
+        """
+        Last known catalogue version, checking the sources in a background
+        thread when due. Only the first lookup waits for them.
+        """
+        with self._lock:
+            if self._version is not None:
+                if self._checker is None and self._due():
+                    self._checker = threading.Thread(
+                        target=self._check, name="catalogue-check", daemon=True
+                    )
+                    self._checker.start()
+                return self._version
+        return self.refresh()
+
+    def get(self, game_type: str) -> Tuple[List[BuildTemplate], str]:
+        """
+        Build catalogue of a game type and its version, checking the sources
+        first when due.
+        """
+        with self._lock:
+            due = self._due()
+        if due:
+            self.refresh()
+        with self._lock:
+            version = self._version
+            catalogue = self._catalogues.get(game_type)
+            if catalogue is None:
+                catalogue = self._catalogues[game_type] = build_templates(
+                    self._entries, game_type, self._specializations
+                )
+                source = "file" if self._specializations is None else "database"
+                logger.info(
+                    f"Loaded build catalogue for {game_type} from the {source}: "
+                    f"{len(catalogue)} templates"
+                )
+            return catalogue, version
+
+
+catalogue_cache = CatalogueCache()
+
+
+def get_catalogue(game_type: str) -> Tuple[List[BuildTemplate], str]:
+    """Build catalogue of a game type from the process-wide cache."""
+    return catalogue_cache.get(game_type)
+
+
+_CATALOGUE_CHANGED = "optimizer_catalogue_changed"
+
+
+def _flag_catalogue_changes(session: Any, flush_context: Any, instances: Any) -> None:
+    from app.models.elite_specialization import EliteSpecialization
+    from app.models.profession import Profession
+
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, (Profession, EliteSpecialization)):
+            session.info[_CATALOGUE_CHANGED] = True
+            return
+
+
+def _invalidate_on_commit(session: Any) -> None:
+    if session.info.pop(_CATALOGUE_CHANGED, False):
+        catalogue_cache.invalidate()
+
+
+def watch_catalogue_tables() -> None:
+    """Invalidate the catalogue cache on commits touching its tables."""
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    if not event.contains(Session, "before_flush", _flag_catalogue_changes):
+        event.listen(Session, "before_flush", _flag_catalogue_changes)
+        event.listen(Session, "after_commit", _invalidate_on_commit)
@@ -0,0 +1,284 @@
+"""
+Hard constraints of an optimization request.
+
+A request can set minimum boon uptimes, healing, damage, crowd control and
+cleanses, and exclude elite specializations. Every minimum is a linear
+constraint on a capability total of the squad:
+
+- ``min_boon_uptime[b] = r``: coverage ``min(1, total / max(1, size / 2))``
+  of at least ``r``, i.e. a boon total of ``r * max(1, size / 2)``,
+- ``min_healing``, ``min_damage``, ``min_cc``: a squad average of at least
+  the minimum, i.e. a total of ``minimum * size``,
+- ``min_cleanses``: a cleanse total of at least the minimum, each template
+  counting for its cleanse capability (a full cleanser is 1).
+
+:meth:`Constraints.compile` checks them before any search. The templates of
+excluded elite specializations leave the candidate set; a minimum that the
+remaining templates cannot reach even with every free slot on its best
+provider rejects the request with an explanation. Each minimum also gives a
+lower bound on the count of its best provider: if it holds ``a`` of the
+capability and any other template at most ``a'``, a squad of ``size``
+meets a minimum ``m`` only with ``ceil((m - a' size) / (a - a'))`` copies.
+
+Searches then only explore compositions that can still meet the
+constraints: the exact solver prunes branches that can't reach a minimum,
+and local search starts from a composition repaired to meet them and
+rejects the swaps that break one.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from app.core.optimizer.scoring import BOON_KEYS, KEY_INDEX
+from app.schemas.composition import CompositionOptimizationRequest
+
+if TYPE_CHECKING:
+    from app.core.optimizer.batch import CompiledCatalogue
+
+# Tolerance on capability totals, against floating point sums
+EPSILON = 1e-9
+
+# Request fields holding a minimum squad average, with their capability
+AVERAGE_MINIMUMS = (
+    ("min_healing", "healing"),
+    ("min_damage", "damage"),
+    ("min_cc", "crowd_control"),
+)
+
+
+class InfeasibleRequest(ValueError):
+    """Raised when no composition can meet the constraints of a request."""
+
+
+@dataclass
+class Requirement:
+    """Minimum total of a capability over the squad."""
+
+    field: str
+    column: int
+    minimum: float
+    # Factor turning a capability total into the unit of the request field
+    unit: float
+
+    def describe(self, total: float) -> str:
+        """A total in the unit of the request field."""
+        value = total * self.unit
+        if self.field.startswith("min_boon_uptime"):
+            value = min(1.0, value)
+        return f"{value:.2f}"
+
+
+class Constraints:
+    """
+    Candidate templates, capability minimums and template count lower
+    bounds of a request.
+
+    ``allowed`` masks the templates the search may draw, ``min_counts``
+    holds the lower bound of each template count, fixed roles included.
+    """
+
+    def __init__(
+        self,
+        compiled: "CompiledCatalogue",
+        allowed: np.ndarray,
+        requirements: List[Requirement],
+        min_counts: np.ndarray,
+    ):
+        self.compiled = compiled
+        self.allowed = allowed
+        self.requirements = requirements
+        self.min_counts = min_counts
+        self.columns = np.array([r.column for r in requirements], dtype=np.intp)
+        self.minimums = np.array([r.minimum for r in requirements])
+        # Shortfalls are compared relative to their minimum
+        self.scales = 1.0 / np.maximum(self.minimums, EPSILON)
+        self.candidates = np.flatnonzero(allowed)
+
+    @classmethod
+    def compile(
+        cls,
+        compiled: "CompiledCatalogue",
+        request: CompositionOptimizationRequest,
+        fixed_min_counts: Sequence[int],
+        allowed: Optional[Set[int]] = None,
+    ) -> "Constraints":
+        """
+        Constraints of a request over a compiled catalogue.
+
+        ``fixed_min_counts`` are the copies of each template frozen by fixed
+        roles, ``allowed`` the templates of the fixed professions (None for
+        all of them).
+
+        Raises:
+            InfeasibleRequest: If no composition can meet the constraints
+        """
+        size = request.squad_size
+        fixed = np.asarray(fixed_min_counts, dtype=np.int64)
+        n_templates = len(compiled)
+
+        mask = np.ones(n_templates, dtype=bool)
+        if allowed is not None:
+            mask[:] = False
+            mask[list(allowed)] = True
+        if request.excluded_elite_specializations:
+            excluded = np.isin(
+                compiled.elite_spec_ids, request.excluded_elite_specializations
+            )
+            conflicts = excluded & (fixed > 0)
+            if conflicts.any():
+                build = compiled.catalogue[int(np.flatnonzero(conflicts)[0])]
+                raise InfeasibleRequest(
+                    f"Fixed role {build.elite_spec_name or build.profession_name} "
+                    f"is an excluded elite specialization"
+                )
+            mask &= ~excluded
+        if not mask.any():
+            raise InfeasibleRequest(
+                "No build template is left once professions and elite "
+                "specializations are filtered"
+            )
+
+        requirements = cls._requirements(request)
+        # Fixed templates count even outside the candidates
+        usable = mask | (fixed > 0)
+        free = size - int(fixed.sum())
+        min_counts = fixed.copy()
+        for requirement in requirements:
+            values = compiled.capabilities[:, requirement.column]
+            reachable = fixed @ values + free * values[mask].max()
+            if reachable < requirement.minimum - EPSILON:
+                raise InfeasibleRequest(
+                    f"{requirement.field} is unreachable: the allowed builds "
+                    f"reach at most {requirement.describe(reachable)} for a "
+                    f"squad of {size}"
+                )
+
+            # Lower bound of the count of the strictly best provider
+            ranked = np.flatnonzero(usable)[np.argsort(-values[usable], kind="stable")]
+            best = int(ranked[0])
+            second = values[ranked[1]] if ranked.size > 1 else 0.0
+            if values[best] > second:
+                needed = (requirement.minimum - second * size) / (values[best] - second)
+                min_counts[best] = max(min_counts[best], math.ceil(needed - EPSILON))
+
+        if min_counts.sum() > size:
+            raise InfeasibleRequest(
+                f"The minimums need at least {int(min_counts.sum())} players "
+                f"for a squad of {size}"
+            )
+        return cls(compiled, mask, requirements, min_counts)
+
+    @staticmethod
+    def _requirements(request: CompositionOptimizationRequest) -> List[Requirement]:
+        """Capability minimums of a request, as squad totals."""
+        size = request.squad_size
+        requirements = []
+        boon_divisor = max(1, size * 0.5)
+        for boon, uptime in sorted((request.min_boon_uptime or {}).items()):
+            field = f"min_boon_uptime[{boon}]"
+            if uptime <= 0:
+                continue
+            if boon not in BOON_KEYS:
+                raise InfeasibleRequest(f"{field}: unknown boon {boon}")
+            if uptime > 1:
+                raise InfeasibleRequest(f"{field} is unreachable: uptime is at most 1")
+            requirements.append(
+                Requirement(
+                    field, KEY_INDEX[boon], uptime * boon_divisor, 1 / boon_divisor
+                )
+            )
+        for field, key in AVERAGE_MINIMUMS:
+            minimum = getattr(request, field)
+            if minimum:
+                requirements.append(
+                    Requirement(field, KEY_INDEX[key], minimum * size, 1 / size)
+                )
+        if request.min_cleanses:
+            requirements.append(
+                Requirement(
+                    "min_cleanses", KEY_INDEX["cleanse"], request.min_cleanses, 1.0
+                )
+            )
+        return requirements
+
+    @property
+    def restricted(self) -> bool:
+        """Whether moves must be checked: minimums or excluded templates."""
+        return bool(self.requirements) or not self.allowed.all()
+
+    def shortfall(self, totals: np.ndarray) -> np.ndarray:
+        """Relative shortfall of each row of capability totals, 0 when met."""
+        totals = np.atleast_2d(totals)
+        missing = np.maximum(0.0, self.minimums - totals[:, self.columns])
+        return (missing * self.scales).sum(axis=1)
+
+    def accepts(
+        self, totals: np.ndarray, old: np.ndarray, new: np.ndarray
+    ) -> np.ndarray:
+        """
+        Which swaps of template ``old[k]`` for ``new[k]`` a search may make:
+        allowed templates that don't increase the shortfall, so that a
+        composition meeting the constraints keeps meeting them.
+        """
+        accepted = self.allowed[new]
+        if self.requirements:
+            capabilities = self.compiled.capabilities[:, self.columns]
+            after = totals[self.columns] + capabilities[new] - capabilities[old]
+            missing = np.maximum(0.0, self.minimums - after) * self.scales
+            before = self.shortfall(totals)[0]
+            accepted &= missing.sum(axis=1) <= before + EPSILON
+        return accepted
+
+    def repair(self, indices: np.ndarray, movable: np.ndarray) -> np.ndarray:
+        """
+        Composition meeting the constraints, changed from ``indices``.
+
+        Templates outside the candidates are replaced first, then the swap
+        reducing the shortfall most is made until every minimum is met.
+
+        Raises:
+            InfeasibleRequest: If no swap reduces the shortfall any more
+        """
+        indices = indices.copy()
+        capabilities = self.compiled.capabilities
+        for slot in movable[~self.allowed[indices[movable]]]:
+            indices[slot] = self.candidates[
+                (
+                    capabilities[self.candidates][:, self.columns].sum(axis=1).argmax()
+                    if self.requirements
+                    else 0
+                )
+            ]
+        if not self.requirements:
+            return indices
+
+        totals = capabilities[indices].sum(axis=0)
+        shortfall = self.shortfall(totals)[0]
+        slots = np.repeat(movable, self.candidates.size)
+        new = np.tile(self.candidates, movable.size)
+        while shortfall > EPSILON:
+            old = indices[slots]
+            after = totals + capabilities[new] - capabilities[old]
+            shortfalls = self.shortfall(after)
+            best = int(shortfalls.argmin())
+            if shortfalls[best] >= shortfall - EPSILON:
+                unmet = [
+                    f"{r.field} {r.describe(totals[r.column])}"
+                    for r in self.requirements
+                    if totals[r.column] < r.minimum - EPSILON
+                ]
+                raise InfeasibleRequest(
+                    "No composition meets all the minimums together: "
+                    f"best found {', '.join(unmet)}"
+                )
+            indices[slots[best]] = new[best]
+            totals = after[best]
+            shortfall = shortfalls[best]
+        return indices
+
+    def bounds(self) -> List[Tuple[int, float]]:
+        """(capability column, minimum total) of each requirement."""
+        return [(r.column, r.minimum) for r in self.requirements]
@@ -5,11 +5,15 @@ This module implements a heuristic-based optimizer that generates optimal
 squad compositions based on game mode, squad size, and optimization goals.
 """
 
+import hashlib
+import json
 import logging
-import random
+import math
 import time
+from collections import Counter
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Set, Tuple, Any
+import numpy as np
 import yaml
 
 from app.schemas.composition import (
@@ -18,26 +22,118 @@ from app.schemas.composition import (
     Composition,
     CompositionCreate,
     CompositionMemberRole,
+    OptimizationDebug,
+    RestartStats,
 )
-from app.core.optimizer.mode_effects import (
-    ModeEffectsManager,
-    apply_mode_adjustments,
+from app.core.optimizer.mode_effects import ModeEffectsManager
+from app.core.optimizer.batch import BatchScorer, CompiledCatalogue
+from app.core.optimizer.catalogue import BuildTemplate, get_catalogue
+from app.core.optimizer.constraints import Constraints, InfeasibleRequest
+from app.core.optimizer.exact import (
+    ExactResult,
+    ExactSolver,
+    counts_to_solution,
+    solution_to_counts,
+)
+from app.core.optimizer.scoring import ScoreFunction, score_totals
+from app.core.optimizer.tables import get_precomputed_tables
+from app.core.optimizer.strategies import (
+    DEFAULT_STRATEGY,
+    STOP_PRECOMPUTED,
+    STOP_NO_IMPROVEMENT,
+    STOP_PROVEN_OPTIMAL,
+    STOP_TIME_BUDGET,
+    ImprovementCallback,
+    SearchStats,
+    get_strategy,
 )
 
 logger = logging.getLogger(__name__)
 
+# Directory holding the optimizer YAML configs
+CONFIG_DIR = Path(__file__).parent.parent.parent.parent / "config" / "optimizer"
+
+# Version of the search and scoring code, part of every memoized result key.
+# Bump it whenever a change can alter the result of an optimization.
+ENGINE_VERSION = "13"
+
+
+def config_index(config_dir: Path = CONFIG_DIR) -> Dict[Tuple[str, str], Path]:
+    """
+    Map (game_type, game_mode) to the optimizer config files of a directory.
+
+    Files are named ``{game_type}_{name}.yml``. A file is found both by the
+    name in its file name and by the ``mode`` it declares, e.g.
+    ``wvw_guild.yml`` serves ``("wvw", "guild")`` and ``("wvw", "guild_raid")``.
+    """
+    index: Dict[Tuple[str, str], Path] = {}
+    for path in sorted(config_dir.glob("*.yml")):
+        game_type, _, name = path.stem.partition("_")
+        index[(game_type, name)] = path
+        try:
+            with open(path, "r") as f:
+                declared = (yaml.safe_load(f) or {}).get("mode")
+        except (OSError, yaml.YAMLError) as e:
+            logger.warning(f"Could not read optimizer config {path}: {e}")
+            continue
+        if declared:
+            index.setdefault((game_type, str(declared)), path)
+    return index
+
+
+def request_hash(request: CompositionOptimizationRequest) -> str:
+    """
+    Canonical SHA-256 of an optimization request.
+
+    Lists with set semantics are sorted so that requests differing only by
+    their order get the same hash. ``debug`` doesn't change the search and is
+    left out.
+    """
+    data = request.model_dump(mode="json", exclude={"debug"})
+    for field in ("fixed_professions", "excluded_elite_specializations"):
+        if data.get(field):
+            data[field] = sorted(data[field])
+    if data.get("fixed_roles"):
+        data["fixed_roles"] = sorted(
+            data["fixed_roles"], key=lambda role: json.dumps(role, sort_keys=True)
+        )
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def request_rng(
+    request: CompositionOptimizationRequest, restart: int = 0
+) -> np.random.Generator:
+    """
+    Random generator seeded from the request, so that runs are reproducible.
+
+    Each restart of a portfolio gets its own independent stream; restart 0
+    is the stream of a plain optimization.
+    """
+    seed = int(request_hash(request)[:16], 16)
+    return np.random.default_rng([seed, restart] if restart else seed)
+
+
+def exact_stats(exact: ExactResult) -> SearchStats:
+    """Search statistics of an exact solve; evaluations are search nodes."""
+    return SearchStats(
+        stop_reason=STOP_PROVEN_OPTIMAL if exact.proven_optimal else STOP_TIME_BUDGET,
+        raw_score=exact.raw_score,
+        elapsed=exact.elapsed,
+        strategy="exact",
+        evaluations=exact.nodes,
+        phases={"exact": exact.elapsed},
+    )
+
 
 class OptimizerConfig:
     """Configuration for the optimizer loaded from YAML files."""
 
-    def __init__(self, mode: str):
+    def __init__(self, mode: str, config_path: Optional[Path] = None):
         self.mode = mode
-        config_path = (
-            Path(__file__).parent.parent.parent.parent
-            / "config"
-            / "optimizer"
-            / f"wvw_{mode}.yml"
-        )
+        if config_path is None:
+            config_path = CONFIG_DIR / f"{mode}.yml"
+        self.path = config_path
 
         if not config_path.exists():
             logger.warning(f"Config file not found: {config_path}, using defaults")
@@ -46,6 +142,10 @@ class OptimizerConfig:
             with open(config_path, "r") as f:
                 self.config = yaml.safe_load(f)
 
+        self.digest = hashlib.sha256(
+            json.dumps(self.config, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
         logger.info(f"Loaded optimizer config for mode: {mode}")
 
     def _default_config(self) -> Dict[str, Any]:
@@ -95,32 +195,26 @@ class OptimizerConfig:
     def synergies(self) -> Dict[str, float]:
         return self.config.get("synergies", {})
 
+    @property
+    def search(self) -> Dict[str, Any]:
+        return self.config.get("search", {})
+
 
-class BuildTemplate:
-    """Represents a build template with its capabilities."""
+class OptimizerEngine:
+    """Main optimization engine using greedy + local search heuristic."""
 
     def __init__(
         self,
-        profession_id: int,
-        elite_spec_id: Optional[int],
-        role_type: CompositionMemberRole,
-        capabilities: Dict[str, float],
+        game_type: str = "wvw",
+        game_mode: str = "zerg",
+        config_path: Optional[Path] = None,
     ):
-        self.profession_id = profession_id
-        self.elite_spec_id = elite_spec_id
-        self.role_type = role_type
-        self.capabilities = capabilities
-
-    def get_capability(self, key: str, default: float = 0.0) -> float:
-        """Get a capability value with a default fallback."""
-        return self.capabilities.get(key, default)
-
-
-class OptimizerEngine:
-    """Main optimization engine using greedy + local search heuristic."""
+        """
+        Initialize optimizer with configuration for specific game type and mode.
 
-    def __init__(self, game_type: str = "wvw", game_mode: str = "zerg"):
-        """Initialize optimizer with configuration for specific game type and mode."""
+        ``config_path`` overrides the YAML file derived from the game type
+        and mode.
+        """
         self.game_type = game_type
         self.game_mode = game_mode
         # Map game_type + game_mode to config file
@@ -128,265 +222,64 @@ class OptimizerEngine:
             config_name = f"pve_{game_mode}"
         else:
             config_name = f"wvw_{game_mode}"
-        self.config = self._load_config(config_name)
+        self.config = self._load_config(config_name, config_path)
         self.mode_effects = ModeEffectsManager(game_type)
-        self.build_catalogue = self._initialize_catalogue()
+        self.build_catalogue, self.catalogue_version = get_catalogue(game_type)
+        self.score_fn = ScoreFunction(self.config, self.build_catalogue)
+        self.compiled = CompiledCatalogue(self.build_catalogue)
+        self.batch_scorer = BatchScorer(self.score_fn, self.compiled)
         logger.info(
             f"Initialized build catalogue with {len(self.build_catalogue)} templates for {game_type}/{game_mode}"
         )
 
-    def _load_config(self, config_name: str) -> OptimizerConfig:
-        return OptimizerConfig(config_name)
-
-    def _initialize_catalogue(self) -> List[BuildTemplate]:
-        """
-        Initialize the build catalogue with profession/elite spec templates.
-
-        Applies mode-specific adjustments to capabilities based on game_type.
-        In production, this would load from database or GW2 API.
-        """
-        catalogue = []
-
-        # Guardian - Firebrand (Healer)
-        base_capabilities = {
-            "healing": 0.95,
-            "boon_uptime": 0.90,
-            "might": 0.85,
-            "quickness": 0.95,
-            "stability": 0.80,
-            "aegis": 0.90,
-            "cleanse": 0.85,
-            "survivability": 0.80,
-        }
-        adjusted_capabilities = apply_mode_adjustments(
-            base_capabilities, 1, self.game_type
-        )
-
-        catalogue.append(
-            BuildTemplate(
-                profession_id=1,
-                elite_spec_id=3,
-                role_type=CompositionMemberRole.HEALER,
-                capabilities=adjusted_capabilities,
-            )
-        )
-
-        # Guardian - Willbender (DPS)
-        catalogue.append(
-            BuildTemplate(
-                profession_id=1,
-                elite_spec_id=4,
-                role_type=CompositionMemberRole.POWER_DAMAGE,
-                capabilities={
-                    "damage": 0.85,
-                    "mobility": 0.80,
-                    "boon_uptime": 0.60,
-                    "crowd_control": 0.70,
-                    "survivability": 0.75,
-                },
-            )
-        )
-
-        # Revenant - Herald (Boon Support)
-        # Note: Herald gives Quickness in WvW, Alacrity in PvE (trait differences)
-        base_capabilities = {
-            "boon_uptime": 0.95,
-            "alacrity": 0.90 if self.game_type == "pve" else 0.30,
-            "quickness": 0.90 if self.game_type == "wvw" else 0.30,
-            "might": 0.80,
-            "fury": 0.90,
-            "protection": 0.85,
-            "damage": 0.60,
-            "crowd_control": 0.65,
-        }
-        adjusted_capabilities = apply_mode_adjustments(
-            base_capabilities, 2, self.game_type
-        )
-
-        catalogue.append(
-            BuildTemplate(
-                profession_id=2,
-                elite_spec_id=5,
-                role_type=CompositionMemberRole.BOON_SUPPORT,
-                capabilities=adjusted_capabilities,
-            )
-        )
-
-        # Necromancer - Scourge (Support/Barrier)
-        catalogue.append(
-            BuildTemplate(
-                profession_id=3,
-                elite_spec_id=7,
-                role_type=CompositionMemberRole.SUPPORT,
-                capabilities={
-                    "survivability": 0.90,
-                    "boon_rip": 0.95,
-                    "crowd_control": 0.75,
-                    "damage": 0.65,
-                    "cleanse": 0.70,
-                    "barrier": 0.95,
-                },
-            )
-        )
-
-        # Warrior - Spellbreaker (DPS/Boon Rip)
-        catalogue.append(
-            BuildTemplate(
-                profession_id=4,
-                elite_spec_id=9,
-                role_type=CompositionMemberRole.POWER_DAMAGE,
-                capabilities={
-                    "damage": 0.85,
-                    "boon_rip": 0.90,
-                    "crowd_control": 0.80,
-                    "survivability": 0.75,
-                    "might": 0.60,
-                },
-            )
-        )
-
-        # Elementalist - Tempest (Support/Auras)
-        catalogue.append(
-            BuildTemplate(
-                profession_id=5,
-                elite_spec_id=11,
-                role_type=CompositionMemberRole.SUPPORT,
-                capabilities={
-                    "boon_uptime": 0.85,
-                    "healing": 0.70,
-                    "damage": 0.60,
-                    "crowd_control": 0.70,
-                    "auras": 0.95,
-                    "cleanse": 0.75,
-                },
-            )
-        )
-
-        # Engineer - Scrapper (Support/Superspeed)
-        # Note: Scrapper gives Stability in WvW, Quickness in PvE
-        base_capabilities = {
-            "boon_uptime": 0.85,
-            "quickness": 0.85 if self.game_type == "pve" else 0.40,
-            "stability": 0.85 if self.game_type == "wvw" else 0.40,
-            "superspeed": 0.95,
-            "healing": 0.65,
-            "survivability": 0.80,
-            "crowd_control": 0.75,
-        }
-        adjusted_capabilities = apply_mode_adjustments(
-            base_capabilities, 6, self.game_type
-        )
-
-        catalogue.append(
-            BuildTemplate(
-                profession_id=6,
-                elite_spec_id=13,
-                role_type=CompositionMemberRole.SUPPORT,
-                capabilities=adjusted_capabilities,
-            )
-        )
-
-        # Engineer - Mechanist (Boon Support)
-        # Note: Mechanist gives Might in WvW, Alacrity in PvE
-        base_capabilities = {
-            "boon_uptime": 0.90,
-            "alacrity": 0.95 if self.game_type == "pve" else 0.30,
-            "might": 0.90 if self.game_type == "wvw" else 0.60,
-            "damage": 0.70,
-            "healing": 0.60,
-            "survivability": 0.75,
-        }
-        adjusted_capabilities = apply_mode_adjustments(
-            base_capabilities, 6, self.game_type
-        )
-
-        catalogue.append(
-            BuildTemplate(
-                profession_id=6,
-                elite_spec_id=23,  # Mechanist
-                role_type=CompositionMemberRole.BOON_SUPPORT,
-                capabilities=adjusted_capabilities,
-            )
-        )
-
-        # Ranger - Druid (Healer)
-        catalogue.append(
-            BuildTemplate(
-                profession_id=7,
-                elite_spec_id=15,
-                role_type=CompositionMemberRole.HEALER,
-                capabilities={
-                    "healing": 0.90,
-                    "boon_uptime": 0.75,
-                    "might": 0.70,
-                    "spirits": 0.90,
-                    "survivability": 0.70,
-                    "crowd_control": 0.60,
-                },
-            )
-        )
-
-        # Thief - Deadeye (DPS)
-        catalogue.append(
-            BuildTemplate(
-                profession_id=8,
-                elite_spec_id=17,
-                role_type=CompositionMemberRole.POWER_DAMAGE,
-                capabilities={
-                    "damage": 0.90,
-                    "burst_damage": 0.95,
-                    "stealth": 0.85,
-                    "mobility": 0.80,
-                    "survivability": 0.60,
-                },
-            )
-        )
-
-        # Mesmer - Chronomancer (Utility)
-        catalogue.append(
-            BuildTemplate(
-                profession_id=9,
-                elite_spec_id=19,
-                role_type=CompositionMemberRole.UTILITY,
-                capabilities={
-                    "boon_uptime": 0.80,
-                    "quickness": 0.85,
-                    "alacrity": 0.80,
-                    "portals": 0.95,
-                    "crowd_control": 0.75,
-                    "damage": 0.60,
-                },
-            )
-        )
+    @property
+    def result_version(self) -> str:
+        """Engine version, config hash and catalogue version of the results."""
+        return f"{ENGINE_VERSION}:{self.config.digest[:16]}:{self.catalogue_version}"
 
-        logger.info(f"Initialized build catalogue with {len(catalogue)} templates")
-        return catalogue
+    def _load_config(
+        self, config_name: str, config_path: Optional[Path] = None
+    ) -> OptimizerConfig:
+        return OptimizerConfig(config_name, config_path)
 
     def greedy_seed(
         self,
         request: CompositionOptimizationRequest,
+        rng: Optional[np.random.Generator] = None,
     ) -> List[BuildTemplate]:
         """
         Generate initial solution using greedy algorithm.
 
-        Prioritizes critical boons and role distribution.
+        Prioritizes critical boons and role distribution. Random choices come
+        from ``rng``, seeded from the request by default.
+
+        Raises:
+            InfeasibleRequest: If no composition can meet the constraints
         """
-        solution = []
+        if rng is None:
+            rng = request_rng(request)
+
         squad_size = request.squad_size
+        constraints = self.constraints(request)
 
-        # Start with fixed professions if specified (engine chooses roles/specs)
-        if request.fixed_professions:
-            # Filter catalogue to only include fixed professions
-            available_builds = [
-                b
-                for b in self.build_catalogue
-                if b.profession_id in request.fixed_professions
-            ]
-        else:
-            available_builds = self.build_catalogue
+        # Fixed roles come first, exactly ``count`` times each: local search
+        # freezes these slots (see fixed_slots)
+        solution = []
+        fixed_counts = self._fixed_min_counts(request)
+        for template, count in self._fixed_roles(request):
+            solution.extend([self.build_catalogue[template]] * count)
+        # Then the copies the minimums require, which local search may move
+        for template, count in enumerate(constraints.min_counts):
+            extra = int(count) - fixed_counts[template]
+            solution.extend([self.build_catalogue[template]] * extra)
+        placed_roles = Counter(build.role_type for build in solution)
+
+        # Only the fixed professions, without excluded elite specializations
+        # (engine chooses roles/specs)
+        available_builds = [self.build_catalogue[i] for i in constraints.candidates]
 
         # Fill slots based on role distribution from config
-        remaining = squad_size
+        remaining = max(0, squad_size - len(solution))
         role_dist = self.config.role_distribution
 
         # Calculate target counts for each role
@@ -402,8 +295,9 @@ class OptimizerEngine:
             except ValueError:
                 continue
 
+            target -= placed_roles[role_type]
             matching = [b for b in available_builds if b.role_type == role_type]
-            if matching:
+            if matching and target > 0:
                 # Sort by overall capability score
                 matching.sort(key=lambda b: sum(b.capabilities.values()), reverse=True)
                 for _ in range(min(target, remaining)):
@@ -413,11 +307,11 @@ class OptimizerEngine:
 
         # Fill any remaining slots with DPS
         while len(solution) < squad_size:
-            dps_builds = [b for b in self.build_catalogue if "damage" in b.capabilities]
+            dps_builds = [b for b in available_builds if "damage" in b.capabilities]
             if dps_builds:
-                solution.append(random.choice(dps_builds))
+                solution.append(dps_builds[rng.integers(len(dps_builds))])
             else:
-                solution.append(random.choice(self.build_catalogue))
+                solution.append(available_builds[rng.integers(len(available_builds))])
 
         return solution[:squad_size]
 
@@ -429,173 +323,297 @@ class OptimizerEngine:
         """
         Evaluate a solution and return (score, metrics, boon_coverage, role_distribution).
         """
-        metrics = {}
-        boon_coverage = {}
-        role_distribution = {}
-
-        # Calculate role distribution
-        for build in solution:
-            role_str = build.role_type.value
-            role_distribution[role_str] = role_distribution.get(role_str, 0) + 1
-
-        # Calculate average capabilities
-        for key in [
-            "healing",
-            "damage",
-            "crowd_control",
-            "survivability",
-            "boon_rip",
-            "cleanse",
-        ]:
-            values = [b.get_capability(key) for b in solution]
-            metrics[key] = sum(values) / len(values) if values else 0.0
-
-        # Calculate boon coverage
-        for boon in [
-            "might",
-            "quickness",
-            "alacrity",
-            "stability",
-            "protection",
-            "fury",
-            "aegis",
-            "resolution",
-        ]:
-            values = [b.get_capability(boon) for b in solution]
-            boon_coverage[boon] = min(1.0, sum(values) / max(1, len(solution) * 0.5))
-
-        # Calculate boon uptime metric (average of critical boons)
-        critical_boons = self.config.critical_boons
-        if critical_boons:
-            boon_scores = [boon_coverage.get(b, 0.0) for b in critical_boons.keys()]
-            metrics["boon_uptime"] = (
-                sum(boon_scores) / len(boon_scores) if boon_scores else 0.0
-            )
-        else:
-            metrics["boon_uptime"] = 0.5
-
-        # Calculate weighted score
-        weights = self.config.weights
-        score = 0.0
-        for key, weight in weights.items():
-            score += metrics.get(key, 0.0) * weight
-
-        # Apply penalties
-        penalties = self.config.penalties or {}
-
-        # Penalty for missing critical boons
-        for boon, required in critical_boons.items():
-            if boon_coverage.get(boon, 0.0) < required:
-                score -= penalties.get("missing_critical_boon", 0.2) * (
-                    required - boon_coverage.get(boon, 0.0)
-                )
+        indices = self.compiled.indices(solution)
+        totals, role_counts = self.compiled.totals(indices)
+        return score_totals(
+            self.score_fn,
+            totals.tolist(),
+            self.compiled.role_counts(role_counts),
+            len(solution),
+            self.compiled.template_counts(indices)[0],
+        )
 
-        # Penalty for role imbalance
-        role_dist_config = self.config.role_distribution
-        for role, dist in role_dist_config.items():
-            actual = role_distribution.get(role, 0)
-            optimal = dist.get("optimal", dist.get("min", 1))
-            if actual < dist.get("min", 0) or actual > dist.get("max", 100):
-                score -= penalties.get("role_imbalance", 0.15)
+    def fixed_slots(
+        self, request: CompositionOptimizationRequest, indices: np.ndarray
+    ) -> np.ndarray:
+        """
+        Boolean mask of the slots of a composition frozen by fixed roles.
 
-        # Ensure score is in [0, 1]
-        score = max(0.0, min(1.0, score))
+        For each fixed role, the first ``count`` slots holding its template
+        are frozen, whatever the other slots hold. Searches compute the mask
+        once and only draw moves among the free slots.
+        """
+        frozen = np.zeros(indices.size, dtype=bool)
+        for template, count in enumerate(self._fixed_min_counts(request)):
+            if count:
+                frozen[np.flatnonzero(indices == template)[:count]] = True
+        return frozen
 
-        return score, metrics, boon_coverage, role_distribution
+    def strategy_name(self, request: CompositionOptimizationRequest) -> str:
+        """Search strategy of a request: its own, else the config's."""
+        return request.strategy or self.config.search.get("strategy", DEFAULT_STRATEGY)
 
     def local_search(
         self,
         solution: List[BuildTemplate],
         request: CompositionOptimizationRequest,
         time_budget: float = 2.0,
-    ) -> List[BuildTemplate]:
+        rng: Optional[np.random.Generator] = None,
+        strategy: Optional[str] = None,
+        on_improvement: Optional[ImprovementCallback] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Tuple[List[BuildTemplate], SearchStats]:
         """
         Improve solution using local search with time budget.
 
-        Tries random swaps and keeps improvements.
+        Each step scores a batch of random swaps in one vectorized call; the
+        ``strategy`` (``hill_climb``, ``annealing`` or ``tabu``, see
+        :mod:`app.core.optimizer.strategies`) decides which one to make. It
+        defaults to the strategy of the request or of the config. Slots
+        holding a fixed role are never swapped.
+
+        The search stops at the first of: the time budget, ``patience`` steps
+        without improvement, or the target score. Returns the best solution
+        and the search statistics, including the reason it stopped. Swaps
+        are drawn from ``rng``, seeded from the request by default: runs that
+        do not stop on the time budget are reproducible.
+
+        ``on_improvement`` receives every new best composition as template
+        indices, and the search stops when ``cancelled`` returns True.
         """
-        start_time = time.time()
-        best_solution = solution[:]
-        best_score, _, _, _ = self.evaluate_solution(best_solution, request)
-
-        iterations = 0
-        improvements = 0
-
-        while time.time() - start_time < time_budget:
-            iterations += 1
-
-            # Try a random swap
-            candidate = best_solution[:]
-            idx = random.randint(0, len(candidate) - 1)
-
-            # Don't swap fixed roles
-            if request.fixed_roles:
-                is_fixed = False
-                for fixed in request.fixed_roles:
-                    # Handle both dict and object formats
-                    if isinstance(fixed, dict):
-                        prof_id = fixed.get("profession_id")
-                        elite_id = fixed.get("elite_specialization_id")
-                    else:
-                        prof_id = fixed.profession_id
-                        elite_id = fixed.elite_specialization_id
-
-                    if (
-                        candidate[idx].profession_id == prof_id
-                        and candidate[idx].elite_spec_id == elite_id
-                    ):
-                        is_fixed = True
-                        break
-                if is_fixed:
-                    continue
-
-            # Swap with a random build from catalogue
-            new_build = random.choice(self.build_catalogue)
-            candidate[idx] = new_build
-
-            # Evaluate candidate
-            score, _, _, _ = self.evaluate_solution(candidate, request)
-
-            if score > best_score:
-                best_solution = candidate
-                best_score = score
-                improvements += 1
+        if rng is None:
+            rng = request_rng(request)
+        search = get_strategy(
+            strategy or self.strategy_name(request), self.config.search
+        )
+        return search.search(
+            self,
+            solution,
+            request,
+            time_budget,
+            rng,
+            on_improvement=on_improvement,
+            cancelled=cancelled,
+        )
 
-        logger.info(
-            f"Local search: {iterations} iterations, {improvements} improvements, "
-            f"final score: {best_score:.3f}"
+    def _fixed_roles(
+        self, request: CompositionOptimizationRequest
+    ) -> List[Tuple[int, int]]:
+        """
+        Catalogue template index and count of each fixed role of a request.
+
+        Raises:
+            ValueError: If no template matches a fixed role
+        """
+        fixed_roles = []
+        for fixed in request.fixed_roles or []:
+            # Handle both dict and object formats
+            if isinstance(fixed, dict):
+                prof_id = fixed.get("profession_id")
+                elite_id = fixed.get("elite_specialization_id")
+                role_type = fixed.get("role_type")
+                count = fixed.get("count", 1)
+            else:
+                prof_id = fixed.profession_id
+                elite_id = fixed.elite_specialization_id
+                role_type = fixed.role_type
+                count = fixed.count
+
+            template = self.match_template(prof_id, elite_id, role_type)
+            if template is None:
+                raise ValueError(
+                    f"No build template for fixed role: profession {prof_id}, "
+                    f"elite specialization {elite_id}"
+                )
+            fixed_roles.append((template, count))
+        return fixed_roles
+
+    def match_template(
+        self,
+        profession_id: int,
+        elite_spec_id: Optional[int] = None,
+        role_type: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        Catalogue index of the template of a build, None if there is none.
+
+        Without an elite spec any template of the profession matches; the
+        template playing ``role_type`` is preferred.
+        """
+        matching = [
+            i
+            for i, build in enumerate(self.build_catalogue)
+            if build.profession_id == profession_id
+            and (elite_spec_id is None or build.elite_spec_id == elite_spec_id)
+        ]
+        preferred = [
+            i for i in matching if self.build_catalogue[i].role_type.value == role_type
+        ]
+        if not matching:
+            return None
+        return (preferred or matching)[0]
+
+    def _fixed_min_counts(self, request: CompositionOptimizationRequest) -> List[int]:
+        """Minimum number of copies of each catalogue template from fixed roles."""
+        min_counts = [0] * len(self.build_catalogue)
+        for template, count in self._fixed_roles(request):
+            min_counts[template] += count
+        return min_counts
+
+    def _allowed_templates(
+        self, request: CompositionOptimizationRequest
+    ) -> Optional[Set[int]]:
+        """Indices of the templates a request may use, None for all of them."""
+        if not request.fixed_professions:
+            return None
+        return {
+            i
+            for i, build in enumerate(self.build_catalogue)
+            if build.profession_id in request.fixed_professions
+        }
+
+    def constraints(self, request: CompositionOptimizationRequest) -> Constraints:
+        """
+        Candidate templates, minimums and template count lower bounds of a
+        request (see :mod:`app.core.optimizer.constraints`).
+
+        Raises:
+            InfeasibleRequest: If no composition can meet the constraints
+        """
+        return Constraints.compile(
+            self.compiled,
+            request,
+            self._fixed_min_counts(request),
+            self._allowed_templates(request),
         )
 
-        return best_solution
+    def search_space_size(self, request: CompositionOptimizationRequest) -> int:
+        """
+        Number of distinct compositions (template count vectors) of a request,
+        within its candidate templates and above its count lower bounds.
+        """
+        constraints = self.constraints(request)
+        templates = constraints.candidates.size
+        free = request.squad_size - int(constraints.min_counts.sum())
+        if templates == 0 or free < 0:
+            return 0
+        return math.comb(free + templates - 1, templates - 1)
+
+    def exact_search(
+        self,
+        request: CompositionOptimizationRequest,
+        time_budget: float = 5.0,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Tuple[List[BuildTemplate], ExactResult]:
+        """
+        Find the best composition with branch and bound over template counts.
+
+        The greedy seed is used as the initial incumbent. The search stops
+        unproven after ``time_budget`` seconds or when ``cancelled`` returns
+        True. Only compositions meeting the constraints of the request are
+        searched. Returns the solution and the solver result.
+        """
+        constraints = self.constraints(request)
+        incumbent = self.compiled.indices(self.greedy_seed(request))
+        if constraints.restricted:
+            # A seed meeting the minimums prunes from the start; the solver
+            # has the last word on requests the repair can't satisfy
+            movable = np.flatnonzero(~self.fixed_slots(request, incumbent))
+            try:
+                incumbent = constraints.repair(incumbent, movable)
+            except InfeasibleRequest:
+                pass
+        incumbent = solution_to_counts(
+            self.compiled.builds(incumbent), self.build_catalogue
+        )
+        solver = ExactSolver(self.score_fn, self.build_catalogue)
+        result = solver.solve(
+            request.squad_size,
+            min_counts=constraints.min_counts.tolist(),
+            allowed=set(constraints.candidates.tolist()),
+            requirements=constraints.bounds(),
+            incumbent=incumbent,
+            time_limit=time_budget,
+            cancelled=cancelled,
+        )
+        return counts_to_solution(result.counts, self.build_catalogue), result
 
     def optimize(
         self,
         request: CompositionOptimizationRequest,
         time_budget: float = 5.0,
+        mode: str = "heuristic",
     ) -> CompositionOptimizationResult:
         """
         Main optimization method.
 
+        Args:
+            request: Optimization request with constraints
+            time_budget: Maximum time in seconds for optimization
+            mode: ``"heuristic"`` (greedy + local search) or ``"exact"``
+                (branch and bound over template counts)
+
         Returns an optimized composition with metrics.
+
+        Raises:
+            InfeasibleRequest: If no composition can meet the constraints of
+                the request, before any search
         """
         start_time = time.time()
+        self.constraints(request)
 
-        # Generate initial solution
-        solution = self.greedy_seed(request)
-        logger.info(f"Generated initial solution with {len(solution)} builds")
+        if mode == "exact":
+            solution, exact = self.exact_search(request, time_budget=time_budget)
+            stats = exact_stats(exact)
+        elif mode == "heuristic":
+            solution, stats = self._heuristic_search(request, time_budget)
+        else:
+            raise ValueError(f"Unknown optimizer mode: {mode}")
 
-        # Improve with local search
-        solution = self.local_search(solution, request, time_budget=time_budget * 0.8)
+        result = self.build_result(
+            solution, request, stop_reason=stats.stop_reason, stats=stats
+        )
+
+        elapsed = time.time() - start_time
+        logger.info(
+            f"Optimization completed in {elapsed:.2f}s with score {result.score:.3f}"
+        )
+        return result
+
+    def build_result(
+        self,
+        solution: List[BuildTemplate],
+        request: CompositionOptimizationRequest,
+        stop_reason: Optional[str] = None,
+        restarts: Optional[List[RestartStats]] = None,
+        stats: Optional[SearchStats] = None,
+    ) -> CompositionOptimizationResult:
+        """
+        Evaluate a solution and wrap it into an optimization result.
+
+        With the ``stats`` of the search, the result carries them in its
+        ``debug`` block, completed with the time of the result phases.
+        """
+        phase_start = time.perf_counter()
+        phases: Dict[str, float] = {}
+
+        def phase_done(name: str) -> None:
+            nonlocal phase_start
+            now = time.perf_counter()
+            phases[name] = now - phase_start
+            phase_start = now
 
         # Final evaluation
         score, metrics, boon_coverage, role_distribution = self.evaluate_solution(
             solution, request
         )
+        phase_done("evaluate")
 
         # Generate notes
         notes = self._generate_notes(
             solution, metrics, boon_coverage, role_distribution, request
         )
+        phase_done("notes")
 
         # Create composition object
         from datetime import datetime as dt
@@ -618,30 +636,6 @@ class OptimizerEngine:
 
         # Generate members list from solution
         members = []
-        profession_names = {
-            1: "Guardian",
-            2: "Revenant",
-            3: "Necromancer",
-            4: "Warrior",
-            5: "Elementalist",
-            6: "Engineer",
-            7: "Ranger",
-            8: "Thief",
-            9: "Mesmer",
-        }
-        elite_names = {
-            3: "Firebrand",
-            4: "Willbender",
-            5: "Herald",
-            7: "Scourge",
-            9: "Spellbreaker",
-            11: "Tempest",
-            13: "Scrapper",
-            15: "Druid",
-            17: "Deadeye",
-            19: "Chronomancer",
-        }
-
         for i, build in enumerate(solution):
             member = {
                 "id": i + 1,
@@ -652,8 +646,8 @@ class OptimizerEngine:
                 "role_type": build.role_type.value,
                 "is_commander": i == 0,  # First member is commander
                 "username": f"Player{i+1}",
-                "profession_name": profession_names.get(build.profession_id, "Unknown"),
-                "elite_specialization_name": elite_names.get(build.elite_spec_id, None),
+                "profession_name": build.profession_name or "Unknown",
+                "elite_specialization_name": build.elite_spec_name,
                 "notes": f"{build.role_type.value.replace('_', ' ').title()}",
             }
             members.append(member)
@@ -672,18 +666,229 @@ class OptimizerEngine:
             updated_at=dt.now(),
         )
 
-        elapsed = time.time() - start_time
-        logger.info(f"Optimization completed in {elapsed:.2f}s with score {score:.3f}")
-
-        return CompositionOptimizationResult(
+        result = CompositionOptimizationResult(
             composition=composition,
             score=score,
             metrics=metrics,
             role_distribution=role_distribution,
             boon_coverage=boon_coverage,
             notes=notes,
+            stop_reason=stop_reason,
+            restarts=restarts,
+        )
+        phase_done("schema")
+
+        if stats is not None:
+            result.debug = OptimizationDebug(
+                strategy=stats.strategy,
+                steps=stats.steps,
+                evaluations=stats.evaluations,
+                acceptances=stats.acceptances,
+                improvements=stats.improvements,
+                transposition_lookups=stats.transposition_lookups,
+                transposition_hits=stats.transposition_hits,
+                phases={**stats.phases, **phases},
+            )
+        return result
+
+    def exact_shortcut(
+        self,
+        request: CompositionOptimizationRequest,
+        time_budget: float,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Optional[Tuple[List[BuildTemplate], SearchStats]]:
+        """
+        Proven optimum of a request, with the solver statistics.
+
+        The exact solver gets ``time_budget`` whatever the size of the search
+        space: how fast it proves an optimum depends on how well the space
+        prunes, not on its size. Returns None when the optimum could not be
+        proven within ``time_budget`` or before ``cancelled`` returned True.
+        """
+        solution, exact = self.exact_search(
+            request, time_budget=time_budget, cancelled=cancelled
+        )
+        if not exact.proven_optimal:
+            return None
+        logger.info(f"Search space proven optimal in {exact.nodes} nodes")
+        return solution, exact_stats(exact)
+
+    def perturb(
+        self,
+        solution: List[BuildTemplate],
+        request: CompositionOptimizationRequest,
+        rng: np.random.Generator,
+        rate: float = 0.5,
+    ) -> List[BuildTemplate]:
+        """Replace a random share of the movable slots with random templates."""
+        candidates = self.constraints(request).candidates
+        indices = self.compiled.indices(solution)
+        slots = np.flatnonzero(
+            ~self.fixed_slots(request, indices) & (rng.random(indices.size) < rate)
+        )
+        indices[slots] = candidates[rng.integers(candidates.size, size=slots.size)]
+        return self.compiled.builds(indices)
+
+    def restart(
+        self,
+        request: CompositionOptimizationRequest,
+        restart: int = 0,
+        time_budget: float = 4.0,
+        strategy: Optional[str] = None,
+        on_improvement: Optional[ImprovementCallback] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Tuple[List[BuildTemplate], SearchStats]:
+        """
+        One independent greedy + local search run.
+
+        Restart 0 climbs from the greedy seed; other restarts use their own
+        random stream and start from a perturbed greedy seed, so that they
+        explore different regions of the search space. ``strategy``
+        overrides the search strategy of the request; ``on_improvement`` and
+        ``cancelled`` are passed to :meth:`local_search`.
+        """
+        rng = request_rng(request, restart)
+
+        # Generate initial solution
+        seed_start = time.perf_counter()
+        solution = self.greedy_seed(request, rng=rng)
+        if restart:
+            solution = self.perturb(solution, request, rng)
+        seed_time = time.perf_counter() - seed_start
+        logger.info(f"Generated initial solution with {len(solution)} builds")
+
+        # Improve with local search
+        solution, stats = self.local_search(
+            solution,
+            request,
+            time_budget=time_budget,
+            rng=rng,
+            strategy=strategy,
+            on_improvement=on_improvement,
+            cancelled=cancelled,
+        )
+        stats.phases["greedy_seed"] = seed_time
+        return solution, stats
+
+    def restarts(
+        self,
+        request: CompositionOptimizationRequest,
+        time_budget: float = 4.0,
+        restart: int = 0,
+        stride: int = 1,
+        strategy: Optional[str] = None,
+        on_improvement: Optional[ImprovementCallback] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Tuple[List[BuildTemplate], SearchStats]:
+        """
+        Restarts until the time budget is spent, keeping the best.
+
+        A local search stops after ``patience`` steps without improvement,
+        long before the budget of a large squad is spent: the rest of it
+        goes to restarts ``restart``, ``restart + stride``... (see
+        :meth:`restart`), as for the precomputed tables. The statistics of
+        the runs are summed, with the ``time_budget`` stop reason once it is
+        spent; ``on_improvement`` only receives compositions better than
+        those of the previous runs. Restarts stop early on the target score,
+        when ``cancelled`` returns True or when no slot can be swapped.
+        """
+        start = time.time()
+        best, total = None, None
+        runs = 0
+        while True:
+            runs += 1
+            offset = time.time() - start
+            notify = None
+            if on_improvement is not None:
+                floor = total.raw_score if total else float("-inf")
+                steps = total.steps if total else 0
+
+                def notify(indices, raw_score, step, elapsed):
+                    if raw_score > floor:
+                        on_improvement(
+                            indices, raw_score, steps + step, offset + elapsed
+                        )
+
+            solution, stats = self.restart(
+                request,
+                restart,
+                time_budget=max(0.0, time_budget - offset),
+                strategy=strategy,
+                on_improvement=notify,
+                cancelled=cancelled,
+            )
+            if total is None:
+                best, total = solution, stats
+            else:
+                if stats.raw_score > total.raw_score:
+                    total.trace.extend(
+                        (offset + elapsed, score)
+                        for elapsed, score in stats.trace
+                        if score > total.raw_score
+                    )
+                    best, total.raw_score = solution, stats.raw_score
+                total.stop_reason = stats.stop_reason
+                total.steps += stats.steps
+                total.improvements += stats.improvements
+                total.evaluations += stats.evaluations
+                total.acceptances += stats.acceptances
+                total.transposition_lookups += stats.transposition_lookups
+                total.transposition_hits += stats.transposition_hits
+                for phase, elapsed in stats.phases.items():
+                    total.phases[phase] = total.phases.get(phase, 0.0) + elapsed
+            total.elapsed = time.time() - start
+            if stats.stop_reason != STOP_NO_IMPROVEMENT or not stats.steps:
+                break
+            if total.elapsed >= time_budget:
+                total.stop_reason = STOP_TIME_BUDGET
+                break
+            restart += stride
+        if runs > 1:
+            logger.info(f"Best of {runs} restarts: raw score {total.raw_score:.3f}")
+        return best, total
+
+    def precomputed(
+        self, request: CompositionOptimizationRequest
+    ) -> Optional[Tuple[List[BuildTemplate], SearchStats]]:
+        """Composition of a request from the precomputed tables, if stored."""
+        start = time.perf_counter()
+        entry = get_precomputed_tables().lookup(self.result_version, request)
+        if entry is None:
+            return None
+        templates, raw_score = entry
+        elapsed = time.perf_counter() - start
+        return self.compiled.builds(templates), SearchStats(
+            stop_reason=STOP_PRECOMPUTED,
+            raw_score=raw_score,
+            elapsed=elapsed,
+            strategy="table",
+            phases={"table": elapsed},
         )
 
+    def _heuristic_search(
+        self, request: CompositionOptimizationRequest, time_budget: float
+    ) -> Tuple[List[BuildTemplate], SearchStats]:
+        """
+        Greedy seed improved by local search, restarted until the budget is
+        spent.
+
+        Requests stored in the precomputed tables are answered from them.
+        Otherwise the exact solver gets a fifth of the budget first: when it
+        proves the optimum, local search is skipped altogether.
+        """
+        precomputed = self.precomputed(request)
+        if precomputed is not None:
+            return precomputed
+        # An unknown strategy fails the request even when the exact solver
+        # answers it
+        get_strategy(self.strategy_name(request), self.config.search)
+
+        shortcut = self.exact_shortcut(request, time_budget * 0.2)
+        if shortcut is not None:
+            return shortcut
+
+        return self.restarts(request, time_budget=time_budget * 0.8)
+
     def _generate_notes(
         self,
         solution: List[BuildTemplate],
@@ -712,7 +917,9 @@ class OptimizerEngine:
             actual = role_distribution.get(role, 0)
             optimal = dist.get("optimal", dist.get("min", 1))
             if actual < dist.get("min", 0):
-                notes.append(f"⚠️ Not enough {role}s: {actual} (minimum: {dist['min']})")
+                notes.append(
+                    f"⚠️ Not enough {role}s: {actual} (minimum: {dist['min']})"
+                )
             elif actual > dist.get("max", 100):
                 notes.append(f"⚠️ Too many {role}s: {actual} (maximum: {dist['max']})")
 
@@ -730,6 +937,7 @@ class OptimizerEngine:
 def optimize_composition(
     request: CompositionOptimizationRequest,
     time_budget: float = 5.0,
+    mode: str = "heuristic",
 ) -> CompositionOptimizationResult:
     """
     Main entry point for composition optimization.
@@ -737,9 +945,12 @@ def optimize_composition(
     Args:
         request: Optimization request with constraints
         time_budget: Maximum time in seconds for optimization
+        mode: ``"heuristic"`` or ``"exact"``, see ``OptimizerEngine.optimize``
 
     Returns:
         Optimized composition with score and metrics
     """
-    engine = OptimizerEngine(game_type=request.game_type, game_mode=request.game_mode)
-    return engine.optimize(request, time_budget=time_budget)
+    from app.core.optimizer.registry import get_engine
+
+    engine = get_engine(request.game_type, request.game_mode)
+    return engine.optimize(request, time_budget=time_budget, mode=mode)
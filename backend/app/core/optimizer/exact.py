@@ -0,0 +1,495 @@
+"""
+Exact composition solver working on template count vectors.
+
+The score of a composition only depends on how many copies of each build
+template it contains, never on their order. With a catalogue of about ten
+templates a squad is a small integer vector, and the optimum can be proven
+with a depth-first branch and bound over those counts instead of searching
+permutations of players.
+"""
+
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from app.core.optimizer.constraints import InfeasibleRequest
+from app.core.optimizer.scoring import ScoreFunction, capability_vector
+
+if TYPE_CHECKING:
+    from app.core.optimizer.engine import BuildTemplate
+
+logger = logging.getLogger(__name__)
+
+CountVector = List[int]
+
+# Minimum bound improvement required to explore a branch
+EPSILON = 1e-9
+
+
+def solution_to_counts(
+    solution: Sequence["BuildTemplate"], catalogue: Sequence["BuildTemplate"]
+) -> CountVector:
+    """Return the number of copies of each catalogue template in a solution."""
+    index = {id(build): i for i, build in enumerate(catalogue)}
+    counts = [0] * len(catalogue)
+    for build in solution:
+        counts[index[id(build)]] += 1
+    return counts
+
+
+def counts_to_solution(
+    counts: Sequence[int], catalogue: Sequence["BuildTemplate"]
+) -> List["BuildTemplate"]:
+    """Expand a count vector into a list of builds, in catalogue order."""
+    solution: List["BuildTemplate"] = []
+    for build, count in zip(catalogue, counts):
+        solution.extend([build] * count)
+    return solution
+
+
+@dataclass
+class ExactResult:
+    """Outcome of an exact solve."""
+
+    counts: CountVector
+    score: float
+    raw_score: float
+    nodes: int
+    proven_optimal: bool
+    elapsed: float
+
+
+class ExactSolver:
+    """
+    Branch and bound over template count vectors.
+
+    Templates are assigned counts one after the other. At each node the
+    objective of the remaining slots is bounded term by term: linear metrics
+    and concave boon terms use the best remaining template for each term,
+    and role penalties that can no longer be avoided (role already above its
+    ``max``, or below its ``min`` with no way to catch up) are always counted.
+    Synergies are bounded by the best pairs the remaining slots can still
+    form, and duplicate elites by the excess already placed. Branches whose
+    best completion can't reach a required capability total are cut.
+    """
+
+    def __init__(self, score_fn: ScoreFunction, catalogue: Sequence["BuildTemplate"]):
+        self.score_fn = score_fn
+        self.catalogue = list(catalogue)
+        self.vectors = [capability_vector(build) for build in self.catalogue]
+        self.roles = [build.role_type.value for build in self.catalogue]
+
+    def solve(
+        self,
+        size: int,
+        min_counts: Optional[Sequence[int]] = None,
+        allowed: Optional[Set[int]] = None,
+        incumbent: Optional[Sequence[int]] = None,
+        time_limit: Optional[float] = None,
+        requirements: Optional[Sequence[Tuple[int, float]]] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> ExactResult:
+        """
+        Find the count vector with the best score for a squad of ``size``.
+
+        Args:
+            size: Number of players in the squad
+            min_counts: Minimum number of copies per template (fixed roles)
+            allowed: Indices of the templates that may be used
+            incumbent: Known feasible count vector used to prune early
+            time_limit: Optional limit in seconds; when reached the best
+                vector found so far is returned with ``proven_optimal=False``
+            requirements: (capability index, minimum total) that every
+                composition must meet
+            cancelled: Optional callable polled along with the time limit;
+                when it returns True the search stops as on the time limit
+
+        Raises:
+            ValueError: If the minimum counts exceed the squad size
+            InfeasibleRequest: If the search proves that no composition
+                meets the requirements
+        """
+        start_time = time.time()
+        score_fn = self.score_fn
+        n_templates = len(self.catalogue)
+        min_counts = list(min_counts or [0] * n_templates)
+        if sum(min_counts) > size:
+            raise ValueError(
+                f"Fixed builds ({sum(min_counts)}) exceed squad size ({size})"
+            )
+
+        candidates = [
+            i
+            for i in range(n_templates)
+            if allowed is None or i in allowed or min_counts[i] > 0
+        ]
+        if not candidates:
+            raise ValueError("No build template available for this request")
+
+        # The score never decreases when a capability grows, so a template
+        # that another template of the same role matches or beats on every
+        # capability can never be needed, unless their pair terms differ
+        pairs = score_fn.pairs
+        duplicates = pairs is not None and pairs.duplicate_penalty > 0
+
+        def same_pairs(i: int, j: int) -> bool:
+            if pairs is None:
+                return True
+            if duplicates and size > pairs.duplicate_limit:
+                if pairs.elite_ids[i] != pairs.elite_ids[j]:
+                    return False
+            return bool((pairs.matrix[i] == pairs.matrix[j]).all())
+
+        def dominated(i: int) -> bool:
+            return min_counts[i] == 0 and any(
+                j != i
+                and self.roles[j] == self.roles[i]
+                and all(a >= b for a, b in zip(self.vectors[j], self.vectors[i]))
+                and (self.vectors[j] != self.vectors[i] or j < i)
+                and same_pairs(i, j)
+                for j in candidates
+            )
+
+        candidates = [i for i in candidates if not dominated(i)]
+
+        # Homogeneous squads first: good templates tend to find incumbents early
+        def homogeneous_score(i: int) -> float:
+            totals = [value * size for value in self.vectors[i]]
+            counts = [size if j == i else 0 for j in range(n_templates)]
+            return score_fn.raw(totals, {self.roles[i]: size}, size, counts)
+
+        order = sorted(candidates, key=homogeneous_score, reverse=True)
+        depth = len(order)
+
+        # Decompose the objective for bounding
+        linear = [
+            sum(
+                self.vectors[i][index] * weight
+                for index, weight in score_fn.metric_weights
+            )
+            / size
+            for i in range(n_templates)
+        ]
+        boon_divisor = max(1, size * 0.5)
+        critical = [
+            (index, required)
+            for index, required in score_fn.critical_boons
+            if index is not None
+        ]
+        if score_fn.critical_boons:
+            uptime_coef = score_fn.boon_uptime_weight / len(score_fn.critical_boons)
+            constant = -sum(
+                score_fn.missing_penalty * required
+                for index, required in score_fn.critical_boons
+                if index is None and required > 0
+            )
+        else:
+            uptime_coef = 0.0
+            constant = 0.5 * score_fn.boon_uptime_weight
+
+        def boon_term(total: float, required: float) -> float:
+            coverage = min(1.0, total / boon_divisor)
+            term = uptime_coef * coverage
+            if coverage < required:
+                term -= score_fn.missing_penalty * (required - coverage)
+            return term
+
+        # The boon terms are concave and piecewise linear in the boon total,
+        # i.e. the minimum of a few lines: below the requirement, between the
+        # requirement and full coverage, and capped. Any choice of one line
+        # per boon is an upper bound that is linear in the template counts.
+        missing = score_fn.missing_penalty
+        pieces = []
+        for _, required in critical:
+            lines = []
+            if required > 0:
+                lines.append(
+                    ((uptime_coef + missing) / boon_divisor, -missing * required)
+                )
+            if required <= 1:
+                lines.append((uptime_coef / boon_divisor, 0.0))
+                lines.append((0.0, uptime_coef))
+            else:
+                lines.append((0.0, uptime_coef - missing * (required - 1)))
+            pieces.append(lines)
+
+        # Suffix data: best remaining template per term, roles still reachable
+        suffix_linear = [0.0] * (depth + 1)
+        suffix_boon = [[0.0] * len(critical) for _ in range(depth + 1)]
+        suffix_roles: List[Set[str]] = [set() for _ in range(depth + 1)]
+        suffix_min = [0] * (depth + 1)
+        for k in range(depth - 1, -1, -1):
+            i = order[k]
+            suffix_linear[k] = max(
+                linear[i], suffix_linear[k + 1] if k + 1 < depth else linear[i]
+            )
+            suffix_boon[k] = [
+                max(self.vectors[i][index], suffix_boon[k + 1][b])
+                for b, (index, _) in enumerate(critical)
+            ]
+            suffix_roles[k] = suffix_roles[k + 1] | {self.roles[i]}
+            suffix_min[k] = suffix_min[k + 1] + min_counts[i]
+
+        # Best remaining value of each required capability
+        requirements = list(requirements or [])
+        suffix_required = [[0.0] * len(requirements) for _ in range(depth + 1)]
+        for k in range(depth - 1, -1, -1):
+            suffix_required[k] = [
+                max(self.vectors[order[k]][index], suffix_required[k + 1][r])
+                for r, (index, _) in enumerate(requirements)
+            ]
+
+        def meets(values: Sequence[float]) -> bool:
+            return all(
+                values[index] >= minimum - EPSILON for index, minimum in requirements
+            )
+
+        # Synergies of the final counts c + x, x >= 0 on the remaining
+        # templates with sum(x) = r: c^T S c + 2 x^T (S c) + x^T S x, at most
+        # c^T S c + 2 r max(S c) + r^2 max(S), both maxima over the suffix
+        if pairs is not None:
+            synergy_scale = pairs.synergy_scale(size)
+            suffix_synergy = [
+                float(pairs.matrix[np.ix_(order[k:], order[k:])].max())
+                for k in range(depth)
+            ]
+            synergy = np.zeros(n_templates)
+            elite_counts = np.zeros(pairs.n_elites)
+
+        # Per line, the gain of one more copy of each template (search order)
+        line_gains = [
+            np.array(
+                [[self.vectors[i][index] * slope for i in order] for slope, _ in lines]
+            )
+            for (index, _), lines in zip(critical, pieces)
+        ]
+        ordered_linear = np.array([linear[i] for i in order])
+        ordered_roles = np.array([self.roles[i] for i in order])
+        # Per depth, the roles still available and the templates playing them
+        suffix_role_masks = [
+            [(role, ordered_roles[k:] == role) for role in sorted(suffix_roles[k])]
+            for k in range(depth)
+        ]
+
+        # Search state
+        totals = [0.0] * len(self.vectors[0]) if self.vectors else []
+        role_counts: Dict[str, int] = {}
+        counts = [0] * n_templates
+
+        best_counts: Optional[CountVector] = None
+        best_raw = float("-inf")
+        if (
+            incumbent is not None
+            and sum(incumbent) == size
+            and all(c >= m for c, m in zip(incumbent, min_counts))
+            and all(incumbent[i] == 0 for i in range(n_templates) if i not in order)
+        ):
+            inc_totals = [0.0] * len(totals)
+            inc_roles: Dict[str, int] = {}
+            for i, count in enumerate(incumbent):
+                if count:
+                    for j, value in enumerate(self.vectors[i]):
+                        inc_totals[j] += value * count
+                    inc_roles[self.roles[i]] = inc_roles.get(self.roles[i], 0) + count
+            if meets(inc_totals):
+                best_counts = list(incumbent)
+                best_raw = score_fn.raw(inc_totals, inc_roles, size, incumbent)
+
+        nodes = 0
+        timed_out = False
+        state = {"linear": 0.0, "synergy": 0.0}
+
+        def pair_bound(k: int, remaining: int) -> float:
+            """Upper bound of the pair terms of any completion."""
+            if pairs is None:
+                return 0.0
+            best_partner = float(synergy[order[k:]].max()) if remaining else 0.0
+            bound = synergy_scale * (
+                state["synergy"]
+                + 2 * remaining * best_partner
+                + remaining**2 * suffix_synergy[k]
+            )
+            # Elite counts only grow: the current excess is always paid
+            if duplicates:
+                excess = np.maximum(0.0, elite_counts - pairs.duplicate_limit)
+                bound -= pairs.duplicate_penalty * excess.sum() / size
+            return bound
+
+        def can_improve(k: int, remaining: int) -> bool:
+            """Whether completing the current partial vector may beat the best."""
+            # Required totals out of reach even with the best remaining template
+            for r, (index, minimum) in enumerate(requirements):
+                if (
+                    totals[index] + remaining * suffix_required[k][r]
+                    < minimum - EPSILON
+                ):
+                    return False
+            # Role bounds that can still be met, as (role, more needed, more
+            # allowed) in the remaining slots; the others are already lost
+            forced = 0
+            binding = []
+            for role, minimum, maximum in score_fn.role_bounds:
+                actual = role_counts.get(role, 0)
+                if actual > maximum:
+                    forced += 1
+                elif actual < minimum and (
+                    role not in suffix_roles[k] or minimum - actual > remaining
+                ):
+                    forced += 1
+                elif actual < minimum or maximum - actual < remaining:
+                    binding.append((role, max(0, minimum - actual), maximum - actual))
+
+            # Bound the rest of the objective against what is left to beat
+            target = (
+                best_raw
+                + EPSILON
+                - constant
+                - state["linear"]
+                + forced * score_fn.imbalance_penalty
+                - pair_bound(k, remaining)
+            )
+
+            # Each term with its own best remaining template
+            separate = remaining * suffix_linear[k]
+            for b, (index, required) in enumerate(critical):
+                separate += boon_term(
+                    totals[index] + remaining * suffix_boon[k][b], required
+                )
+            if separate <= target:
+                return False
+
+            # One line per boon makes the objective linear in the counts. All
+            # combinations of lines are bounded at once, one row each. Only
+            # the current line and the next flatter one are tried: steeper
+            # lines never give the tightest bound, flatter ones rarely do
+            base = np.zeros(1)
+            gains = ordered_linear[k:][np.newaxis, :]
+            for b, (index, required) in enumerate(critical):
+                total = totals[index]
+                values = [
+                    (slope, slope * total + intercept) for slope, intercept in pieces[b]
+                ]
+                steepest = min(values, key=lambda line: (line[1], -line[0]))[0]
+                lines = [
+                    line for line, (slope, _) in enumerate(values) if slope <= steepest
+                ][:2]
+                line_values = np.array([values[line][1] for line in lines])
+                base = (base[:, np.newaxis] + line_values).ravel()
+                gains = (
+                    gains[:, np.newaxis, :] + line_gains[b][lines, k:][np.newaxis]
+                ).reshape(-1, gains.shape[1])
+
+            # With linear gains only the best template of each role matters
+            roles = [role for role, _ in suffix_role_masks[k]]
+            role_gains = np.stack(
+                [gains[:, mask].max(axis=1) for _, mask in suffix_role_masks[k]],
+                axis=1,
+            )
+            ranking = np.argsort(-role_gains, axis=1)
+            ranked_gains = np.take_along_axis(role_gains, ranking, axis=1)
+
+            # Each binding role either stays within its bounds or pays the
+            # imbalance penalty and is left unconstrained. Within the bounds,
+            # meet the minimums, then fill with the best roles
+            best = np.full(base.shape, -np.inf)
+            position = {role: j for j, role in enumerate(roles)}
+            for flags in itertools.product((False, True), repeat=len(binding)):
+                lows = np.zeros(len(roles))
+                caps = np.full(len(roles), float(remaining))
+                for (role, low, high), relaxed in zip(binding, flags):
+                    if not relaxed and role in position:
+                        lows[position[role]] = low
+                        caps[position[role]] = high - low
+                left = remaining - lows.sum()
+                if left < 0 or caps.sum() < left:
+                    continue
+
+                ranked_caps = caps[ranking]
+                before = np.cumsum(ranked_caps, axis=1) - ranked_caps
+                take = np.clip(left - before, 0.0, ranked_caps)
+                value = (
+                    role_gains @ lows
+                    + (take * ranked_gains).sum(axis=1)
+                    - sum(flags) * score_fn.imbalance_penalty
+                )
+                np.maximum(best, value, out=best)
+
+            return bool((base + best).min() > target)
+
+        def add(i: int, count: int) -> None:
+            counts[i] += count
+            for j, value in enumerate(self.vectors[i]):
+                if value:
+                    totals[j] += value * count
+            role_counts[self.roles[i]] = role_counts.get(self.roles[i], 0) + count
+            state["linear"] += linear[i] * count
+            if pairs is not None:
+                # c^T S c after adding count copies of template i
+                state["synergy"] += count * (
+                    2 * synergy[i] + count * pairs.matrix[i, i]
+                )
+                synergy[:] += count * pairs.matrix[:, i]
+                elite_counts[pairs.elite_ids[i]] += count
+
+        def search(k: int, remaining: int) -> None:
+            nonlocal best_counts, best_raw, nodes, timed_out
+            nodes += 1
+            if timed_out:
+                return
+            if nodes % 1024 == 0:
+                if (
+                    time_limit is not None and time.time() - start_time > time_limit
+                ) or (cancelled is not None and cancelled()):
+                    timed_out = True
+                    return
+
+            i = order[k]
+            if k == depth - 1:
+                add(i, remaining)
+                raw = score_fn.raw(totals, role_counts, size, counts)
+                if raw > best_raw + EPSILON and meets(totals):
+                    best_raw = raw
+                    best_counts = list(counts)
+                add(i, -remaining)
+                return
+
+            if not can_improve(k, remaining):
+                return
+
+            highest = remaining - suffix_min[k + 1]
+            for count in range(highest, min_counts[i] - 1, -1):
+                if count:
+                    add(i, count)
+                search(k + 1, remaining - count)
+                if count:
+                    add(i, -count)
+                if timed_out:
+                    return
+
+        search(0, size)
+
+        elapsed = time.time() - start_time
+        if best_counts is None:
+            if requirements and not timed_out:
+                raise InfeasibleRequest(
+                    "No composition meets all the minimums of this request together"
+                )
+            raise ValueError("No feasible composition for this request")
+
+        logger.info(
+            f"Exact search: {nodes} nodes in {elapsed * 1000:.1f}ms, "
+            f"proven_optimal={not timed_out}, raw score: {best_raw:.3f}"
+        )
+
+        return ExactResult(
+            counts=best_counts,
+            score=max(0.0, min(1.0, best_raw)),
+            raw_score=best_raw,
+            nodes=nodes,
+            proven_optimal=not timed_out,
+            elapsed=elapsed,
+        )
@@ -0,0 +1,179 @@
+"""
+Optimization jobs run by the arq worker.
+
+Deep searches (tens of seconds for a 50-player zerg) don't fit in an HTTP
+request: ``POST /builder/jobs`` enqueues them on the arq worker, which runs
+them in its own optimizer pool and keeps the result in Redis for
+``OPTIMIZER_JOB_RESULT_TTL`` seconds. While a job runs, its latest incumbent
+is published under :func:`progress_key` so that ``GET /builder/jobs/{id}``
+can report progress before the result is ready.
+
+Nobody scrapes the metrics of the worker: a job returns its result with the
+run statistics (``debug``) and the API process publishes them the first time
+it serves the result, like those of the optimizations it runs itself.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from arq import Retry
+from arq.connections import ArqRedis
+from arq.jobs import Job, JobResult, JobStatus
+
+from app.core.config import settings
+from app.core.optimizer.leaderboard import score_compositions
+from app.core.optimizer.memo import get_optimizer_memo, memo_key
+from app.core.optimizer.metrics import observe_result
+from app.core.optimizer.pool import OptimizerQueueFull, get_optimizer_pool
+from app.core.optimizer.portfolio import optimize_portfolio
+from app.core.optimizer.stream import stream_incumbents
+from app.core.optimizer.tables import precompute_tables
+from app.db.session import AsyncSessionLocal
+from app.schemas.composition import (
+    CompositionOptimizationJob,
+    CompositionOptimizationJobProgress,
+    CompositionOptimizationRequest,
+    CompositionOptimizationResult,
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_FUNCTION = "optimize_composition_job"
+PROGRESS_KEY_PREFIX = "optimizer:job:progress"
+OBSERVED_KEY_PREFIX = "optimizer:job:observed"
+
+
+def progress_key(job_id: str) -> str:
+    """Redis key of the progress of a job."""
+    return f"{PROGRESS_KEY_PREFIX}:{job_id}"
+
+
+def observed_key(job_id: str) -> str:
+    """Redis key set once the run statistics of a job are published."""
+    return f"{OBSERVED_KEY_PREFIX}:{job_id}"
+
+
+async def optimize_composition_job(
+    ctx: Dict[str, Any], request: Dict[str, Any], time_budget: float
+) -> Dict[str, Any]:
+    """
+    Optimize a composition on the arq worker and return the result as JSON.
+
+    Single runs publish every incumbent as progress; portfolio runs
+    (``restarts`` > 1) only report their final result. The result keeps its
+    run statistics for :func:`get_job_status` to publish. Jobs are retried
+    later when the worker's optimizer pool is full.
+    """
+    optimization = CompositionOptimizationRequest.model_validate(request)
+    memo = get_optimizer_memo()
+    key = await memo_key(optimization, time_budget)
+    result = await memo.get(key)
+    if result is not None:
+        return result.model_dump(mode="json")
+
+    redis = ctx["redis"]
+    pool = get_optimizer_pool()
+    try:
+        if optimization.restarts and optimization.restarts > 1:
+            result = await optimize_portfolio(optimization, pool, time_budget)
+        else:
+            async for incumbent in stream_incumbents(optimization, pool, time_budget):
+                progress = CompositionOptimizationJobProgress(
+                    iteration=incumbent.iteration,
+                    elapsed=incumbent.elapsed,
+                    fraction=min(1.0, incumbent.elapsed / time_budget),
+                    raw_score=incumbent.raw_score,
+                    score=incumbent.result.score,
+                )
+                await redis.set(
+                    progress_key(ctx["job_id"]),
+                    progress.model_dump_json(),
+                    ex=settings.OPTIMIZER_JOB_RESULT_TTL,
+                )
+                result = incumbent.result
+    except OptimizerQueueFull as e:
+        raise Retry(defer=e.retry_after)
+
+    await memo.set(key, result)
+    logger.info(f"Optimization job {ctx['job_id']} done, score {result.score:.3f}")
+    return result.model_dump(mode="json")
+
+
+async def precompute_tables_job(ctx: Dict[str, Any]) -> int:
+    """
+    Extend the precomputed tables on the arq worker (nightly cron job).
+
+    Entries already stored for the current versions are kept, so the job
+    only solves what a config or catalogue change made stale.
+    """
+    stored = await precompute_tables(
+        get_optimizer_pool(), time_budget=settings.OPTIMIZER_TABLES_BUDGET
+    )
+    logger.info(f"Precomputed tables job done, {stored} compositions stored")
+    return stored
+
+
+async def score_compositions_job(ctx: Dict[str, Any]) -> int:
+    """
+    Score the stored compositions on the arq worker (periodic cron job).
+
+    Only compositions without a score of the current versions are scored:
+    new ones, those whose members changed and, after a mode YAML or build
+    catalogue change, every composition of the mode.
+    """
+    async with AsyncSessionLocal() as db:
+        stored = await score_compositions(db, get_optimizer_pool())
+    logger.info(f"Composition scores job done, {stored} compositions scored")
+    return stored
+
+
+async def enqueue_optimization(
+    redis: ArqRedis, request: CompositionOptimizationRequest, time_budget: float
+) -> Optional[Job]:
+    """Enqueue an optimization job, None if the job could not be created."""
+    return await redis.enqueue_job(
+        JOB_FUNCTION, request.model_dump(mode="json"), time_budget
+    )
+
+
+async def _observe_job_result(
+    redis: ArqRedis, job_id: str, info: JobResult
+) -> CompositionOptimizationResult:
+    """
+    Result of a complete job, its run statistics published by the first poll
+    that serves it: results are polled again and again until they expire.
+    """
+    request = CompositionOptimizationRequest.model_validate(info.args[0])
+    result = CompositionOptimizationResult.model_validate(info.result)
+    if result.debug is not None and await redis.set(
+        observed_key(job_id), 1, ex=settings.OPTIMIZER_JOB_RESULT_TTL, nx=True
+    ):
+        return observe_result(request, result)
+    if request.debug:
+        return result
+    return result.model_copy(update={"debug": None})
+
+
+async def get_job_status(redis: ArqRedis, job_id: str) -> CompositionOptimizationJob:
+    """Status, progress and result of an optimization job."""
+    job = Job(job_id, redis)
+    status = await job.status()
+    body = CompositionOptimizationJob(job_id=job_id, status=status.value)
+    if status == JobStatus.not_found:
+        return body
+
+    # Job definition, or outcome once the job is complete
+    info = await job.info()
+    if info is not None:
+        body.enqueue_time = info.enqueue_time
+
+    progress = await redis.get(progress_key(job_id))
+    if progress is not None:
+        body.progress = CompositionOptimizationJobProgress.model_validate_json(progress)
+
+    if isinstance(info, JobResult):
+        if info.success:
+            body.result = await _observe_job_result(redis, job_id, info)
+        else:
+            body.error = str(info.result) or type(info.result).__name__
+    return body
@@ -0,0 +1,302 @@
+"""
+Scores of the stored compositions, for ranking them.
+
+Compositions saved through the API list their members' builds (profession
+and elite specialization, in ``composition_members``) but have no score.
+:func:`score_compositions` scores them in bulk: the members of each
+composition are matched to build templates, compositions of the same size
+are stacked into a (n, size) array of template indices and scored with one
+:meth:`BatchScorer.raw_solutions` call per chunk of
+``OPTIMIZER_SCORES_CHUNK_SIZE`` compositions, in the optimizer pool workers.
+
+A stored composition has a game type (``game_mode`` holds "wvw", "pve"...)
+or a single mode ("wvw_zerg", as optimization results name theirs), so it
+is scored with every config of its type or with its mode. Scores are stored
+with a snapshot of their metrics in ``composition_scores``, keyed by
+(composition, result version). The version is made of the engine version,
+the config hash and the build catalogue version, like precomputed tables:
+editing a mode YAML leaves every composition of the mode without a score of
+the current version, and the arq job rescoring the compositions without one
+every ``OPTIMIZER_SCORES_INTERVAL`` minutes scores them again. Changing the
+members of a composition drops its scores.
+
+Compositions without members, or with a member whose build has no template,
+are not scored: they get a row without a score for the version, so that
+later runs skip them until their members or the version change. Rankings
+leave them out.
+"""
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.optimizer.engine import config_index
+from app.core.optimizer.registry import engine_registry, get_engine, result_version
+from app.core.optimizer.scoring import BOON_KEYS, KEY_INDEX, METRIC_KEYS
+from app.models import Composition, CompositionScore, composition_members
+
+if TYPE_CHECKING:
+    from app.core.optimizer.batch import BatchScorer, CompiledCatalogue
+    from app.core.optimizer.pool import OptimizerPool
+
+logger = logging.getLogger(__name__)
+
+# (profession_id, elite_specialization_id) of each member of a composition
+Members = Sequence[Tuple[Optional[int], Optional[int]]]
+
+METRIC_COLUMNS = np.array([KEY_INDEX[key] for key in METRIC_KEYS], dtype=np.intp)
+BOON_COLUMNS = np.array([KEY_INDEX[boon] for boon in BOON_KEYS], dtype=np.intp)
+
+
+@dataclass
+class ScoreEntry:
+    """Score of a stored composition under one config, None if unmatched."""
+
+    composition_id: int
+    version: str
+    game_type: str
+    game_mode: str
+    score: Optional[float]
+    raw_score: Optional[float]
+    metrics: Optional[Dict[str, Any]]
+
+
+def score_configs() -> List[Tuple[str, str, List[str]]]:
+    """
+    (game_type, game_mode, stored game modes) of each optimizer config file.
+
+    The stored game modes are those of the compositions the config scores:
+    the game type alone and every ``{game_type}_{mode}`` naming the file.
+    """
+    names: Dict[Path, List[Tuple[str, str]]] = {}
+    for key, path in config_index().items():
+        names.setdefault(path, []).append(key)
+    configs = []
+    for keys in names.values():
+        game_type, game_mode = keys[0]
+        stored = [game_type] + [f"{key_type}_{name}" for key_type, name in keys]
+        configs.append((game_type, game_mode, stored))
+    return sorted(configs)
+
+
+def _ranking_version(score_mode: str) -> str:
+    game_type, _, game_mode = score_mode.partition("_")
+    if engine_registry.config_path(game_type, game_mode) is None:
+        raise ValueError(f"Unknown optimizer mode {score_mode}")
+    return get_engine(game_type, game_mode).result_version
+
+
+async def ranking_version(score_mode: str) -> str:
+    """
+    Result version of the scores ranking compositions by a
+    ``{game_type}_{mode}`` optimizer mode.
+
+    Resolved in a thread: the engine lookup may build the engine and read
+    the build catalogue from the database.
+
+    Raises:
+        ValueError: If no optimizer config serves the mode
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _ranking_version, score_mode)
+
+
+def snapshots(
+    scorer: "BatchScorer",
+    compiled: "CompiledCatalogue",
+    totals: np.ndarray,
+    role_totals: np.ndarray,
+    size: int,
+) -> List[Dict[str, Any]]:
+    """
+    Metrics, boon coverage and role distribution of solutions of one size,
+    from their (n_solutions, keys) capability totals and role counts: the
+    values ``score_totals`` reports for each of them.
+    """
+    averages = totals[:, METRIC_COLUMNS] / size
+    boon_divisor = max(1, size * 0.5)
+    coverage = np.minimum(1.0, totals[:, BOON_COLUMNS] / boon_divisor)
+    if scorer.n_critical:
+        critical = np.minimum(1.0, totals[:, scorer.critical_index] / boon_divisor)
+        uptime = critical.sum(axis=1) / scorer.n_critical
+    else:
+        uptime = np.full(totals.shape[0], 0.5)
+
+    return [
+        {
+            "metrics": {
+                **dict(zip(METRIC_KEYS, averages[k].tolist())),
+                "boon_uptime": float(uptime[k]),
+            },
+            "boon_coverage": dict(zip(BOON_KEYS, coverage[k].tolist())),
+            "role_distribution": compiled.role_counts(role_totals[k]),
+        }
+        for k in range(totals.shape[0])
+    ]
+
+
+def score_chunk(
+    game_type: str, game_mode: str, compositions: Sequence[Tuple[int, Members]]
+) -> List[ScoreEntry]:
+    """
+    Score stored compositions with the engine of a mode (pool entry point).
+
+    Compositions are grouped by size and each group is scored in one batch.
+    Unmatched compositions get an entry without a score.
+    """
+    engine = get_engine(game_type, game_mode)
+    compiled = engine.compiled
+    scorer = engine.batch_scorer
+    version = engine.result_version
+
+    templates: Dict[Tuple[Optional[int], Optional[int]], Optional[int]] = {}
+    groups: Dict[int, Tuple[List[int], List[List[int]]]] = {}
+    unmatched = []
+    for composition_id, members in compositions:
+        indices = []
+        for build in members:
+            if build not in templates:
+                profession_id, elite_id = build
+                templates[build] = (
+                    None
+                    if profession_id is None
+                    else engine.match_template(profession_id, elite_id)
+                )
+            indices.append(templates[build])
+        if not indices or None in indices:
+            unmatched.append(composition_id)
+            continue
+        ids, rows = groups.setdefault(len(indices), ([], []))
+        ids.append(composition_id)
+        rows.append(indices)
+
+    entries = [
+        ScoreEntry(
+            composition_id=composition_id,
+            version=version,
+            game_type=game_type,
+            game_mode=game_mode,
+            score=None,
+            raw_score=None,
+            metrics=None,
+        )
+        for composition_id in unmatched
+    ]
+    for size, (ids, rows) in sorted(groups.items()):
+        indices = np.array(rows, dtype=np.intp)
+        raw = scorer.raw_solutions(indices)
+        totals, role_totals = compiled.totals(indices)
+        metrics = snapshots(scorer, compiled, totals, role_totals, size)
+        for k, composition_id in enumerate(ids):
+            entries.append(
+                ScoreEntry(
+                    composition_id=composition_id,
+                    version=version,
+                    game_type=game_type,
+                    game_mode=game_mode,
+                    score=min(1.0, max(0.0, float(raw[k]))),
+                    raw_score=float(raw[k]),
+                    metrics=metrics[k],
+                )
+            )
+    if unmatched:
+        logger.info(
+            f"{len(unmatched)} compositions not scored for {game_type}/{game_mode}: "
+            f"no member or a member build without template"
+        )
+    return entries
+
+
+async def unscored_compositions(
+    db: AsyncSession, version: str, game_modes: Sequence[str], force: bool = False
+) -> List[int]:
+    """
+    Ids of the compositions of some game modes without a score row of a
+    version, scored or unmatched.
+    """
+    query = select(Composition.id).where(Composition.game_mode.in_(game_modes))
+    if not force:
+        scored = select(CompositionScore.composition_id).where(
+            CompositionScore.version == version
+        )
+        query = query.where(Composition.id.not_in(scored))
+    result = await db.execute(query.order_by(Composition.id))
+    return list(result.scalars())
+
+
+async def stored_members(
+    db: AsyncSession, composition_ids: Sequence[int]
+) -> Dict[int, List[Tuple[Optional[int], Optional[int]]]]:
+    """Member builds of compositions, the compositions without members left out."""
+    result = await db.execute(
+        select(
+            composition_members.c.composition_id,
+            composition_members.c.profession_id,
+            composition_members.c.elite_specialization_id,
+        )
+        .where(composition_members.c.composition_id.in_(composition_ids))
+        .order_by(composition_members.c.composition_id, composition_members.c.user_id)
+    )
+    members: Dict[int, List[Tuple[Optional[int], Optional[int]]]] = {}
+    for composition_id, profession_id, elite_id in result:
+        members.setdefault(composition_id, []).append((profession_id, elite_id))
+    return members
+
+
+async def store_scores(db: AsyncSession, entries: Sequence[ScoreEntry]) -> None:
+    """Store scores, replacing those of the same compositions and versions."""
+    for version in {entry.version for entry in entries}:
+        await db.execute(
+            delete(CompositionScore).where(
+                CompositionScore.version == version,
+                CompositionScore.composition_id.in_(
+                    [
+                        entry.composition_id
+                        for entry in entries
+                        if entry.version == version
+                    ]
+                ),
+            )
+        )
+    db.add_all([CompositionScore(**asdict(entry)) for entry in entries])
+    await db.commit()
+
+
+async def score_compositions(
+    db: AsyncSession,
+    pool: "OptimizerPool",
+    chunk_size: Optional[int] = None,
+    force: bool = False,
+) -> int:
+    """
+    Score the stored compositions without a score of the current versions,
+    or all of them with ``force``; return the number of scores stored,
+    unmatched compositions left out.
+
+    Chunks are scored in parallel pool workers, at most one per worker at a
+    time so that a large backlog never fills the pool queue.
+    """
+    chunk_size = chunk_size or settings.OPTIMIZER_SCORES_CHUNK_SIZE
+    stored = 0
+    for game_type, game_mode, game_modes in score_configs():
+        version = await result_version(game_type, game_mode)
+        ids = await unscored_compositions(db, version, game_modes, force)
+        chunks = [ids[i : i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        for start in range(0, len(chunks), pool.max_workers):
+            jobs = []
+            for chunk in chunks[start : start + pool.max_workers]:
+                members = await stored_members(db, chunk)
+                compositions = [(i, members.get(i, [])) for i in chunk]
+                jobs.append((game_type, game_mode, compositions))
+            for entries in await pool.run_many(score_chunk, jobs):
+                await store_scores(db, entries)
+                stored += sum(entry.score is not None for entry in entries)
+    logger.info(f"Composition scores: {stored} compositions scored")
+    return stored
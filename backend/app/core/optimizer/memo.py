@@ -0,0 +1,129 @@
+"""
+Memo cache of optimization results.
+
+Optimizations are reproducible: the engine seeds its random generator from
+the request, so the same request on the same config and engine version gives
+the same composition, as long as the restarts that find it fit in the time
+budget. Results are therefore memoized under a key made of the engine
+version, the config content hash and the canonical request hash.
+
+The cache has two levels: a bounded in-process LRU answering repeated
+requests without leaving the API process, and Redis shared by every API
+process. Redis errors never fail a request, the result is just recomputed.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.optimizer.engine import request_hash
+from app.core.optimizer.registry import result_version
+from app.schemas.composition import (
+    CompositionOptimizationRequest,
+    CompositionOptimizationResult,
+)
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "optimizer:result"
+
+
+async def memo_key(
+    request: CompositionOptimizationRequest,
+    time_budget: float = 5.0,
+    mode: str = "heuristic",
+) -> str:
+    """
+    Cache key of an optimization: engine version, config hash, build catalogue
+    version and request hash.
+    """
+    version = await result_version(request.game_type, request.game_mode)
+    return f"{KEY_PREFIX}:v{version}:{mode}:{time_budget:g}:{request_hash(request)}"
+
+
+class OptimizerMemo:
+    """Two-level (LRU + Redis) cache of optimization results."""
+
+    def __init__(self, max_size: int = 256, ttl: int = 86400, redis_client: Any = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.redis = redis_client
+        self._entries: "OrderedDict[str, CompositionOptimizationResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local_hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+
+    def _remember(self, key: str, result: CompositionOptimizationResult) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[CompositionOptimizationResult]:
+        """Return the memoized result of a key, None if unknown."""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self._local_hits += 1
+                return result
+
+        if self.redis is not None:
+            try:
+                cached = await self.redis.get(key)
+            except Exception as e:
+                logger.warning(f"Redis memo cache error: {e}")
+                cached = None
+            if cached:
+                result = CompositionOptimizationResult.model_validate_json(cached)
+                self._remember(key, result)
+                self._redis_hits += 1
+                return result
+
+        self._misses += 1
+        return None
+
+    async def set(self, key: str, result: CompositionOptimizationResult) -> None:
+        """
+        Memoize the result of a key in both levels.
+
+        Run statistics (``debug``) describe one run and are not memoized.
+        """
+        if result.debug is not None:
+            result = result.model_copy(update={"debug": None})
+        self._remember(key, result)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, result.model_dump_json(), ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"Redis memo cache error: {e}")
+
+    def clear(self) -> None:
+        """Drop the in-process entries (Redis entries expire on their own)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of in-process entries and the lookup counters."""
+        return {
+            "entries": len(self._entries),
+            "local_hits": self._local_hits,
+            "redis_hits": self._redis_hits,
+            "misses": self._misses,
+        }
+
+
+optimizer_memo = OptimizerMemo(
+    max_size=settings.OPTIMIZER_MEMO_SIZE,
+    ttl=settings.OPTIMIZER_MEMO_TTL,
+    redis_client=settings.redis_client,
+)
+
+
+def get_optimizer_memo() -> OptimizerMemo:
+    """Return the process-wide optimization memo cache."""
+    return optimizer_memo
@@ -0,0 +1,115 @@
+"""
+Prometheus metrics of the optimizer.
+
+Optimizations run in worker processes, whose metrics would never reach the
+registry of the API process. Workers attach their run statistics to the
+result instead (``CompositionOptimizationResult.debug``) and the API process
+publishes them with :func:`observe_result` when the result comes back. Jobs
+of the arq worker do the same: their statistics are published when the API
+serves their result.
+Metrics are labelled by game type, game mode and search strategy.
+"""
+
+from prometheus_client import Counter, Histogram
+
+from app.schemas.composition import (
+    CompositionOptimizationRequest,
+    CompositionOptimizationResult,
+)
+
+LABELS = ["game_type", "game_mode", "strategy"]
+
+OPTIMIZER_RUNS = Counter(
+    "optimizer_runs_total",
+    "Total number of optimizer runs",
+    LABELS + ["stop_reason"],
+)
+OPTIMIZER_EVALUATIONS = Counter(
+    "optimizer_evaluations_total",
+    "Total number of candidate compositions scored by the optimizer",
+    LABELS,
+)
+OPTIMIZER_ACCEPTANCES = Counter(
+    "optimizer_acceptances_total",
+    "Total number of moves made by the optimizer search",
+    LABELS,
+)
+OPTIMIZER_IMPROVEMENTS = Counter(
+    "optimizer_improvements_total",
+    "Total number of new best compositions found by the optimizer search",
+    LABELS,
+)
+# Hit rate: rate of the hits over rate of the lookups
+OPTIMIZER_TRANSPOSITION_LOOKUPS = Counter(
+    "optimizer_transposition_lookups_total",
+    "Total number of candidate compositions looked up in the transposition table",
+    LABELS,
+)
+OPTIMIZER_TRANSPOSITION_HITS = Counter(
+    "optimizer_transposition_hits_total",
+    "Total number of transposition table lookups answered without scoring",
+    LABELS,
+)
+OPTIMIZER_PHASE_SECONDS = Histogram(
+    "optimizer_phase_seconds",
+    "Time spent in each phase of an optimizer run",
+    LABELS + ["phase"],
+    buckets=(
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+    ),
+)
+OPTIMIZER_QUEUE_WAIT = Histogram(
+    "optimizer_queue_wait_seconds",
+    "Time jobs wait for a free optimizer worker",
+    ["job"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+def observe_queue_wait(job: str, wait: float) -> None:
+    """Publish the time a pool job waited for a worker."""
+    OPTIMIZER_QUEUE_WAIT.labels(job=job).observe(max(0.0, wait))
+
+
+def observe_result(
+    request: CompositionOptimizationRequest, result: CompositionOptimizationResult
+) -> CompositionOptimizationResult:
+    """
+    Publish the run statistics of a fresh optimization result.
+
+    Returns the result to send, whose ``debug`` block is only kept when the
+    request asked for it.
+    """
+    debug = result.debug
+    if debug is None:
+        return result
+
+    labels = {
+        "game_type": request.game_type,
+        "game_mode": request.game_mode,
+        "strategy": debug.strategy,
+    }
+    OPTIMIZER_RUNS.labels(stop_reason=result.stop_reason or "", **labels).inc()
+    OPTIMIZER_EVALUATIONS.labels(**labels).inc(debug.evaluations)
+    OPTIMIZER_ACCEPTANCES.labels(**labels).inc(debug.acceptances)
+    OPTIMIZER_IMPROVEMENTS.labels(**labels).inc(debug.improvements)
+    OPTIMIZER_TRANSPOSITION_LOOKUPS.labels(**labels).inc(debug.transposition_lookups)
+    OPTIMIZER_TRANSPOSITION_HITS.labels(**labels).inc(debug.transposition_hits)
+    for phase, elapsed in debug.phases.items():
+        OPTIMIZER_PHASE_SECONDS.labels(phase=phase, **labels).observe(elapsed)
+
+    if request.debug:
+        return result
+    return result.model_copy(update={"debug": None})
@@ -0,0 +1,315 @@
+"""
+Process pool for running the optimizer off the event loop.
+
+The optimizer is CPU bound and fully synchronous: running it inside an
+``async def`` endpoint freezes the whole uvicorn worker for the duration of
+the time budget. This module runs optimizations in a dedicated pool of
+worker processes, with a bounded number of queued jobs so that overload is
+reported to clients (503 + Retry-After) instead of piling up.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from app.core.config import settings
+from app.core.optimizer.catalogue import catalogue_cache
+from app.core.optimizer.metrics import observe_queue_wait
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Modules imported once by the fork server so new workers start warm
+PRELOAD_MODULES = [
+    "app.core.optimizer.engine",
+    "app.core.optimizer.registry",
+    "app.core.optimizer.portfolio",
+    "app.core.optimizer.alliance",
+    "app.core.optimizer.assignment",
+    "app.core.optimizer.leaderboard",
+    "app.core.optimizer.repair",
+    "app.core.optimizer.sensitivity",
+    "app.core.optimizer.stream",
+]
+
+
+class OptimizerQueueFull(Exception):
+    """Raised when the optimizer pool cannot accept more jobs."""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Optimizer queue is full, retry after {retry_after}s")
+
+
+def _timed_call(fn: Callable[..., T], submitted: float, *args: Any) -> Tuple[float, T]:
+    """Run ``fn(*args)`` in a worker, with the time the job waited for it."""
+    wait = time.time() - submitted
+    value = fn(*args)
+    # Optimization results report their own wait in their debug block
+    debug = getattr(value, "debug", None)
+    if debug is not None:
+        debug.queue_wait = wait
+    return wait, value
+
+
+def _init_worker(
+    registry_counters: Any = None, catalogue_generation: Any = None
+) -> None:
+    """Warm up a worker process before it receives its first job."""
+    from app.core.optimizer.registry import engine_registry
+
+    if registry_counters is not None:
+        engine_registry.use_shared_counters(registry_counters)
+    if catalogue_generation is not None:
+        catalogue_cache.use_shared_generation(catalogue_generation)
+    engine_registry.warm()
+
+    logger.info("Optimizer worker process ready")
+
+
+class OptimizerPool:
+    """
+    Managed process pool with admission control for optimization jobs.
+
+    At most ``max_workers`` jobs run at the same time and at most
+    ``max_queue`` more wait for a free worker. Any job submitted beyond that
+    is rejected immediately with :class:`OptimizerQueueFull`.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        retry_after: int = 5,
+        start_method: str = "forkserver",
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Server process of the queues and events shared with streamed jobs
+        self._manager: Any = None
+        self._in_flight = 0
+        self._completed = 0
+        # Jobs that raised, were cancelled or lost their worker
+        self._failed = 0
+        self._rejected = 0
+        # Engine registry counters (hits, misses, rebuilds) of all workers
+        self._registry_counters: Any = None
+        # Build catalogue invalidations, shared with the workers
+        self._catalogue_generation: Any = None
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of jobs either running or waiting."""
+        return self.max_workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def _mp_context(self) -> multiprocessing.context.BaseContext:
+        method = self.start_method
+        if method not in multiprocessing.get_all_start_methods():
+            method = "spawn"
+        context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            context.set_forkserver_preload(PRELOAD_MODULES)
+        return context
+
+    def start(self, warm: bool = False) -> None:
+        """
+        Start the worker processes (no-op if already started).
+
+        Workers are spawned on demand; with ``warm`` every worker is spawned
+        right away so that its engines are built before the first request.
+        """
+        if self._executor is not None:
+            return
+        context = self._mp_context()
+        if self._registry_counters is None:
+            self._registry_counters = context.Array("q", 3)
+        if self._catalogue_generation is None:
+            self._catalogue_generation = context.Value("q", 0)
+            catalogue_cache.use_shared_generation(self._catalogue_generation)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self._registry_counters, self._catalogue_generation),
+        )
+        if warm:
+            for _ in range(self.max_workers):
+                self._executor.submit(os.getpid)
+        logger.info(
+            f"Optimizer pool started: workers={self.max_workers}, "
+            f"max_queue={self.max_queue}"
+        )
+
+    def channel(self) -> Tuple[Any, Any]:
+        """
+        Return a new queue and event shared with the worker processes.
+
+        Jobs that report progress while they run (streamed optimizations)
+        receive them as arguments: the worker puts events on the queue and
+        polls the event to know when to stop.
+        """
+        if self._manager is None:
+            self._manager = self._mp_context().Manager()
+        return self._manager.Queue(), self._manager.Event()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes and cancel jobs still waiting."""
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+        self._stop_executor(wait)
+
+    def _stop_executor(self, wait: bool) -> None:
+        """Stop the worker processes, keeping the shared queues alive."""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._executor = None
+        logger.info("Optimizer pool stopped")
+
+    def _done(self, count: int, succeeded: bool) -> None:
+        """Release the slots of finished jobs and count them."""
+        self._in_flight -= count
+        if succeeded:
+            self._completed += count
+        else:
+            self._failed += count
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run ``fn(*args)`` in a worker process.
+
+        ``fn`` and its arguments must be picklable (module-level function,
+        Pydantic models, plain data).
+
+        Raises:
+            OptimizerQueueFull: If the pool is already at capacity
+        """
+        if self._in_flight >= self.capacity:
+            self._rejected += 1
+            raise OptimizerQueueFull(self.retry_after)
+
+        if self._executor is None:
+            self.start()
+
+        self._in_flight += 1
+        executor = self._executor
+        succeeded = False
+        try:
+            loop = asyncio.get_running_loop()
+            wait, value = await loop.run_in_executor(
+                executor, _timed_call, fn, time.time(), *args
+            )
+            observe_queue_wait(fn.__name__, wait)
+            succeeded = True
+            return value
+        except BrokenProcessPool:
+            self._restart_broken(executor)
+            raise
+        finally:
+            self._done(1, succeeded)
+
+    async def run_many(
+        self, fn: Callable[..., T], arg_lists: Sequence[Tuple[Any, ...]]
+    ) -> List[T]:
+        """
+        Run ``fn(*args)`` for each argument tuple, in parallel workers.
+
+        The jobs are admitted all together or not at all, so that a request
+        never holds part of the pool while its other jobs are rejected.
+
+        Raises:
+            OptimizerQueueFull: If the pool cannot take every job
+        """
+        count = len(arg_lists)
+        if self._in_flight + count > self.capacity:
+            self._rejected += 1
+            raise OptimizerQueueFull(self.retry_after)
+
+        if self._executor is None:
+            self.start()
+
+        self._in_flight += count
+        executor = self._executor
+        succeeded = False
+        try:
+            loop = asyncio.get_running_loop()
+            submitted = time.time()
+            outcomes = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, _timed_call, fn, submitted, *args)
+                    for args in arg_lists
+                )
+            )
+            values = []
+            for wait, value in outcomes:
+                observe_queue_wait(fn.__name__, wait)
+                values.append(value)
+            succeeded = True
+            return values
+        except BrokenProcessPool:
+            self._restart_broken(executor)
+            raise
+        finally:
+            self._done(count, succeeded)
+
+    def _restart_broken(self, executor: ProcessPoolExecutor) -> None:
+        # A worker died (OOM, segfault...): rebuild the pool for next jobs.
+        # Every job of the broken executor gets here: only the first one
+        # restarts it, later ones must not stop the executor that replaced
+        # it. The manager is kept: the queues it handed out to streamed
+        # jobs must stay usable
+        if self._executor is not executor:
+            return
+        logger.error("Optimizer pool is broken, restarting workers")
+        self._stop_executor(wait=False)
+        self.start()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool usage counters and the engine registry counters."""
+        from app.core.optimizer.registry import COUNTER_NAMES
+
+        counters = self._registry_counters
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "started": self.started,
+            "engines": {
+                name: int(counters[i]) if counters is not None else 0
+                for i, name in enumerate(COUNTER_NAMES)
+            },
+        }
+
+
+optimizer_pool = OptimizerPool(
+    max_workers=settings.OPTIMIZER_POOL_WORKERS,
+    max_queue=settings.OPTIMIZER_POOL_MAX_QUEUE,
+    retry_after=settings.OPTIMIZER_POOL_RETRY_AFTER,
+    start_method=settings.OPTIMIZER_POOL_START_METHOD,
+)
+
+
+def get_optimizer_pool() -> OptimizerPool:
+    """Return the process-wide optimizer pool."""
+    return optimizer_pool
@@ -0,0 +1,191 @@
+"""
+Multi-start (portfolio) optimization over the optimizer process pool.
+
+A plain optimization runs one greedy seed and one local search in a single
+worker. In portfolio mode, the restarts of a request run in parallel in
+different workers, each with its own random stream and starting point, and
+all of them stop at the same wall-clock deadline. Unless the request pins a
+strategy, restarts rotate over every search strategy, starting with the
+default one of the mode. The best incumbent is kept and the statistics of
+every restart are reported with the result.
+
+The event loop never touches an engine: the restarts are planned, run and
+merged into the result by optimizer pool jobs.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Union
+
+from app.core.optimizer.engine import optimize_composition
+from app.core.optimizer.pool import OptimizerPool, get_optimizer_pool
+from app.core.optimizer.registry import get_engine
+from app.core.optimizer.strategies import STRATEGIES, SearchStats
+from app.schemas.composition import (
+    CompositionOptimizationRequest,
+    CompositionOptimizationResult,
+    RestartStats,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RestartOutcome:
+    """Solution of one restart, as catalogue template indices."""
+
+    restart: int
+    indices: List[int]
+    stats: SearchStats
+
+
+def run_restart(
+    request: CompositionOptimizationRequest,
+    restart: int,
+    deadline: float,
+    strategy: Optional[str] = None,
+    restarts: int = 1,
+) -> RestartOutcome:
+    """
+    Run one restart in a worker process, until ``deadline``.
+
+    When its local search stops early, the worker goes on with restarts
+    ``restart + restarts``, ``restart + 2 * restarts``... so that the
+    workers of a portfolio never run the same restart.
+    """
+    engine = get_engine(request.game_type, request.game_mode)
+    solution, stats = engine.restarts(
+        request,
+        time_budget=max(0.0, deadline - time.time()),
+        restart=restart,
+        stride=restarts,
+        strategy=strategy,
+    )
+    return RestartOutcome(
+        restart=restart,
+        indices=engine.compiled.indices(solution).tolist(),
+        stats=stats,
+    )
+
+
+def plan_portfolio(
+    request: CompositionOptimizationRequest, time_budget: float
+) -> Union[List[str], CompositionOptimizationResult]:
+    """
+    Strategies of the restarts of a portfolio (pool entry point).
+
+    Requests stored in the precomputed tables and those whose optimum the
+    exact solver proves within a fifth of the budget need no restarts: their
+    result is returned instead.
+    """
+    engine = get_engine(request.game_type, request.game_mode)
+    shortcut = engine.precomputed(request)
+    if shortcut is None:
+        shortcut = engine.exact_shortcut(request, time_budget * 0.2)
+    if shortcut is not None:
+        solution, stats = shortcut
+        return engine.build_result(
+            solution, request, stop_reason=stats.stop_reason, stats=stats
+        )
+
+    default = engine.strategy_name(request)
+    if request.strategy:
+        return [default]
+    return [default] + sorted(set(STRATEGIES) - {default})
+
+
+def portfolio_result(
+    request: CompositionOptimizationRequest, outcomes: List[RestartOutcome]
+) -> CompositionOptimizationResult:
+    """
+    Result of the best of the restart outcomes, sorted best first, with the
+    statistics of every restart (pool entry point).
+    """
+    engine = get_engine(request.game_type, request.game_mode)
+    best = outcomes[0]
+
+    # Restarts run side by side: phase times are those of the slowest one
+    phases = {}
+    for outcome in outcomes:
+        for phase, elapsed in outcome.stats.phases.items():
+            phases[phase] = max(phases.get(phase, 0.0), elapsed)
+    stats = SearchStats(
+        stop_reason=best.stats.stop_reason,
+        raw_score=best.stats.raw_score,
+        steps=sum(outcome.stats.steps for outcome in outcomes),
+        improvements=sum(outcome.stats.improvements for outcome in outcomes),
+        strategy="portfolio",
+        evaluations=sum(outcome.stats.evaluations for outcome in outcomes),
+        acceptances=sum(outcome.stats.acceptances for outcome in outcomes),
+        phases=phases,
+        transposition_lookups=sum(
+            outcome.stats.transposition_lookups for outcome in outcomes
+        ),
+        transposition_hits=sum(
+            outcome.stats.transposition_hits for outcome in outcomes
+        ),
+    )
+
+    return engine.build_result(
+        engine.compiled.builds(best.indices),
+        request,
+        stop_reason=best.stats.stop_reason,
+        stats=stats,
+        restarts=[
+            RestartStats(
+                restart=outcome.restart,
+                strategy=outcome.stats.strategy,
+                raw_score=outcome.stats.raw_score,
+                steps=outcome.stats.steps,
+                improvements=outcome.stats.improvements,
+                stop_reason=outcome.stats.stop_reason,
+                elapsed=outcome.stats.elapsed,
+            )
+            for outcome in outcomes
+        ],
+    )
+
+
+async def optimize_portfolio(
+    request: CompositionOptimizationRequest,
+    pool: Optional[OptimizerPool] = None,
+    time_budget: float = 5.0,
+) -> CompositionOptimizationResult:
+    """
+    Optimize with ``request.restarts`` parallel restarts and keep the best.
+
+    Restarts are capped at the number of workers: extra restarts would only
+    start once the deadline is almost over. Single restarts fall back to a
+    plain optimization.
+    """
+    pool = pool or get_optimizer_pool()
+    restarts = min(request.restarts or 1, pool.max_workers)
+    if restarts <= 1:
+        return await pool.run(optimize_composition, request, time_budget)
+    strategies = await pool.run(plan_portfolio, request, time_budget)
+    if isinstance(strategies, CompositionOptimizationResult):
+        return strategies
+
+    # Same share of the budget as the local search of a plain optimization
+    deadline = time.time() + time_budget * 0.8
+    outcomes = await pool.run_many(
+        run_restart,
+        [
+            (
+                request,
+                restart,
+                deadline,
+                strategies[restart % len(strategies)],
+                restarts,
+            )
+            for restart in range(restarts)
+        ],
+    )
+    outcomes.sort(key=lambda outcome: (-outcome.stats.raw_score, outcome.restart))
+    best = outcomes[0]
+    logger.info(
+        f"Portfolio of {restarts} restarts: best restart {best.restart} "
+        f"with raw score {best.stats.raw_score:.3f}"
+    )
+    return await pool.run(portfolio_result, request, outcomes)
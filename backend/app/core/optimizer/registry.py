@@ -0,0 +1,195 @@
+"""
+Process-wide registry of warm optimizer engines.
+
+Building an ``OptimizerEngine`` parses a YAML config, builds the mode
+effects and compiles the build catalogue. The registry keeps one engine per
+(game_type, game_mode), built once and reused by every request handled in
+the process. An engine is only rebuilt when its config file or the build
+catalogue changes: the file mtime is checked on each lookup and, when it
+moved, the content hash decides whether the config really changed; the
+catalogue version comes from :mod:`app.core.optimizer.catalogue`.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.optimizer.catalogue import catalogue_cache
+from app.core.optimizer.engine import CONFIG_DIR, OptimizerEngine, config_index
+
+logger = logging.getLogger(__name__)
+
+EngineKey = Tuple[str, str]
+
+# Counter slots, also the layout of shared counter arrays
+HITS, MISSES, REBUILDS = 0, 1, 2
+COUNTER_NAMES = ("hits", "misses", "rebuilds")
+
+
+@dataclass
+class _Entry:
+    engine: OptimizerEngine
+    path: Optional[Path]
+    mtime_ns: Optional[int]
+    digest: Optional[str]
+
+
+def _file_state(path: Optional[Path]) -> Tuple[Optional[int], Optional[str]]:
+    """Return (mtime_ns, sha256) of a config file, (None, None) if missing."""
+    if path is None:
+        return None, None
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        with open(path, "rb") as f:
+            return mtime_ns, hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None, None
+
+
+class EngineRegistry:
+    """
+    Pre-built optimizer engines keyed by (game_type, game_mode).
+
+    Thread safe. Counts lookups served by a cached engine (hits), lookups
+    that had to build one (misses) and engines rebuilt after a config change
+    (rebuilds).
+    """
+
+    def __init__(self, config_dir: Path = CONFIG_DIR):
+        self.config_dir = config_dir
+        self._entries: Dict[EngineKey, _Entry] = {}
+        self._index: Dict[EngineKey, Path] = {}
+        self._index_mtime_ns: Optional[int] = None
+        self._lock = threading.RLock()
+        self._counters: Any = [0, 0, 0]
+
+    def use_shared_counters(self, counters: Any) -> None:
+        """
+        Count into ``counters`` instead of local integers.
+
+        Used with a ``multiprocessing.Array`` so the parent process can read
+        the counters of the optimizer pool workers.
+        """
+        self._counters = counters
+
+    def _count(self, slot: int) -> None:
+        get_lock = getattr(self._counters, "get_lock", None)
+        if get_lock is None:
+            self._counters[slot] += 1
+            return
+        with get_lock():
+            self._counters[slot] += 1
+
+    def _config_path(self, key: EngineKey) -> Optional[Path]:
+        """Config file of a key, rescanning the directory when it changed."""
+        try:
+            mtime_ns = os.stat(self.config_dir).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if mtime_ns != self._index_mtime_ns:
+            self._index = config_index(self.config_dir) if mtime_ns else {}
+            self._index_mtime_ns = mtime_ns
+        return self._index.get(key)
+
+    def _build(self, key: EngineKey, path: Optional[Path]) -> _Entry:
+        mtime_ns, digest = _file_state(path)
+        game_type, game_mode = key
+        engine = OptimizerEngine(
+            game_type=game_type, game_mode=game_mode, config_path=path
+        )
+        return _Entry(engine=engine, path=path, mtime_ns=mtime_ns, digest=digest)
+
+    def _config_unchanged(self, entry: _Entry, path: Optional[Path]) -> bool:
+        """Whether the config file of an entry is still the one it was built from."""
+        if path != entry.path:
+            return False
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns if path else None
+        except OSError:
+            mtime_ns = None
+        if mtime_ns == entry.mtime_ns:
+            return True
+
+        # Touched but maybe not modified: compare the content
+        mtime_ns, digest = _file_state(path)
+        if digest != entry.digest:
+            return False
+        entry.mtime_ns = mtime_ns
+        return True
+
+    def get(self, game_type: str, game_mode: str) -> OptimizerEngine:
+        """Return the engine for a game type and mode, building it if needed."""
+        key = (game_type, game_mode)
+        with self._lock:
+            path = self._config_path(key)
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self._count(MISSES)
+                entry = self._entries[key] = self._build(key, path)
+                return entry.engine
+
+            if entry.engine.catalogue_version != catalogue_cache.version():
+                logger.info(f"Build catalogue changed for {game_type}/{game_mode}")
+            elif self._config_unchanged(entry, path):
+                self._count(HITS)
+                return entry.engine
+            else:
+                logger.info(f"Optimizer config changed for {game_type}/{game_mode}")
+
+            self._count(REBUILDS)
+            entry = self._entries[key] = self._build(key, path)
+            return entry.engine
+
+    def config_path(self, game_type: str, game_mode: str) -> Optional[Path]:
+        """Config file of a game type and mode, None when it has none."""
+        with self._lock:
+            return self._config_path((game_type, game_mode))
+
+    def warm(self) -> List[EngineKey]:
+        """Build an engine for every config file of the config directory."""
+        with self._lock:
+            self._index_mtime_ns = None
+            self._config_path(("", ""))
+            keys = sorted(self._index)
+            for game_type, game_mode in keys:
+                self.get(game_type, game_mode)
+        logger.info(f"Optimizer engines warmed: {len(keys)}")
+        return keys
+
+    def clear(self) -> None:
+        """Drop every cached engine."""
+        with self._lock:
+            self._entries.clear()
+            self._index_mtime_ns = None
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of cached engines and the lookup counters."""
+        stats = {name: int(self._counters[i]) for i, name in enumerate(COUNTER_NAMES)}
+        stats["engines"] = len(self._entries)
+        return stats
+
+
+engine_registry = EngineRegistry()
+
+
+def get_engine(game_type: str, game_mode: str) -> OptimizerEngine:
+    """Return the warm engine of the process-wide registry."""
+    return engine_registry.get(game_type, game_mode)
+
+
+async def result_version(game_type: str, game_mode: str) -> str:
+    """
+    Result version of the warm engine of a mode, for coroutines.
+
+    The lookup runs in a thread: it may build the engine and read the
+    build catalogue from the database.
+    """
+    loop = asyncio.get_running_loop()
+    engine = await loop.run_in_executor(None, get_engine, game_type, game_mode)
+    return engine.result_version
@@ -0,0 +1,211 @@
+"""
+Warm-start repair of an existing composition after a roster change.
+
+In live WvW the squad changes every few minutes: someone leaves, a commander
+swaps class. Optimizing the new roster from scratch reshuffles the whole
+squad. :func:`repair` starts from the players actually there instead, and
+asks as few of them as possible to change build: each step makes the single
+change of build with the best score gain, until no change gains at least
+``repair_min_gain`` (``search`` section of the mode config), ``max_swaps``
+players have changed, or the time budget is spent.
+
+Locked players keep their build, and players of a locked profession only
+change elite specialization or role. A repair scores every allowed change
+of every player in one batch per step, so it takes a few milliseconds.
+"""
+
+import logging
+import time
+from typing import Dict, List, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from app.core.optimizer.strategies import (
+    STOP_MAX_SWAPS,
+    STOP_NO_IMPROVEMENT,
+    STOP_TIME_BUDGET,
+)
+from app.schemas.composition import (
+    CompositionOptimizationRequest,
+    CompositionRepairRequest,
+    CompositionRepairResult,
+    CompositionSwap,
+    RosterMember,
+)
+
+if TYPE_CHECKING:
+    from app.core.optimizer.engine import BuildTemplate, OptimizerEngine
+
+logger = logging.getLogger(__name__)
+
+# Minimum raw score gain for asking a player to change build
+DEFAULT_REPAIR_MIN_GAIN = 0.005
+
+
+def roster(request: CompositionRepairRequest) -> List[RosterMember]:
+    """
+    Players of the squad after the roster change: the members still there,
+    in order, then the players who joined.
+
+    Raises:
+        ValueError: If a removed index is unknown or the squad size invalid
+    """
+    members = request.members or []
+    for index in request.removed:
+        if not 0 <= index < len(members):
+            raise ValueError(f"Unknown removed member: {index}")
+    removed = set(request.removed)
+    players = [member for i, member in enumerate(members) if i not in removed] + list(
+        request.added
+    )
+    if not 1 <= len(players) <= 50:
+        raise ValueError("Squad size must be between 1 and 50")
+    return players
+
+
+def roster_member(build: "BuildTemplate", locked: bool = False) -> RosterMember:
+    """Roster entry of a player playing a build template."""
+    return RosterMember(
+        profession_id=build.profession_id,
+        elite_specialization_id=build.elite_spec_id,
+        role_type=build.role_type.value,
+        locked=locked,
+    )
+
+
+def member_templates(
+    engine: "OptimizerEngine", players: List[RosterMember]
+) -> np.ndarray:
+    """
+    Catalogue template index of the build of each player.
+
+    Raises:
+        ValueError: If no template matches a player's build
+    """
+    indices = np.empty(len(players), dtype=np.intp)
+    for slot, player in enumerate(players):
+        template = engine.match_template(
+            player.profession_id, player.elite_specialization_id, player.role_type
+        )
+        if template is None:
+            raise ValueError(
+                f"No build template for member {slot}: profession "
+                f"{player.profession_id}, elite specialization "
+                f"{player.elite_specialization_id}"
+            )
+        indices[slot] = template
+    return indices
+
+
+def _candidate_moves(
+    engine: "OptimizerEngine",
+    players: List[RosterMember],
+    locked_professions: List[int],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(player, template) of every change of build allowed to a player."""
+    slots: List[int] = []
+    templates: List[int] = []
+    for slot, player in enumerate(players):
+        if player.locked:
+            continue
+        for template, build in enumerate(engine.build_catalogue):
+            if (
+                player.profession_id in locked_professions
+                and build.profession_id != player.profession_id
+            ):
+                continue
+            slots.append(slot)
+            templates.append(template)
+    return np.array(slots, dtype=np.intp), np.array(templates, dtype=np.intp)
+
+
+def repair(
+    engine: "OptimizerEngine", request: CompositionRepairRequest
+) -> CompositionRepairResult:
+    """
+    Repair a composition after a roster change with the fewest swaps.
+
+    Raises:
+        ValueError: If the roster is invalid or a player's build is unknown
+    """
+    start_time = time.time()
+    players = roster(request)
+    size = len(players)
+    indices = member_templates(engine, players)
+    initial = indices.copy()
+
+    compiled = engine.compiled
+    scorer = engine.batch_scorer
+    slots, new = _candidate_moves(engine, players, request.locked_professions)
+    totals, role_counts = compiled.totals(indices)
+    pairs = scorer.pair_counts(indices)
+    raw_score_before = score = float(scorer.raw_solutions(indices)[0])
+
+    min_gain = engine.config.search.get("repair_min_gain", DEFAULT_REPAIR_MIN_GAIN)
+    max_swaps = size if request.max_swaps is None else request.max_swaps
+    gains: Dict[int, float] = {}
+    stop_reason = STOP_TIME_BUDGET
+    while time.time() - start_time < request.time_budget:
+        old = indices[slots]
+        scores = scorer.raw_swaps(totals, role_counts, size, old, new, pairs)
+        scores[old == new] = -np.inf
+        # Once max_swaps players have changed, only they may change again
+        if len(gains) >= max_swaps:
+            scores[~np.isin(slots, list(gains))] = -np.inf
+        if not scores.size or scores.max() - score < min_gain:
+            stop_reason = (
+                STOP_MAX_SWAPS
+                if gains and len(gains) >= max_swaps
+                else STOP_NO_IMPROVEMENT
+            )
+            break
+
+        best = int(scores.argmax())
+        slot, template = int(slots[best]), int(new[best])
+        totals += compiled.capabilities[template] - compiled.capabilities[old[best]]
+        role_counts += compiled.role_onehot[template] - compiled.role_onehot[old[best]]
+        if pairs is not None:
+            pairs.apply(old[best], template)
+        indices[slot] = template
+        gains[slot] = gains.get(slot, 0.0) + float(scores[best]) - score
+        score = float(scores[best])
+
+    # A player changed twice counts once, a player back to their build not at all
+    catalogue = engine.build_catalogue
+    swaps = [
+        CompositionSwap(
+            member=slot,
+            before=roster_member(catalogue[initial[slot]]),
+            after=roster_member(catalogue[indices[slot]]),
+            gain=gains[slot],
+        )
+        for slot in sorted(gains)
+        if indices[slot] != initial[slot]
+    ]
+
+    optimization = CompositionOptimizationRequest(
+        squad_size=size, game_type=request.game_type, game_mode=request.game_mode
+    )
+    result = engine.build_result(
+        compiled.builds(indices), optimization, stop_reason=stop_reason
+    )
+    elapsed = time.time() - start_time
+    logger.info(
+        f"Composition repair: {len(swaps)} swaps in {elapsed * 1000:.1f}ms, "
+        f"raw score {raw_score_before:.3f} -> {score:.3f}"
+    )
+    return CompositionRepairResult(
+        result=result,
+        swaps=swaps,
+        raw_score_before=raw_score_before,
+        raw_score=score,
+        elapsed=elapsed,
+    )
+
+
+def repair_composition(request: CompositionRepairRequest) -> CompositionRepairResult:
+    """Repair a composition with the engine of its game mode (pool entry point)."""
+    from app.core.optimizer.registry import get_engine
+
+    engine = get_engine(request.game_type, request.game_mode)
+    return repair(engine, request)
@@ -0,0 +1,190 @@
+"""
+Composition scoring helpers for the optimizer.
+
+The score of a composition only depends on the sum of each capability over
+the squad and on the number of builds per role. This module computes the
+score from those totals, one composition at a time; searches score
+batches of compositions with :class:`app.core.optimizer.batch.BatchScorer`.
+
+Synergies and duplicate elites depend on the template counts instead; they
+are compiled by :mod:`app.core.optimizer.synergy` when the score function is
+given the build catalogue.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from app.core.optimizer.synergy import PairTerms
+
+if TYPE_CHECKING:
+    from app.core.optimizer.engine import BuildTemplate, OptimizerConfig
+
+# Capabilities averaged over the squad and reported as metrics
+METRIC_KEYS = [
+    "healing",
+    "damage",
+    "crowd_control",
+    "survivability",
+    "boon_rip",
+    "cleanse",
+]
+
+# Boons reported in boon coverage
+BOON_KEYS = [
+    "might",
+    "quickness",
+    "alacrity",
+    "stability",
+    "protection",
+    "fury",
+    "aegis",
+    "resolution",
+]
+
+# Every capability that contributes to the score, in vector order
+SCORED_KEYS = METRIC_KEYS + BOON_KEYS
+KEY_INDEX = {key: i for i, key in enumerate(SCORED_KEYS)}
+
+EvaluationResult = Tuple[float, Dict[str, float], Dict[str, float], Dict[str, int]]
+
+
+def capability_vector(build: "BuildTemplate") -> Tuple[float, ...]:
+    """Return the scored capabilities of a build in ``SCORED_KEYS`` order."""
+    return tuple(build.get_capability(key) for key in SCORED_KEYS)
+
+
+class ScoreFunction:
+    """
+    Scoring rules of an optimizer config, flattened for the hot loop.
+
+    The weighted objective and the penalties are read once from the config
+    so that scoring a set of totals does not allocate any dict. With the
+    build ``catalogue``, the synergies and the duplicate elite penalty are
+    compiled into ``pairs``, scored from the template counts.
+    """
+
+    def __init__(
+        self,
+        config: "OptimizerConfig",
+        catalogue: Optional[Sequence["BuildTemplate"]] = None,
+    ):
+        weights = config.weights
+        penalties = config.penalties or {}
+
+        self.metric_weights = [
+            (KEY_INDEX[key], weight)
+            for key, weight in weights.items()
+            if key in METRIC_KEYS
+        ]
+        self.boon_uptime_weight = weights.get("boon_uptime", 0.0)
+
+        # Critical boons outside the coverage keys always count as 0 coverage
+        self.critical_boons = [
+            (KEY_INDEX.get(boon) if boon in BOON_KEYS else None, required)
+            for boon, required in config.critical_boons.items()
+        ]
+        self.missing_penalty = penalties.get("missing_critical_boon", 0.2)
+
+        self.role_bounds = [
+            (role, dist.get("min", 0), dist.get("max", 100))
+            for role, dist in config.role_distribution.items()
+        ]
+        self.imbalance_penalty = penalties.get("role_imbalance", 0.15)
+
+        self.pairs: Optional[PairTerms] = None
+        if catalogue is not None:
+            self.pairs = PairTerms.compile(config, catalogue)
+
+    def boon_uptime(self, totals: Sequence[float], size: int) -> float:
+        """Average coverage of the critical boons."""
+        if not self.critical_boons:
+            return 0.5
+        boon_divisor = max(1, size * 0.5)
+        covered = 0.0
+        for index, _ in self.critical_boons:
+            if index is not None:
+                covered += min(1.0, totals[index] / boon_divisor)
+        return covered / len(self.critical_boons)
+
+    def __call__(
+        self,
+        totals: Sequence[float],
+        role_counts: Dict[str, int],
+        size: int,
+        counts: Optional[Sequence[float]] = None,
+    ) -> float:
+        """Score a composition from its capability totals and role counts."""
+        # Ensure score is in [0, 1]
+        return max(0.0, min(1.0, self.raw(totals, role_counts, size, counts)))
+
+    def raw(
+        self,
+        totals: Sequence[float],
+        role_counts: Dict[str, int],
+        size: int,
+        counts: Optional[Sequence[float]] = None,
+    ) -> float:
+        """
+        Weighted objective minus penalties, before clipping to [0, 1].
+
+        ``counts``, the number of copies of each catalogue template, adds
+        the pair terms (synergies and duplicate elites).
+        """
+        score = 0.0
+        if size:
+            for index, weight in self.metric_weights:
+                score += totals[index] / size * weight
+        score += self.boon_uptime(totals, size) * self.boon_uptime_weight
+
+        # Penalty for missing critical boons
+        boon_divisor = max(1, size * 0.5)
+        for index, required in self.critical_boons:
+            actual = (
+                min(1.0, totals[index] / boon_divisor) if index is not None else 0.0
+            )
+            if actual < required:
+                score -= self.missing_penalty * (required - actual)
+
+        # Penalty for role imbalance
+        for role, minimum, maximum in self.role_bounds:
+            actual_count = role_counts.get(role, 0)
+            if actual_count < minimum or actual_count > maximum:
+                score -= self.imbalance_penalty
+
+        if self.pairs is not None and counts is not None:
+            score += float(self.pairs.raw(np.asarray(counts, dtype=float), size)[0])
+
+        return score
+
+
+def score_totals(
+    score_fn: ScoreFunction,
+    totals: Sequence[float],
+    role_counts: Dict[str, int],
+    size: int,
+    counts: Optional[Sequence[float]] = None,
+) -> EvaluationResult:
+    """
+    Score a composition from its capability totals and role counts.
+
+    Returns (score, metrics, boon_coverage, role_distribution).
+    """
+    metrics = {
+        key: totals[KEY_INDEX[key]] / size if size else 0.0 for key in METRIC_KEYS
+    }
+    metrics["boon_uptime"] = score_fn.boon_uptime(totals, size)
+
+    boon_divisor = max(1, size * 0.5)
+    boon_coverage = {
+        boon: min(1.0, totals[KEY_INDEX[boon]] / boon_divisor) for boon in BOON_KEYS
+    }
+
+    role_distribution = {role: count for role, count in role_counts.items() if count}
+
+    return (
+        score_fn(totals, role_counts, size, counts),
+        metrics,
+        boon_coverage,
+        role_distribution,
+    )
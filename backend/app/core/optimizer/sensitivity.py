@@ -0,0 +1,100 @@
+"""
+What-if analysis of a composition: the score change of every build change.
+
+Commanders want to know what swapping one player's build would do before
+asking for it. :func:`sensitivity` answers for the whole neighbourhood at
+once: the raw score change of every member playing every template of the
+catalogue instead, as a members x templates matrix the UI renders as a
+heatmap.
+
+A change only depends on the template it replaces, not on the slot, so
+the changes of the distinct templates of the squad are scored in one
+batch (at most templates x templates candidates) and expanded to the
+members.
+"""
+
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.core.optimizer.repair import member_templates, roster_member
+from app.schemas.composition import (
+    CompositionSensitivityRequest,
+    CompositionSensitivityResult,
+    CompositionSwap,
+)
+
+if TYPE_CHECKING:
+    from app.core.optimizer.engine import OptimizerEngine
+
+logger = logging.getLogger(__name__)
+
+
+def sensitivity(
+    engine: "OptimizerEngine", request: CompositionSensitivityRequest
+) -> CompositionSensitivityResult:
+    """
+    Raw score change of every single build change of a composition.
+
+    Raises:
+        ValueError: If the squad size is invalid or a member's build unknown
+    """
+    start_time = time.time()
+    members = request.members or []
+    if not 1 <= len(members) <= 50:
+        raise ValueError("Squad size must be between 1 and 50")
+    indices = member_templates(engine, members)
+    size = indices.size
+
+    compiled = engine.compiled
+    scorer = engine.batch_scorer
+    totals, role_counts = compiled.totals(indices)
+    pairs = scorer.pair_counts(indices)
+    raw_score = float(scorer.raw_solutions(indices)[0])
+
+    # Every change of each distinct template of the squad, in one batch
+    present, rows = np.unique(indices, return_inverse=True)
+    n_templates = len(compiled)
+    old = np.repeat(present, n_templates)
+    new = np.tile(np.arange(n_templates), present.size)
+    scores = scorer.raw_swaps(totals, role_counts, size, old, new, pairs)
+    changes = (scores - raw_score).reshape(present.size, n_templates)
+    changes[np.arange(present.size), present] = 0.0
+    deltas = changes[rows]
+
+    best = None
+    member, template = np.unravel_index(int(deltas.argmax()), deltas.shape)
+    if deltas[member, template] > 0:
+        catalogue = engine.build_catalogue
+        best = CompositionSwap(
+            member=int(member),
+            before=roster_member(catalogue[indices[member]]),
+            after=roster_member(catalogue[template]),
+            gain=float(deltas[member, template]),
+        )
+
+    elapsed = time.time() - start_time
+    logger.info(
+        f"Composition sensitivity: {size} x {n_templates} changes in "
+        f"{elapsed * 1000:.1f}ms, raw score {raw_score:.3f}"
+    )
+    return CompositionSensitivityResult(
+        members=[roster_member(build) for build in compiled.builds(indices)],
+        templates=[roster_member(build) for build in engine.build_catalogue],
+        deltas=deltas.tolist(),
+        raw_score=raw_score,
+        best=best,
+        elapsed=elapsed,
+    )
+
+
+def composition_sensitivity(
+    request: CompositionSensitivityRequest,
+) -> CompositionSensitivityResult:
+    """Analyse a composition with the engine of its game mode (pool entry point)."""
+    from app.core.optimizer.registry import get_engine
+
+    engine = get_engine(request.game_type, request.game_mode)
+    return sensitivity(engine, request)
@@ -0,0 +1,414 @@
+"""
+Improvement strategies of the optimizer local search.
+
+Every strategy explores swap moves: one movable slot of the composition gets
+another build template. Each step scores a batch of random swaps in one
+vectorized call. Replacements are drawn uniformly from the catalogue, except
+for the ``role_moves`` share of the batch, which draws a template of the
+same role as the replaced one, and the ``boon_moves`` share, which draws a
+provider of the critical boon furthest below its target. Strategies differ
+in the move they make:
+
+- ``hill_climb``: the best swap of the batch, only if it improves the score.
+- ``annealing``: simulated annealing. The swaps of the batch are Metropolis
+  proposals taken in random order: a swap is made if it improves the score,
+  otherwise with probability ``exp(delta / T)`` where the temperature ``T``
+  decreases geometrically at each step; the first accepted swap is made.
+- ``tabu``: tabu search. The best swap of the batch is always made unless it
+  puts back a template removed, or removes a template added, less than
+  ``tenure`` steps ago; such a tabu move is still allowed when it beats the
+  best score.
+
+All strategies keep the best composition seen so far and share the stopping
+criteria: time budget, ``patience`` steps without a new best score, target
+score, cancellation by the caller. Every new best composition can be reported
+to an ``on_improvement`` callback while the search goes on.
+
+Candidate compositions already scored during the run are looked up in a
+transposition table instead of being scored again (see
+:mod:`app.core.optimizer.transposition`).
+
+Requests with constraints (minimums, excluded elite specializations, fixed
+professions) only draw their candidate templates. The search starts from a
+composition repaired to meet the minimums and never makes a swap that
+breaks one (see :mod:`app.core.optimizer.constraints`). Strategies are
+selected per request or in the ``search`` section of a mode config, which also
+holds their parameters::
+
+    search:
+      strategy: annealing
+      role_moves: 0.25
+      boon_moves: 0.25
+      annealing:
+        initial_temperature: 0.01
+        cooling: 0.999
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+from app.core.optimizer.transposition import (
+    DEFAULT_TRANSPOSITION_SIZE,
+    TranspositionTable,
+)
+from app.schemas.composition import CompositionOptimizationRequest
+
+if TYPE_CHECKING:
+    from app.core.optimizer.engine import BuildTemplate, OptimizerEngine
+
+logger = logging.getLogger(__name__)
+
+# Number of candidate swaps scored per local search step
+LOCAL_SEARCH_BATCH_SIZE = 256
+
+# Default stopping criteria, overridable in the ``search`` section of a config
+DEFAULT_PATIENCE = 200  # Local search steps without improvement
+DEFAULT_TARGET_SCORE = 1.0
+# Shares of each batch swapping a slot for a template of the same role, and
+# for a provider of the most lacking critical boon; the rest is uniform
+DEFAULT_ROLE_MOVES = 0.0
+DEFAULT_BOON_MOVES = 0.0
+
+# Local search steps between two polls of the cancellation callback
+CANCEL_CHECK_INTERVAL = 32
+
+# Reasons reported in CompositionOptimizationResult.stop_reason
+STOP_TIME_BUDGET = "time_budget"
+STOP_NO_IMPROVEMENT = "no_improvement"
+STOP_TARGET_SCORE = "target_score"
+STOP_PROVEN_OPTIMAL = "proven_optimal"
+STOP_CANCELLED = "cancelled"
+STOP_MAX_SWAPS = "max_swaps"
+STOP_PRECOMPUTED = "precomputed"
+
+DEFAULT_STRATEGY = "hill_climb"
+
+# Called with (template indices, raw score, step, elapsed seconds)
+ImprovementCallback = Callable[[np.ndarray, float, int, float], None]
+
+
+@dataclass
+class SearchStats:
+    """Outcome of a local search run."""
+
+    stop_reason: str
+    raw_score: float
+    steps: int = 0
+    improvements: int = 0
+    elapsed: float = 0.0
+    strategy: str = DEFAULT_STRATEGY
+    # (elapsed seconds, best raw score) at each new best score
+    trace: List[Tuple[float, float]] = field(default_factory=list)
+    # Candidate compositions scored and moves made
+    evaluations: int = 0
+    acceptances: int = 0
+    # Seconds spent in each phase of the run (greedy_seed, search, exact...)
+    phases: Dict[str, float] = field(default_factory=dict)
+    # Candidates looked up in the transposition table, and found there
+    transposition_lookups: int = 0
+    transposition_hits: int = 0
+
+
+@dataclass
+class SearchState:
+    """Current composition of a search, as catalogue template indices."""
+
+    indices: np.ndarray
+    totals: np.ndarray
+    role_counts: np.ndarray
+    score: float
+    best_score: float
+    step: int = 0
+
+
+class SearchStrategy:
+    """
+    Base class of the local search strategies.
+
+    Subclasses implement :meth:`choose`, which picks the swap to make among
+    a batch of scored candidates, and may prepare their own state in
+    :meth:`start`.
+    """
+
+    name = ""
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        self.params = params or {}
+
+    def start(self, state: SearchState, template_count: int) -> None:
+        """Prepare a new search."""
+
+    def choose(
+        self,
+        state: SearchState,
+        scores: np.ndarray,
+        slots: np.ndarray,
+        old: np.ndarray,
+        new: np.ndarray,
+        rng: np.random.Generator,
+    ) -> Optional[int]:
+        """Return the candidate swap to make, None to stay in place."""
+        raise NotImplementedError
+
+    def search(
+        self,
+        engine: "OptimizerEngine",
+        solution: List["BuildTemplate"],
+        request: CompositionOptimizationRequest,
+        time_budget: float,
+        rng: np.random.Generator,
+        on_improvement: Optional[ImprovementCallback] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Tuple[List["BuildTemplate"], SearchStats]:
+        """
+        Improve a solution until a stopping criterion fires.
+
+        ``on_improvement`` is called with every new best composition, and
+        ``cancelled`` is polled every ``CANCEL_CHECK_INTERVAL`` steps to stop
+        the search early.
+        """
+        search_config = engine.config.search
+        patience = self.params.get(
+            "patience", search_config.get("patience", DEFAULT_PATIENCE)
+        )
+        target_score = request.target_score
+        if target_score is None:
+            target_score = search_config.get("target_score", DEFAULT_TARGET_SCORE)
+        role_moves = int(
+            LOCAL_SEARCH_BATCH_SIZE
+            * search_config.get("role_moves", DEFAULT_ROLE_MOVES)
+        )
+        boon_moves = int(
+            LOCAL_SEARCH_BATCH_SIZE
+            * search_config.get("boon_moves", DEFAULT_BOON_MOVES)
+        )
+        boon_moves = min(boon_moves, LOCAL_SEARCH_BATCH_SIZE - role_moves)
+        table_size = search_config.get("transposition_size", DEFAULT_TRANSPOSITION_SIZE)
+
+        start_time = time.time()
+        compiled = engine.compiled
+        scorer = engine.batch_scorer
+
+        size = len(solution)
+        indices = compiled.indices(solution)
+        # Slots frozen by fixed roles are resolved once: moves are only drawn
+        # among the free slots
+        movable = np.flatnonzero(~engine.fixed_slots(request, indices))
+        constraints = engine.constraints(request)
+        restricted = constraints.restricted
+        if restricted:
+            indices = constraints.repair(indices, movable)
+        candidates = constraints.candidates
+        totals, role_counts = compiled.totals(indices)
+        # Template counts for the pair terms, updated with each swap
+        pairs = scorer.pair_counts(indices)
+        # Candidates are ranked on the unclipped objective, so that the search
+        # can still climb from compositions whose score is clipped to 0
+        score = float(scorer.raw_solutions(indices)[0])
+        state = SearchState(indices, totals, role_counts, score, score)
+        best_indices = indices.copy()
+        self.start(state, len(compiled))
+        table = None
+        if table_size:
+            table = TranspositionTable(len(compiled), size, table_size)
+            table.start(indices)
+
+        improvements = 0
+        acceptances = 0
+        last_improvement = 0
+        trace = [(0.0, state.best_score)]
+        stop_reason = STOP_TIME_BUDGET
+
+        while time.time() - start_time < time_budget:
+            if state.best_score >= target_score:
+                stop_reason = STOP_TARGET_SCORE
+                break
+            if not movable.size or state.step - last_improvement >= patience:
+                stop_reason = STOP_NO_IMPROVEMENT
+                break
+            if (
+                cancelled is not None
+                and state.step % CANCEL_CHECK_INTERVAL == 0
+                and cancelled()
+            ):
+                stop_reason = STOP_CANCELLED
+                break
+            state.step += 1
+
+            # Score a batch of random swaps
+            slots = movable[rng.integers(movable.size, size=LOCAL_SEARCH_BATCH_SIZE)]
+            new = candidates[
+                rng.integers(candidates.size, size=LOCAL_SEARCH_BATCH_SIZE)
+            ]
+            old = indices[slots]
+            if role_moves:
+                new[:role_moves] = compiled.same_role(old[:role_moves], rng)
+            boon = scorer.lacking_boon(totals, size) if boon_moves else None
+            if boon is not None and compiled.providers[boon].size:
+                providers = compiled.providers[boon]
+                new[role_moves : role_moves + boon_moves] = providers[
+                    rng.integers(providers.size, size=boon_moves)
+                ]
+            if table is None:
+                scores = scorer.raw_swaps(totals, role_counts, size, old, new, pairs)
+            else:
+                # Only the candidates missing from the table are scored
+                hashes = table.neighbours(old, new)
+                hit, scores = table.probe(hashes)
+                if not hit.all():
+                    miss = ~hit
+                    scores[miss] = scorer.raw_swaps(
+                        totals, role_counts, size, old[miss], new[miss], pairs
+                    )
+                    table.store(hashes[miss], scores[miss])
+            if restricted:
+                scores[~constraints.accepts(totals, old, new)] = -np.inf
+
+            choice = self.choose(state, scores, slots, old, new, rng)
+            if choice is None or scores[choice] == -np.inf:
+                continue
+            acceptances += 1
+
+            totals += (
+                compiled.capabilities[new[choice]] - compiled.capabilities[old[choice]]
+            )
+            role_counts += (
+                compiled.role_onehot[new[choice]] - compiled.role_onehot[old[choice]]
+            )
+            if pairs is not None:
+                pairs.apply(old[choice], new[choice])
+            if table is not None:
+                table.apply(old[choice], new[choice])
+            indices[slots[choice]] = new[choice]
+            state.score = float(scores[choice])
+
+            if state.score > state.best_score:
+                state.best_score = state.score
+                best_indices = indices.copy()
+                improvements += 1
+                last_improvement = state.step
+                elapsed = time.time() - start_time
+                trace.append((elapsed, state.best_score))
+                if on_improvement is not None:
+                    on_improvement(best_indices, state.best_score, state.step, elapsed)
+
+        logger.info(
+            f"Local search ({self.name}): {state.step} steps "
+            f"({state.step * LOCAL_SEARCH_BATCH_SIZE} candidates), "
+            f"{improvements} improvements, "
+            f"{table.hits if table else 0} transposition hits, final raw score: "
+            f"{state.best_score:.3f}, stopped on {stop_reason}"
+        )
+
+        elapsed = time.time() - start_time
+        stats = SearchStats(
+            stop_reason=stop_reason,
+            raw_score=state.best_score,
+            steps=state.step,
+            improvements=improvements,
+            elapsed=elapsed,
+            strategy=self.name,
+            trace=trace,
+            evaluations=state.step * LOCAL_SEARCH_BATCH_SIZE,
+            acceptances=acceptances,
+            phases={"search": elapsed},
+        )
+        if table is not None:
+            stats.transposition_lookups = table.lookups
+            stats.transposition_hits = table.hits
+        return compiled.builds(best_indices), stats
+
+
+class HillClimbing(SearchStrategy):
+    """Accept the best swap of each batch only if it improves the score."""
+
+    name = "hill_climb"
+
+    def choose(self, state, scores, slots, old, new, rng):
+        best = int(scores.argmax())
+        return best if scores[best] > state.score else None
+
+
+class SimulatedAnnealing(SearchStrategy):
+    """Accept worse swaps with a probability decreasing with temperature."""
+
+    name = "annealing"
+
+    def start(self, state, template_count):
+        self.temperature = self.params.get("initial_temperature", 0.01)
+        self.cooling = self.params.get("cooling", 0.999)
+
+    def choose(self, state, scores, slots, old, new, rng):
+        temperature = self.temperature
+        self.temperature *= self.cooling
+        # Metropolis proposals in random order: a rejected proposal leaves
+        # the composition as it is, so the batch scores stay valid for the
+        # next one until a proposal is accepted
+        order = rng.permutation(scores.size)
+        delta = scores[order] - state.score
+        with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+            threshold = np.exp(delta / temperature) if temperature > 0 else 0.0
+        accepted = (delta > 0) | (rng.random(scores.size) < threshold)
+        accepted &= (old[order] != new[order]) & (scores[order] > -np.inf)
+        if not accepted.any():
+            return None
+        return int(order[accepted.argmax()])
+
+
+class TabuSearch(SearchStrategy):
+    """Make the best non-tabu swap of each batch, even when it is worse."""
+
+    name = "tabu"
+
+    def start(self, state, template_count):
+        # A composition is a multiset of templates: moves are made tabu by
+        # template, whatever the slot, so that a swap cannot be undone
+        # through another slot holding the same template
+        self.tenure = self.params.get("tenure", max(1, template_count // 4))
+        self.removed_until = np.zeros(template_count, dtype=int)
+        self.added_until = np.zeros(template_count, dtype=int)
+
+    def choose(self, state, scores, slots, old, new, rng):
+        tabu = (self.removed_until[new] >= state.step) | (
+            self.added_until[old] >= state.step
+        )
+        # Swaps rejected by the constraints are never made: they must not
+        # make other moves tabu
+        allowed = (
+            (~tabu | (scores > state.best_score)) & (old != new) & (scores > -np.inf)
+        )
+        if not allowed.any():
+            return None
+        best = int(np.where(allowed, scores, -np.inf).argmax())
+        self.removed_until[old[best]] = state.step + self.tenure
+        self.added_until[new[best]] = state.step + self.tenure
+        return best
+
+
+STRATEGIES: Dict[str, Type[SearchStrategy]] = {
+    strategy.name: strategy
+    for strategy in (HillClimbing, SimulatedAnnealing, TabuSearch)
+}
+
+
+def get_strategy(
+    name: str, search_config: Optional[Dict[str, Any]] = None
+) -> SearchStrategy:
+    """
+    Create the strategy of a name with its parameters from a ``search`` config.
+
+    Raises:
+        ValueError: If the strategy is unknown
+    """
+    try:
+        strategy = STRATEGIES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown search strategy: {name} "
+            f"(available: {', '.join(sorted(STRATEGIES))})"
+        )
+    return strategy((search_config or {}).get(name))
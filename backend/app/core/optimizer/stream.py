@@ -0,0 +1,154 @@
+"""
+Anytime optimization: stream the incumbents of a run as they are found.
+
+A plain optimization only answers once its search has stopped. A streamed
+optimization runs the same greedy + local search in a worker of the
+optimizer pool, but publishes the greedy seed and then every new best
+composition (the incumbent) on a queue shared with the caller, so that a
+client gets a usable composition within milliseconds and watches it improve.
+
+The caller stops the run early by setting the shared cancellation event,
+e.g. when the client disconnects or accepts an incumbent: the exact solver
+and the local search poll it and stop within a few steps, releasing the
+worker.
+"""
+
+import asyncio
+import logging
+import queue
+import time
+from typing import Any, AsyncIterator, Optional
+
+import numpy as np
+
+from app.core.optimizer.engine import OptimizerEngine, request_rng
+from app.core.optimizer.pool import OptimizerPool, get_optimizer_pool
+from app.core.optimizer.registry import get_engine
+from app.schemas.composition import (
+    CompositionOptimizationIncumbent,
+    CompositionOptimizationRequest,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two checks of the worker job while no event arrives
+POLL_INTERVAL = 0.1
+
+
+def _raw_score(engine: OptimizerEngine, indices: np.ndarray) -> float:
+    """Unclipped score of a composition given as template indices."""
+    return float(engine.batch_scorer.raw_solutions(indices)[0])
+
+
+def run_streamed(
+    request: CompositionOptimizationRequest,
+    events: Any,
+    cancel: Any,
+    time_budget: float = 5.0,
+) -> None:
+    """
+    Run an optimization in a worker process, publishing its incumbents.
+
+    Every incumbent is put on ``events`` as a JSON encoded
+    :class:`CompositionOptimizationIncumbent`; the last one has ``final``
+    set. The search is the one of ``OptimizerEngine.optimize`` in heuristic
+    mode, so an uncancelled run ends on the same composition. It stops
+    early once ``cancel`` is set.
+    """
+    engine = get_engine(request.game_type, request.game_mode)
+    start_time = time.time()
+
+    def publish(indices, raw_score, iteration, final=False, stats=None):
+        result = engine.build_result(
+            engine.compiled.builds(indices),
+            request,
+            stop_reason=stats.stop_reason if stats else None,
+            stats=stats,
+        )
+        incumbent = CompositionOptimizationIncumbent(
+            raw_score=raw_score,
+            iteration=iteration,
+            elapsed=time.time() - start_time,
+            result=result,
+            final=final,
+        )
+        events.put(incumbent.model_dump_json())
+
+    shortcut = engine.precomputed(request)
+    if shortcut is None:
+        shortcut = engine.exact_shortcut(
+            request, time_budget * 0.2, cancelled=cancel.is_set
+        )
+    if shortcut is not None:
+        solution, stats = shortcut
+        publish(engine.compiled.indices(solution), stats.raw_score, 0, True, stats)
+        return
+
+    # The greedy seed of the first restart, published before it is improved;
+    # it is repaired first, as the local search does, to meet the minimums
+    seed = engine.greedy_seed(request, rng=request_rng(request))
+    seed_indices = engine.compiled.indices(seed)
+    constraints = engine.constraints(request)
+    if constraints.restricted:
+        movable = np.flatnonzero(~engine.fixed_slots(request, seed_indices))
+        seed_indices = constraints.repair(seed_indices, movable)
+    publish(seed_indices, _raw_score(engine, seed_indices), 0)
+
+    solution, stats = engine.restarts(
+        request,
+        time_budget=time_budget * 0.8,
+        on_improvement=lambda indices, raw_score, step, _: publish(
+            indices, raw_score, step
+        ),
+        cancelled=cancel.is_set,
+    )
+    publish(
+        engine.compiled.indices(solution), stats.raw_score, stats.steps, True, stats
+    )
+
+
+def _log_failure(job: "asyncio.Future[None]") -> None:
+    if not job.cancelled() and job.exception() is not None:
+        logger.error(f"Streamed optimization failed: {job.exception()}")
+
+
+async def stream_incumbents(
+    request: CompositionOptimizationRequest,
+    pool: Optional[OptimizerPool] = None,
+    time_budget: float = 5.0,
+) -> AsyncIterator[CompositionOptimizationIncumbent]:
+    """
+    Yield the incumbents of an optimization run in the optimizer pool.
+
+    Closing the iterator before the final incumbent cancels the run; it
+    returns without waiting for the worker to notice.
+
+    Raises:
+        OptimizerQueueFull: If the pool is already at capacity
+    """
+    pool = pool or get_optimizer_pool()
+    events, cancel = pool.channel()
+    job = asyncio.ensure_future(
+        pool.run(run_streamed, request, events, cancel, time_budget)
+    )
+    loop = asyncio.get_running_loop()
+    final = False
+    try:
+        while not final:
+            try:
+                data = await loop.run_in_executor(None, events.get, True, POLL_INTERVAL)
+            except queue.Empty:
+                if job.done():
+                    # The worker stopped without a final incumbent
+                    job.result()
+                    return
+                continue
+            incumbent = CompositionOptimizationIncumbent.model_validate_json(data)
+            final = incumbent.final
+            yield incumbent
+        await job
+    finally:
+        if not final:
+            cancel.set()
+            logger.info("Streamed optimization cancelled by the caller")
+        job.add_done_callback(_log_failure)
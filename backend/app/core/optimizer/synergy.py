@@ -0,0 +1,227 @@
+"""
+Pair terms of the composition score: synergies and duplicate elites.
+
+The ``synergies`` section of a mode config rewards pairs of specializations
+that work well together, e.g. ``firebrand_scourge: 0.05``. Each name is two
+tokens matched against the catalogue: a token matches a template when it is
+its elite specialization or starts its profession name (``necro`` matches
+Necromancer). Names that don't resolve to two tokens matching templates
+(``coordinated_cc``, ``power_dps_synergy``) describe behaviours the
+catalogue doesn't model and are ignored.
+
+The synergies of a composition only depend on its template counts ``c``:
+the number of player pairs of a synergy is ``c_a . c_b``, so all of them are
+the quadratic form ``c^T S c`` of a symmetric template x template matrix,
+computed in O(templates^2) whatever the squad size. It is normalized by
+``size^2 / 4``: a squad split evenly between the two sides of a synergy
+earns its full weight.
+
+The ``duplicate_elite`` penalty is charged for each player beyond
+``DUPLICATE_ELITE_LIMIT`` of the same elite specialization, as a share of
+the squad.
+
+:class:`PairCounts` keeps ``S c`` and the elite counts of a solution under
+local search up to date, so that a swap is scored in O(1) and applied in
+O(templates).
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.core.optimizer.engine import BuildTemplate, OptimizerConfig
+
+logger = logging.getLogger(__name__)
+
+# Players of the same elite specialization before the duplicate penalty
+DUPLICATE_ELITE_LIMIT = 4
+
+
+def parse_synergy(name: str) -> Optional[Tuple[str, str]]:
+    """The two specialization tokens of a synergy name, None if not a pair."""
+    tokens = name.lower().split("_")
+    if len(tokens) != 2 or not all(tokens):
+        return None
+    return tokens[0], tokens[1]
+
+
+def matches(build: "BuildTemplate", token: str) -> bool:
+    """Whether a synergy token designates a build template."""
+    elite = (build.elite_spec_name or "").lower()
+    profession = (build.profession_name or "").lower()
+    return token == elite or (bool(profession) and profession.startswith(token))
+
+
+class PairTerms:
+    """
+    Synergy matrix and duplicate elite penalty of a config over a catalogue.
+
+    Both terms are arrays indexed by catalogue template; use
+    :meth:`compile` to get None when a config has neither.
+    """
+
+    def __init__(
+        self,
+        catalogue: Sequence["BuildTemplate"],
+        synergies: Dict[str, float],
+        duplicate_penalty: float = 0.0,
+        duplicate_limit: int = DUPLICATE_ELITE_LIMIT,
+    ):
+        n_templates = len(catalogue)
+        self.matrix = np.zeros((n_templates, n_templates))
+        self.synergies: List[str] = []
+        for name, weight in synergies.items():
+            tokens = parse_synergy(name)
+            if tokens is None or not weight:
+                continue
+            left, right = (
+                np.array([matches(build, token) for build in catalogue], dtype=float)
+                for token in tokens
+            )
+            if not left.any() or not right.any():
+                logger.debug(f"Synergy {name} matches no build pair, ignored")
+                continue
+            self.matrix += weight * (np.outer(left, right) + np.outer(right, left)) / 2
+            self.synergies.append(name)
+
+        # Templates without elite specialization are grouped by profession
+        elites: Dict[Tuple[int, Optional[int]], int] = {}
+        self.elite_ids = np.array(
+            [
+                elites.setdefault(
+                    (build.profession_id, build.elite_spec_id), len(elites)
+                )
+                for build in catalogue
+            ],
+            dtype=np.intp,
+        )
+        self.n_elites = len(elites)
+        self.duplicate_penalty = duplicate_penalty
+        self.duplicate_limit = duplicate_limit
+
+    @classmethod
+    def compile(
+        cls, config: "OptimizerConfig", catalogue: Sequence["BuildTemplate"]
+    ) -> Optional["PairTerms"]:
+        """Pair terms of a config, None when it has no synergy nor penalty."""
+        penalty = (config.penalties or {}).get("duplicate_elite", 0.0)
+        terms = cls(catalogue, config.synergies or {}, penalty)
+        if not terms.synergies and not terms.duplicate_penalty:
+            return None
+        return terms
+
+    def __len__(self) -> int:
+        return len(self.elite_ids)
+
+    def elite_counts(self, counts: np.ndarray) -> np.ndarray:
+        """Players per elite specialization, for each row of template counts."""
+        counts = np.atleast_2d(counts)
+        totals = np.zeros((counts.shape[0], self.n_elites))
+        np.add.at(totals.T, self.elite_ids, counts.T)
+        return totals
+
+    def synergy_scale(self, size: int) -> float:
+        """Factor normalizing ``c^T S c`` for a squad of ``size``."""
+        return 4.0 / size**2 if size else 0.0
+
+    def raw(self, counts: np.ndarray, size: int) -> np.ndarray:
+        """Synergy bonus minus duplicate elite penalty, per row of counts."""
+        counts = np.atleast_2d(counts)
+        score = np.einsum("ri,ij,rj->r", counts, self.matrix, counts)
+        score *= self.synergy_scale(size)
+        if self.duplicate_penalty and size:
+            excess = np.maximum(0.0, self.elite_counts(counts) - self.duplicate_limit)
+            score -= self.duplicate_penalty * excess.sum(axis=1) / size
+        return score
+
+
+class PairCounts:
+    """
+    Template counts of a solution under local search, with the change of the
+    pair terms when adding or removing a copy of each template.
+
+    For ``c' = c + e_new - e_old``, ``c'^T S c' - c^T S c`` is the sum of
+    ``2 (S c)_new + S_new,new`` (added), ``S_old,old - 2 (S c)_old``
+    (removed) and ``-2 S_old,new`` (``cross``): a swap is scored with three
+    lookups. Elite counts change the same way, except between templates of
+    the same elite, corrected in ``cross``. Applying a swap shifts ``S c``
+    by two columns of ``S`` and only touches the templates of the two
+    elites.
+    """
+
+    def __init__(self, terms: PairTerms, indices: np.ndarray):
+        self.terms = terms
+        self.size = len(indices)
+        scale = terms.synergy_scale(self.size)
+        self.penalty = terms.duplicate_penalty / self.size if self.size else 0.0
+        self.synergy_cross = -2 * scale * terms.matrix
+        self.same_elite = terms.elite_ids[:, np.newaxis] == terms.elite_ids
+        # Templates of each elite, as lists: elites have a few templates and
+        # scalar updates are much cheaper than fancy indexing
+        self.members = [
+            np.flatnonzero(terms.elite_ids == elite).tolist()
+            for elite in range(terms.n_elites)
+        ]
+
+        self.counts = np.bincount(indices, minlength=len(terms)).astype(np.float64)
+        self.elites = terms.elite_counts(self.counts)[0]
+        self.value = float(terms.raw(self.counts, self.size)[0])
+
+        synergy = scale * (terms.matrix @ self.counts)
+        diagonal = scale * np.diag(terms.matrix)
+        self.added = self.value + 2 * synergy + diagonal
+        self.removed = diagonal - 2 * synergy
+        self.cross = self.synergy_cross.copy()
+        if self.penalty:
+            template_elites = self.elites[terms.elite_ids]
+            added, removed, at_limit = self._elite_terms(template_elites)
+            self.added += added
+            self.removed += removed
+            self.cross += at_limit[:, np.newaxis] * self.same_elite
+
+    def _elite_terms(self, count):
+        """Penalty change of adding and removing a player of an elite of
+        ``count`` players, and the correction within that elite."""
+        limit = self.terms.duplicate_limit
+        return (
+            -self.penalty * (count >= limit),
+            self.penalty * (count > limit),
+            self.penalty * (count == limit),
+        )
+
+    def swap_values(self, old: np.ndarray, new: np.ndarray) -> np.ndarray:
+        """Pair terms after replacing template ``old[k]`` with ``new[k]``."""
+        return self.added[new] + self.removed[old] + self.cross[old, new]
+
+    def apply(self, old: int, new: int) -> None:
+        """Commit the replacement of template ``old`` with ``new``."""
+        if old == new:
+            return
+        value = self.added[new] + self.removed[old] + self.cross[old, new]
+        # 2 (S c) moves by twice the difference of the two columns
+        shift = self.synergy_cross[:, old] - self.synergy_cross[:, new]
+        self.added += shift + (value - self.value)
+        self.removed -= shift
+        self.value = float(value)
+        self.counts[old] -= 1
+        self.counts[new] += 1
+
+        if self.penalty and not self.same_elite[old, new]:
+            elite_ids = self.terms.elite_ids
+            self._move_elite(elite_ids[old], -1)
+            self._move_elite(elite_ids[new], 1)
+
+    def _move_elite(self, elite: int, step: int) -> None:
+        count = int(self.elites[elite])
+        self.elites[elite] = count + step
+        before = self._elite_terms(count)
+        after = self._elite_terms(count + step)
+        if before != after:
+            members = self.members[elite]
+            for i in members:
+                self.added[i] += after[0] - before[0]
+                self.removed[i] += after[1] - before[1]
+                for j in members:
+                    self.cross[i, j] = self.synergy_cross[i, j] + after[2]
@@ -0,0 +1,377 @@
+"""
+Precomputed optimal compositions, served before any search.
+
+The space of plain requests is small: a few configs x squad sizes 1-50,
+plus a handful of popular ``fixed_professions`` sets listed per config
+(``search.table_profession_sets``). :func:`precompute_tables` solves them
+offline with a long budget, restarting with every search strategy, and
+stores the best composition in a SQLite file (``OPTIMIZER_TABLES_PATH``).
+The file is built by ``scripts/precompute_optimizer_tables.py`` or by the
+nightly arq cron job, and only improves: an entry is replaced by a better
+one only.
+
+Entries are keyed by a version made of the engine version, the config hash
+and the build catalogue version, like memoized results, so that any change
+that can alter a result ignores the old entries. Plain, streamed and
+portfolio optimizations and alliance squads look requests without other
+constraints up in an in-memory copy of the entries of their engine
+version, reloaded when the file changes: a hit answers in O(1) without
+searching, whatever the search path memoizing it.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from app.core.config import settings
+from app.core.optimizer.strategies import STRATEGIES
+from app.schemas.composition import CompositionOptimizationRequest
+
+if TYPE_CHECKING:
+    from app.core.optimizer.pool import OptimizerPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = tuple(range(1, 51))
+# Seconds spent on each entry
+DEFAULT_TABLE_BUDGET = 10.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS compositions (
+    version TEXT NOT NULL,
+    game_type TEXT NOT NULL,
+    game_mode TEXT NOT NULL,
+    squad_size INTEGER NOT NULL,
+    professions TEXT NOT NULL,
+    templates TEXT NOT NULL,
+    raw_score REAL NOT NULL,
+    strategy TEXT NOT NULL,
+    computed_at TEXT NOT NULL,
+    PRIMARY KEY (version, squad_size, professions)
+)
+"""
+
+# Fields of a request that a table entry accounts for. Restarts only add
+# search effort: the entry is already the best composition known.
+KEY_FIELDS = {
+    "squad_size",
+    "game_type",
+    "game_mode",
+    "fixed_professions",
+    "debug",
+    "restarts",
+}
+_PLAIN = CompositionOptimizationRequest(
+    squad_size=1, game_type="", game_mode=""
+).model_dump(exclude=KEY_FIELDS)
+
+
+@dataclass
+class TableEntry:
+    """Best known composition of a plain request."""
+
+    version: str
+    game_type: str
+    game_mode: str
+    squad_size: int
+    professions: str
+    templates: List[int]
+    raw_score: float
+    strategy: str
+
+
+def professions_key(professions: Optional[Iterable[int]]) -> str:
+    """Canonical key of a ``fixed_professions`` set, "" without one."""
+    return ",".join(str(p) for p in sorted(set(professions or ())))
+
+
+def table_key(request: CompositionOptimizationRequest) -> Optional[Tuple[int, str]]:
+    """
+    (squad size, professions) key of a request, None when it has other
+    constraints than ``fixed_professions`` and can't be served from tables.
+    """
+    if request.model_dump(exclude=KEY_FIELDS) != _PLAIN:
+        return None
+    return request.squad_size, professions_key(request.fixed_professions)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open a table file for writing, creating its schema."""
+    connection = sqlite3.connect(path)
+    connection.execute(SCHEMA)
+    return connection
+
+
+def store(connection: sqlite3.Connection, entries: Sequence[TableEntry]) -> int:
+    """Store entries that improve on the stored ones; return their number."""
+    stored = 0
+    computed_at = datetime.now(timezone.utc).isoformat()
+    with connection:
+        for entry in entries:
+            row = connection.execute(
+                "SELECT raw_score FROM compositions "
+                "WHERE version = ? AND squad_size = ? AND professions = ?",
+                (entry.version, entry.squad_size, entry.professions),
+            ).fetchone()
+            if row is not None and row[0] >= entry.raw_score:
+                continue
+            connection.execute(
+                "INSERT OR REPLACE INTO compositions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry.version,
+                    entry.game_type,
+                    entry.game_mode,
+                    entry.squad_size,
+                    entry.professions,
+                    json.dumps(entry.templates),
+                    entry.raw_score,
+                    entry.strategy,
+                    computed_at,
+                ),
+            )
+            stored += 1
+    return stored
+
+
+def stored_keys(path: str, version: str) -> set:
+    """(squad size, professions) keys already stored for a version."""
+    if not os.path.exists(path):
+        return set()
+    with closing(connect(path)) as connection:
+        rows = connection.execute(
+            "SELECT squad_size, professions FROM compositions WHERE version = ?",
+            (version,),
+        ).fetchall()
+    return {(size, professions) for size, professions in rows}
+
+
+class PrecomputedTables:
+    """
+    Read-only, in-memory view of a table file, per version.
+
+    Thread safe. The file is checked on each lookup and reloaded when its
+    modification time changes; a missing file or path means no tables.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = settings.OPTIMIZER_TABLES_PATH if path is None else path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._versions: Dict[str, Dict[Tuple[int, str], Tuple[List[int], float]]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def _check_file(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self._versions.clear()
+
+    def _load(self, version: str) -> Dict[Tuple[int, str], Tuple[List[int], float]]:
+        entries = {}
+        if self._mtime is not None:
+            try:
+                uri = f"file:{self.path}?mode=ro"
+                with closing(sqlite3.connect(uri, uri=True)) as connection:
+                    rows = connection.execute(
+                        "SELECT squad_size, professions, templates, raw_score "
+                        "FROM compositions WHERE version = ?",
+                        (version,),
+                    ).fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not read optimizer tables {self.path}: {e}")
+                rows = []
+            for size, professions, templates, raw_score in rows:
+                entries[(size, professions)] = (json.loads(templates), raw_score)
+            if entries:
+                logger.info(
+                    f"Loaded {len(entries)} precomputed compositions (version {version})"
+                )
+        return entries
+
+    def lookup(
+        self, version: str, request: CompositionOptimizationRequest
+    ) -> Optional[Tuple[List[int], float]]:
+        """Template indices and raw score of a request, None if not stored."""
+        key = table_key(request)
+        if key is None or not self.path:
+            return None
+        with self._lock:
+            self._check_file()
+            entries = self._versions.get(version)
+            if entries is None:
+                entries = self._versions[version] = self._load(version)
+            entry = entries.get(key)
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return entry
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": sum(len(entries) for entries in self._versions.values()),
+            }
+
+
+_tables: Optional[PrecomputedTables] = None
+
+
+def get_precomputed_tables() -> PrecomputedTables:
+    """Process-wide precomputed tables."""
+    global _tables
+    if _tables is None:
+        _tables = PrecomputedTables()
+    return _tables
+
+
+def precompute_config(
+    game_type: str,
+    game_mode: str,
+    sizes: Sequence[int],
+    time_budget: float,
+    profession_sets: Optional[Sequence[Sequence[int]]] = None,
+    skip: Iterable[Tuple[int, str]] = (),
+) -> List[TableEntry]:
+    """
+    Best compositions of a config for every squad size and profession set.
+
+    Each entry gets ``time_budget`` seconds: the exact solver gets half of
+    it, and when it can't prove the optimum, restarts rotating over every
+    strategy spend the rest. The profession sets default to the
+    ``table_profession_sets`` of the config; keys in ``skip`` are left out.
+    """
+    # Imported lazily: the engine imports this module to serve the tables
+    from app.core.optimizer.registry import get_engine
+
+    engine = get_engine(game_type, game_mode)
+    version = engine.result_version
+    if profession_sets is None:
+        profession_sets = engine.config.search.get("table_profession_sets", [])
+    skip = set(skip)
+    strategies = sorted(STRATEGIES)
+    entries = []
+    for professions in [None, *profession_sets]:
+        for size in sizes:
+            request = CompositionOptimizationRequest(
+                squad_size=size,
+                game_type=game_type,
+                game_mode=game_mode,
+                fixed_professions=sorted(professions) if professions else None,
+            )
+            if table_key(request) in skip:
+                continue
+            deadline = time.time() + time_budget
+            shortcut = engine.exact_shortcut(request, time_budget * 0.5)
+            if shortcut is not None:
+                best, stats = shortcut
+                raw_score, strategy = stats.raw_score, stats.strategy
+            else:
+                best, raw_score, strategy = None, float("-inf"), ""
+                restart = 0
+                while restart < len(strategies) or time.time() < deadline:
+                    solution, stats = engine.restart(
+                        request,
+                        restart,
+                        time_budget=max(0.0, deadline - time.time()),
+                        strategy=strategies[restart % len(strategies)],
+                    )
+                    if stats.raw_score > raw_score:
+                        best, raw_score, strategy = (
+                            solution,
+                            stats.raw_score,
+                            stats.strategy,
+                        )
+                    restart += 1
+            entries.append(
+                TableEntry(
+                    version=version,
+                    game_type=game_type,
+                    game_mode=game_mode,
+                    squad_size=size,
+                    professions=professions_key(professions),
+                    templates=engine.compiled.indices(best).tolist(),
+                    raw_score=raw_score,
+                    strategy=strategy,
+                )
+            )
+    logger.info(f"Precomputed {len(entries)} compositions for {game_type}/{game_mode}")
+    return entries
+
+
+def table_configs() -> List[Tuple[str, str]]:
+    """(game_type, game_mode) of each optimizer config file, once per file."""
+    from app.core.optimizer.engine import config_index
+
+    configs: Dict[str, Tuple[str, str]] = {}
+    for key, path in config_index().items():
+        configs.setdefault(str(path), key)
+    return sorted(configs.values())
+
+
+def _store_file(path: str, entries: Sequence[TableEntry]) -> int:
+    with closing(connect(path)) as connection:
+        return store(connection, entries)
+
+
+async def precompute_tables(
+    pool: "OptimizerPool",
+    path: Optional[str] = None,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    time_budget: float = DEFAULT_TABLE_BUDGET,
+    force: bool = False,
+) -> int:
+    """
+    Precompute the tables of every config in parallel pool workers.
+
+    Entries already stored for the current versions are skipped unless
+    ``force``. Configs run at most one per worker at a time, and the entries
+    of a config are stored as soon as it completes: a run cut short keeps
+    the configs already done, and the next run skips them. Returns the
+    number of entries stored.
+    """
+    from app.core.optimizer.registry import result_version
+
+    path = path or settings.OPTIMIZER_TABLES_PATH
+    loop = asyncio.get_running_loop()
+    jobs = []
+    for game_type, game_mode in table_configs():
+        version = await result_version(game_type, game_mode)
+        skip = ()
+        if not force:
+            skip = await loop.run_in_executor(None, stored_keys, path, version)
+        jobs.append((game_type, game_mode, list(sizes), time_budget, None, skip))
+
+    stored = 0
+    for start in range(0, len(jobs), pool.max_workers):
+        runs = [
+            asyncio.ensure_future(pool.run(precompute_config, *job))
+            for job in jobs[start : start + pool.max_workers]
+        ]
+        # A failed config doesn't discard the configs running beside it
+        failure = None
+        for run in asyncio.as_completed(runs):
+            try:
+                entries = await run
+            except Exception as e:
+                failure = failure or e
+                continue
+            stored += await loop.run_in_executor(None, _store_file, path, entries)
+        if failure is not None:
+            raise failure
+    logger.info(f"Optimizer tables {path}: {stored} compositions stored")
+    return stored
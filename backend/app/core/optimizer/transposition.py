@@ -0,0 +1,105 @@
+"""
+Transposition table of the local search.
+
+A composition is a multiset of templates, and swaps often lead back to a
+multiset seen before: the same template swapped from another slot holding
+it, or the neighbourhood of a local optimum sampled again at every step
+until ``patience`` runs out. The table remembers the raw score of the
+compositions scored during a run, so that a batch whose candidates were all
+seen costs a few array lookups instead of a scoring pass.
+
+Compositions are keyed by a Zobrist hash of their template count vector:
+the XOR of one random 64-bit key per (template, count). A swap changes two
+counts, so the hash of every candidate of a batch is the hash of the
+current composition XOR two precomputed values, one gather each. The table
+is a fixed array of ``search.transposition_size`` entries (a power of two,
+0 disables it) indexed by the low bits of the hash, where a new entry
+always replaces the old one: memory stays bounded however long the run.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+# Entries of the table, overridable with ``transposition_size`` in the
+# ``search`` section of a config
+DEFAULT_TRANSPOSITION_SIZE = 1 << 16
+
+# Seed of the Zobrist keys: hashes don't depend on the search random stream
+ZOBRIST_SEED = 0x5EED
+
+
+class TranspositionTable:
+    """
+    Raw scores of the compositions of a run, keyed by the Zobrist hash of
+    their template counts.
+
+    :meth:`start` hashes the first composition, :meth:`apply` follows the
+    swaps the search makes; :meth:`neighbours` hashes candidate swaps of
+    the current composition.
+    """
+
+    def __init__(self, n_templates: int, size: int, capacity: int):
+        if capacity & (capacity - 1):
+            raise ValueError(f"Transposition table size {capacity} is not a power of 2")
+        keys = np.random.default_rng(ZOBRIST_SEED).integers(
+            0,
+            np.iinfo(np.uint64).max,
+            size=(n_templates, size + 1),
+            dtype=np.uint64,
+            endpoint=True,
+        )
+        self.keys = keys
+        # Change of the hash when the count of a template goes from c to c + 1
+        self.steps = np.zeros_like(keys)
+        self.steps[:, :-1] = keys[:, :-1] ^ keys[:, 1:]
+        self.mask = np.uint64(capacity - 1)
+        self.hashes = np.zeros(capacity, dtype=np.uint64)
+        self.scores = np.zeros(capacity)
+        self.filled = np.zeros(capacity, dtype=bool)
+        self.lookups = 0
+        self.hits = 0
+
+    def start(self, indices: np.ndarray) -> None:
+        """Hash the composition a search starts from."""
+        n_templates = self.keys.shape[0]
+        self.counts = np.bincount(indices, minlength=n_templates)
+        templates = np.arange(n_templates)
+        self.key = np.bitwise_xor.reduce(self.keys[templates, self.counts])
+        # Hash changes of adding and removing a copy of each template; the
+        # removal of an absent template is never used
+        self.added = self.steps[templates, self.counts]
+        self.removed = self.steps[templates, self.counts - 1]
+
+    def neighbours(self, old: np.ndarray, new: np.ndarray) -> np.ndarray:
+        """Hashes of the compositions replacing template ``old[k]`` with ``new[k]``."""
+        return np.where(
+            old == new, self.key, self.key ^ self.removed[old] ^ self.added[new]
+        )
+
+    def apply(self, old: int, new: int) -> None:
+        """Follow the replacement of template ``old`` with ``new``."""
+        if old == new:
+            return
+        self.key ^= self.removed[old] ^ self.added[new]
+        self.counts[old] -= 1
+        self.counts[new] += 1
+        for template in (old, new):
+            count = self.counts[template]
+            self.added[template] = self.steps[template, count]
+            self.removed[template] = self.steps[template, count - 1]
+
+    def probe(self, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Which hashes are stored, and their scores (meaningless if not)."""
+        entries = (hashes & self.mask).astype(np.intp)
+        hit = self.filled[entries] & (self.hashes[entries] == hashes)
+        self.lookups += hashes.size
+        self.hits += int(hit.sum())
+        return hit, self.scores[entries]
+
+    def store(self, hashes: np.ndarray, scores: np.ndarray) -> None:
+        """Store the scores of compositions, replacing the entries they hit."""
+        entries = (hashes & self.mask).astype(np.intp)
+        self.hashes[entries] = hashes
+        self.scores[entries] = scores
+        self.filled[entries] = True
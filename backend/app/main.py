@@ -6,6 +6,7 @@ from fastapi.exceptions import RequestValidationError, HTTPException
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.requests import Request
 from starlette.responses import JSONResponse, Response
+from prometheus_client import make_asgi_app
 from contextlib import asynccontextmanager
 
 import os
@@ -72,6 +73,19 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         db_monitor.start_monitoring(interval=300)
     )  # Toutes les 5 minutes
 
+    # Démarrage du pool de processus de l'optimiseur
+    logger.info("Démarrage du pool de l'optimiseur...")
+    from app.core.optimizer.pool import get_optimizer_pool
+
+    optimizer_pool = get_optimizer_pool()
+    # Les workers construisent leurs moteurs au démarrage (sauf en test)
+    optimizer_pool.start(warm=settings.ENVIRONMENT != "test")
+
+    # Le catalogue de builds est rechargé quand ses tables changent
+    from app.core.optimizer.catalogue import watch_catalogue_tables
+
+    watch_catalogue_tables()
+
     try:
         yield  # L'application est en cours d'exécution
     finally:
@@ -87,6 +101,10 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
                 pass
             logger.info("Surveillance de la base de données arrêtée")
 
+        # Arrêter le pool de l'optimiseur
+        optimizer_pool.shutdown(wait=False)
+        logger.info("Pool de l'optimiseur arrêté")
+
         # Fermer la connexion Redis et le rate limiter
         logger.info("Fermeture des connexions...")
         try:
@@ -153,6 +171,9 @@ def create_application() -> FastAPI:
     # Include API routes
     application.include_router(api_router, prefix=settings.API_V1_STR)
 
+    # Exposition des métriques Prometheus (cache, optimiseur...)
+    application.mount("/metrics", make_asgi_app())
+
     # Set up static files if present (skip in test envs without static dir)
     print(f"Environment: {settings.ENVIRONMENT}")
     static_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "static"))
@@ -195,6 +216,7 @@ def create_application() -> FastAPI:
         return JSONResponse(
             status_code=exc.status_code,
             content={"detail": exc.detail},
+            headers=getattr(exc, "headers", None),
         )
 
     @application.exception_handler(RequestValidationError)
@@ -50,6 +50,7 @@ from .team import Team
 from .team_member import TeamMember
 from .token_models import Token, TokenPayload
 from .composition_tag import CompositionTag
+from .composition_score import CompositionScore
 from .tag import Tag
 from .user_role import UserRole
 from .association_tables import composition_members, build_profession
@@ -79,6 +80,7 @@ __all__ = [
     "Token",
     "TokenPayload",
     "CompositionTag",
+    "CompositionScore",
     "Tag",
     "UserRole",
     "composition_members",
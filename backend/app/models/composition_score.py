@@ -0,0 +1,69 @@
+"""
+Module des scores de composition pour l'application GW2 WvW Builder.
+
+Ce module définit le modèle CompositionScore : le score d'une composition
+enregistrée selon une version de l'optimiseur, calculé en lot par
+``app.core.optimizer.leaderboard``.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import (
+    JSON,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base_model import Base
+
+
+class CompositionScore(Base):
+    """
+    Score d'une composition pour une version de l'optimiseur.
+
+    La version (moteur, hash du fichier YAML du mode, catalogue de builds)
+    identifie aussi le mode de jeu : une composition a un score par mode de
+    son type de jeu. L'index (version, score) sert le classement des
+    compositions sans les évaluer.
+    """
+
+    __tablename__ = "composition_scores"
+    __table_args__ = (
+        UniqueConstraint("composition_id", "version", name="uq_composition_score"),
+        Index("ix_composition_scores_version_score", "version", "score", "raw_score"),
+        {"extend_existing": True},
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    composition_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("compositions.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    version: Mapped[str] = mapped_column(String(100), nullable=False)
+    game_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    game_mode: Mapped[str] = mapped_column(String(50), nullable=False)
+    # Sans score : composition sans membres ou dont un build n'a pas de
+    # modèle dans le catalogue, qui n'est pas recalculée pour cette version
+    score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    raw_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # Métriques, couverture des boons et répartition des rôles au moment du calcul
+    metrics: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    scored_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<CompositionScore(composition_id={self.composition_id}, "
+            f"version={self.version}, score={self.score})>"
+        )
@@ -52,6 +52,7 @@ from .composition import (
     CompositionTagInDB,
     CompositionTag,
     CompositionSearch,
+    FixedRole,
     CompositionOptimizationRequest,
     CompositionOptimizationResult,
     CompositionEvaluation,
@@ -113,6 +114,7 @@ __all__ = [
     "CompositionTagInDB",
     "CompositionTag",
     "CompositionSearch",
+    "FixedRole",
     "CompositionOptimizationRequest",
     "CompositionOptimizationResult",
     "CompositionEvaluation",
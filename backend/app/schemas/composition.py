@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from pydantic import BaseModel, Field, field_validator, model_validator, ConfigDict
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -233,6 +233,11 @@ class Composition(BaseModel):
     members: List[Dict[str, Any]] = Field(default_factory=list)
     tags: List[Dict[str, Any]] = Field(default_factory=list)
     created_by_username: Optional[str] = Field(None, examples=["john_doe"])
+    score: Optional[float] = Field(
+        None,
+        examples=[0.82],
+        description="Stored score of the composition, when listed by score",
+    )
 
     model_config = ConfigDict(
         from_attributes=True,
@@ -277,7 +282,7 @@ class Composition(BaseModel):
                     "created_by_username": "john_doe",
                 }
             ]
-        }
+        },
     )
 
 
@@ -388,6 +393,15 @@ class CompositionSearch(BaseModel):
     )
 
 
+class FixedRole(BaseModel):
+    """A build that must appear a given number of times in the optimized squad"""
+
+    profession_id: int = Field(..., examples=[1])
+    elite_specialization_id: Optional[int] = Field(None, examples=[3])
+    count: int = Field(default=1, ge=1, le=50, examples=[2])
+    role_type: str = Field(..., examples=["healer"])
+
+
 class CompositionOptimizationRequest(BaseModel):
     """Schema for composition optimization request"""
 
@@ -405,6 +419,10 @@ class CompositionOptimizationRequest(BaseModel):
         examples=[[1, 2, 4]],
         description="List of profession IDs to include (if user wants to choose classes). Engine will optimize roles and specs.",
     )
+    fixed_roles: Optional[List[FixedRole]] = Field(
+        default=None,
+        description="Builds that must be kept in the composition, with their count",
+    )
     preferred_roles: Optional[Dict[str, int]] = Field(
         default=None,
         examples=[{"healer": 2, "dps": 5, "support": 3}],
@@ -454,6 +472,33 @@ class CompositionOptimizationRequest(BaseModel):
         examples=[[10, 15]],
         description="List of elite specialization IDs to exclude from optimization",
     )
+    target_score: Optional[float] = Field(
+        default=None,
+        ge=0,
+        le=1,
+        examples=[0.9],
+        description="Stop the search as soon as this score is reached",
+    )
+    strategy: Optional[str] = Field(
+        default=None,
+        examples=["annealing"],
+        description="Local search strategy: hill_climb, annealing or tabu "
+        "(defaults to the strategy of the game mode config)",
+    )
+    restarts: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=32,
+        examples=[4],
+        description="Number of independent restarts run in parallel within the "
+        "time budget (portfolio mode), capped at the number of optimizer workers. "
+        "Without a strategy, restarts rotate over every strategy",
+    )
+    debug: bool = Field(
+        default=False,
+        description="Return the run statistics of the optimizer in the result "
+        "(not available for results served from cache)",
+    )
     optimization_goals: Optional[List[str]] = Field(
         default=None,
         examples=[["boon_uptime", "healing", "damage"]],
@@ -509,6 +554,63 @@ class CompositionOptimizationRequest(BaseModel):
     )
 
 
+class RestartStats(BaseModel):
+    """Statistics of one restart of a portfolio optimization"""
+
+    restart: int = Field(..., ge=0, examples=[1])
+    strategy: str = Field(..., examples=["tabu"])
+    raw_score: float = Field(
+        ..., examples=[0.82], description="Unclipped score of the restart"
+    )
+    steps: int = Field(..., ge=0, examples=[240])
+    improvements: int = Field(..., ge=0, examples=[12])
+    stop_reason: str = Field(..., examples=["no_improvement"])
+    elapsed: float = Field(..., ge=0, examples=[0.35], description="Seconds")
+
+
+class OptimizationDebug(BaseModel):
+    """Run statistics of an optimization"""
+
+    strategy: str = Field(..., examples=["hill_climb"])
+    steps: int = Field(..., ge=0, examples=[240])
+    evaluations: int = Field(
+        ..., ge=0, examples=[61440], description="Candidate compositions scored"
+    )
+    acceptances: int = Field(..., ge=0, examples=[30], description="Moves made")
+    improvements: int = Field(..., ge=0, examples=[12])
+    transposition_lookups: int = Field(
+        default=0,
+        ge=0,
+        examples=[61440],
+        description="Candidate compositions looked up in the transposition table",
+    )
+    transposition_hits: int = Field(
+        default=0,
+        ge=0,
+        examples=[40960],
+        description="Lookups answered by the table without scoring",
+    )
+    phases: Dict[str, float] = Field(
+        ...,
+        examples=[
+            {
+                "greedy_seed": 0.002,
+                "search": 0.03,
+                "evaluate": 0.0004,
+                "notes": 0.0001,
+                "schema": 0.0002,
+            }
+        ],
+        description="Seconds spent in each phase",
+    )
+    queue_wait: Optional[float] = Field(
+        default=None,
+        ge=0,
+        examples=[0.01],
+        description="Seconds waited for an optimizer worker",
+    )
+
+
 class CompositionOptimizationResult(BaseModel):
     """Schema for composition optimization result"""
 
@@ -541,6 +643,19 @@ class CompositionOptimizationResult(BaseModel):
             ]
         ],
     )
+    stop_reason: Optional[str] = Field(
+        default=None,
+        examples=["no_improvement"],
+        description="Why the search stopped: time_budget, no_improvement, "
+        "target_score, proven_optimal or cancelled",
+    )
+    restarts: Optional[List[RestartStats]] = Field(
+        default=None,
+        description="Per-restart statistics in portfolio mode, best restart first",
+    )
+    debug: Optional[OptimizationDebug] = Field(
+        default=None, description="Run statistics, when requested"
+    )
 
     model_config = ConfigDict(
         json_schema_extra={
@@ -571,6 +686,343 @@ class CompositionOptimizationResult(BaseModel):
     )
 
 
+class CompositionOptimizationBatchItem(BaseModel):
+    """One line of the streamed response of a batch optimization"""
+
+    indices: List[int] = Field(
+        ...,
+        examples=[[0, 2]],
+        description="Positions in the batch of the (identical) requests answered",
+    )
+    cached: bool = Field(
+        default=False, description="Whether the result came from the memo cache"
+    )
+    result: Optional[CompositionOptimizationResult] = None
+    status_code: int = Field(default=200, examples=[200, 400, 503])
+    error: Optional[str] = Field(default=None, examples=["Optimizer is busy"])
+
+
+class CompositionOptimizationIncumbent(BaseModel):
+    """Best composition found so far by a streamed optimization"""
+
+    raw_score: Optional[float] = Field(
+        default=None,
+        examples=[0.82],
+        description="Unclipped score of the composition, unset for cached results",
+    )
+    iteration: int = Field(
+        ..., ge=0, examples=[42], description="Local search step it was found at"
+    )
+    elapsed: float = Field(
+        ..., ge=0, examples=[0.08], description="Seconds since the start"
+    )
+    result: CompositionOptimizationResult
+    final: bool = Field(
+        default=False, description="Last event of the stream, with stop_reason set"
+    )
+
+
+class CompositionOptimizationJobRequest(CompositionOptimizationRequest):
+    """Schema for an optimization request run as a background job"""
+
+    time_budget: float = Field(
+        default=30.0,
+        gt=0,
+        examples=[60.0],
+        description="Search time budget in seconds",
+    )
+
+
+class CompositionOptimizationJobProgress(BaseModel):
+    """Progress of a running optimization job"""
+
+    iteration: int = Field(..., ge=0, examples=[1200])
+    elapsed: float = Field(..., ge=0, examples=[12.5], description="Seconds")
+    fraction: float = Field(
+        ..., ge=0, le=1, examples=[0.4], description="Share of the time budget spent"
+    )
+    raw_score: Optional[float] = Field(
+        default=None, examples=[0.82], description="Unclipped score of the incumbent"
+    )
+    score: float = Field(..., ge=0, le=1, examples=[0.82])
+
+
+class CompositionOptimizationJob(BaseModel):
+    """Status of an optimization job"""
+
+    job_id: str = Field(..., examples=["3f5c2d0e9b7a4c1d8e6f"])
+    status: str = Field(
+        ...,
+        examples=["in_progress"],
+        description="deferred, queued, in_progress, complete or not_found",
+    )
+    enqueue_time: Optional[datetime] = None
+    progress: Optional[CompositionOptimizationJobProgress] = None
+    result: Optional[CompositionOptimizationResult] = None
+    error: Optional[str] = Field(default=None, examples=["Optimization failed"])
+
+
+class RosterMember(BaseModel):
+    """A player of an existing composition and the build they play"""
+
+    profession_id: int = Field(..., examples=[1])
+    elite_specialization_id: Optional[int] = Field(None, examples=[3])
+    role_type: Optional[str] = Field(
+        default=None,
+        examples=["healer"],
+        description="Role played, the first role of the build when omitted",
+    )
+    locked: bool = Field(
+        default=False, description="The player keeps this build (e.g. commander)"
+    )
+
+
+class CompositionRepairRequest(BaseModel):
+    """Schema for the repair of an existing composition after a roster change"""
+
+    game_type: str = Field(..., examples=["wvw"])
+    game_mode: str = Field(..., examples=["zerg"])
+    composition_id: Optional[int] = Field(
+        default=None, examples=[12], description="Stored composition to repair"
+    )
+    members: Optional[List[RosterMember]] = Field(
+        default=None, description="Inline composition to repair"
+    )
+    removed: List[int] = Field(
+        default_factory=list,
+        examples=[[3, 7]],
+        description="Indices of the members who left the squad",
+    )
+    added: List[RosterMember] = Field(
+        default_factory=list, description="Players who joined the squad"
+    )
+    locked_professions: List[int] = Field(
+        default_factory=list,
+        examples=[[1]],
+        description="Players of these professions may change specialization "
+        "or role, but not profession",
+    )
+    max_swaps: Optional[int] = Field(
+        default=None,
+        ge=0,
+        le=50,
+        examples=[3],
+        description="Maximum number of players asked to change build",
+    )
+    time_budget: float = Field(
+        default=0.1, gt=0, le=5, examples=[0.1], description="Seconds"
+    )
+
+    @model_validator(mode="after")
+    def check_source(self) -> "CompositionRepairRequest":
+        """Exactly one of ``composition_id`` and ``members`` is required."""
+        if (self.composition_id is None) == (self.members is None):
+            raise ValueError("Provide either composition_id or members")
+        return self
+
+
+class CompositionSwap(BaseModel):
+    """A player asked to change build by a composition repair"""
+
+    member: int = Field(
+        ..., ge=0, examples=[4], description="Index of the player in the squad"
+    )
+    before: RosterMember
+    after: RosterMember
+    gain: float = Field(
+        ..., examples=[0.02], description="Raw score gained when it was chosen"
+    )
+
+
+class CompositionRepairResult(BaseModel):
+    """Repaired composition with the swaps that lead to it"""
+
+    result: CompositionOptimizationResult
+    swaps: List[CompositionSwap] = Field(default_factory=list)
+    raw_score_before: float = Field(
+        ..., examples=[0.61], description="Unclipped score of the changed roster"
+    )
+    raw_score: float = Field(
+        ..., examples=[0.68], description="Unclipped score after the swaps"
+    )
+    elapsed: float = Field(..., ge=0, examples=[0.02], description="Seconds")
+
+
+class CompositionSensitivityRequest(BaseModel):
+    """Schema for the what-if analysis of the build changes of a composition"""
+
+    game_type: str = Field(..., examples=["wvw"])
+    game_mode: str = Field(..., examples=["zerg"])
+    composition_id: Optional[int] = Field(
+        default=None, examples=[12], description="Stored composition to analyse"
+    )
+    members: Optional[List[RosterMember]] = Field(
+        default=None, description="Inline composition to analyse"
+    )
+
+    @model_validator(mode="after")
+    def check_source(self) -> "CompositionSensitivityRequest":
+        """Exactly one of ``composition_id`` and ``members`` is required."""
+        if (self.composition_id is None) == (self.members is None):
+            raise ValueError("Provide either composition_id or members")
+        return self
+
+
+class CompositionSensitivityResult(BaseModel):
+    """Score change of every single build change of a composition"""
+
+    members: List[RosterMember] = Field(
+        ..., description="Build template of each member, the rows of deltas"
+    )
+    templates: List[RosterMember] = Field(
+        ..., description="Build templates of the catalogue, the columns of deltas"
+    )
+    deltas: List[List[float]] = Field(
+        ...,
+        examples=[[[0.0, 0.012, -0.03], [0.004, 0.0, -0.02]]],
+        description="Raw score change when a member plays a template instead",
+    )
+    raw_score: float = Field(
+        ..., examples=[0.61], description="Unclipped score of the composition"
+    )
+    best: Optional[CompositionSwap] = Field(
+        default=None, description="Best change, when one improves the score"
+    )
+    elapsed: float = Field(..., ge=0, examples=[0.002], description="Seconds")
+
+
+class PlayableBuild(BaseModel):
+    """A build a player can play"""
+
+    profession_id: int = Field(..., examples=[1])
+    elite_specialization_id: Optional[int] = Field(
+        default=None, examples=[3], description="Any elite specialization when omitted"
+    )
+    role_type: Optional[str] = Field(
+        default=None, examples=["healer"], description="Any role when omitted"
+    )
+
+
+class RosterPlayer(BaseModel):
+    """A player of a roster and the builds they can play"""
+
+    user_id: Optional[int] = Field(default=None, examples=[42])
+    name: Optional[str] = Field(default=None, examples=["Commander.1234"])
+    builds: Optional[List[PlayableBuild]] = Field(
+        default=None,
+        max_length=100,
+        description="Playable builds, by order of preference. When omitted, "
+        "the professions of the saved builds of user_id",
+    )
+
+
+class RosterAssignmentRequest(BaseModel):
+    """Schema for the assignment of the players of a roster to composition slots"""
+
+    game_type: str = Field(..., examples=["wvw"])
+    game_mode: str = Field(..., examples=["zerg"])
+    players: List[RosterPlayer] = Field(..., min_length=1, max_length=100)
+    slots: Optional[List[RosterMember]] = Field(
+        default=None,
+        max_length=50,
+        description="Target composition. When omitted, a composition is "
+        "optimized for the roster size and professions",
+    )
+    time_budget: float = Field(
+        default=2.0,
+        gt=0,
+        le=5,
+        examples=[2.0],
+        description="Seconds, for the optimization of the target composition",
+    )
+
+
+class RosterAssignment(BaseModel):
+    """A player assigned to a slot of the target composition"""
+
+    slot: int = Field(..., ge=0, examples=[0])
+    player: int = Field(
+        ..., ge=0, examples=[3], description="Index of the player in the roster"
+    )
+    user_id: Optional[int] = Field(default=None, examples=[42])
+    name: Optional[str] = Field(default=None, examples=["Commander.1234"])
+    build: RosterMember
+    match: str = Field(
+        ...,
+        examples=["exact"],
+        description="exact, role (other role of the build) or specialization "
+        "(other elite specialization of the profession)",
+    )
+    cost: float = Field(..., ge=0, examples=[0.0])
+
+
+class RosterAssignmentResult(BaseModel):
+    """Players of a roster assigned to the slots of a composition"""
+
+    assignments: List[RosterAssignment] = Field(default_factory=list)
+    unfilled_slots: List[int] = Field(
+        default_factory=list, description="Slots no available player can play"
+    )
+    benched_players: List[int] = Field(
+        default_factory=list, description="Players without a slot"
+    )
+    total_cost: float = Field(..., ge=0, examples=[1.5])
+    result: Optional[CompositionOptimizationResult] = Field(
+        default=None, description="Optimized target composition, when not given"
+    )
+    elapsed: float = Field(..., ge=0, examples=[0.004], description="Seconds")
+
+
+class ProfessionAvailability(BaseModel):
+    """Number of players of a profession available to an alliance"""
+
+    profession_id: int = Field(..., examples=[1])
+    count: int = Field(..., ge=0, le=500, examples=[12])
+
+
+class AllianceOptimizationRequest(BaseModel):
+    """Schema for the optimization of several squads sharing a player pool"""
+
+    squads: List[CompositionOptimizationRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=10,
+        description="One optimization request per squad, each with its own mode",
+    )
+    available_professions: Optional[List[ProfessionAvailability]] = Field(
+        default=None,
+        description="Players available per profession, shared by all squads "
+        "(unlimited when omitted)",
+    )
+    time_budget: float = Field(
+        default=5.0, gt=0, le=30, examples=[5.0], description="Seconds"
+    )
+
+
+class AllianceOptimizationResult(BaseModel):
+    """Compositions of the squads of an alliance"""
+
+    squads: List[CompositionOptimizationResult]
+    raw_score: float = Field(
+        ..., examples=[2.41], description="Sum of the unclipped squad scores"
+    )
+    profession_counts: Dict[int, int] = Field(
+        default_factory=dict,
+        examples=[{1: 12, 2: 8}],
+        description="Players of each profession over all squads",
+    )
+    rebalance_moves: int = Field(
+        default=0,
+        ge=0,
+        examples=[6],
+        description="Build changes made while rebalancing the squads",
+    )
+    stop_reason: Optional[str] = Field(
+        default=None, examples=["no_improvement"], description="Why rebalancing stopped"
+    )
+    elapsed: float = Field(..., ge=0, examples=[4.8], description="Seconds")
+
+
 class CompositionEvaluation(BaseModel):
     """Schema for composition evaluation"""
 
@@ -2,10 +2,16 @@ import httpx
 import logging
 from typing import Dict, Any
 
-from arq import create_pool
-from arq.connections import RedisSettings
+from arq import create_pool, cron, func
+from arq.connections import ArqRedis, RedisSettings
 
 from app.core.config import settings
+from app.core.optimizer.jobs import (
+    optimize_composition_job,
+    precompute_tables_job,
+    score_compositions_job,
+)
+from app.core.optimizer.pool import get_optimizer_pool
 from app.core.webhook_helpers import generate_webhook_signature
 from app.db.session import SessionLocal
 
@@ -92,22 +98,15 @@ def get_redis_settings() -> RedisSettings:
     """Retourne les paramètres Redis en fonction de l'environnement."""
     if settings.TESTING:
         # Utilise une base de données Redis différente pour les tests
-        return RedisSettings(
-            host=settings.REDIS_HOST, port=settings.REDIS_PORT, database=1
-        )
+        return RedisSettings(database=1)
 
     # En production/développement, utilise l'URL Redis configurée
-    redis_url = settings.redis_url
+    redis_url = settings.REDIS_URL
     if redis_url and redis_url.startswith("redis"):
         return RedisSettings.from_dsn(redis_url)
 
-    # Fallback si l'URL n'est pas valide
-    return RedisSettings(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        database=settings.REDIS_DB,
-        password=settings.REDIS_PASSWORD or None,
-    )
+    # Fallback si l'URL n'est pas valide : Redis local par défaut
+    return RedisSettings()
 
 
 class WorkerSettings:
@@ -115,7 +114,32 @@ class WorkerSettings:
     Configuration pour le worker Arq.
     """
 
-    functions = [send_webhook]
+    functions = [
+        send_webhook,
+        # Budget maximal plus une marge pour la construction du résultat
+        func(
+            optimize_composition_job,
+            timeout=settings.OPTIMIZER_JOB_MAX_BUDGET + 30,
+            keep_result=settings.OPTIMIZER_JOB_RESULT_TTL,
+        ),
+    ]
+    # Précalcul nocturne des compositions optimales (reprend là où il s'est arrêté)
+    cron_jobs = [
+        cron(
+            precompute_tables_job,
+            hour={settings.OPTIMIZER_TABLES_CRON_HOUR},
+            minute={0},
+            timeout=4 * 3600,
+            unique=True,
+        ),
+        # Scores des compositions enregistrées, recalculés après un changement de YAML
+        cron(
+            score_compositions_job,
+            minute=set(range(0, 60, settings.OPTIMIZER_SCORES_INTERVAL)),
+            timeout=3600,
+            unique=True,
+        ),
+    ]
     redis_settings = get_redis_settings()
     job_timeout = 60  # 1 minute
     max_jobs = 10
@@ -126,11 +150,26 @@ class WorkerSettings:
 arq_pool = None
 
 
+async def get_arq_pool() -> ArqRedis:
+    """Retourne le pool arq de l'application, créé à la première utilisation."""
+    global arq_pool
+    if arq_pool is None:
+        arq_pool = await create_pool(WorkerSettings.redis_settings)
+    return arq_pool
+
+
 async def startup(ctx: Dict[str, Any]) -> None:
     global arq_pool
-    arq_pool = await create_pool(WorkerSettings)
+    arq_pool = await create_pool(WorkerSettings.redis_settings)
+    # Les jobs d'optimisation tournent dans le pool de processus du worker
+    get_optimizer_pool().start(warm=True)
 
 
 async def shutdown(ctx: Dict[str, Any]) -> None:
+    get_optimizer_pool().shutdown()
     if arq_pool:
         await arq_pool.close()
+
+
+WorkerSettings.on_startup = startup
+WorkerSettings.on_shutdown = shutdown
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark de performance de l'optimiseur.
+
+Lance la recherche (graine gloutonne + recherche locale) de chaque
+configuration de backend/config/optimizer/ pour chaque taille d'escouade
+(1 à 50 par défaut) et mesure itérations/s, évaluations/s, temps jusqu'au
+meilleur score, score final et pic mémoire.
+
+Les résultats peuvent être écrits en JSON et comparés à une référence : le
+script sort en erreur si un score baisse ou si le débit chute au-delà de la
+tolérance, pour détecter les régressions de la boucle critique avant un
+déploiement.
+
+Usage:
+    python scripts/benchmark_optimizer.py --json reports/optimizer.json
+    python scripts/benchmark_optimizer.py --baseline tests/benchmarks/optimizer_baseline.json
+    python scripts/benchmark_optimizer.py --sizes 10 30 50 --no-memory
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.optimizer.benchmark import (  # noqa: E402
+    DEFAULT_REPEAT,
+    DEFAULT_SIZES,
+    DEFAULT_TOLERANCE,
+    compare,
+    from_json,
+    run_suite,
+    to_json,
+)
+from app.core.optimizer.engine import CONFIG_DIR  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget", type=float, default=2.0, help="Budget (s)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--config-dir", type=Path, default=CONFIG_DIR)
+    parser.add_argument("--json", type=Path, help="Fichier de sortie JSON")
+    parser.add_argument("--baseline", type=Path, help="Référence JSON à comparer")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Baisse de débit tolérée (0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Ne mesure pas le pic mémoire"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = run_suite(
+        args.config_dir,
+        args.sizes,
+        args.budget,
+        memory=not args.no_memory,
+        repeat=args.repeat,
+    )
+    for result in results:
+        print(
+            f"{result.config:<20} n={result.squad_size:<3} "
+            f"it/s={result.iterations_per_sec:<8.0f} "
+            f"eval/s={result.evaluations_per_sec:<10.0f} "
+            f"best@{result.time_to_best * 1000:.1f}ms "
+            f"raw={result.raw_score:+.4f} score={result.score:.3f} "
+            f"mem={result.peak_memory / 1024:.0f}KiB"
+        )
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(to_json(results), indent=2))
+        print(f"Résultats écrits dans {args.json}")
+
+    if args.baseline:
+        baseline = from_json(json.loads(args.baseline.read_text()))
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) par rapport à {args.baseline}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"\nAucune régression par rapport à {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark des stratégies de recherche locale de l'optimiseur.
+
+Pour chaque configuration de backend/config/optimizer/, chaque stratégie
+(hill_climb, annealing, tabu) est lancée avec plusieurs graines sur la taille
+d'escouade maximale du mode. Le critère de patience est désactivé pour que
+chaque recherche utilise tout le budget de temps, et la courbe score/temps est
+échantillonnée à plusieurs instants du budget.
+
+Usage:
+    python scripts/benchmark_optimizer_strategies.py --budget 2 --seeds 5
+    python scripts/benchmark_optimizer_strategies.py --json reports/strategies.json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from statistics import mean
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.optimizer.engine import CONFIG_DIR, OptimizerEngine  # noqa: E402
+from app.core.optimizer.strategies import STRATEGIES  # noqa: E402
+from app.schemas.composition import CompositionOptimizationRequest  # noqa: E402
+
+# Instants d'échantillonnage, en fraction du budget
+CHECKPOINTS = (0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def score_at(trace: List[Tuple[float, float]], elapsed: float) -> float:
+    """Meilleur score atteint à un instant donné d'une trace."""
+    best = trace[0][1]
+    for at, score in trace:
+        if at > elapsed:
+            break
+        best = score
+    return best
+
+
+def benchmark_config(path: Path, budget: float, seeds: int) -> List[Dict[str, Any]]:
+    """Courbes score/temps de chaque stratégie pour un fichier de config."""
+    game_type, _, name = path.stem.partition("_")
+    engine = OptimizerEngine(game_type=game_type, game_mode=name, config_path=path)
+    game_mode = engine.config.config.get("mode", name)
+    squad_size = engine.config.config.get("squad_size_range", [10, 10])[-1]
+    # Désactive l'arrêt sur convergence : chaque run utilise tout le budget
+    engine.config.config["search"] = {
+        **engine.config.search,
+        "patience": 10**9,
+        "target_score": float("inf"),
+    }
+
+    rows = []
+    for strategy in sorted(STRATEGIES):
+        request = CompositionOptimizationRequest(
+            squad_size=squad_size,
+            game_type=game_type,
+            game_mode=game_mode,
+            strategy=strategy,
+        )
+        curves = []
+        steps = []
+        for seed in range(seeds):
+            _, stats = engine.restart(request, restart=seed, time_budget=budget)
+            curves.append([score_at(stats.trace, budget * c) for c in CHECKPOINTS])
+            steps.append(stats.steps)
+        rows.append(
+            {
+                "config": path.name,
+                "squad_size": squad_size,
+                "strategy": strategy,
+                "steps": mean(steps),
+                "curve": {
+                    f"{budget * c:g}s": mean(curve[i] for curve in curves)
+                    for i, c in enumerate(CHECKPOINTS)
+                },
+                "final": [curve[-1] for curve in curves],
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget", type=float, default=2.0, help="Budget (s)")
+    parser.add_argument("--seeds", type=int, default=3, help="Runs par stratégie")
+    parser.add_argument("--config-dir", type=Path, default=CONFIG_DIR)
+    parser.add_argument("--json", type=Path, help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = []
+    for path in sorted(args.config_dir.glob("*.yml")):
+        rows = benchmark_config(path, args.budget, args.seeds)
+        results.extend(rows)
+        for row in rows:
+            curve = "  ".join(f"{t}={s:+.3f}" for t, s in row["curve"].items())
+            print(
+                f"{row['config']:<22} n={row['squad_size']:<3} "
+                f"{row['strategy']:<11} steps={row['steps']:<8.0f} {curve}"
+            )
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(results, indent=2))
+        print(f"Résultats écrits dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
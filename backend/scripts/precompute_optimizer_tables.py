@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Précalcul des compositions optimales de l'optimiseur.
+
+Résout hors ligne chaque requête simple (config x taille d'escouade 1 à 50,
+plus les ensembles de professions `search.table_profession_sets` de chaque
+config) avec un long budget et toutes les stratégies, et écrit la meilleure
+composition dans le fichier SQLite lu par l'optimiseur avant toute
+recherche (`OPTIMIZER_TABLES_PATH`). Une entrée n'est remplacée que par une
+meilleure ; les entrées déjà calculées pour la version courante du moteur,
+des configs et du catalogue sont ignorées sauf avec --force.
+
+Le worker arq exécute le même précalcul chaque nuit.
+
+Usage:
+    python scripts/precompute_optimizer_tables.py
+    python scripts/precompute_optimizer_tables.py --budget 30 --workers 8
+    python scripts/precompute_optimizer_tables.py --sizes 5 10 15 --output tables.sqlite
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.core.optimizer.pool import OptimizerPool  # noqa: E402
+from app.core.optimizer.tables import DEFAULT_SIZES, precompute_tables  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=settings.OPTIMIZER_TABLES_BUDGET,
+        help="Budget par composition (s)",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument(
+        "--output", default=settings.OPTIMIZER_TABLES_PATH, help="Fichier SQLite"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 2, help="Processus"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Recalcule les entrées existantes"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    pool = OptimizerPool(max_workers=args.workers, max_queue=args.workers)
+    try:
+        stored = asyncio.run(
+            precompute_tables(
+                pool,
+                path=args.output,
+                sizes=args.sizes,
+                time_budget=args.budget,
+                force=args.force,
+            )
+        )
+    finally:
+        pool.shutdown()
+    print(f"{stored} composition(s) écrite(s) dans {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Benchmarks of the optimizer search, run with pytest-benchmark.
+
+Each benchmark times the greedy + local search of one optimizer config at
+one squad size, and checks that its final score hasn't dropped below the
+stored baseline (``optimizer_baseline.json``, see
+``scripts/benchmark_optimizer.py``). Use pytest-benchmark's own options to
+save and compare timings::
+
+    pytest tests/benchmarks --no-cov --benchmark-json=reports/bench.json
+    pytest tests/benchmarks --no-cov --benchmark-autosave
+    pytest tests/benchmarks --no-cov --benchmark-compare --benchmark-compare-fail=mean:25%
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.core.optimizer.benchmark import (  # noqa: E402
+    SCORE_TOLERANCE,
+    config_engines,
+    from_json,
+)
+from app.core.optimizer.engine import CONFIG_DIR  # noqa: E402
+from app.core.optimizer.strategies import LOCAL_SEARCH_BATCH_SIZE  # noqa: E402
+from app.schemas.composition import CompositionOptimizationRequest  # noqa: E402
+
+pytestmark = pytest.mark.performance
+
+BASELINE_PATH = Path(__file__).parent / "optimizer_baseline.json"
+CONFIGS = sorted(path.name for path in CONFIG_DIR.glob("*.yml"))
+SIZES = (1, 5, 10, 15, 30, 50)
+
+
+@pytest.fixture(scope="module")
+def engines():
+    """One engine per optimizer config."""
+    return dict(config_engines())
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    """Baseline results by (config, squad size)."""
+    return {
+        result.key: result
+        for result in from_json(json.loads(BASELINE_PATH.read_text()))
+    }
+
+
+@pytest.mark.parametrize("squad_size", SIZES)
+@pytest.mark.parametrize("config", CONFIGS)
+def test_search(benchmark, engines, baseline, config, squad_size):
+    """Benchmark greedy + local search and check the final score."""
+    engine = engines[config]
+    request = CompositionOptimizationRequest(
+        squad_size=squad_size,
+        game_type=engine.game_type,
+        game_mode=engine.config.config.get("mode", engine.game_mode),
+    )
+
+    _, stats = benchmark(engine.restart, request, time_budget=2.0)
+
+    benchmark.extra_info.update(
+        steps=stats.steps,
+        evaluations=stats.steps * LOCAL_SEARCH_BATCH_SIZE,
+        time_to_best=stats.trace[-1][0],
+        raw_score=stats.raw_score,
+        stop_reason=stats.stop_reason,
+    )
+    expected = baseline[(config, squad_size)]
+    assert stats.raw_score >= expected.raw_score - SCORE_TOLERANCE
@@ -112,8 +112,12 @@ def _freeze_time_session():
     """Freeze time globally during the test session to avoid flakiness.
 
     Ensures deterministic behavior for JWT expirations and any time-based logic.
+    The optimizer is excluded: its search loops are bounded by wall-clock budgets.
+    So is pytest-benchmark, whose timers must measure real durations.
     """
-    with freeze_time("2025-01-01 00:00:00"):
+    with freeze_time(
+        "2025-01-01 00:00:00", ignore=["app.core.optimizer", "pytest_benchmark"]
+    ):
         yield
 
 
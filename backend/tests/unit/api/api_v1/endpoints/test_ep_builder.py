@@ -0,0 +1,389 @@
+"""
+Tests for the composition builder optimization endpoints.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, status
+from httpx import ASGITransport, AsyncClient
+
+from app.api import deps
+from app.api.api_v1.endpoints import builder
+from app.core.config import settings
+from app.core.optimizer.memo import OptimizerMemo
+from app.core.optimizer.pool import OptimizerPool
+from app.schemas.composition import CompositionOptimizationJob
+
+pytestmark = pytest.mark.asyncio
+
+ZERG = {"squad_size": 15, "game_type": "wvw", "game_mode": "zerg"}
+ROAMING = {"squad_size": 5, "game_type": "wvw", "game_mode": "roaming"}
+# Its optimum takes the exact solver seconds to prove: it goes to local search
+HARD_ZERG = {**ZERG, "squad_size": 30, "min_damage": 0.7}
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Optimizer pool of two workers used by the endpoints."""
+    pool = OptimizerPool(max_workers=2, max_queue=2)
+    monkeypatch.setattr(builder, "get_optimizer_pool", lambda: pool)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def memo(monkeypatch):
+    """Empty optimizer memo used by the endpoints."""
+    memo = OptimizerMemo()
+    monkeypatch.setattr(builder, "get_optimizer_memo", lambda: memo)
+    return memo
+
+
+@pytest.fixture
+async def client(pool, memo):
+    """Client of an app serving the builder router to an authenticated user."""
+    app = FastAPI()
+    app.include_router(builder.router, prefix="/builder")
+    app.dependency_overrides[deps.get_current_active_user] = lambda: SimpleNamespace(
+        id=1
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+def read_items(response):
+    """Parse a newline-delimited JSON batch response."""
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+class TestOptimize:
+    """Test suite for POST /builder/optimize."""
+
+    async def test_debug_block_on_request(self, client):
+        """Test that run statistics are only returned when asked for."""
+        plain = await client.post("/builder/optimize", json=ZERG)
+        debug = await client.post("/builder/optimize", json={**ROAMING, "debug": True})
+
+        assert plain.json()["debug"] is None
+        assert debug.json()["debug"]["evaluations"] > 0
+        assert debug.json()["debug"]["queue_wait"] >= 0
+        assert "evaluate" in debug.json()["debug"]["phases"]
+
+    async def test_infeasible_constraints_are_rejected(self, client):
+        """Test that unreachable minimums answer 400 with the reason."""
+        response = await client.post(
+            "/builder/optimize", json={**ZERG, "min_cleanses": 100}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "min_cleanses is unreachable" in response.json()["detail"]
+
+
+class TestOptimizeBatch:
+    """Test suite for POST /builder/optimize/batch."""
+
+    async def test_batch_streams_one_item_per_request(self, client):
+        """Test that every request gets its result, as NDJSON lines."""
+        response = await client.post("/builder/optimize/batch", json=[ZERG, ROAMING])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        items = read_items(response)
+        assert sorted(item["indices"] for item in items) == [[0], [1]]
+        for item in items:
+            assert item["status_code"] == 200
+            size = [ZERG, ROAMING][item["indices"][0]]["squad_size"]
+            assert len(item["result"]["composition"]["members"]) == size
+
+    async def test_identical_requests_are_optimized_once(self, client, pool):
+        """Test that duplicated requests share a single optimization."""
+        response = await client.post("/builder/optimize/batch", json=[ZERG, ZERG])
+
+        items = read_items(response)
+        assert len(items) == 1
+        assert items[0]["indices"] == [0, 1]
+        assert pool.stats()["completed"] == 1
+
+    async def test_cached_results_come_first(self, client, pool):
+        """Test that memoized results are streamed without running again."""
+        await client.post("/builder/optimize", json=ROAMING)
+
+        response = await client.post("/builder/optimize/batch", json=[ZERG, ROAMING])
+
+        items = read_items(response)
+        assert items[0]["indices"] == [1]
+        assert items[0]["cached"] is True
+        assert items[1]["cached"] is False
+        assert pool.stats()["completed"] == 2
+
+    async def test_invalid_request_rejects_batch(self, client):
+        """Test that an invalid request rejects the whole batch."""
+        too_many_fixed = {
+            **ROAMING,
+            "fixed_roles": [
+                {"profession_id": 1, "role_type": "healer", "count": 6},
+            ],
+        }
+
+        response = await client.post(
+            "/builder/optimize/batch", json=[ZERG, too_many_fixed]
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"].startswith("Request 1:")
+
+    async def test_oversized_batch_is_rejected(self, client):
+        """Test that batches above the configured size are rejected."""
+        response = await client.post(
+            "/builder/optimize/batch",
+            json=[ZERG] * (settings.OPTIMIZER_BATCH_MAX_REQUESTS + 1),
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_batch_beyond_pool_capacity_is_rejected(self, client, pool):
+        """Test that a batch the pool cannot take answers 503."""
+        requests = [{**ZERG, "squad_size": size} for size in range(10, 15)]
+
+        response = await client.post("/builder/optimize/batch", json=requests)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert "retry-after" in response.headers
+        assert pool.stats()["completed"] == 0
+
+
+def read_events(response):
+    """Parse a server-sent events response into (event, data) pairs."""
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestOptimizeStream:
+    """Test suite for POST /builder/optimize/stream."""
+
+    async def test_stream_sends_incumbents_then_result(self, client, memo):
+        """Test that improving incumbents are streamed before the result."""
+        response = await client.post("/builder/optimize/stream", json=HARD_ZERG)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = read_events(response)
+        names = [name for name, _ in events]
+        assert names[-1] == "result"
+        assert set(names[:-1]) == {"incumbent"}
+        scores = [data["raw_score"] for _, data in events]
+        assert scores == sorted(scores)
+        assert events[0][1]["iteration"] == 0
+        final = events[-1][1]
+        assert final["final"] is True
+        assert final["result"]["stop_reason"] is not None
+        assert memo.stats()["entries"] == 1
+
+    async def test_cached_result_is_sent_at_once(self, client):
+        """Test that a memoized optimization is a single result event."""
+        await client.post("/builder/optimize", json=ZERG)
+
+        response = await client.post("/builder/optimize/stream", json=ZERG)
+
+        events = read_events(response)
+        assert [name for name, _ in events] == ["result"]
+
+    async def test_full_pool_is_rejected(self, client, pool, monkeypatch):
+        """Test that a streamed optimization needs a free pool slot."""
+        monkeypatch.setattr(pool, "max_queue", 0)
+        monkeypatch.setattr(pool, "_in_flight", 2)
+
+        response = await client.post("/builder/optimize/stream", json=ZERG)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class FakeArqRedis:
+    """Records the jobs enqueued by the endpoints."""
+
+    def __init__(self):
+        self.jobs = []
+
+    async def enqueue_job(self, function, *args):
+        self.jobs.append((function, args))
+        return SimpleNamespace(job_id=f"job-{len(self.jobs)}")
+
+
+@pytest.fixture
+def arq_redis(monkeypatch):
+    """Fake arq connection used by the job endpoints."""
+    redis = FakeArqRedis()
+
+    async def get_arq_pool():
+        return redis
+
+    monkeypatch.setattr(builder, "get_arq_pool", get_arq_pool)
+    return redis
+
+
+class TestOptimizationJobs:
+    """Test suite for the /builder/jobs endpoints."""
+
+    async def test_create_job_enqueues_optimization(self, client, arq_redis):
+        """Test that a job is enqueued with its request and budget."""
+        response = await client.post("/builder/jobs", json={**ZERG, "time_budget": 45})
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.json()["job_id"] == "job-1"
+        assert response.json()["status"] == "queued"
+        function, (request, time_budget) = arq_redis.jobs[0]
+        assert function == "optimize_composition_job"
+        assert request["squad_size"] == 15
+        assert "time_budget" not in request
+        assert time_budget == 45
+
+    async def test_budget_above_maximum_is_rejected(self, client, arq_redis):
+        """Test that budgets above OPTIMIZER_JOB_MAX_BUDGET are rejected."""
+        response = await client.post(
+            "/builder/jobs",
+            json={**ZERG, "time_budget": settings.OPTIMIZER_JOB_MAX_BUDGET + 1},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not arq_redis.jobs
+
+    async def test_unknown_job_is_not_found(self, client, arq_redis, monkeypatch):
+        """Test that unknown or expired jobs answer 404."""
+
+        async def get_job_status(redis, job_id):
+            return CompositionOptimizationJob(job_id=job_id, status="not_found")
+
+        monkeypatch.setattr(builder, "get_job_status", get_job_status)
+
+        response = await client.get("/builder/jobs/unknown")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestRepair:
+    """Test suite for POST /builder/repair."""
+
+    async def test_inline_composition_is_repaired(self, client):
+        """Test that an inline roster change is repaired in the pool."""
+        optimized = await client.post("/builder/optimize", json=ROAMING)
+        members = optimized.json()["composition"]["members"]
+        request = {
+            "game_type": "wvw",
+            "game_mode": "roaming",
+            "members": members,
+            "removed": [0],
+            "added": [{"profession_id": members[0]["profession_id"]}],
+        }
+
+        response = await client.post("/builder/repair", json=request)
+
+        assert response.status_code == status.HTTP_200_OK
+        repaired = response.json()
+        assert len(repaired["result"]["composition"]["members"]) == 5
+        assert repaired["raw_score"] >= repaired["raw_score_before"]
+
+    async def test_invalid_roster_is_rejected(self, client):
+        """Test that unknown removed members answer 400."""
+        request = {
+            "game_type": "wvw",
+            "game_mode": "roaming",
+            "members": [{"profession_id": 1}],
+            "removed": [3],
+        }
+
+        response = await client.post("/builder/repair", json=request)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestSensitivity:
+    """Test suite for POST /builder/sensitivity."""
+
+    async def test_inline_composition_is_analysed(self, client):
+        """Test that every member gets a change for every template."""
+        request = {
+            "game_type": "wvw",
+            "game_mode": "zerg",
+            "members": [{"profession_id": 1}, {"profession_id": 3}],
+        }
+
+        response = await client.post("/builder/sensitivity", json=request)
+
+        assert response.status_code == status.HTTP_200_OK
+        analysis = response.json()
+        assert len(analysis["deltas"]) == 2
+        assert {len(row) for row in analysis["deltas"]} == {len(analysis["templates"])}
+
+    async def test_unknown_build_is_rejected(self, client):
+        """Test that a build without template answers 400."""
+        request = {
+            "game_type": "wvw",
+            "game_mode": "zerg",
+            "members": [{"profession_id": 999}],
+        }
+
+        response = await client.post("/builder/sensitivity", json=request)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestAlliance:
+    """Test suite for POST /builder/alliance."""
+
+    async def test_squads_share_the_player_pool(self, client, pool):
+        """Test that squads are optimized in the pool within the player pool."""
+        available = [{"profession_id": p, "count": 3} for p in range(1, 10)]
+        request = {
+            "squads": [ZERG, {**ZERG, "game_mode": "guild_raid", "squad_size": 10}],
+            "available_professions": available,
+            "time_budget": 1.0,
+        }
+
+        response = await client.post("/builder/alliance", json=request)
+
+        assert response.status_code == status.HTTP_200_OK
+        result = response.json()
+        sizes = [len(squad["composition"]["members"]) for squad in result["squads"]]
+        assert sizes == [15, 10]
+        assert all(count <= 3 for count in result["profession_counts"].values())
+        assert pool.stats()["completed"] == 3
+
+    async def test_not_enough_players_is_rejected(self, client):
+        """Test that a pool smaller than the squads answers 400."""
+        request = {
+            "squads": [ZERG],
+            "available_professions": [{"profession_id": 1, "count": 2}],
+        }
+
+        response = await client.post("/builder/alliance", json=request)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestAssign:
+    """Test suite for POST /builder/assign."""
+
+    async def test_inline_roster_is_assigned(self, client):
+        """Test that players are matched to the slots they play."""
+        request = {
+            "game_type": "wvw",
+            "game_mode": "zerg",
+            "players": [
+                {"name": "A", "builds": [{"profession_id": 1}]},
+                {"name": "B", "builds": [{"profession_id": 8}]},
+            ],
+            "slots": [{"profession_id": 8}, {"profession_id": 1}],
+        }
+
+        response = await client.post("/builder/assign", json=request)
+
+        assert response.status_code == status.HTTP_200_OK
+        assignments = response.json()["assignments"]
+        assert [(a["slot"], a["name"]) for a in assignments] == [(0, "B"), (1, "A")]
@@ -0,0 +1,102 @@
+"""
+Tests for listing compositions ranked by their stored score.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, status
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.api.api_v1.endpoints import compositions
+from app.core.optimizer.leaderboard import ranking_version
+from app.models import Base, Composition, CompositionScore, User
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def session_factory():
+    """Sessions of an in-memory database holding a user."""
+    database = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with database.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(database, expire_on_commit=False)
+    async with factory() as db:
+        db.add(User(username="owner", email="owner@example.com", hashed_password="x"))
+        await db.commit()
+    yield factory
+    await database.dispose()
+
+
+@pytest.fixture
+async def client(session_factory):
+    """Client of an app serving the compositions router to a superuser."""
+    app = FastAPI()
+    app.include_router(compositions.router, prefix="/compositions")
+
+    async def get_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[deps.get_async_db] = get_db
+    app.dependency_overrides[deps.get_current_active_user] = lambda: SimpleNamespace(
+        id=1, is_superuser=True
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+async def add_scored(db, name, scores):
+    """Store a composition with a score for each (version, score) pair."""
+    composition = Composition(name=name, game_mode="wvw", created_by=1)
+    db.add(composition)
+    await db.flush()
+    for version, score in scores:
+        db.add(
+            CompositionScore(
+                composition_id=composition.id,
+                version=version,
+                game_type="wvw",
+                game_mode="zerg",
+                score=score,
+                raw_score=score,
+                metrics={},
+            )
+        )
+    await db.commit()
+
+
+class TestOrderByScore:
+    """Test suite for GET /compositions?order_by=score."""
+
+    async def test_ranked_by_current_scores(self, client, session_factory):
+        """Test that compositions are ranked by their scores of the current version."""
+        version = await ranking_version("wvw_zerg")
+        async with session_factory() as db:
+            await add_scored(db, "middle", [(version, 0.5), ("old", 0.9)])
+            await add_scored(db, "best", [(version, 0.8)])
+            await add_scored(db, "stale", [("old", 1.0)])
+            await add_scored(db, "unmatched", [(version, None)])
+            await add_scored(db, "worst", [(version, 0.1)])
+
+        response = await client.get(
+            "/compositions/", params={"order_by": "score", "limit": 4}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        ranked = [(c["name"], c["score"]) for c in response.json()]
+        assert ranked == [("best", 0.8), ("middle", 0.5), ("worst", 0.1)]
+
+    async def test_unknown_score_mode(self, client):
+        """Test that ranking by a mode without config is rejected."""
+        response = await client.get(
+            "/compositions/", params={"order_by": "score", "score_mode": "wvw_nope"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Unknown optimizer mode" in response.json()["detail"]
@@ -0,0 +1,18 @@
+"""Shared helpers of the optimizer unit tests."""
+
+from app.schemas.composition import CompositionOptimizationRequest
+
+
+def make_request(squad_size=30, **kwargs):
+    """Build a WvW zerg optimization request."""
+    return CompositionOptimizationRequest(
+        squad_size=squad_size, game_type="wvw", game_mode="zerg", **kwargs
+    )
+
+
+def make_hard_request(squad_size=30, **kwargs):
+    """
+    Build a WvW zerg request whose optimum takes the exact solver seconds to
+    prove, so that short runs go through local search.
+    """
+    return make_request(squad_size, min_damage=0.7, **kwargs)
@@ -0,0 +1,133 @@
+"""Unit tests for the multi-squad alliance optimizer."""
+
+import time
+
+import numpy as np
+import pytest
+
+from app.core.optimizer.alliance import (
+    SquadState,
+    rebalance_alliance,
+    run_squad,
+    squad_requests,
+)
+from app.schemas.composition import (
+    AllianceOptimizationRequest,
+    CompositionOptimizationRequest,
+    ProfessionAvailability,
+)
+
+
+def squad(size, mode="zerg"):
+    return CompositionOptimizationRequest(
+        squad_size=size, game_type="wvw", game_mode=mode
+    )
+
+
+def alliance(squads, professions=None):
+    return AllianceOptimizationRequest(
+        squads=squads,
+        available_professions=(
+            None
+            if professions is None
+            else [
+                ProfessionAvailability(profession_id=profession, count=count)
+                for profession, count in professions.items()
+            ]
+        ),
+    )
+
+
+def outcomes(request, time_budget=0.2):
+    return [run_squad(squad, time_budget) for squad in squad_requests(request)]
+
+
+def professions(result):
+    counts = {}
+    for squad in result.squads:
+        for member in squad.composition.members:
+            profession = member["profession_id"]
+            counts[profession] = counts.get(profession, 0) + 1
+    return counts
+
+
+class TestSquadRequests:
+    """Test squad_requests function."""
+
+    def test_restricted_to_available_professions(self):
+        """Test that squads only draw from the professions of the pool."""
+        request = alliance(
+            [
+                squad(5),
+                squad(5, "roaming").model_copy(update={"fixed_professions": [1, 3]}),
+            ],
+            {1: 5, 2: 5, 4: 0},
+        )
+
+        requests = squad_requests(request)
+
+        assert requests[0].fixed_professions == [1, 2]
+        assert requests[1].fixed_professions == [1]
+
+    def test_not_enough_players(self):
+        """Test that a pool smaller than the squads is rejected."""
+        with pytest.raises(ValueError, match="only 8 are available"):
+            squad_requests(alliance([squad(5), squad(5)], {1: 4, 2: 4}))
+
+
+class TestRebalance:
+    """Test rebalance_alliance function."""
+
+    def test_pool_is_enforced(self):
+        """Test that squads never use more players than available."""
+        pool = {profession: 4 for profession in range(1, 10)}
+        request = alliance([squad(20), squad(15, "guild_raid")], pool)
+
+        result = rebalance_alliance(request, outcomes(request), time.time() + 0.5)
+
+        counts = professions(result)
+        assert sum(counts.values()) == 35
+        assert all(counts[p] <= pool[p] for p in counts)
+        assert result.profession_counts == counts
+        assert result.rebalance_moves > 0
+
+    def test_rebalancing_never_lowers_the_score(self):
+        """Test that without a pool, rebalancing only improves squads."""
+        request = alliance([squad(10), squad(10, "roaming")])
+        squads = outcomes(request)
+        before = sum(outcome.stats.raw_score for outcome in squads)
+
+        result = rebalance_alliance(request, squads, time.time() + 0.5)
+
+        assert result.raw_score >= before - 1e-9
+        assert [len(s.composition.members) for s in result.squads] == [10, 10]
+
+    def test_repair_ignores_the_deadline(self):
+        """Test that an expired budget still repairs the pool."""
+        pool = {profession: 2 for profession in range(1, 10)}
+        request = alliance([squad(9), squad(9)], pool)
+
+        result = rebalance_alliance(request, outcomes(request), time.time())
+
+        assert all(count <= 2 for count in professions(result).values())
+
+
+class TestSquadState:
+    """Test SquadState class."""
+
+    def test_best_moves_match_scoring(self):
+        """Test that best profession changes are scored like full evaluations."""
+        request = squad(10)
+        outcome = run_squad(request, 0.1)
+        columns = {profession: profession - 1 for profession in range(1, 10)}
+        state = SquadState(request, outcome.indices, columns)
+
+        gains, moves = state.best_moves(9)
+
+        p, q = np.unravel_index(int(np.nanargmax(gains)), gains.shape)
+        move = moves[p, q]
+        indices = state.indices.copy()
+        indices[state.slots[move]] = state.new[move]
+        expected = state.scorer.raw_solutions(indices)[0] - state.score
+        assert gains[p, q] == pytest.approx(expected)
+        assert state.apply(move) == pytest.approx(expected)
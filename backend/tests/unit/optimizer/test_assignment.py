@@ -0,0 +1,148 @@
+"""Unit tests for the assignment of roster players to composition slots."""
+
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+from app.core.optimizer.assignment import (
+    FORBIDDEN_COST,
+    ROLE_COST,
+    SPECIALIZATION_COST,
+    assign_roster,
+    cost_matrix,
+    min_cost_assignment,
+)
+from app.schemas.composition import (
+    PlayableBuild,
+    RosterAssignmentRequest,
+    RosterMember,
+    RosterPlayer,
+)
+
+FIREBRAND_HEALER = RosterMember(
+    profession_id=1, elite_specialization_id=3, role_type="healer"
+)
+SCOURGE_DPS = RosterMember(profession_id=8, elite_specialization_id=19, role_type="dps")
+
+
+def player(*builds):
+    return RosterPlayer(builds=[PlayableBuild(**build) for build in builds])
+
+
+def assignment_request(players, slots=None):
+    return RosterAssignmentRequest(
+        game_type="wvw", game_mode="zerg", players=players, slots=slots
+    )
+
+
+class TestMinCostAssignment:
+    """Test min_cost_assignment function."""
+
+    @pytest.mark.parametrize("shape", [(3, 3), (3, 5), (5, 3), (6, 6)])
+    def test_matches_brute_force(self, shape):
+        """Test that assignments are optimal on random matrices."""
+        rng = np.random.default_rng(0)
+        rows, columns = shape
+        for _ in range(10):
+            cost = rng.integers(0, 20, size=shape).astype(float)
+            if rows <= columns:
+                best = min(
+                    cost[np.arange(rows), list(p)].sum()
+                    for p in itertools.permutations(range(columns), rows)
+                )
+            else:
+                best = min(
+                    cost[list(p), np.arange(columns)].sum()
+                    for p in itertools.permutations(range(rows), columns)
+                )
+
+            assigned_rows, assigned_columns = min_cost_assignment(cost)
+
+            assert len(set(assigned_rows)) == len(set(assigned_columns)) == min(shape)
+            assert cost[assigned_rows, assigned_columns].sum() == pytest.approx(best)
+
+    def test_large_roster_is_fast(self):
+        """Test that 100 players x 50 slots are matched in milliseconds."""
+        cost = np.random.default_rng(1).random((100, 50))
+
+        start = time.perf_counter()
+        rows, columns = min_cost_assignment(cost)
+
+        assert time.perf_counter() - start < 0.5
+        assert sorted(columns) == list(range(50))
+
+
+class TestCostMatrix:
+    """Test cost_matrix function."""
+
+    def test_costs_and_best_builds(self):
+        """Test that players get the cost of their best build for each slot."""
+        players = [
+            player(
+                {"profession_id": 1, "elite_specialization_id": 4},
+                {"profession_id": 1, "elite_specialization_id": 3, "role_type": "dps"},
+            ),
+            player({"profession_id": 8}),
+        ]
+
+        cost, choice = cost_matrix(
+            assignment_request(players), [FIREBRAND_HEALER, SCOURGE_DPS]
+        )
+
+        assert cost[0, 0] == pytest.approx(ROLE_COST + 0.01)
+        assert choice[0, 0] == 1
+        assert cost[0, 1] == FORBIDDEN_COST
+        assert cost[1, 1] == 0
+        assert SPECIALIZATION_COST > ROLE_COST
+
+
+class TestAssignRoster:
+    """Test assign_roster function."""
+
+    def test_players_take_the_slots_they_play(self):
+        """Test that the matching seats every player on a playable slot."""
+        players = [
+            player({"profession_id": 1}, {"profession_id": 8}),
+            player({"profession_id": 1}),
+        ]
+
+        result = assign_roster(
+            assignment_request(players, [SCOURGE_DPS, FIREBRAND_HEALER])
+        )
+
+        assert [(a.slot, a.player) for a in result.assignments] == [(0, 0), (1, 1)]
+        assert result.assignments[0].build == SCOURGE_DPS
+        assert {a.match for a in result.assignments} == {"exact"}
+        assert result.total_cost == pytest.approx(0.01)
+
+    def test_unfilled_slots_and_benched_players(self):
+        """Test that slots nobody plays stay unfilled."""
+        players = [player({"profession_id": 1}), player({"profession_id": 2})]
+
+        result = assign_roster(
+            assignment_request(players, [FIREBRAND_HEALER, SCOURGE_DPS])
+        )
+
+        assert result.unfilled_slots == [1]
+        assert result.benched_players == [1]
+
+    def test_optimized_target_composition(self):
+        """Test that a composition is optimized for the roster without slots."""
+        players = [
+            player({"profession_id": profession}, {"profession_id": 1})
+            for profession in range(1, 10)
+        ]
+
+        result = assign_roster(assignment_request(players))
+
+        assert result.result is not None
+        assert len(result.result.composition.members) == 9
+        assert len(result.assignments) == 9 - len(result.unfilled_slots)
+        assert len(result.assignments) >= 5
+
+    def test_roster_without_builds(self):
+        """Test that a roster nobody can play is rejected."""
+        with pytest.raises(ValueError, match="No player of the roster"):
+            assign_roster(assignment_request([RosterPlayer(user_id=1, builds=[])]))
@@ -0,0 +1,104 @@
+"""Unit tests for vectorized batch scoring."""
+
+import numpy as np
+import pytest
+
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.scoring import capability_vector
+from app.schemas.composition import CompositionOptimizationRequest, FixedRole
+
+
+@pytest.fixture(params=[("wvw", "zerg"), ("pve", "raid")])
+def engine(request):
+    """Create optimizer engines for several game types."""
+    game_type, game_mode = request.param
+    return OptimizerEngine(game_type=game_type, game_mode=game_mode)
+
+
+@pytest.fixture
+def population():
+    """Random population of 64 solutions of 20 templates."""
+    return np.random.default_rng(42).integers(11, size=(64, 20))
+
+
+class TestCompiledCatalogue:
+    """Test CompiledCatalogue class."""
+
+    def test_matrix_matches_capabilities(self, engine):
+        """Test that the matrix holds the scored capabilities of each template."""
+        compiled = engine.compiled
+        solution = engine.build_catalogue
+
+        totals, role_counts = compiled.totals(compiled.indices(solution))
+        expected_roles = {}
+        for build in solution:
+            role = build.role_type.value
+            expected_roles[role] = expected_roles.get(role, 0) + 1
+
+        assert compiled.capabilities.shape[0] == len(engine.build_catalogue)
+        assert totals.tolist() == pytest.approx(
+            np.sum([capability_vector(build) for build in solution], axis=0)
+        )
+        assert compiled.role_counts(role_counts) == expected_roles
+
+
+class TestBatchScorer:
+    """Test BatchScorer class."""
+
+    def test_scores_match_score_function(self, engine, population):
+        """Test that every row gets the same score as the scalar scorer."""
+        raw = engine.batch_scorer.raw_solutions(population)
+
+        for indices, raw_score in zip(population, raw):
+            score, _, _, _ = engine.evaluate_solution(
+                engine.compiled.builds(indices), None
+            )
+            assert min(1.0, max(0.0, raw_score)) == pytest.approx(score)
+
+    def test_raw_swaps_match_full_evaluation(self, engine, population):
+        """Test that batched swap scores match scoring each neighbour."""
+        rng = np.random.default_rng(7)
+        indices = population[0]
+        totals, role_counts = engine.compiled.totals(indices)
+        slots = rng.integers(indices.size, size=100)
+        new = rng.integers(len(engine.compiled), size=100)
+
+        pairs = engine.batch_scorer.pair_counts(indices)
+
+        scores = engine.batch_scorer.raw_swaps(
+            totals, role_counts, indices.size, indices[slots], new, pairs
+        )
+
+        for slot, template, score in zip(slots, new, scores):
+            neighbour = indices.copy()
+            neighbour[slot] = template
+            assert score == pytest.approx(
+                engine.batch_scorer.raw_solutions(neighbour)[0]
+            )
+
+
+class TestBatchedLocalSearch:
+    """Test local search on top of batch scoring."""
+
+    def test_local_search_keeps_fixed_roles(self):
+        """Test that slots holding a fixed role are never swapped."""
+        engine = OptimizerEngine(game_type="wvw", game_mode="zerg")
+        request = CompositionOptimizationRequest(
+            squad_size=10,
+            game_type="wvw",
+            game_mode="zerg",
+            fixed_roles=[
+                FixedRole(
+                    profession_id=8,
+                    elite_specialization_id=17,
+                    count=3,
+                    role_type="power_damage",
+                )
+            ],
+        )
+        deadeye = next(b for b in engine.build_catalogue if b.elite_spec_id == 17)
+        solution = [deadeye] * 3 + engine.greedy_seed(request)[:7]
+
+        result, _ = engine.local_search(solution, request, time_budget=0.1)
+
+        assert result[:3] == [deadeye] * 3
@@ -0,0 +1,55 @@
+"""Unit tests for the optimizer benchmark harness."""
+
+from dataclasses import replace
+
+import pytest
+
+from app.core.optimizer.benchmark import benchmark_run, compare
+from app.core.optimizer.engine import OptimizerEngine
+
+
+@pytest.fixture(scope="module")
+def result():
+    """Benchmark result of a small WvW roaming run."""
+    engine = OptimizerEngine(game_type="wvw", game_mode="roaming")
+    return benchmark_run(engine, "wvw_roaming.yml", 5, time_budget=0.5, repeat=1)
+
+
+class TestBenchmarkRun:
+    """Test benchmark_run function."""
+
+    def test_records_throughput_and_memory(self, result):
+        """Test that a run records every measurement."""
+        assert result.key == ("wvw_roaming.yml", 5)
+        assert result.steps > 0
+        assert result.evaluations_per_sec > result.iterations_per_sec > 0
+        assert 0 <= result.time_to_best <= result.elapsed
+        assert result.peak_memory > 0
+
+
+class TestCompare:
+    """Test compare function."""
+
+    def test_same_results_have_no_regression(self, result):
+        """Test that a run compared to itself doesn't regress."""
+        assert compare([result], [result]) == []
+
+    def test_lower_score_is_a_regression(self, result):
+        """Test that any raw score drop is reported."""
+        worse = replace(result, raw_score=result.raw_score - 0.01)
+
+        assert "raw score" in compare([worse], [result])[0]
+
+    def test_throughput_drop_beyond_tolerance(self, result):
+        """Test that throughput drops are reported beyond the tolerance."""
+        slower = replace(result, evaluations_per_sec=result.evaluations_per_sec / 2)
+        slightly = replace(result, evaluations_per_sec=result.evaluations_per_sec * 0.9)
+
+        assert "evaluations/s" in compare([slower], [result])[0]
+        assert compare([slightly], [result], tolerance=0.2) == []
+
+    def test_missing_runs_are_ignored(self, result):
+        """Test that runs absent from the baseline are not compared."""
+        other = replace(result, squad_size=6, raw_score=-10.0)
+
+        assert compare([other], [result]) == []
@@ -0,0 +1,259 @@
+"""Unit tests for the optimizer build catalogue."""
+
+import shutil
+import threading
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.optimizer import catalogue as catalogue_module
+from app.core.optimizer.catalogue import (
+    CATALOGUE_PATH,
+    CatalogueCache,
+    build_templates,
+    catalogue_cache,
+    database_specializations,
+    read_catalogue_file,
+    watch_catalogue_tables,
+)
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.registry import EngineRegistry
+from app.models.elite_specialization import EliteSpecialization
+from app.models.profession import Profession
+from app.schemas.composition import CompositionOptimizationRequest
+
+
+@pytest.fixture
+def entries():
+    """Specialization entries of the shipped catalogue file."""
+    return read_catalogue_file()[0]
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Session factory of an empty SQLite database, used by the catalogue."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalogue.db'}")
+    Profession.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr("app.db.session.SessionLocal", factory)
+    yield factory
+    engine.dispose()
+
+
+def add_specialization(db, profession_id, profession, elite_id, elite, active=True):
+    """Insert an elite specialization, and its profession when missing."""
+    if db.get(Profession, profession_id) is None:
+        db.add(Profession(id=profession_id, name=profession))
+    db.add(
+        EliteSpecialization(
+            id=elite_id, name=elite, profession_id=profession_id, is_active=active
+        )
+    )
+    db.commit()
+
+
+class TestBuildTemplates:
+    """Test build_templates function."""
+
+    def test_file_catalogue(self, entries):
+        """Test that the data file gives one template per role variant."""
+        templates = build_templates(entries, "wvw")
+
+        assert len(templates) == sum(len(entry["roles"]) for entry in entries)
+        firebrand = templates[0]
+        assert (firebrand.profession_name, firebrand.elite_spec_name) == (
+            "Guardian",
+            "Firebrand",
+        )
+        assert (firebrand.profession_id, firebrand.elite_spec_id) == (1, 3)
+        assert not hasattr(firebrand, "__dict__")
+
+    def test_game_type_overrides(self, entries):
+        """Test that capabilities are overridden per game type."""
+        herald = lambda game_type: next(
+            template
+            for template in build_templates(entries, game_type)
+            if template.elite_spec_name == "Herald"
+        )
+
+        assert herald("wvw").capabilities["quickness"] > 0.5
+        assert herald("pve").capabilities["alacrity"] > 0.5
+        assert herald("wvw").capabilities["alacrity"] < 0.5
+
+    def test_database_specializations_drive_the_catalogue(self, entries):
+        """Test that only database specializations are kept, with their ids."""
+        specializations = {("thief", "deadeye"): (80, "Thief", 170, "Deadeye")}
+
+        templates = build_templates(entries, "wvw", specializations)
+
+        assert [(t.profession_id, t.elite_spec_id) for t in templates] == [(80, 170)]
+
+
+class TestDatabaseSpecializations:
+    """Test database_specializations function."""
+
+    def test_empty_database_falls_back_to_file(self, database):
+        """Test that a database without specializations gives None."""
+        assert database_specializations() is None
+
+    def test_active_specializations(self, database):
+        """Test that inactive specializations are left out."""
+        with database() as db:
+            add_specialization(db, 10, "Guardian", 30, "Firebrand")
+            add_specialization(db, 10, "Guardian", 31, "Willbender", active=False)
+
+        assert database_specializations() == {
+            ("guardian", "firebrand"): (10, "Guardian", 30, "Firebrand")
+        }
+
+
+class TestCatalogueCache:
+    """Test CatalogueCache class."""
+
+    def test_catalogue_is_cached(self):
+        """Test that lookups share one catalogue until the version changes."""
+        cache = CatalogueCache(check_interval=3600)
+
+        first, version = cache.get("wvw")
+        second, _ = cache.get("wvw")
+
+        assert first is second
+        assert cache.version() == version
+
+    def test_file_change_after_invalidation(self, tmp_path):
+        """Test that an invalidated cache reloads a modified data file."""
+        path = tmp_path / "builds.yml"
+        shutil.copy(CATALOGUE_PATH, path)
+        cache = CatalogueCache(path=path, check_interval=3600)
+        catalogue, version = cache.get("wvw")
+
+        path.write_text(path.read_text().replace("damage: 0.90", "damage: 0.10"))
+        assert cache.version() == version
+        cache.invalidate()
+
+        reloaded, new_version = cache.get("wvw")
+        assert new_version != version
+        assert reloaded is not catalogue
+
+    def test_version_is_checked_in_background(self, tmp_path, monkeypatch):
+        """Test that version lookups return the last version while checking."""
+        path = tmp_path / "builds.yml"
+        shutil.copy(CATALOGUE_PATH, path)
+        cache = CatalogueCache(path=path, check_interval=3600)
+        version = cache.version()
+        path.write_text(path.read_text().replace("damage: 0.90", "damage: 0.10"))
+        cache.invalidate()
+
+        checking = threading.Event()
+        release = threading.Event()
+
+        def slow_database():
+            checking.set()
+            release.wait(5)
+            return None
+
+        monkeypatch.setattr(catalogue_module, "database_specializations", slow_database)
+        assert cache.version() == version
+        assert checking.wait(5)
+        assert cache.version() == version
+
+        checker = cache._checker
+        release.set()
+        checker.join(5)
+        assert cache.version() != version
+
+    def test_database_change_is_checked_periodically(self, database):
+        """Test that database changes are picked up after the check interval."""
+        cache = CatalogueCache(check_interval=0)
+        catalogue, version = cache.get("wvw")
+
+        with database() as db:
+            add_specialization(db, 8, "Thief", 17, "Deadeye")
+
+        reloaded, new_version = cache.get("wvw")
+        assert new_version != version
+        assert len(reloaded) == 1 < len(catalogue)
+
+    def test_commits_invalidate_the_cache(self, database):
+        """Test that committing catalogue rows invalidates the cache."""
+        watch_catalogue_tables()
+        generation = catalogue_cache._read_generation()
+        try:
+            with database() as db:
+                db.add(Profession(id=1, name="Guardian"))
+                db.commit()
+        finally:
+            event.remove(
+                Session, "before_flush", catalogue_module._flag_catalogue_changes
+            )
+            event.remove(
+                Session, "after_commit", catalogue_module._invalidate_on_commit
+            )
+
+        assert catalogue_cache._read_generation() == generation + 1
+
+    def test_registry_rebuilds_on_catalogue_change(self, monkeypatch):
+        """Test that engines are rebuilt when the catalogue version changes."""
+        registry = EngineRegistry()
+        engine = registry.get("wvw", "zerg")
+
+        monkeypatch.setattr(catalogue_cache, "version", lambda: "changed")
+
+        assert registry.get("wvw", "zerg") is not engine
+        assert registry.stats()["rebuilds"] == 1
+
+
+class TestCatalogueIndexes:
+    """Test the role and boon provider indexes of the compiled catalogue."""
+
+    @pytest.fixture
+    def engine(self):
+        return OptimizerEngine(game_type="wvw", game_mode="zerg")
+
+    def test_role_buckets(self, engine):
+        """Test that role buckets hold exactly the templates of their role."""
+        compiled = engine.compiled
+
+        for r, role in enumerate(compiled.roles):
+            start = compiled.role_starts[r]
+            bucket = compiled.role_order[start : start + compiled.role_sizes[r]]
+            assert {compiled.catalogue[i].role_type.value for i in bucket} == {role}
+        assert sum(compiled.role_sizes) == len(compiled)
+
+    def test_same_role_replacements(self, engine):
+        """Test that same-role replacements keep the role of each template."""
+        compiled = engine.compiled
+        templates = np.tile(np.arange(len(compiled)), 20)
+
+        replacements = compiled.same_role(templates, np.random.default_rng(0))
+
+        assert (compiled.role_ids[replacements] == compiled.role_ids[templates]).all()
+
+    def test_boon_providers(self, engine):
+        """Test that providers are sorted by their boon capability."""
+        compiled = engine.compiled
+        batch = engine.batch_scorer
+
+        for column, providers in enumerate(compiled.providers):
+            values = compiled.capabilities[providers, column]
+            assert (values >= 0.5).all()
+            assert (np.diff(values) <= 0).all()
+        # An empty squad lacks every critical boon
+        assert batch.lacking_boon(np.zeros(compiled.capabilities.shape[1]), 10) in (
+            batch.critical_index
+        )
+
+    def test_role_moves_keep_role_distribution(self, engine):
+        """Test that a search of same-role moves never changes role counts."""
+        engine.config.config["search"] = {"role_moves": 1.0}
+        request = CompositionOptimizationRequest(
+            squad_size=20, game_type="wvw", game_mode="zerg"
+        )
+        seed = engine.greedy_seed(request)
+
+        solution, _ = engine.local_search(seed, request, time_budget=0.2)
+
+        roles = lambda builds: sorted(build.role_type.value for build in builds)
+        assert roles(solution) == roles(seed)
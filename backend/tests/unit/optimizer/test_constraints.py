@@ -0,0 +1,128 @@
+"""Unit tests for the hard constraints of optimization requests."""
+
+import numpy as np
+import pytest
+
+from app.core.optimizer.constraints import InfeasibleRequest
+from app.core.optimizer.engine import OptimizerEngine
+from tests.unit.optimizer.conftest import make_request
+
+# Elite specialization of the Firebrand, the best healer of the catalogue
+FIREBRAND = 3
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """Create optimizer engine for WvW zerg."""
+    return OptimizerEngine(game_type="wvw", game_mode="zerg")
+
+
+def elites(result):
+    return [member["elite_specialization_id"] for member in result.composition.members]
+
+
+class TestCompile:
+    """Test Constraints.compile through the engine."""
+
+    def test_plain_request_is_unrestricted(self, engine):
+        """Test that a request without constraints keeps every template."""
+        constraints = engine.constraints(make_request(10))
+
+        assert not constraints.restricted
+        assert constraints.candidates.tolist() == list(range(len(engine.compiled)))
+        assert not constraints.min_counts.any()
+
+    def test_excluded_elites_leave_candidates(self, engine):
+        """Test that excluded elite specializations are never candidates."""
+        constraints = engine.constraints(
+            make_request(10, excluded_elite_specializations=[FIREBRAND])
+        )
+
+        assert constraints.restricted
+        assert FIREBRAND not in engine.compiled.elite_spec_ids[constraints.candidates]
+
+    def test_lower_bound_of_best_provider(self, engine):
+        """Test that a minimum forces copies of its best provider."""
+        request = make_request(10, min_healing=0.95)
+        constraints = engine.constraints(request)
+        firebrand = int(np.flatnonzero(engine.compiled.elite_spec_ids == FIREBRAND)[0])
+        healing = engine.compiled.capabilities[:, 0]
+        second = np.sort(healing)[-2]
+
+        expected = int(np.ceil((9.5 - 10 * second) / (healing[firebrand] - second)))
+        assert constraints.min_counts[firebrand] == expected > 0
+
+    @pytest.mark.parametrize(
+        "kwargs, message",
+        [
+            ({"min_cleanses": 100}, "min_cleanses is unreachable"),
+            ({"min_boon_uptime": {"foo": 0.5}}, "unknown boon foo"),
+            (
+                {"min_boon_uptime": {"resolution": 0.5}},
+                r"min_boon_uptime\[resolution\]",
+            ),
+            (
+                {"min_healing": 0.95, "excluded_elite_specializations": [FIREBRAND]},
+                "min_healing is unreachable",
+            ),
+        ],
+    )
+    def test_unreachable_minimums(self, engine, kwargs, message):
+        """Test that a minimum no template can reach rejects the request."""
+        with pytest.raises(InfeasibleRequest, match=message):
+            engine.constraints(make_request(10, **kwargs))
+
+    def test_excluded_fixed_role(self, engine):
+        """Test that a fixed role of an excluded elite is rejected."""
+        request = make_request(
+            10,
+            fixed_roles=[
+                {
+                    "profession_id": 1,
+                    "elite_specialization_id": FIREBRAND,
+                    "role_type": "healer",
+                }
+            ],
+            excluded_elite_specializations=[FIREBRAND],
+        )
+
+        with pytest.raises(InfeasibleRequest, match="Firebrand"):
+            engine.constraints(request)
+
+
+class TestConstrainedSearch:
+    """Test that searches only return compositions meeting the constraints."""
+
+    @pytest.mark.parametrize("squad_size", [8, 40])
+    def test_minimums_are_met(self, engine, squad_size):
+        """Test exact (small) and heuristic (large) searches meet the minimums."""
+        request = make_request(
+            squad_size,
+            min_healing=0.3,
+            min_cleanses=squad_size // 4,
+            min_boon_uptime={"stability": 0.9},
+            excluded_elite_specializations=[FIREBRAND],
+        )
+
+        result = engine.optimize(request, time_budget=1.0)
+
+        assert FIREBRAND not in elites(result)
+        assert result.metrics["healing"] >= 0.3 - 1e-9
+        assert result.metrics["cleanse"] * squad_size >= squad_size // 4 - 1e-9
+        assert result.boon_coverage["stability"] >= 0.9 - 1e-9
+
+    def test_restarts_are_repaired(self, engine):
+        """Test that perturbed restarts still meet the minimums."""
+        request = make_request(30, min_healing=0.4)
+
+        for restart in range(1, 4):
+            solution, stats = engine.restart(request, restart, time_budget=0.2)
+            metrics = engine.evaluate_solution(solution, request)[1]
+            assert metrics["healing"] >= 0.4 - 1e-9
+
+    def test_jointly_infeasible(self, engine):
+        """Test that minimums reachable alone but not together are rejected."""
+        request = make_request(10, min_healing=0.9, min_damage=0.9)
+
+        with pytest.raises(InfeasibleRequest, match="together"):
+            engine.optimize(request, time_budget=1.0)
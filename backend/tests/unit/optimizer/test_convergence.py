@@ -0,0 +1,127 @@
+"""Unit tests for the optimizer stopping criteria."""
+
+import time
+
+import pytest
+
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.strategies import (
+    STOP_NO_IMPROVEMENT,
+    STOP_PROVEN_OPTIMAL,
+    STOP_TARGET_SCORE,
+    STOP_TIME_BUDGET,
+)
+from app.schemas.composition import CompositionOptimizationRequest
+from tests.unit.optimizer.conftest import make_hard_request, make_request
+
+
+@pytest.fixture
+def engine():
+    """Create optimizer engine for WvW zerg."""
+    return OptimizerEngine(game_type="wvw", game_mode="zerg")
+
+
+class TestLocalSearchStopping:
+    """Test the stopping criteria of local search."""
+
+    def test_stops_without_improvement(self, engine):
+        """Test that a converged search stops long before its time budget."""
+        request = make_request(30)
+        engine.config.config["search"] = {"patience": 20}
+
+        start = time.time()
+        _, stats = engine.local_search(
+            engine.greedy_seed(request), request, time_budget=10.0
+        )
+
+        assert stats.stop_reason == STOP_NO_IMPROVEMENT
+        assert time.time() - start < 5.0
+
+    def test_stops_on_target_score(self):
+        """Test that reaching the requested score stops the search."""
+        engine = OptimizerEngine(game_type="wvw", game_mode="roaming")
+        request = CompositionOptimizationRequest(
+            squad_size=5, game_type="wvw", game_mode="roaming", target_score=0.01
+        )
+
+        _, stats = engine.local_search(
+            engine.greedy_seed(request), request, time_budget=10.0
+        )
+
+        assert stats.stop_reason == STOP_TARGET_SCORE
+
+    def test_stops_on_time_budget(self, engine):
+        """Test that the time budget still bounds the search."""
+        request = make_request(30)
+        engine.config.config["search"] = {"patience": 10**9}
+
+        _, stats = engine.local_search(
+            engine.greedy_seed(request), request, time_budget=0.05
+        )
+
+        assert stats.stop_reason == STOP_TIME_BUDGET
+
+
+class TestOptimizeStopReason:
+    """Test the stop reason reported by optimize."""
+
+    def test_small_squad_is_proven_optimal(self, engine):
+        """Test that tiny search spaces skip local search."""
+        request = make_request(5)
+        assert engine.search_space_size(request) <= 200_000
+
+        start = time.time()
+        result = engine.optimize(request, time_budget=5.0)
+
+        assert result.stop_reason == STOP_PROVEN_OPTIMAL
+        assert time.time() - start < 1.0
+        assert result.score == pytest.approx(
+            engine.optimize(request, mode="exact").score
+        )
+
+    def test_large_space_is_proven_optimal(self, engine):
+        """Test that the exact solver runs whatever the size of the space."""
+        request = make_request(50)
+        assert engine.search_space_size(request) > 200_000
+
+        result = engine.optimize(request, time_budget=10.0)
+
+        assert result.stop_reason == STOP_PROVEN_OPTIMAL
+
+    def test_unproven_request_uses_local_search(self, engine):
+        """Test that unproven requests spend the budget on local search."""
+        request = make_hard_request()
+        engine.config.config["search"] = {"patience": 20}
+
+        result = engine.optimize(request, time_budget=1.0)
+
+        assert result.stop_reason == STOP_TIME_BUDGET
+
+
+class TestRestarts:
+    """Test the restarts of a heuristic search."""
+
+    def test_leftover_budget_goes_to_restarts(self, engine):
+        """Test that restarts keep the best run and sum the statistics."""
+        request = make_request(30)
+        engine.config.config["search"] = {"patience": 20}
+        _, first = engine.restart(request, time_budget=1.0)
+
+        _, stats = engine.restarts(request, time_budget=0.5)
+
+        assert first.stop_reason == STOP_NO_IMPROVEMENT
+        assert stats.stop_reason == STOP_TIME_BUDGET
+        assert stats.steps > first.steps
+        assert stats.raw_score >= first.raw_score
+        assert stats.trace[-1][1] == stats.raw_score
+
+    def test_stops_on_target_score(self):
+        """Test that a run reaching the target score ends the restarts."""
+        engine = OptimizerEngine(game_type="wvw", game_mode="roaming")
+        request = CompositionOptimizationRequest(
+            squad_size=5, game_type="wvw", game_mode="roaming", target_score=0.01
+        )
+
+        _, stats = engine.restarts(request, time_budget=10.0)
+
+        assert stats.stop_reason == STOP_TARGET_SCORE
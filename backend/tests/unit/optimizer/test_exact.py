@@ -0,0 +1,161 @@
+"""Unit tests for the exact count-vector solver."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.exact import (
+    ExactSolver,
+    counts_to_solution,
+    solution_to_counts,
+)
+
+from app.schemas.composition import CompositionOptimizationRequest, FixedRole
+
+
+@pytest.fixture
+def engine():
+    """Create optimizer engine for WvW zerg."""
+    return OptimizerEngine(game_type="wvw", game_mode="zerg")
+
+
+def brute_force(engine, size):
+    """Best raw score over every multiset of templates."""
+    combos = np.array(
+        list(
+            itertools.combinations_with_replacement(
+                range(len(engine.build_catalogue)), size
+            )
+        ),
+        dtype=np.intp,
+    )
+    return float(engine.batch_scorer.raw_solutions(combos).max())
+
+
+class TestCountVectors:
+    """Test count vector helpers."""
+
+    def test_round_trip(self, engine):
+        """Test that a solution survives conversion to counts and back."""
+        request = CompositionOptimizationRequest(
+            squad_size=15, game_type="wvw", game_mode="zerg"
+        )
+        solution = engine.greedy_seed(request)
+
+        counts = solution_to_counts(solution, engine.build_catalogue)
+        rebuilt = counts_to_solution(counts, engine.build_catalogue)
+
+        assert sum(counts) == 15
+        assert sorted(map(id, rebuilt)) == sorted(map(id, solution))
+
+
+class TestExactSolver:
+    """Test ExactSolver class."""
+
+    @pytest.mark.parametrize(
+        "game_type,game_mode", [("wvw", "zerg"), ("wvw", "roaming"), ("pve", "raid")]
+    )
+    @pytest.mark.parametrize("size", [1, 3, 5])
+    def test_matches_brute_force(self, game_type, game_mode, size):
+        """Test that the solver finds the optimum of small squads."""
+        engine = OptimizerEngine(game_type=game_type, game_mode=game_mode)
+        solver = ExactSolver(engine.score_fn, engine.build_catalogue)
+
+        result = solver.solve(size)
+
+        assert result.proven_optimal
+        assert sum(result.counts) == size
+        assert result.raw_score == pytest.approx(brute_force(engine, size))
+
+    def test_full_squad_is_proven_optimal(self, engine):
+        """Test that a 50 player squad is solved without hitting the limit."""
+        solver = ExactSolver(engine.score_fn, engine.build_catalogue)
+
+        result = solver.solve(50, time_limit=10.0)
+
+        assert result.proven_optimal
+        assert sum(result.counts) == 50
+
+    def test_incumbent_is_not_worse(self, engine):
+        """Test that the optimum is at least as good as a given incumbent."""
+        solver = ExactSolver(engine.score_fn, engine.build_catalogue)
+        incumbent = [0] * len(engine.build_catalogue)
+        incumbent[0] = 20
+
+        result = solver.solve(20, incumbent=incumbent)
+        solution = counts_to_solution(incumbent, engine.build_catalogue)
+
+        assert (
+            result.raw_score
+            >= engine.batch_scorer.raw_solutions(engine.compiled.indices(solution))[0]
+        )
+
+    def test_min_counts_are_respected(self, engine):
+        """Test that fixed builds are always part of the solution."""
+        solver = ExactSolver(engine.score_fn, engine.build_catalogue)
+        min_counts = [0] * len(engine.build_catalogue)
+        min_counts[-1] = 7
+
+        result = solver.solve(10, min_counts=min_counts)
+
+        assert result.counts[-1] >= 7
+
+    def test_min_counts_exceeding_size(self, engine):
+        """Test that impossible fixed builds are rejected."""
+        solver = ExactSolver(engine.score_fn, engine.build_catalogue)
+        min_counts = [0] * len(engine.build_catalogue)
+        min_counts[0] = 6
+
+        with pytest.raises(ValueError):
+            solver.solve(5, min_counts=min_counts)
+
+
+class TestExactMode:
+    """Test OptimizerEngine.optimize with mode="exact"."""
+
+    def test_exact_not_worse_than_heuristic(self, engine):
+        """Test that exact mode scores at least as well as local search."""
+        request = CompositionOptimizationRequest(
+            squad_size=10, game_type="wvw", game_mode="zerg"
+        )
+
+        exact = engine.optimize(request, mode="exact")
+        heuristic = engine.optimize(request, time_budget=0.2)
+
+        assert len(exact.composition.members) == 10
+        assert exact.score >= heuristic.score - 1e-9
+
+    def test_exact_with_constraints(self, engine):
+        """Test that exact mode honours fixed roles and professions."""
+        request = CompositionOptimizationRequest(
+            squad_size=10,
+            game_type="wvw",
+            game_mode="zerg",
+            fixed_professions=[1, 9],
+            fixed_roles=[
+                FixedRole(
+                    profession_id=9,
+                    elite_specialization_id=19,
+                    count=4,
+                    role_type="utility",
+                )
+            ],
+        )
+
+        result = engine.optimize(request, mode="exact")
+        members = result.composition.members
+
+        assert len(members) == 10
+        assert all(member["profession_id"] in (1, 9) for member in members)
+        assert sum(member["elite_specialization_id"] == 19 for member in members) >= 4
+
+    def test_unknown_mode(self, engine):
+        """Test that an unknown mode is rejected."""
+        request = CompositionOptimizationRequest(
+            squad_size=5, game_type="wvw", game_mode="zerg"
+        )
+
+        with pytest.raises(ValueError):
+            engine.optimize(request, mode="genetic")
@@ -0,0 +1,150 @@
+"""Unit tests for optimization jobs run by the arq worker."""
+
+from datetime import datetime
+
+import pytest
+from arq import Retry
+from arq.jobs import JobResult, JobStatus
+from prometheus_client import REGISTRY
+
+from app.core.optimizer import jobs
+from app.core.optimizer.memo import OptimizerMemo
+from app.core.optimizer.pool import OptimizerPool
+from app.schemas.composition import (
+    CompositionOptimizationJobProgress,
+    CompositionOptimizationResult,
+)
+from tests.unit.optimizer.conftest import make_request
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the arq Redis connection."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Optimizer pool of one worker used by the jobs."""
+    pool = OptimizerPool(max_workers=1, max_queue=0)
+    monkeypatch.setattr(jobs, "get_optimizer_pool", lambda: pool)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def memo(monkeypatch):
+    """Empty optimizer memo used by the jobs."""
+    memo = OptimizerMemo()
+    monkeypatch.setattr(jobs, "get_optimizer_memo", lambda: memo)
+    return memo
+
+
+def job_payload(**kwargs):
+    """A WvW zerg optimization request as sent to the worker."""
+    return make_request(**kwargs).model_dump(mode="json")
+
+
+class TestOptimizeCompositionJob:
+    """Test optimize_composition_job function."""
+
+    async def test_job_reports_progress_and_returns_result(self, pool, memo):
+        """Test that the job publishes its incumbent and returns JSON."""
+        ctx = {"redis": FakeRedis(), "job_id": "job-1"}
+
+        result = await jobs.optimize_composition_job(ctx, job_payload(), 2.0)
+
+        result = CompositionOptimizationResult.model_validate(result)
+        assert len(result.composition.members) == 30
+        progress = CompositionOptimizationJobProgress.model_validate_json(
+            ctx["redis"].data[jobs.progress_key("job-1")]
+        )
+        assert progress.score == result.score
+        assert 0 <= progress.fraction <= 1
+        assert memo.stats()["entries"] == 1
+        assert result.debug is not None
+
+    async def test_memoized_job_skips_the_pool(self, pool, memo):
+        """Test that a job already optimized returns the cached result."""
+        ctx = {"redis": FakeRedis(), "job_id": "job-1"}
+        await jobs.optimize_composition_job(ctx, job_payload(), 2.0)
+
+        ctx = {"redis": FakeRedis(), "job_id": "job-2"}
+        await jobs.optimize_composition_job(ctx, job_payload(), 2.0)
+
+        assert pool.stats()["completed"] == 1
+        assert not ctx["redis"].data
+
+    async def test_full_pool_defers_the_job(self, pool, memo, monkeypatch):
+        """Test that a job is retried later when the pool is full."""
+        monkeypatch.setattr(pool, "_in_flight", 1)
+        ctx = {"redis": FakeRedis(), "job_id": "job-1"}
+
+        with pytest.raises(Retry):
+            await jobs.optimize_composition_job(ctx, job_payload(restarts=2), 2.0)
+
+
+class TestGetJobStatus:
+    """Test get_job_status function."""
+
+    async def test_run_statistics_are_published_once(self, pool, memo, monkeypatch):
+        """Test that the first poll of a result publishes its statistics."""
+        redis = FakeRedis()
+        request = job_payload()
+        output = await jobs.optimize_composition_job(
+            {"redis": redis, "job_id": "job-1"}, request, 1.0
+        )
+        now = datetime.now()
+        info = JobResult(
+            function=jobs.JOB_FUNCTION,
+            args=(request, 1.0),
+            kwargs={},
+            job_try=1,
+            enqueue_time=now,
+            score=None,
+            job_id="job-1",
+            success=True,
+            result=output,
+            start_time=now,
+            finish_time=now,
+            queue_name="arq:queue",
+        )
+
+        class FakeJob:
+            """arq job complete with ``info``."""
+
+            def __init__(self, job_id, redis):
+                pass
+
+            async def status(self):
+                return JobStatus.complete
+
+            async def info(self):
+                return info
+
+        monkeypatch.setattr(jobs, "Job", FakeJob)
+        labels = {
+            "game_type": "wvw",
+            "game_mode": "zerg",
+            "strategy": output["debug"]["strategy"],
+            "stop_reason": output["stop_reason"],
+        }
+        runs = REGISTRY.get_sample_value("optimizer_runs_total", labels) or 0.0
+
+        first = await jobs.get_job_status(redis, "job-1")
+        second = await jobs.get_job_status(redis, "job-1")
+
+        assert REGISTRY.get_sample_value("optimizer_runs_total", labels) == runs + 1
+        assert first.result.debug is None
+        assert second.result.debug is None
+        assert second.result.score == first.result.score
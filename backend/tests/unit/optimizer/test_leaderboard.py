@@ -0,0 +1,182 @@
+"""Unit tests for the bulk scores of stored compositions."""
+
+import numpy as np
+import pytest
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.optimizer.leaderboard import (
+    ranking_version,
+    score_chunk,
+    score_compositions,
+    score_configs,
+    unscored_compositions,
+)
+from app.core.optimizer.pool import OptimizerPool
+from app.core.optimizer.registry import get_engine
+from app.models import Base, Composition, CompositionScore, composition_members
+
+WVW_CONFIGS = 3
+
+
+@pytest.fixture
+def engine():
+    """Warm optimizer engine for WvW zerg."""
+    return get_engine("wvw", "zerg")
+
+
+@pytest.fixture
+async def db():
+    """Session of an empty in-memory database."""
+    database = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with database.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(database, expire_on_commit=False)() as session:
+        yield session
+    await database.dispose()
+
+
+@pytest.fixture
+def pool():
+    """Optimizer pool of one worker."""
+    pool = OptimizerPool(max_workers=1, max_queue=0)
+    yield pool
+    pool.shutdown()
+
+
+def random_members(engine, size, rng):
+    """(profession, elite specialization) members of random templates."""
+    builds = [
+        engine.build_catalogue[i]
+        for i in rng.integers(len(engine.build_catalogue), size=size)
+    ]
+    return [(build.profession_id, build.elite_spec_id) for build in builds]
+
+
+async def add_composition(db, game_mode, members):
+    """Store a composition and its members; return its id."""
+    composition = Composition(name="Stored", game_mode="wvw", created_by=1)
+    composition.game_mode = game_mode
+    db.add(composition)
+    await db.flush()
+    for user_id, (profession_id, elite_id) in enumerate(members, start=1):
+        await db.execute(
+            insert(composition_members).values(
+                composition_id=composition.id,
+                user_id=user_id,
+                profession_id=profession_id,
+                elite_specialization_id=elite_id,
+            )
+        )
+    await db.commit()
+    return composition.id
+
+
+class TestScoreChunk:
+    """Test score_chunk function."""
+
+    def test_scores_match_evaluation(self, engine):
+        """Test that batch scores are those of the engine evaluation."""
+        rng = np.random.default_rng(3)
+        compositions = [
+            (k, random_members(engine, size, rng))
+            for k, size in enumerate([5, 12, 5, 30, 12])
+        ]
+
+        entries = score_chunk("wvw", "zerg", compositions)
+
+        assert sorted(entry.composition_id for entry in entries) == list(range(5))
+        for entry in entries:
+            members = compositions[entry.composition_id][1]
+            solution = [
+                engine.build_catalogue[engine.match_template(*build)]
+                for build in members
+            ]
+            score, metrics, coverage, roles = engine.evaluate_solution(solution, None)
+            assert entry.version == engine.result_version
+            assert entry.score == pytest.approx(score)
+            assert entry.metrics["metrics"] == pytest.approx(metrics)
+            assert entry.metrics["boon_coverage"] == pytest.approx(coverage)
+            assert entry.metrics["role_distribution"] == roles
+
+    def test_unmatched_compositions_are_not_scored(self, engine):
+        """Test that compositions with an unknown or missing build get no score."""
+        known = random_members(engine, 5, np.random.default_rng(0))
+        compositions = [
+            (1, known),
+            (2, known + [(999, None)]),
+            (3, known + [(None, None)]),
+            (4, []),
+        ]
+
+        entries = score_chunk("wvw", "zerg", compositions)
+
+        scores = {entry.composition_id: entry.score for entry in entries}
+        assert scores[1] is not None
+        assert [scores[i] for i in (2, 3, 4)] == [None, None, None]
+
+
+class TestConfigs:
+    """Test the configs scoring and ranking stored compositions."""
+
+    def test_stored_game_modes(self):
+        """Test that a config scores its game type and its named modes."""
+        configs = {(t, m): stored for t, m, stored in score_configs()}
+
+        assert sum(t == "wvw" for t, _ in configs) == WVW_CONFIGS
+        assert configs[("wvw", "zerg")][:2] == ["wvw", "wvw_zerg"]
+
+    async def test_ranking_version(self, engine):
+        """Test that rankings read the scores of the current engine version."""
+        assert await ranking_version("wvw_zerg") == engine.result_version
+        with pytest.raises(ValueError, match="Unknown optimizer mode"):
+            await ranking_version("wvw_nope")
+
+
+class TestScoreCompositions:
+    """Test score_compositions function."""
+
+    async def test_only_unscored_compositions_are_scored(self, engine, db, pool):
+        """Test that runs score new and invalidated compositions only."""
+        rng = np.random.default_rng(1)
+        wvw = [
+            await add_composition(db, "wvw", random_members(engine, size, rng))
+            for size in (5, 10, 10)
+        ]
+        zerg = await add_composition(db, "wvw_zerg", random_members(engine, 8, rng))
+        await add_composition(db, "pvp", random_members(engine, 5, rng))
+        empty = await add_composition(db, "wvw", [])
+
+        assert await score_compositions(db, pool, chunk_size=2) == 3 * WVW_CONFIGS + 1
+        assert await score_compositions(db, pool) == 0
+        assert empty not in await unscored_compositions(
+            db, engine.result_version, ["wvw"]
+        )
+
+        await db.execute(
+            delete(CompositionScore).where(CompositionScore.composition_id == wvw[0])
+        )
+        await db.commit()
+        assert await score_compositions(db, pool) == WVW_CONFIGS
+        assert await score_compositions(db, pool, force=True) == 3 * WVW_CONFIGS + 1
+
+        rows = await db.execute(
+            select(CompositionScore.composition_id).where(
+                CompositionScore.version == engine.result_version,
+                CompositionScore.score.is_not(None),
+            )
+        )
+        assert sorted(rows.scalars()) == sorted(wvw + [zerg])
+
+    async def test_config_change_rescores(self, engine, db, pool):
+        """Test that scores of an old version are not current ones."""
+        rng = np.random.default_rng(2)
+        await add_composition(db, "wvw_zerg", random_members(engine, 10, rng))
+        assert await score_compositions(db, pool) == 1
+
+        await db.execute(CompositionScore.__table__.update().values(version="old"))
+        await db.commit()
+
+        assert await score_compositions(db, pool) == 1
+        versions = await db.execute(select(CompositionScore.version))
+        assert sorted(versions.scalars()) == sorted(["old", engine.result_version])
@@ -0,0 +1,160 @@
+"""Unit tests for reproducible optimizations and the result memo cache."""
+
+import threading
+
+import pytest
+
+from app.core.optimizer import registry
+from app.core.optimizer.engine import OptimizerEngine, request_hash
+from app.core.optimizer.memo import OptimizerMemo, memo_key
+from app.schemas.composition import FixedRole, OptimizationDebug
+from tests.unit.optimizer.conftest import make_request
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the async Redis client."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+        return True
+
+
+class TestRequestHash:
+    """Test request_hash function."""
+
+    def test_hash_ignores_set_order(self):
+        """Test that professions and fixed roles are hashed in canonical order."""
+        roles = [
+            FixedRole(profession_id=1, count=2, role_type="healer"),
+            FixedRole(profession_id=2, count=1, role_type="boon_support"),
+        ]
+        first = make_request(fixed_professions=[1, 2, 4], fixed_roles=roles)
+        second = make_request(fixed_professions=[4, 1, 2], fixed_roles=roles[::-1])
+
+        assert request_hash(first) == request_hash(second)
+
+    def test_hash_depends_on_constraints(self):
+        """Test that different requests get different hashes."""
+        assert request_hash(make_request()) != request_hash(make_request(min_cc=0.5))
+        assert request_hash(make_request()) != request_hash(make_request(squad_size=16))
+
+
+class TestReproducibility:
+    """Test that optimizations are deterministic."""
+
+    def test_optimize_is_reproducible(self):
+        """Test that two engines give the same composition for a request."""
+        request = make_request(squad_size=30)
+
+        results = [
+            OptimizerEngine(game_type="wvw", game_mode="zerg").optimize(
+                request, time_budget=5.0
+            )
+            for _ in range(2)
+        ]
+
+        members = [
+            [
+                (m["profession_id"], m["elite_specialization_id"])
+                for m in r.composition.members
+            ]
+            for r in results
+        ]
+        assert members[0] == members[1]
+        assert results[0].score == results[1].score
+
+
+class TestOptimizerMemo:
+    """Test OptimizerMemo class."""
+
+    @pytest.fixture
+    def result(self):
+        # Memoized results carry no run statistics
+        result = OptimizerEngine(game_type="wvw", game_mode="zerg").optimize(
+            make_request(squad_size=5), time_budget=1.0
+        )
+        return result.model_copy(update={"debug": None})
+
+    async def test_key_depends_on_mode_and_request(self):
+        """Test that keys identify the optimization they memoize."""
+        request = make_request()
+        key = await memo_key(request)
+
+        assert key == await memo_key(make_request())
+        assert key != await memo_key(request, mode="exact")
+        assert key != await memo_key(make_request(squad_size=20))
+
+    async def test_key_engine_lookup_leaves_the_loop(self, monkeypatch):
+        """Test that keys look the engine up outside the event loop thread."""
+        threads = []
+        get_engine = registry.get_engine
+
+        def lookup(game_type, game_mode):
+            threads.append(threading.current_thread())
+            return get_engine(game_type, game_mode)
+
+        monkeypatch.setattr(registry, "get_engine", lookup)
+        await memo_key(make_request())
+
+        assert threads and threading.current_thread() not in threads
+
+    async def test_local_hit(self, result):
+        """Test that a stored result is served from the in-process LRU."""
+        memo = OptimizerMemo(max_size=4)
+
+        assert await memo.get("key") is None
+        await memo.set("key", result)
+
+        assert await memo.get("key") is result
+        assert memo.stats() == {
+            "entries": 1,
+            "local_hits": 1,
+            "redis_hits": 0,
+            "misses": 1,
+        }
+
+    async def test_lru_eviction(self, result):
+        """Test that the least recently used entry is evicted first."""
+        memo = OptimizerMemo(max_size=2)
+        await memo.set("a", result)
+        await memo.set("b", result)
+        await memo.get("a")
+        await memo.set("c", result)
+
+        assert await memo.get("b") is None
+        assert await memo.get("a") is result
+        assert memo.stats()["entries"] == 2
+
+    async def test_run_statistics_are_not_memoized(self, result):
+        """Test that the debug block of a run is dropped from the memo."""
+        memo = OptimizerMemo()
+        debug = OptimizationDebug(
+            strategy="exact",
+            steps=0,
+            evaluations=10,
+            acceptances=0,
+            improvements=0,
+            phases={"exact": 0.01},
+        )
+        await memo.set("key", result.model_copy(update={"debug": debug}))
+
+        assert (await memo.get("key")).debug is None
+
+    async def test_redis_level_is_shared(self, result):
+        """Test that a result stored by one process is found by another."""
+        redis = FakeRedis()
+        await OptimizerMemo(redis_client=redis).set("key", result)
+        memo = OptimizerMemo(redis_client=redis)
+
+        cached = await memo.get("key")
+
+        assert cached.score == result.score
+        assert cached.composition.members == result.composition.members
+        assert memo.stats()["redis_hits"] == 1
+        assert await memo.get("key") is cached
@@ -0,0 +1,122 @@
+"""Unit tests for the optimizer run statistics and Prometheus metrics."""
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.optimizer.engine import (
+    OptimizerEngine,
+    optimize_composition,
+    request_hash,
+)
+from app.core.optimizer.metrics import observe_result
+from app.core.optimizer.pool import OptimizerPool
+from app.core.optimizer.strategies import LOCAL_SEARCH_BATCH_SIZE
+from tests.unit.optimizer.conftest import make_hard_request, make_request
+
+
+@pytest.fixture
+def engine():
+    """Create optimizer engine for WvW zerg."""
+    return OptimizerEngine(game_type="wvw", game_mode="zerg")
+
+
+def sample(name, **labels):
+    """Current value of a metric sample, 0 if never observed."""
+    labels.setdefault("game_type", "wvw")
+    labels.setdefault("game_mode", "zerg")
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestRunStatistics:
+    """Test the debug block of optimization results."""
+
+    def test_heuristic_run_phases(self, engine):
+        """Test that a heuristic run reports its phases and counters."""
+        result = engine.optimize(make_hard_request(), time_budget=0.5)
+
+        debug = result.debug
+        assert debug is not None
+        assert debug.strategy == "hill_climb"
+        assert debug.evaluations == debug.steps * LOCAL_SEARCH_BATCH_SIZE
+        assert debug.acceptances >= debug.improvements
+        assert {"greedy_seed", "search", "evaluate", "notes", "schema"} <= set(
+            debug.phases
+        )
+        assert all(elapsed >= 0 for elapsed in debug.phases.values())
+        assert debug.queue_wait is None
+
+    def test_exact_run_phases(self, engine):
+        """Test that a run solved exactly reports the exact phase."""
+        result = engine.optimize(make_request(squad_size=2), time_budget=1.0)
+
+        assert result.stop_reason == "proven_optimal"
+        assert result.debug.strategy == "exact"
+        assert "exact" in result.debug.phases
+
+    def test_debug_is_not_hashed(self):
+        """Test that asking for debug output doesn't change the memo key."""
+        assert request_hash(make_request(debug=True)) == request_hash(make_request())
+
+
+class TestObserveResult:
+    """Test observe_result function."""
+
+    def test_counters_are_published(self, engine):
+        """Test that the run statistics are added to the counters."""
+        result = engine.optimize(make_hard_request(), time_budget=0.2)
+        labels = {"strategy": result.debug.strategy}
+        runs = sample("optimizer_runs_total", stop_reason=result.stop_reason, **labels)
+        evaluations = sample("optimizer_evaluations_total", **labels)
+        searches = sample("optimizer_phase_seconds_count", phase="search", **labels)
+
+        observe_result(make_request(), result)
+
+        assert (
+            sample("optimizer_runs_total", stop_reason=result.stop_reason, **labels)
+            == runs + 1
+        )
+        assert (
+            sample("optimizer_evaluations_total", **labels)
+            == evaluations + result.debug.evaluations
+        )
+        assert (
+            sample("optimizer_phase_seconds_count", phase="search", **labels)
+            == searches + 1
+        )
+
+    def test_debug_is_stripped_unless_requested(self, engine):
+        """Test that the debug block is only returned on request."""
+        result = engine.optimize(make_request(), time_budget=0.2)
+
+        assert observe_result(make_request(), result).debug is None
+        assert observe_result(make_request(debug=True), result).debug is not None
+
+    def test_result_without_statistics(self, engine):
+        """Test that memoized results, without statistics, are left as is."""
+        result = engine.optimize(make_request(), time_budget=0.2)
+        result = result.model_copy(update={"debug": None})
+
+        assert observe_result(make_request(debug=True), result) is result
+
+
+class TestQueueWait:
+    """Test the queue wait reported by the optimizer pool."""
+
+    async def test_pool_reports_queue_wait(self):
+        """Test that pool jobs report how long they waited for a worker."""
+        pool = OptimizerPool(max_workers=1, max_queue=0)
+        before = REGISTRY.get_sample_value(
+            "optimizer_queue_wait_seconds_count", {"job": "optimize_composition"}
+        )
+        try:
+            result = await pool.run(optimize_composition, make_request(squad_size=5))
+        finally:
+            pool.shutdown()
+
+        assert result.debug.queue_wait >= 0
+        assert (
+            REGISTRY.get_sample_value(
+                "optimizer_queue_wait_seconds_count", {"job": "optimize_composition"}
+            )
+            == (before or 0) + 1
+        )
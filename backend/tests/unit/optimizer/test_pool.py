@@ -0,0 +1,123 @@
+"""Unit tests for the optimizer process pool."""
+
+import asyncio
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.core.optimizer.pool import OptimizerPool, OptimizerQueueFull
+from app.core.optimizer.engine import optimize_composition
+from app.schemas.composition import (
+    CompositionOptimizationRequest,
+    CompositionOptimizationResult,
+)
+
+
+@pytest.fixture
+def pool():
+    """Small optimizer pool, stopped after the test."""
+    pool = OptimizerPool(max_workers=1, max_queue=0, retry_after=7)
+    yield pool
+    pool.shutdown()
+
+
+class TestOptimizerPool:
+    """Test OptimizerPool class."""
+
+    def test_pool_is_lazy(self, pool):
+        """Test that no worker is started before the first job."""
+        assert not pool.started
+        assert pool.capacity == 1
+
+    async def test_run_executes_in_worker(self, pool):
+        """Test that run returns the worker result."""
+        result = await pool.run(pow, 2, 10)
+
+        assert result == 1024
+        assert pool.started
+        assert pool.in_flight == 0
+        assert pool.stats()["completed"] == 1
+
+    async def test_rejects_when_queue_full(self, pool):
+        """Test admission control when the pool is at capacity."""
+        pool.start()
+        busy = asyncio.ensure_future(pool.run(time.sleep, 0.5))
+        await asyncio.sleep(0)
+
+        with pytest.raises(OptimizerQueueFull) as exc_info:
+            await pool.run(pow, 2, 2)
+
+        assert exc_info.value.retry_after == 7
+        assert pool.stats()["rejected"] == 1
+        await busy
+        assert await pool.run(pow, 2, 2) == 4
+
+    async def test_run_optimizer(self, pool):
+        """Test running a full optimization in the pool."""
+        request = CompositionOptimizationRequest(
+            squad_size=5, game_type="pve", game_mode="fractale"
+        )
+
+        result = await pool.run(optimize_composition, request, 0.2)
+
+        assert isinstance(result, CompositionOptimizationResult)
+        assert len(result.composition.members) == 5
+
+    async def test_workers_use_warm_engines(self, pool):
+        """Test that workers serve optimizations from their engine registry."""
+        request = CompositionOptimizationRequest(
+            squad_size=5, game_type="wvw", game_mode="zerg"
+        )
+
+        await pool.run(optimize_composition, request, 0.1)
+        engines = pool.stats()["engines"]
+
+        assert engines["misses"] > 0
+        assert engines["hits"] == 1
+        assert engines["rebuilds"] == 0
+
+    async def test_failed_jobs_are_not_completed(self, pool):
+        """Test that jobs raising in the worker are counted as failed."""
+        with pytest.raises(ZeroDivisionError):
+            await pool.run(divmod, 1, 0)
+        with pytest.raises(ZeroDivisionError):
+            await pool.run_many(divmod, [(1, 0)])
+
+        assert await pool.run(divmod, 1, 1) == (1, 0)
+
+        stats = pool.stats()
+        assert (stats["completed"], stats["failed"]) == (1, 2)
+        assert pool.in_flight == 0
+
+    async def test_restart_keeps_shared_queues(self, pool):
+        """Test that restarting broken workers keeps the streamed job queues."""
+        queue, event = pool.channel()
+        pool.start()
+
+        pool._restart_broken(pool._executor)
+        queue.put("progress")
+
+        assert pool.started
+        assert queue.get(timeout=5) == "progress"
+        assert not event.is_set()
+
+    async def test_broken_pool_restarts_once(self, monkeypatch):
+        """Test that jobs lost with their workers restart the pool once."""
+        pool = OptimizerPool(max_workers=2, max_queue=0)
+        starts = []
+        start = pool.start
+        monkeypatch.setattr(pool, "start", lambda: starts.append(start()))
+        try:
+            outcomes = await asyncio.gather(
+                pool.run(os._exit, 1),
+                pool.run(os._exit, 1),
+                return_exceptions=True,
+            )
+
+            assert all(isinstance(e, BrokenProcessPool) for e in outcomes)
+            assert len(starts) == 2
+            assert await pool.run(divmod, 7, 2) == (3, 1)
+        finally:
+            pool.shutdown()
@@ -0,0 +1,114 @@
+"""Unit tests for portfolio (multi-start) optimization."""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app.core.optimizer import portfolio
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.pool import OptimizerPool, OptimizerQueueFull
+from app.core.optimizer.portfolio import optimize_portfolio, run_restart
+from app.schemas.composition import FixedRole
+from tests.unit.optimizer.conftest import make_hard_request, make_request
+
+
+@pytest.fixture
+def pool():
+    """Optimizer pool of two workers, stopped after the test."""
+    pool = OptimizerPool(max_workers=2, max_queue=0)
+    yield pool
+    pool.shutdown()
+
+
+class TestRestarts:
+    """Test independent restarts of the engine."""
+
+    def test_restarts_start_from_different_solutions(self):
+        """Test that restarts perturb the seed but keep fixed roles."""
+        engine = OptimizerEngine(game_type="wvw", game_mode="zerg")
+        request = make_request(
+            fixed_roles=[
+                FixedRole(
+                    profession_id=8,
+                    elite_specialization_id=17,
+                    count=3,
+                    role_type="power_damage",
+                )
+            ]
+        )
+        deadeye = next(b for b in engine.build_catalogue if b.elite_spec_id == 17)
+        seed = [deadeye] * 3 + engine.greedy_seed(request)[:27]
+
+        perturbed = engine.perturb(seed, request, np.random.default_rng(1))
+
+        assert perturbed != seed
+        assert perturbed[:3] == [deadeye] * 3
+
+    def test_run_restart_returns_template_indices(self):
+        """Test that a restart outcome can be mapped back to builds."""
+        request = make_request()
+
+        outcome = run_restart(request, 1, time.time() + 0.5)
+
+        assert outcome.restart == 1
+        assert len(outcome.indices) == 30
+        assert outcome.stats.elapsed < 1.0
+
+
+class TestOptimizerPoolRunMany:
+    """Test OptimizerPool.run_many."""
+
+    async def test_run_many_returns_results_in_order(self, pool):
+        """Test that every job result is returned in submission order."""
+        assert await pool.run_many(pow, [(2, 3), (2, 4)]) == [8, 16]
+        assert pool.stats()["completed"] == 2
+
+    async def test_run_many_is_all_or_nothing(self, pool):
+        """Test that jobs beyond capacity reject the whole batch."""
+        pool.start()
+        busy = asyncio.ensure_future(pool.run(time.sleep, 0.3))
+        await asyncio.sleep(0)
+
+        with pytest.raises(OptimizerQueueFull):
+            await pool.run_many(pow, [(2, 3), (2, 4)])
+
+        assert pool.in_flight == 1
+        await busy
+
+
+class TestOptimizePortfolio:
+    """Test optimize_portfolio function."""
+
+    async def test_portfolio_keeps_best_restart(self, pool):
+        """Test that the best restart is returned with every restart's stats."""
+        request = make_hard_request(restarts=4)
+
+        result = await optimize_portfolio(request, pool, time_budget=1.0)
+
+        assert len(result.restarts) == 2
+        raw_scores = [stats.raw_score for stats in result.restarts]
+        assert raw_scores == sorted(raw_scores, reverse=True)
+        assert result.stop_reason == result.restarts[0].stop_reason
+        assert len(result.composition.members) == 30
+
+    async def test_small_request_runs_once(self, pool):
+        """Test that tiny search spaces skip the portfolio."""
+        result = await optimize_portfolio(make_request(5, restarts=4), pool)
+
+        assert result.restarts is None
+        assert result.stop_reason == "proven_optimal"
+
+    async def test_engine_stays_in_the_workers(self, pool, monkeypatch):
+        """Test that the restarts are planned and merged by pool jobs."""
+
+        def no_engine(game_type, game_mode):
+            raise AssertionError("engine used outside the pool")
+
+        monkeypatch.setattr(portfolio, "get_engine", no_engine)
+
+        result = await optimize_portfolio(make_hard_request(restarts=2), pool, 0.5)
+
+        assert len(result.restarts) == 2
+        assert pool.stats()["completed"] == 4
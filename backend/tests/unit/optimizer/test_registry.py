@@ -0,0 +1,102 @@
+"""Unit tests for the optimizer engine registry."""
+
+import os
+import shutil
+
+import pytest
+
+from app.core.optimizer.engine import CONFIG_DIR, config_index
+from app.core.optimizer.registry import EngineRegistry
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    """Copy of the optimizer configs that tests can modify."""
+    for name in ("wvw_zerg.yml", "wvw_guild.yml"):
+        shutil.copy(CONFIG_DIR / name, tmp_path / name)
+    return tmp_path
+
+
+@pytest.fixture
+def registry(config_dir):
+    """Registry over the copied configs."""
+    return EngineRegistry(config_dir)
+
+
+def touch(path, offset_ns=10**9):
+    """Move the mtime of a file forward without changing its content."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset_ns))
+
+
+class TestConfigIndex:
+    """Test config_index function."""
+
+    def test_index_uses_file_name_and_declared_mode(self):
+        """Test that configs are found by file name and by their mode."""
+        index = config_index()
+
+        assert index[("wvw", "zerg")].name == "wvw_zerg.yml"
+        assert index[("pve", "raid")].name == "pve_raid.yml"
+        assert index[("wvw", "guild_raid")].name == "wvw_guild.yml"
+
+
+class TestEngineRegistry:
+    """Test EngineRegistry class."""
+
+    def test_warm_builds_every_config(self, registry):
+        """Test that warming builds one engine per config key."""
+        keys = registry.warm()
+
+        assert ("wvw", "zerg") in keys
+        assert ("wvw", "guild_raid") in keys
+        assert registry.stats() == {
+            "hits": 0,
+            "misses": len(keys),
+            "rebuilds": 0,
+            "engines": len(keys),
+        }
+
+    def test_engine_loads_its_config(self, registry, config_dir):
+        """Test that engines use the YAML file of their key."""
+        engine = registry.get("wvw", "zerg")
+
+        assert engine.config.path == config_dir / "wvw_zerg.yml"
+        assert engine.config.critical_boons["resolution"] == 0.70
+
+    def test_get_reuses_engine(self, registry):
+        """Test that repeated lookups return the same engine."""
+        engine = registry.get("wvw", "zerg")
+
+        assert registry.get("wvw", "zerg") is engine
+        assert registry.stats()["hits"] == 1
+        assert registry.stats()["misses"] == 1
+
+    def test_touched_config_is_not_rebuilt(self, registry, config_dir):
+        """Test that an mtime change without a content change is a hit."""
+        engine = registry.get("wvw", "zerg")
+        touch(config_dir / "wvw_zerg.yml")
+
+        assert registry.get("wvw", "zerg") is engine
+        assert registry.stats()["rebuilds"] == 0
+
+    def test_modified_config_is_rebuilt(self, registry, config_dir):
+        """Test that a content change rebuilds the engine."""
+        path = config_dir / "wvw_zerg.yml"
+        engine = registry.get("wvw", "zerg")
+        path.write_text(path.read_text().replace("might: 0.90", "might: 0.50"))
+        touch(path)
+
+        rebuilt = registry.get("wvw", "zerg")
+
+        assert rebuilt is not engine
+        assert rebuilt.config.critical_boons["might"] == 0.50
+        assert registry.stats()["rebuilds"] == 1
+
+    def test_unknown_mode_uses_default_config(self, registry):
+        """Test that a key without config file gets a default engine once."""
+        engine = registry.get("wvw", "unknown")
+
+        assert registry.get("wvw", "unknown") is engine
+        assert engine.config.weights
+        assert registry.stats()["misses"] == 1
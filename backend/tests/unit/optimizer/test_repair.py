@@ -0,0 +1,137 @@
+"""Unit tests for the warm-start repair of compositions."""
+
+import pytest
+
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.repair import repair, roster, roster_member
+from app.core.optimizer.strategies import STOP_MAX_SWAPS
+from app.schemas.composition import (
+    CompositionOptimizationRequest,
+    CompositionRepairRequest,
+    RosterMember,
+)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """Create optimizer engine for WvW zerg."""
+    return OptimizerEngine(game_type="wvw", game_mode="zerg")
+
+
+@pytest.fixture(scope="module")
+def members(engine):
+    """Roster of a locally optimal 15-player zerg composition."""
+    request = CompositionOptimizationRequest(
+        squad_size=15, game_type="wvw", game_mode="zerg"
+    )
+    solution, _ = engine.local_search(
+        engine.greedy_seed(request), request, time_budget=0.5
+    )
+    return [roster_member(build) for build in solution]
+
+
+def repair_request(members, **kwargs):
+    return CompositionRepairRequest(
+        game_type="wvw", game_mode="zerg", members=members, **kwargs
+    )
+
+
+def professions(result):
+    return [member["profession_id"] for member in result.result.composition.members]
+
+
+class TestRoster:
+    """Test roster function."""
+
+    def test_removed_then_added(self, members):
+        """Test that removed members leave and added players come last."""
+        newcomer = RosterMember(profession_id=3)
+        request = repair_request(members[:3], removed=[1], added=[newcomer])
+
+        assert roster(request) == [members[0], members[2], newcomer]
+
+    def test_unknown_removed_member(self, members):
+        """Test that removing an unknown member is rejected."""
+        with pytest.raises(ValueError, match="Unknown removed member"):
+            roster(repair_request(members, removed=[15]))
+
+    def test_source_is_required(self):
+        """Test that a composition id or members are required, not both."""
+        with pytest.raises(ValueError):
+            CompositionRepairRequest(game_type="wvw", game_mode="zerg")
+        with pytest.raises(ValueError):
+            CompositionRepairRequest(
+                game_type="wvw", game_mode="zerg", composition_id=1, members=[]
+            )
+
+
+class TestRepair:
+    """Test repair function."""
+
+    def test_unchanged_roster_needs_no_swap(self, engine, members):
+        """Test that a locally optimal composition is kept as is."""
+        result = repair(engine, repair_request(members))
+
+        assert result.swaps == []
+        assert result.raw_score == result.raw_score_before
+
+    def test_departure_is_repaired_with_few_swaps(self, engine, members):
+        """Test that losing players is repaired by changing a few builds."""
+        healers = [
+            i for i, member in enumerate(members) if member.role_type == "healer"
+        ]
+        result = repair(engine, repair_request(members, removed=healers))
+
+        assert 0 < len(result.swaps) <= len(healers) + 2
+        assert result.raw_score > result.raw_score_before
+        assert len(result.result.composition.members) == 15 - len(healers)
+        assert result.elapsed < 0.1
+
+    def test_swaps_describe_the_changes(self, engine, members):
+        """Test that swaps turn the roster into the repaired composition."""
+        request = repair_request(members, removed=[0, 1, 2])
+        players = roster(request)
+
+        result = repair(engine, request)
+
+        after = {swap.member: swap.after for swap in result.swaps}
+        expected = [
+            after.get(slot, player).profession_id for slot, player in enumerate(players)
+        ]
+        assert professions(result) == expected
+        for swap in result.swaps:
+            assert swap.before.profession_id == players[swap.member].profession_id
+            assert swap.gain > 0
+
+    def test_locked_members_keep_their_build(self, engine, members):
+        """Test that locked members are never swapped."""
+        locked = [member.model_copy(update={"locked": True}) for member in members]
+        result = repair(engine, repair_request(locked, removed=[0, 1, 2]))
+
+        assert result.swaps == []
+
+    def test_locked_professions(self, engine, members):
+        """Test that members of a locked profession keep their profession."""
+        locked = sorted({member.profession_id for member in members})
+        request = repair_request(members, removed=[0, 1, 2], locked_professions=locked)
+
+        result = repair(engine, request)
+
+        for swap in result.swaps:
+            assert swap.after.profession_id == swap.before.profession_id
+
+    def test_max_swaps(self, engine, members):
+        """Test that at most max_swaps members are asked to change."""
+        request = repair_request(members, removed=list(range(6)), max_swaps=1)
+
+        result = repair(engine, request)
+
+        assert len(result.swaps) <= 1
+        assert result.result.stop_reason == STOP_MAX_SWAPS
+
+    def test_unknown_build(self, engine, members):
+        """Test that members without a build template are rejected."""
+        request = repair_request(members, added=[RosterMember(profession_id=999)])
+
+        with pytest.raises(ValueError, match="No build template"):
+            repair(engine, request)
@@ -0,0 +1,78 @@
+"""Unit tests for the what-if analysis of compositions."""
+
+import numpy as np
+import pytest
+
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.repair import member_templates, roster_member
+from app.core.optimizer.sensitivity import sensitivity
+from app.schemas.composition import (
+    CompositionOptimizationRequest,
+    CompositionSensitivityRequest,
+)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """Create optimizer engine for WvW zerg."""
+    return OptimizerEngine(game_type="wvw", game_mode="zerg")
+
+
+@pytest.fixture(scope="module")
+def members(engine):
+    """Roster of the greedy seed of a 12-player zerg composition."""
+    request = CompositionOptimizationRequest(
+        squad_size=12, game_type="wvw", game_mode="zerg"
+    )
+    return [roster_member(build) for build in engine.greedy_seed(request)]
+
+
+def analyse(engine, members):
+    return sensitivity(
+        engine,
+        CompositionSensitivityRequest(
+            game_type="wvw", game_mode="zerg", members=members
+        ),
+    )
+
+
+class TestSensitivity:
+    """Test sensitivity function."""
+
+    def test_deltas_match_full_evaluation(self, engine, members):
+        """Test that each change is the score change of the changed squad."""
+        result = analyse(engine, members)
+        indices = member_templates(engine, members)
+        scorer = engine.batch_scorer
+
+        assert len(result.deltas) == len(members)
+        assert len(result.templates) == len(engine.compiled)
+        assert result.raw_score == pytest.approx(scorer.raw_solutions(indices)[0])
+        for member in (0, 5, 11):
+            for template in range(len(engine.compiled)):
+                changed = indices.copy()
+                changed[member] = template
+                expected = scorer.raw_solutions(changed)[0] - result.raw_score
+                assert result.deltas[member][template] == pytest.approx(expected)
+
+    def test_own_build_is_zero(self, engine, members):
+        """Test that a member keeping their build changes nothing."""
+        result = analyse(engine, members)
+        indices = member_templates(engine, members)
+
+        for member, template in enumerate(indices):
+            assert result.deltas[member][template] == 0.0
+
+    def test_best_change(self, engine, members):
+        """Test that the best change is the largest improving delta."""
+        result = analyse(engine, members)
+        deltas = np.array(result.deltas)
+
+        assert result.best is not None
+        assert result.best.gain == pytest.approx(deltas.max())
+        assert deltas[result.best.member].max() == pytest.approx(result.best.gain)
+
+    def test_invalid_squad_size(self, engine):
+        """Test that an empty squad is rejected."""
+        with pytest.raises(ValueError, match="Squad size"):
+            analyse(engine, [])
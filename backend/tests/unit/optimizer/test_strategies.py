@@ -0,0 +1,249 @@
+"""Unit tests for the local search strategies."""
+
+import numpy as np
+import pytest
+
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.strategies import (
+    STRATEGIES,
+    SearchState,
+    SimulatedAnnealing,
+    TabuSearch,
+    get_strategy,
+)
+from app.schemas.composition import FixedRole
+from tests.unit.optimizer.conftest import make_request
+
+
+@pytest.fixture
+def engine():
+    """Create optimizer engine for WvW zerg."""
+    return OptimizerEngine(game_type="wvw", game_mode="zerg")
+
+
+def make_state(score=0.0, best_score=0.0, step=1):
+    """Search state of a 4-slot composition."""
+    indices = np.zeros(4, dtype=int)
+    return SearchState(indices, np.zeros(3), np.zeros(2), score, best_score, step)
+
+
+class TestGetStrategy:
+    """Test get_strategy function."""
+
+    def test_params_come_from_search_config(self):
+        """Test that a strategy gets its own section of the search config."""
+        strategy = get_strategy("tabu", {"patience": 5, "tabu": {"tenure": 7}})
+
+        assert isinstance(strategy, TabuSearch)
+        assert strategy.params == {"tenure": 7}
+
+    def test_unknown_strategy(self):
+        """Test that unknown strategies are rejected."""
+        with pytest.raises(ValueError, match="Unknown search strategy"):
+            get_strategy("genetic")
+
+
+class TestStrategies:
+    """Test every strategy through the engine."""
+
+    @pytest.mark.parametrize("name", sorted(STRATEGIES))
+    def test_search_never_loses_best_score(self, engine, name):
+        """Test that the returned solution is the best one seen."""
+        request = make_request(strategy=name)
+        solution = engine.greedy_seed(request)
+        initial = engine.evaluate_solution(solution, request)[0]
+
+        result, stats = engine.local_search(solution, request, time_budget=0.5)
+
+        assert stats.strategy == name
+        assert engine.evaluate_solution(result, request)[0] >= initial
+        assert stats.trace[-1][1] == stats.raw_score
+        scores = [score for _, score in stats.trace]
+        assert scores == sorted(scores)
+
+    @pytest.mark.parametrize("name", ["annealing", "tabu"])
+    def test_leaves_hill_climbing_optimum(self, engine, name):
+        """Test that annealing and tabu end past the hill climbing optimum."""
+        request = make_request(squad_size=5)
+        seed = engine.greedy_seed(request)
+
+        scores = {}
+        for strategy in ("hill_climb", name):
+            _, stats = engine.local_search(
+                seed,
+                request,
+                time_budget=5.0,
+                rng=np.random.default_rng(0),
+                strategy=strategy,
+            )
+            assert stats.stop_reason == "no_improvement"
+            scores[strategy] = stats.raw_score
+
+        assert scores[name] > scores["hill_climb"]
+
+    @pytest.mark.parametrize("name", sorted(STRATEGIES))
+    def test_fixed_roles_are_kept(self, engine, name):
+        """Test that no strategy swaps slots holding a fixed role."""
+        request = make_request(
+            squad_size=10,
+            strategy=name,
+            fixed_roles=[
+                FixedRole(
+                    profession_id=8,
+                    elite_specialization_id=17,
+                    count=3,
+                    role_type="power_damage",
+                )
+            ],
+        )
+        deadeye = next(b for b in engine.build_catalogue if b.elite_spec_id == 17)
+        solution = [deadeye] * 3 + engine.greedy_seed(request)[:7]
+
+        result, _ = engine.local_search(solution, request, time_budget=0.1)
+
+        assert result.count(deadeye) >= 3
+
+    def test_fixed_slots_are_resolved_once(self, engine):
+        """Test that only the first count slots of a fixed template are frozen."""
+        request = make_request(
+            squad_size=6,
+            fixed_roles=[
+                FixedRole(
+                    profession_id=8,
+                    elite_specialization_id=17,
+                    count=2,
+                    role_type="power_damage",
+                )
+            ],
+        )
+        deadeye = next(
+            i for i, b in enumerate(engine.build_catalogue) if b.elite_spec_id == 17
+        )
+        other = (deadeye + 1) % len(engine.build_catalogue)
+        indices = np.array([other, deadeye, other, deadeye, deadeye, other])
+
+        frozen = engine.fixed_slots(request, indices)
+
+        assert frozen.tolist() == [False, True, False, True, False, False]
+
+    def test_greedy_seed_places_exact_fixed_count(self, engine):
+        """Test that the greedy seed holds every fixed role up front."""
+        request = make_request(
+            squad_size=10,
+            fixed_roles=[
+                FixedRole(
+                    profession_id=8,
+                    elite_specialization_id=17,
+                    count=3,
+                    role_type="power_damage",
+                ),
+                FixedRole(profession_id=1, count=2, role_type="healer"),
+            ],
+        )
+        templates = [
+            engine.build_catalogue[template]
+            for template, _ in engine._fixed_roles(request)
+        ]
+
+        seed = engine.greedy_seed(request)
+
+        assert len(seed) == 10
+        assert seed[:5] == [templates[0]] * 3 + [templates[1]] * 2
+        assert engine.fixed_slots(request, engine.compiled.indices(seed))[:5].all()
+
+    def test_strategy_from_config(self, engine):
+        """Test that the config strategy applies when the request has none."""
+        engine.config.config["search"] = {"strategy": "tabu"}
+
+        _, stats = engine.local_search(
+            engine.greedy_seed(make_request()), make_request(), time_budget=0.1
+        )
+
+        assert stats.strategy == "tabu"
+        assert engine.strategy_name(make_request(strategy="annealing")) == "annealing"
+
+    def test_optimize_rejects_unknown_strategy(self, engine):
+        """Test that an unknown strategy fails the optimization."""
+        with pytest.raises(ValueError):
+            engine.optimize(make_request(strategy="genetic"), time_budget=0.1)
+
+
+class TestSimulatedAnnealing:
+    """Test SimulatedAnnealing class."""
+
+    def test_accepts_worse_moves_when_hot(self):
+        """Test that worse moves are accepted at high temperature only."""
+        rng = np.random.default_rng(0)
+        old, new = np.array([0, 1]), np.array([1, 2])
+        scores = np.array([-0.01, -0.02])
+        hot = SimulatedAnnealing({"initial_temperature": 100.0})
+        cold = SimulatedAnnealing({"initial_temperature": 0.0})
+        hot.start(make_state(), 3)
+        cold.start(make_state(), 3)
+
+        assert hot.choose(make_state(), scores, old, old, new, rng) == 0
+        assert cold.choose(make_state(), scores, old, old, new, rng) is None
+        assert hot.temperature < 100.0
+
+
+class TestTabuSearch:
+    """Test TabuSearch class."""
+
+    def test_removed_template_is_tabu(self):
+        """Test that a removed template cannot come back during its tenure."""
+        rng = np.random.default_rng(0)
+        tabu = TabuSearch({"tenure": 5})
+        tabu.start(make_state(), 3)
+        slots = np.array([0, 1])
+
+        # Replace template 0 by template 1 in slot 0
+        first = tabu.choose(
+            make_state(step=1),
+            np.array([0.1, -1.0]),
+            slots,
+            np.array([0, 0]),
+            np.array([1, 2]),
+            rng,
+        )
+        # Putting template 0 back, in any slot, is now tabu...
+        second = tabu.choose(
+            make_state(score=0.1, best_score=0.1, step=2),
+            np.array([0.05, -0.5]),
+            slots,
+            np.array([1, 2]),
+            np.array([0, 1]),
+            rng,
+        )
+        # ...unless it beats the best score
+        third = tabu.choose(
+            make_state(score=0.1, best_score=0.1, step=3),
+            np.array([0.2, -0.5]),
+            slots,
+            np.array([2, 2]),
+            np.array([0, 1]),
+            rng,
+        )
+
+        assert first == 0
+        assert second == 1
+        assert third == 0
+
+    def test_rejected_swaps_are_not_made_tabu(self):
+        """Test that a batch of swaps rejected by constraints leaves no tabu."""
+        rng = np.random.default_rng(0)
+        tabu = TabuSearch({"tenure": 5})
+        tabu.start(make_state(), 3)
+        slots = np.array([0, 1])
+
+        choice = tabu.choose(
+            make_state(step=1),
+            np.array([-np.inf, -np.inf]),
+            slots,
+            np.array([0, 0]),
+            np.array([1, 2]),
+            rng,
+        )
+
+        assert choice is None
+        assert not tabu.removed_until.any()
+        assert not tabu.added_until.any()
@@ -0,0 +1,100 @@
+"""Unit tests for streamed (anytime) optimization."""
+
+import asyncio
+import queue
+import threading
+import time
+
+import pytest
+
+from app.core.optimizer.pool import OptimizerPool
+from app.core.optimizer.stream import run_streamed, stream_incumbents
+from app.schemas.composition import (
+    CompositionOptimizationIncumbent,
+)
+from tests.unit.optimizer.conftest import make_hard_request, make_request
+
+
+@pytest.fixture
+def pool():
+    """Optimizer pool of one worker, stopped after the test."""
+    pool = OptimizerPool(max_workers=1, max_queue=0)
+    yield pool
+    pool.shutdown()
+
+
+def drain(events):
+    """Incumbents put on a queue by run_streamed."""
+    incumbents = []
+    while not events.empty():
+        data = events.get_nowait()
+        incumbents.append(CompositionOptimizationIncumbent.model_validate_json(data))
+    return incumbents
+
+
+class TestRunStreamed:
+    """Test run_streamed function."""
+
+    def test_publishes_seed_improvements_and_final(self):
+        """Test that every incumbent improves on the previous one."""
+        events = queue.Queue()
+
+        run_streamed(make_hard_request(), events, threading.Event(), time_budget=1.0)
+
+        incumbents = drain(events)
+        assert len(incumbents) >= 3
+        assert incumbents[0].iteration == 0
+        assert [i.final for i in incumbents] == [False] * (len(incumbents) - 1) + [True]
+        scores = [i.raw_score for i in incumbents]
+        assert scores == sorted(scores)
+        assert incumbents[-1].result.stop_reason == "time_budget"
+
+    def test_cancelled_run_stops_early(self):
+        """Test that a set cancel event stops the local search."""
+        events = queue.Queue()
+        cancel = threading.Event()
+        cancel.set()
+
+        run_streamed(make_hard_request(), events, cancel, time_budget=5.0)
+
+        final = drain(events)[-1]
+        assert final.final
+        assert final.result.stop_reason == "cancelled"
+        assert final.elapsed < 1.0
+
+    def test_small_request_is_solved_exactly(self):
+        """Test that tiny search spaces publish the proven optimum only."""
+        events = queue.Queue()
+
+        run_streamed(make_request(5), events, threading.Event())
+
+        incumbents = drain(events)
+        assert len(incumbents) == 1
+        assert incumbents[0].result.stop_reason == "proven_optimal"
+
+
+class TestStreamIncumbents:
+    """Test stream_incumbents function."""
+
+    async def test_streams_until_final(self, pool):
+        """Test that incumbents are read from the worker until the final one."""
+        incumbents = [i async for i in stream_incumbents(make_request(), pool)]
+
+        assert incumbents[-1].final
+        assert pool.in_flight == 0
+
+    async def test_closing_early_frees_the_worker(self, pool):
+        """Test that closing the stream cancels the run in the worker."""
+        stream = stream_incumbents(make_request(40, target_score=1.0), pool)
+        first = await stream.__anext__()
+        await stream.aclose()
+
+        # The only worker is released for the next job (asyncio.sleep
+        # would never return under the frozen clock of the test session)
+        loop = asyncio.get_running_loop()
+        for _ in range(50):
+            if not pool.in_flight:
+                break
+            await loop.run_in_executor(None, time.sleep, 0.02)
+        assert first.iteration == 0
+        assert await pool.run(pow, 2, 3) == 8
@@ -0,0 +1,154 @@
+"""Unit tests for the synergy and duplicate elite terms of the score."""
+
+import numpy as np
+import pytest
+
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.synergy import PairTerms, parse_synergy
+from app.schemas.composition import CompositionOptimizationRequest
+
+
+@pytest.fixture
+def engine():
+    """Create optimizer engine for WvW zerg."""
+    return OptimizerEngine(game_type="wvw", game_mode="zerg")
+
+
+def template(engine, elite):
+    """Catalogue index of the template of an elite specialization."""
+    return next(
+        i
+        for i, build in enumerate(engine.build_catalogue)
+        if build.elite_spec_name == elite
+    )
+
+
+class TestParseSynergy:
+    """Test parse_synergy function."""
+
+    def test_pairs(self):
+        """Test that two-token names give their tokens."""
+        assert parse_synergy("firebrand_scourge") == ("firebrand", "scourge")
+
+    def test_other_names(self):
+        """Test that names that aren't a pair are ignored."""
+        assert parse_synergy("power_dps_synergy") is None
+        assert parse_synergy("firebrand") is None
+
+
+class TestPairTerms:
+    """Test PairTerms class."""
+
+    def test_matrix_of_config_synergies(self, engine):
+        """Test that each synergy weighs the pairs of its two templates."""
+        pairs = engine.score_fn.pairs
+        firebrand = template(engine, "Firebrand")
+        scourge = template(engine, "Scourge")
+
+        assert pairs.synergies == [
+            "firebrand_scourge",
+            "herald_scrapper",
+            "tempest_druid",
+        ]
+        assert pairs.matrix[firebrand, scourge] == pytest.approx(0.05 / 2)
+        assert (pairs.matrix == pairs.matrix.T).all()
+        assert pairs.matrix[firebrand, firebrand] == 0
+        assert pairs.duplicate_penalty == 0.1
+
+    def test_profession_tokens(self):
+        """Test that tokens also match the start of profession names."""
+        engine = OptimizerEngine(game_type="wvw", game_mode="roaming")
+        pairs = engine.score_fn.pairs
+
+        druid = template(engine, "Druid")
+        scourge = template(engine, "Scourge")
+        assert "ranger_necro" in pairs.synergies
+        assert pairs.matrix[druid, scourge] > 0
+
+    def test_config_without_pairs(self):
+        """Test that configs without synergy pairs nor penalty compile to None."""
+        engine = OptimizerEngine(game_type="pve", game_mode="openworld")
+
+        assert engine.score_fn.pairs is None
+        assert PairTerms.compile(engine.config, engine.build_catalogue) is None
+
+    def test_even_split_earns_full_weight(self, engine):
+        """Test that a squad split between both sides of a synergy earns it."""
+        pairs = engine.score_fn.pairs
+        counts = np.zeros(len(pairs))
+        counts[template(engine, "Firebrand")] = 4
+        counts[template(engine, "Scourge")] = 4
+
+        assert pairs.raw(counts, 8)[0] == pytest.approx(0.05)
+
+    def test_duplicate_elite_penalty(self, engine):
+        """Test that players beyond the elite limit are penalized."""
+        pairs = engine.score_fn.pairs
+        counts = np.zeros(len(pairs))
+        counts[template(engine, "Willbender")] = 7
+        counts[template(engine, "Spellbreaker")] = 3
+
+        assert pairs.raw(counts, 10)[0] == pytest.approx(-0.1 * 3 / 10)
+
+
+class TestPairCounts:
+    """Test PairCounts class."""
+
+    def test_swaps_match_full_evaluation(self, engine):
+        """Test that incremental pair terms match scoring each composition."""
+        rng = np.random.default_rng(3)
+        scorer = engine.batch_scorer
+        indices = rng.integers(len(engine.compiled), size=30)
+        pairs = scorer.pair_counts(indices)
+
+        for _ in range(50):
+            old = indices[rng.integers(indices.size, size=20)]
+            new = rng.integers(len(engine.compiled), size=20)
+            values = pairs.swap_values(old, new)
+            for k in range(20):
+                neighbour = indices.copy()
+                neighbour[np.flatnonzero(indices == old[k])[0]] = new[k]
+                counts = engine.compiled.template_counts(neighbour)
+                assert values[k] == pytest.approx(scorer.pairs.raw(counts, 30)[0])
+
+            slot = np.flatnonzero(indices == old[0])[0]
+            pairs.apply(old[0], new[0])
+            indices[slot] = new[0]
+
+        counts = engine.compiled.template_counts(indices)
+        assert pairs.value == pytest.approx(scorer.pairs.raw(counts, 30)[0])
+        assert (pairs.counts == counts[0]).all()
+
+
+class TestSynergyScoring:
+    """Test the pair terms in engine scoring."""
+
+    def test_evaluation_counts_synergies(self, engine):
+        """Test that evaluate_solution adds the pair terms to the score."""
+        request = CompositionOptimizationRequest(
+            squad_size=10, game_type="wvw", game_mode="zerg"
+        )
+        solution = engine.greedy_seed(request)
+        indices = engine.compiled.indices(solution)
+        totals, role_counts = engine.compiled.totals(indices)
+        counts = engine.compiled.template_counts(indices)
+
+        score = engine.evaluate_solution(solution, request)[0]
+
+        assert score == pytest.approx(
+            engine.batch_scorer.score(totals, role_counts, 10, counts)[0]
+        )
+
+    def test_local_search_score_matches_evaluation(self, engine):
+        """Test that the incremental search score is the one of its result."""
+        request = CompositionOptimizationRequest(
+            squad_size=30, game_type="wvw", game_mode="zerg"
+        )
+        seed = engine.greedy_seed(request)
+
+        solution, stats = engine.local_search(seed, request, time_budget=0.2)
+
+        indices = engine.compiled.indices(solution)
+        assert stats.raw_score == pytest.approx(
+            engine.batch_scorer.raw_solutions(indices)[0]
+        )
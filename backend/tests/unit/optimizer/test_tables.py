@@ -0,0 +1,233 @@
+"""Unit tests for the precomputed optimal-composition tables."""
+
+import os
+import queue
+import threading
+from contextlib import closing
+
+import pytest
+
+from app.core.optimizer import engine as engine_module
+from app.core.optimizer import tables as tables_module
+from app.core.optimizer.alliance import run_squad
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.portfolio import plan_portfolio
+from app.core.optimizer.stream import run_streamed
+from app.core.optimizer.strategies import STOP_PRECOMPUTED
+from app.core.optimizer.tables import (
+    PrecomputedTables,
+    TableEntry,
+    connect,
+    precompute_config,
+    precompute_tables,
+    store,
+    stored_keys,
+    table_key,
+)
+from app.schemas.composition import (
+    CompositionOptimizationIncumbent,
+    CompositionOptimizationRequest,
+)
+
+
+@pytest.fixture
+def engine():
+    """Create optimizer engine for WvW roaming."""
+    return OptimizerEngine(game_type="wvw", game_mode="roaming")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "tables.sqlite")
+
+
+def request(size=5, **kwargs):
+    return CompositionOptimizationRequest(
+        squad_size=size, game_type="wvw", game_mode="roaming", **kwargs
+    )
+
+
+def entry(engine, size=5, templates=None, raw_score=0.5):
+    return TableEntry(
+        version=engine.result_version,
+        game_type="wvw",
+        game_mode="roaming",
+        squad_size=size,
+        professions="",
+        templates=templates or [0] * size,
+        raw_score=raw_score,
+        strategy="tabu",
+    )
+
+
+class TestTableKey:
+    """Test table_key function."""
+
+    def test_plain_requests(self):
+        """Test that plain requests are keyed by size and professions."""
+        assert table_key(request()) == (5, "")
+        assert table_key(request(fixed_professions=[3, 1, 3])) == (5, "1,3")
+        assert table_key(request(debug=True)) == (5, "")
+        assert table_key(request(restarts=4)) == (5, "")
+
+    def test_constrained_requests(self):
+        """Test that requests with other constraints aren't served from tables."""
+        assert table_key(request(min_healing=0.5)) is None
+        assert table_key(request(strategy="tabu")) is None
+
+
+class TestStore:
+    """Test store function."""
+
+    def test_only_better_entries_replace(self, engine, path):
+        """Test that stored entries only improve."""
+        with closing(connect(path)) as connection:
+            assert store(connection, [entry(engine, raw_score=0.5)]) == 1
+            assert store(connection, [entry(engine, raw_score=0.4)]) == 0
+            assert store(connection, [entry(engine, raw_score=0.6)]) == 1
+            rows = connection.execute("SELECT raw_score FROM compositions").fetchall()
+
+        assert rows == [(0.6,)]
+        assert stored_keys(path, engine.result_version) == {(5, "")}
+        assert stored_keys(path, "other") == set()
+
+
+class TestPrecomputedTables:
+    """Test PrecomputedTables class."""
+
+    def test_lookup(self, engine, path):
+        """Test that stored requests of the version are found."""
+        with closing(connect(path)) as connection:
+            store(connection, [entry(engine, templates=[1, 2, 3, 4, 5])])
+        tables = PrecomputedTables(path)
+
+        assert tables.lookup(engine.result_version, request()) == (
+            [1, 2, 3, 4, 5],
+            0.5,
+        )
+        assert tables.lookup("other", request()) is None
+        assert tables.lookup(engine.result_version, request(6)) is None
+        assert tables.stats()["hits"] == 1
+
+    def test_missing_file(self, engine, tmp_path):
+        """Test that a missing file or an empty path serve nothing."""
+        assert (
+            PrecomputedTables(str(tmp_path / "none")).lookup(
+                engine.result_version, request()
+            )
+            is None
+        )
+        assert PrecomputedTables("").lookup(engine.result_version, request()) is None
+
+    def test_reload_on_change(self, engine, path):
+        """Test that a rewritten file is reloaded."""
+        with closing(connect(path)) as connection:
+            store(connection, [entry(engine)])
+        tables = PrecomputedTables(path)
+        assert tables.lookup(engine.result_version, request(6)) is None
+
+        with closing(connect(path)) as connection:
+            store(connection, [entry(engine, size=6)])
+        os.utime(path, (1, 1))
+
+        assert tables.lookup(engine.result_version, request(6)) is not None
+
+
+class TestPrecompute:
+    """Test precompute_config function."""
+
+    def test_entries_match_their_score(self, engine):
+        """Test that precomputed entries carry the score of their templates."""
+        entries = precompute_config("wvw", "roaming", [3, 5], 0.1)
+
+        assert [e.squad_size for e in entries] == [3, 5]
+        for e in entries:
+            assert e.version == engine.result_version
+            assert e.raw_score == pytest.approx(
+                engine.batch_scorer.raw_solutions(e.templates)[0]
+            )
+
+    def test_profession_sets_and_skip(self):
+        """Test that profession sets are solved and stored keys skipped."""
+        entries = precompute_config(
+            "wvw", "roaming", [3, 4], 0.1, profession_sets=[[2, 1]], skip={(3, "")}
+        )
+
+        assert [(e.squad_size, e.professions) for e in entries] == [
+            (4, ""),
+            (3, "1,2"),
+            (4, "1,2"),
+        ]
+
+
+class FakePool:
+    """Pool running jobs in process; the zerg config fails."""
+
+    max_workers = 2
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    async def run(self, fn, game_type, game_mode, *args):
+        if game_mode == "zerg":
+            raise RuntimeError("worker died")
+        return self.entries
+
+
+class TestPrecomputeTables:
+    """Test precompute_tables function."""
+
+    async def test_completed_configs_are_stored(self, engine, path, monkeypatch):
+        """Test that a failed config doesn't lose the entries of the others."""
+        monkeypatch.setattr(
+            tables_module,
+            "table_configs",
+            lambda: [("wvw", "roaming"), ("wvw", "zerg")],
+        )
+
+        with pytest.raises(RuntimeError):
+            await precompute_tables(FakePool([entry(engine)]), path)
+
+        assert stored_keys(path, engine.result_version) == {(5, "")}
+
+
+class TestEngineLookup:
+    """Test the tables in engine optimizations."""
+
+    def test_stored_request_skips_the_search(self, engine, path, monkeypatch):
+        """Test that optimizations of stored requests come from the tables."""
+        templates = engine.compiled.indices(engine.greedy_seed(request())).tolist()
+        with closing(connect(path)) as connection:
+            store(connection, [entry(engine, templates=templates)])
+        tables = PrecomputedTables(path)
+        monkeypatch.setattr(engine_module, "get_precomputed_tables", lambda: tables)
+
+        result = engine.optimize(request(debug=True))
+        constrained = engine.optimize(request(min_healing=0.1))
+
+        assert result.stop_reason == STOP_PRECOMPUTED
+        assert [m["profession_id"] for m in result.composition.members] == [
+            engine.build_catalogue[i].profession_id for i in templates
+        ]
+        assert constrained.stop_reason != STOP_PRECOMPUTED
+
+    def test_every_search_path_reads_the_tables(self, engine, path, monkeypatch):
+        """Test that streamed, portfolio and alliance squad runs use the tables."""
+        size = 10
+        stored = request(size, restarts=2)
+        templates = engine.compiled.indices(engine.greedy_seed(stored)).tolist()
+        with closing(connect(path)) as connection:
+            store(connection, [entry(engine, size, templates=templates)])
+        tables = PrecomputedTables(path)
+        monkeypatch.setattr(engine_module, "get_precomputed_tables", lambda: tables)
+
+        events = queue.Queue()
+        run_streamed(stored, events, threading.Event(), time_budget=1.0)
+        streamed = CompositionOptimizationIncumbent.model_validate_json(events.get())
+        planned = plan_portfolio(stored, time_budget=1.0)
+        squad = run_squad(stored, time_budget=1.0)
+
+        assert streamed.final and streamed.result.stop_reason == STOP_PRECOMPUTED
+        assert planned.stop_reason == STOP_PRECOMPUTED
+        assert squad.stats.stop_reason == STOP_PRECOMPUTED
+        assert squad.indices == templates
@@ -0,0 +1,115 @@
+"""Unit tests for the transposition table of the local search."""
+
+import numpy as np
+import pytest
+
+from app.core.optimizer.engine import OptimizerEngine
+from app.core.optimizer.transposition import TranspositionTable
+from app.schemas.composition import CompositionOptimizationRequest
+from tests.unit.optimizer.conftest import make_hard_request
+
+
+@pytest.fixture
+def engine():
+    """Create optimizer engine for WvW zerg."""
+    return OptimizerEngine(game_type="wvw", game_mode="zerg")
+
+
+def key_of(indices, n_templates, size):
+    """Zobrist hash of a composition, hashed from scratch."""
+    table = TranspositionTable(n_templates, size, 16)
+    table.start(indices)
+    return table.key
+
+
+class TestTranspositionTable:
+    """Test TranspositionTable class."""
+
+    def test_incremental_hashes_match_full_hashes(self):
+        """Test that swap hashes are those of the swapped compositions."""
+        rng = np.random.default_rng(5)
+        n_templates, size = 11, 20
+        indices = rng.integers(n_templates, size=size)
+        table = TranspositionTable(n_templates, size, 16)
+        table.start(indices)
+
+        for _ in range(30):
+            slots = rng.integers(size, size=8)
+            old, new = indices[slots], rng.integers(n_templates, size=8)
+            hashes = table.neighbours(old, new)
+            for k in range(8):
+                neighbour = indices.copy()
+                neighbour[slots[k]] = new[k]
+                assert hashes[k] == key_of(neighbour, n_templates, size)
+
+            table.apply(old[0], new[0])
+            indices[slots[0]] = new[0]
+            assert table.key == key_of(indices, n_templates, size)
+
+    def test_hash_ignores_slot_order(self):
+        """Test that permutations of a composition share their hash."""
+        indices = np.array([0, 3, 3, 7, 1])
+
+        assert key_of(indices, 8, 5) == key_of(indices[::-1], 8, 5)
+        assert key_of(indices, 8, 5) != key_of(np.array([0, 3, 7, 7, 1]), 8, 5)
+
+    def test_probe_finds_stored_scores(self):
+        """Test that stored hashes are hits with their score, others misses."""
+        table = TranspositionTable(4, 4, 16)
+        hashes = np.array([3, 12345, 2**63 + 7], dtype=np.uint64)
+        table.store(hashes[:2], np.array([0.5, -0.25]))
+
+        hit, scores = table.probe(hashes)
+
+        assert hit.tolist() == [True, True, False]
+        assert scores[:2].tolist() == [0.5, -0.25]
+        assert (table.lookups, table.hits) == (3, 2)
+
+    def test_size_is_bounded(self):
+        """Test that colliding entries replace each other."""
+        table = TranspositionTable(4, 4, 4)
+        table.store(np.array([1], dtype=np.uint64), np.array([1.0]))
+        table.store(np.array([5], dtype=np.uint64), np.array([5.0]))
+
+        hit, _ = table.probe(np.array([1, 5], dtype=np.uint64))
+
+        assert hit.tolist() == [False, True]
+        assert table.hashes.size == 4
+
+    def test_size_must_be_power_of_two(self):
+        """Test that table sizes other than powers of 2 are rejected."""
+        with pytest.raises(ValueError, match="power of 2"):
+            TranspositionTable(4, 4, 100)
+
+
+class TestLocalSearchTable:
+    """Test the transposition table in local search."""
+
+    def test_hits_are_reported(self, engine):
+        """Test that revisited candidates are counted in the run stats."""
+        request = make_hard_request(debug=True)
+
+        result = engine.optimize(request, time_budget=0.5)
+
+        debug = result.debug
+        assert debug.transposition_lookups == debug.evaluations
+        assert 0 < debug.transposition_hits <= debug.transposition_lookups
+
+    def test_same_search_without_table(self, engine):
+        """Test that the table changes the cost of a search, not its course."""
+        request = CompositionOptimizationRequest(
+            squad_size=30, game_type="wvw", game_mode="zerg"
+        )
+        seed = engine.greedy_seed(request)
+
+        with_table, stats = engine.local_search(seed, request, time_budget=5.0)
+        engine.config.search["transposition_size"] = 0
+        without_table, plain = engine.local_search(seed, request, time_budget=5.0)
+
+        assert stats.stop_reason == plain.stop_reason == "no_improvement"
+        assert engine.compiled.indices(with_table).tolist() == (
+            engine.compiled.indices(without_table).tolist()
+        )
+        assert stats.raw_score == pytest.approx(plain.raw_score)
+        assert stats.steps == plain.steps
+        assert plain.transposition_lookups == 0
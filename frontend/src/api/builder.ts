@@ -3,7 +3,7 @@
  * Operations for squad optimization and building
  */
 
-import { apiPost, apiGet } from "./client";
+import { apiPost, apiGet, apiPostEvents, apiPostStream } from "./client";
 
 export interface BuilderRole {
   profession: string;
@@ -31,7 +31,11 @@ export interface CompositionOptimizationRequest {
   min_cc?: number;
   min_cleanses?: number;
   excluded_elite_specializations?: number[];
+  target_score?: number;
+  strategy?: SearchStrategy;
+  restarts?: number;
   optimization_goals?: string[];
+  debug?: boolean;
 }
 
 export interface CompositionMember {
@@ -60,6 +64,28 @@ export interface Composition {
   updated_at?: string;
 }
 
+export type SearchStrategy = 'hill_climb' | 'annealing' | 'tabu';
+
+export interface RestartStats {
+  restart: number;
+  strategy: SearchStrategy;
+  raw_score: number;
+  steps: number;
+  improvements: number;
+  stop_reason: string;
+  elapsed: number;
+}
+
+export interface OptimizationDebug {
+  strategy: string;
+  steps: number;
+  evaluations: number;
+  acceptances: number;
+  improvements: number;
+  phases: Record<string, number>;
+  queue_wait?: number;
+}
+
 export interface CompositionOptimizationResult {
   composition: Composition;
   score: number;
@@ -67,6 +93,52 @@ export interface CompositionOptimizationResult {
   role_distribution: Record<string, number>;
   boon_coverage: Record<string, number>;
   notes?: string[];
+  stop_reason?:
+    | 'time_budget'
+    | 'no_improvement'
+    | 'target_score'
+    | 'proven_optimal'
+    | 'cancelled';
+  restarts?: RestartStats[];
+  debug?: OptimizationDebug;
+}
+
+export interface CompositionOptimizationBatchItem {
+  indices: number[];
+  cached: boolean;
+  result?: CompositionOptimizationResult;
+  status_code: number;
+  error?: string;
+}
+
+export interface CompositionOptimizationIncumbent {
+  raw_score?: number;
+  iteration: number;
+  elapsed: number;
+  result: CompositionOptimizationResult;
+  final: boolean;
+}
+
+export interface CompositionOptimizationJobRequest
+  extends CompositionOptimizationRequest {
+  time_budget?: number;
+}
+
+export interface CompositionOptimizationJobProgress {
+  iteration: number;
+  elapsed: number;
+  fraction: number;
+  raw_score?: number;
+  score: number;
+}
+
+export interface CompositionOptimizationJob {
+  job_id: string;
+  status: 'deferred' | 'queued' | 'in_progress' | 'complete' | 'not_found';
+  enqueue_time?: string;
+  progress?: CompositionOptimizationJobProgress;
+  result?: CompositionOptimizationResult;
+  error?: string;
 }
 
 export interface GameMode {
@@ -95,6 +167,68 @@ export const optimizeComposition = async (
   );
 };
 
+/**
+ * Optimize several compositions at once; `onItem` receives each result as
+ * soon as it is ready (`indices` are the positions of the requests it answers)
+ */
+export const optimizeBatch = async (
+  requests: CompositionOptimizationRequest[],
+  onItem: (item: CompositionOptimizationBatchItem) => void,
+): Promise<void> => {
+  return apiPostStream<
+    CompositionOptimizationBatchItem,
+    CompositionOptimizationRequest[]
+  >("/builder/optimize/batch", requests, onItem);
+};
+
+/**
+ * Optimize a composition, receiving every better composition as it is found.
+ * Resolves with the final result; aborting `signal` (e.g. once an incumbent
+ * is good enough) stops the search on the server.
+ */
+export const optimizeStream = async (
+  request: CompositionOptimizationRequest,
+  onIncumbent: (incumbent: CompositionOptimizationIncumbent) => void,
+  signal?: AbortSignal,
+): Promise<CompositionOptimizationResult | undefined> => {
+  let final: CompositionOptimizationResult | undefined;
+  await apiPostEvents<
+    CompositionOptimizationIncumbent & { detail?: string },
+    CompositionOptimizationRequest
+  >(
+    "/builder/optimize/stream",
+    request,
+    (event, data) => {
+      if (event === "error") throw new Error(data.detail);
+      onIncumbent(data);
+      if (event === "result") final = data.result;
+    },
+    { signal },
+  );
+  return final;
+};
+
+/**
+ * Start a long optimization on the background worker
+ */
+export const createOptimizationJob = async (
+  request: CompositionOptimizationJobRequest,
+): Promise<CompositionOptimizationJob> => {
+  return apiPost<CompositionOptimizationJob, CompositionOptimizationJobRequest>(
+    "/builder/jobs",
+    request,
+  );
+};
+
+/**
+ * Get the status, progress and result of a background optimization
+ */
+export const getOptimizationJob = async (
+  jobId: string,
+): Promise<CompositionOptimizationJob> => {
+  return apiGet<CompositionOptimizationJob>(`/builder/jobs/${jobId}`);
+};
+
 /**
  * Get available game modes
  */
@@ -140,6 +140,90 @@ export async function apiPost<T, D = unknown>(
   return handleResponse<T>(response);
 }
 
+/**
+ * POST request answered with newline-delimited JSON (application/x-ndjson):
+ * calls `onItem` for every line as soon as it arrives
+ */
+export async function apiPostStream<T, D = unknown>(
+  endpoint: string,
+  data: D,
+  onItem: (item: T) => void,
+  options?: RequestInit,
+): Promise<void> {
+  const url = `${API_BASE_URL}${API_V1_STR}${endpoint}`;
+
+  const response = await fetch(url, {
+    method: "POST",
+    headers: getHeaders(),
+    body: JSON.stringify(data),
+    ...options,
+  });
+
+  if (!response.ok || !response.body) {
+    await handleResponse<T>(response);
+    return;
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += value;
+    const lines = buffer.split("\n");
+    buffer = lines.pop() ?? "";
+    for (const line of lines) {
+      if (line.trim()) onItem(JSON.parse(line) as T);
+    }
+  }
+  if (buffer.trim()) onItem(JSON.parse(buffer) as T);
+}
+
+/**
+ * POST request answered with server-sent events (text/event-stream):
+ * calls `onEvent` with the name and parsed data of every event. Abort
+ * `options.signal` to close the stream.
+ */
+export async function apiPostEvents<T, D = unknown>(
+  endpoint: string,
+  data: D,
+  onEvent: (event: string, data: T) => void,
+  options?: RequestInit,
+): Promise<void> {
+  const url = `${API_BASE_URL}${API_V1_STR}${endpoint}`;
+
+  const response = await fetch(url, {
+    method: "POST",
+    headers: getHeaders(),
+    body: JSON.stringify(data),
+    ...options,
+  });
+
+  if (!response.ok || !response.body) {
+    await handleResponse<T>(response);
+    return;
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += value;
+    const blocks = buffer.split("\n\n");
+    buffer = blocks.pop() ?? "";
+    for (const block of blocks) {
+      let event = "message";
+      let payload = "";
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) payload += line.slice(6);
+      }
+      if (payload) onEvent(event, JSON.parse(payload) as T);
+    }
+  }
+}
+
 /**
  * Generic PUT request
  */